@@ -2,7 +2,7 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -14,11 +14,14 @@ class MultiOmicsConfig(BaseSettings):
     Environment Variables:
         MULTIOMICS_DATA_DIR: Directory for multi-omics data files
         MULTIOMICS_CACHE_DIR: Directory for cached results
+        MULTIOMICS_CACHE_MAX_GB: Disk budget for cached integrated datasets
         MULTIOMICS_DRY_RUN: Enable mock mode without R dependencies
         MULTIOMICS_R_HOME: Path to R installation (optional)
         MULTIOMICS_LOG_LEVEL: Logging level (DEBUG, INFO, WARNING, ERROR)
         MULTIOMICS_MAX_FEATURES: Maximum features per modality
         MULTIOMICS_MIN_SAMPLES: Minimum samples required
+        MULTIOMICS_JOB_WORKERS: Worker threads running tool jobs
+        MULTIOMICS_TOOL_CONCURRENCY: JSON dict of per-tool concurrent run limits
     """
 
     model_config = SettingsConfigDict(
@@ -39,6 +42,12 @@ class MultiOmicsConfig(BaseSettings):
         description="Directory for cached results and intermediate files",
     )
 
+    cache_max_gb: float = Field(
+        default=50.0,
+        description="Disk budget for cached integrated datasets (least recently used are evicted)",
+        gt=0,
+    )
+
     # R configuration
     r_home: Optional[Path] = Field(
         default=None,
@@ -91,10 +100,21 @@ class MultiOmicsConfig(BaseSettings):
 
     timeout_seconds: int = Field(
         default=600,
-        description="Timeout for long-running operations",
+        description="Timeout for long-running operations; slower tool calls return a job handle",
         ge=60,
     )
 
+    job_workers: int = Field(
+        default=4,
+        description="Worker threads running tool jobs (shared by all clients)",
+        ge=1,
+    )
+
+    tool_concurrency: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Per-tool concurrent run limits, overriding jobs.TOOL_CONCURRENCY",
+    )
+
     @model_validator(mode='after')
     def parse_boolean_env_vars(self):
         """Fix boolean parsing from environment variables.
@@ -0,0 +1,271 @@
+"""Managed worker pool for the multi-omics tools.
+
+The analysis implementations are synchronous pandas/scipy code. Calling them
+directly from a FastMCP tool would block the server's event loop, so every
+tool hands its work to a shared JobManager instead:
+
+    result = await get_job_manager().run("run_pca", run_multiomics_pca_impl, **kwargs)
+
+Jobs run on a thread pool of MULTIOMICS_JOB_WORKERS threads. Each tool also
+has its own concurrency limit (TOOL_CONCURRENCY, overridable with
+MULTIOMICS_TOOL_CONCURRENCY); jobs above the limit wait in a per-tool queue
+without occupying a worker, so one busy tool cannot starve the others.
+
+Long runs can instead be submitted as jobs and polled (submit / status /
+cancel / result). Implementations that accept a ``progress_callback`` (HAllA
+reports progress after every tile) have their progress recorded on the job.
+Cancellation is immediate for queued jobs and cooperative for running ones:
+the next progress report raises JobCancelled inside the job.
+
+A running job that reads a cached integrated dataset (its ``data_path``
+argument) holds a lease on it, so cache eviction never removes it mid-run.
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .config import config
+from .tools.dataset_cache import dataset_lease
+
+logger = logging.getLogger(__name__)
+
+# Concurrent runs per tool; tools not listed use DEFAULT_TOOL_CONCURRENCY
+TOOL_CONCURRENCY = {
+    "run_halla_analysis": 1,
+    "preprocess_multiomics_data": 2,
+    "integrate_omics_data": 2,
+    "create_multiomics_heatmap": 2,
+    "run_multiomics_pca": 2,
+    "infer_regulator_activity": 2,
+}
+DEFAULT_TOOL_CONCURRENCY = 4
+
+# Finished jobs kept for polling; the oldest are forgotten first
+MAX_FINISHED_JOBS = 200
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled."""
+
+
+class JobNotFound(KeyError):
+    """No job with the given ID (never submitted, or already forgotten)."""
+
+
+@dataclass(eq=False)
+class Job:
+    """One submitted tool run."""
+
+    job_id: str
+    tool: str
+    fn: Callable[..., Any]
+    kwargs: Dict[str, Any]
+    status: str = "queued"
+    progress: Optional[Dict[str, Any]] = None
+    result: Any = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+    done: Future = field(default_factory=Future)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def report_progress(self, progress: Dict[str, Any]) -> None:
+        """Progress callback handed to the implementation."""
+        self.progress = dict(progress)
+        if self.cancel_requested.is_set():
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.job_id,
+            "tool": self.tool,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "queued_seconds": round((self.started_at or end) - self.submitted_at, 3),
+            "run_seconds": round(end - self.started_at, 3) if self.started_at else None,
+        }
+
+
+class JobManager:
+    """Thread pool with per-tool concurrency limits and job bookkeeping."""
+
+    def __init__(self, max_workers: int = 4, tool_concurrency: Optional[Dict[str, int]] = None):
+        self.max_workers = max_workers
+        self.tool_concurrency = {**TOOL_CONCURRENCY, **(tool_concurrency or {})}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="multiomics-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._running: Dict[str, int] = defaultdict(int)
+        self._queued: Dict[str, Deque[Job]] = defaultdict(deque)
+
+    def limit(self, tool: str) -> int:
+        return max(1, self.tool_concurrency.get(tool, DEFAULT_TOOL_CONCURRENCY))
+
+    # Submission -----------------------------------------------------------
+
+    def submit(self, tool: str, fn: Callable[..., Any], **kwargs: Any) -> Job:
+        """Queue ``fn(**kwargs)`` as a job of ``tool`` and return it immediately."""
+        job = Job(uuid.uuid4().hex[:12], tool, fn, kwargs)
+        if "progress_callback" in inspect.signature(fn).parameters and "progress_callback" not in kwargs:
+            job.kwargs["progress_callback"] = job.report_progress
+        with self._lock:
+            self._jobs[job.job_id] = job
+            if self._running[tool] < self.limit(tool):
+                self._start(job)
+            else:
+                self._queued[tool].append(job)
+                logger.info(f"Job {job.job_id} ({tool}) queued: {self._running[tool]} already running")
+            self._forget_finished()
+        return job
+
+    async def run(self, tool: str, fn: Callable[..., Any], timeout: Optional[float] = None,
+                  **kwargs: Any) -> Any:
+        """Run ``fn(**kwargs)`` in the pool without blocking the event loop.
+
+        Args:
+            tool: Tool name (selects the concurrency limit)
+            fn: Synchronous implementation
+            timeout: Seconds to wait for the result. When exceeded, the job
+                keeps running and a job handle is returned instead of the result.
+
+        Returns:
+            The implementation's result, or the job status dict on timeout
+
+        Raises:
+            Whatever the implementation raised
+        """
+        job = self.submit(tool, fn, **kwargs)
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.done)), timeout)
+        except asyncio.TimeoutError:
+            logger.info(f"Job {job.job_id} ({tool}) still running after {timeout}s; returning handle")
+            return {
+                **job.to_dict(),
+                "message": f"Still running after {timeout:g}s. Poll get_job_status('{job.job_id}') "
+                           f"and fetch the output with get_job_results('{job.job_id}').",
+            }
+        return self.result(job.job_id)
+
+    # Queries --------------------------------------------------------------
+
+    def get(self, job_id: str) -> Job:
+        try:
+            return self._jobs[job_id]
+        except KeyError:
+            raise JobNotFound(f"Unknown job '{job_id}'") from None
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        # Snapshot under the lock: the job may start or be cancelled concurrently
+        with self._lock:
+            status = job.to_dict()
+            queue = self._queued[job.tool]
+            if job.status == "queued" and job in queue:
+                status["queue_position"] = list(queue).index(job) + 1
+        return status
+
+    def result(self, job_id: str) -> Any:
+        """Result of a completed job; re-raises the error of a failed one."""
+        job = self.get(job_id)
+        if job.status == "completed":
+            return job.result
+        if job.status == "failed":
+            raise job.done.exception()
+        if job.status == "cancelled":
+            raise JobCancelled(f"Job {job_id} was cancelled")
+        raise RuntimeError(f"Job {job_id} is still {job.status}")
+
+    def list_jobs(self, tool: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in list(self._jobs.values()) if tool in (None, job.tool)]
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a job: queued jobs never start, running jobs stop at their next progress report."""
+        job = self.get(job_id)
+        with self._lock:
+            if job.status == "queued":
+                self._queued[job.tool].remove(job)
+                self._finish(job, "cancelled")
+            elif job.status == "running":
+                job.cancel_requested.set()
+                job.status = "cancelling"
+        return job.to_dict()
+
+    def shutdown(self, wait: bool = True) -> None:
+        for job in list(self._jobs.values()):
+            if not job.finished:
+                self.cancel(job.job_id)
+        self._executor.shutdown(wait=wait)
+
+    # Execution ------------------------------------------------------------
+
+    def _start(self, job: Job) -> None:
+        """Hand a job to the pool (caller holds the lock)."""
+        self._running[job.tool] += 1
+        job.status = "running"
+        job.started_at = time.time()
+        self._executor.submit(self._execute, job)
+
+    def _execute(self, job: Job) -> None:
+        try:
+            with dataset_lease(job.kwargs.get("data_path")):
+                result = job.fn(**job.kwargs)
+        except JobCancelled as exc:
+            outcome, value = "cancelled", exc
+        except Exception as exc:
+            logger.exception(f"Job {job.job_id} ({job.tool}) failed")
+            outcome, value = "failed", exc
+        else:
+            outcome, value = ("cancelled", JobCancelled(f"Job {job.job_id} cancelled")) \
+                if job.cancel_requested.is_set() else ("completed", result)
+
+        with self._lock:
+            self._running[job.tool] -= 1
+            self._finish(job, outcome, value)
+            queue = self._queued[job.tool]
+            if queue and self._running[job.tool] < self.limit(job.tool):
+                self._start(queue.popleft())
+
+    def _finish(self, job: Job, status: str, value: Any = None) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        if status == "completed":
+            job.result = value
+            job.done.set_result(value)
+        else:
+            value = value or JobCancelled(f"Job {job.job_id} cancelled")
+            job.error = str(value)
+            job.done.set_exception(value)
+
+    def _forget_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The server-wide JobManager, created from config on first use."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(config.job_workers, config.tool_concurrency)
+        return _job_manager
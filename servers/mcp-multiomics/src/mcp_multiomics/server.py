@@ -11,12 +11,14 @@ Provides tools for:
 import logging
 import os
 import sys
+from itertools import combinations
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from fastmcp import FastMCP
 
 from .config import config
+from .jobs import JobNotFound, get_job_manager
 
 # Import cost tracking utilities
 # In container: /app/shared/utils is in PYTHONPATH
@@ -29,15 +31,22 @@ except ImportError:
     if str(_shared_utils_path) not in sys.path:
         sys.path.insert(0, str(_shared_utils_path))
     from cost_tracking import CostTracker, CostEstimator
-from .tools.integration import integrate_omics_data_impl
-from .tools.stouffer import calculate_stouffer_meta_impl
+from .tools.integration import integrate_omics_data_impl, list_integrated_datasets_impl
+from .tools.stouffer import (
+    calculate_stouffer_meta_from_stores_impl,
+    calculate_stouffer_meta_impl,
+)
 from .tools.preprocessing import (
     validate_multiomics_data_impl,
     preprocess_multiomics_data_impl,
     visualize_data_quality_impl,
 )
-from .tools.halla import run_halla_analysis_impl
+from .tools.halla import query_halla_associations_impl, run_halla_analysis_impl
 from .tools.upstream_regulators import predict_upstream_regulators_impl
+from .tools.regulator_activity import infer_regulator_activity_impl
+from .tools.pca import run_multiomics_pca_impl
+from .tools.halla_store import ASSOCIATION_DTYPE
+from .tools.heatmap import DEFAULT_TOP_FEATURES as HEATMAP_TOP_FEATURES, create_multiomics_heatmap_impl
 
 # Configure logging
 logging.basicConfig(
@@ -110,23 +119,35 @@ All findings must be:
     return result
 
 
+async def run_tool(tool: str, impl: Callable[..., Any], **kwargs: Any) -> Any:
+    """Run a synchronous tool implementation in the shared worker pool.
+
+    Keeps the event loop free for other clients. Calls still running after
+    MULTIOMICS_TIMEOUT_SECONDS return a job handle (see get_job_status).
+    """
+    return await get_job_manager().run(tool, impl, timeout=config.timeout_seconds, **kwargs)
+
+
 # ============================================================================
 # TOOLS
 # ============================================================================
 
 
 @mcp.tool()
-def integrate_omics_data(
+async def integrate_omics_data(
     rna_path: str,
     protein_path: Optional[str] = None,
     phospho_path: Optional[str] = None,
     metadata_path: Optional[str] = None,
     normalize: bool = True,
     filter_missing: float = 0.5,
+    session_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Integrate multi-omics data from RNA, protein, and phosphorylation datasets.
 
     Aligns samples across modalities, handles missing data, and performs normalization.
+    Results are cached by content: integrating the same files with the same
+    parameters again returns the cached dataset (cache_hit=True).
 
     Args:
         rna_path: Path to RNA expression data (CSV or TSV, genes x samples)
@@ -135,6 +156,7 @@ def integrate_omics_data(
         metadata_path: Path to sample metadata (optional, must include 'Sample' column)
         normalize: Apply Z-score normalization within each modality
         filter_missing: Remove features with >X fraction missing (0.0-1.0)
+        session_id: Session or patient identifier recorded in the dataset index (optional)
 
     Returns:
         Dictionary with:
@@ -143,6 +165,9 @@ def integrate_omics_data(
         - feature_counts: Number of features per modality
         - metadata: Sample metadata if provided
         - qc_metrics: Quality control statistics
+        - dataset_id: Content key of the integrated dataset
+        - cache_path: Dataset path to pass to downstream tools (data_path)
+        - cache_hit: True if an identical integration was reused
 
     Example:
         ```
@@ -188,19 +213,63 @@ def integrate_omics_data(
         })
 
     # Real implementation
-    result = integrate_omics_data_impl(
+    result = await run_tool(
+        "integrate_omics_data", integrate_omics_data_impl,
         rna_path=rna_path,
         protein_path=protein_path,
         phospho_path=phospho_path,
         metadata_path=metadata_path,
         normalize=normalize,
         filter_missing=filter_missing,
+        session_id=session_id,
     )
     return add_research_disclaimer(result, "multi-omics data integration")
 
 
 @mcp.tool()
-def validate_multiomics_data(
+def list_integrated_datasets(session_id: Optional[str] = None) -> Dict[str, Any]:
+    """List integrated datasets available in the cache.
+
+    Each integrate_omics_data call stores its result under a content key, so
+    datasets of different patients or sessions coexist. Least recently used
+    datasets are evicted when the cache exceeds MULTIOMICS_CACHE_MAX_GB.
+
+    Args:
+        session_id: Only list datasets created or reused by this session (optional)
+
+    Returns:
+        Dictionary with:
+        - datasets: dataset_id, cache_path, modalities, inputs, params, sessions,
+          size_mb, created_at and last_accessed (most recent first)
+        - total_size_gb / cache_max_gb: Cache usage and budget
+    """
+    logger.info(f"list_integrated_datasets called (session_id={session_id})")
+
+    if config.dry_run:
+        return add_dry_run_warning({
+            "datasets": [
+                {
+                    "dataset_id": "3f2a9c" + "0" * 58,
+                    "cache_path": str(config.cache_dir / "datasets" / ("3f2a9c" + "0" * 58)),
+                    "modalities": ["rna", "protein", "phospho"],
+                    "inputs": {"rna": "/data/rna.csv", "protein": "/data/protein.csv"},
+                    "params": {"normalize": True, "filter_missing": 0.5},
+                    "sessions": [session_id or "session_1"],
+                    "size_mb": 12.4,
+                    "created_at": "2025-01-01T00:00:00",
+                    "last_accessed": "2025-01-01T00:00:00",
+                }
+            ],
+            "total_size_gb": 0.012,
+            "cache_max_gb": config.cache_max_gb,
+            "status": "success (DRY_RUN mode)",
+        })
+
+    return list_integrated_datasets_impl(session_id=session_id)
+
+
+@mcp.tool()
+async def validate_multiomics_data(
     rna_path: str,
     protein_path: Optional[str] = None,
     phospho_path: Optional[str] = None,
@@ -286,7 +355,8 @@ def validate_multiomics_data(
         })
 
     # Real implementation
-    result = validate_multiomics_data_impl(
+    result = await run_tool(
+        "validate_multiomics_data", validate_multiomics_data_impl,
         rna_path=rna_path,
         protein_path=protein_path,
         phospho_path=phospho_path,
@@ -297,7 +367,7 @@ def validate_multiomics_data(
 
 
 @mcp.tool()
-def preprocess_multiomics_data(
+async def preprocess_multiomics_data(
     rna_path: str,
     protein_path: Optional[str] = None,
     phospho_path: Optional[str] = None,
@@ -321,7 +391,8 @@ def preprocess_multiomics_data(
         metadata_path: Path to sample metadata with 'Batch' column (required for batch correction)
         normalize_method: Normalization method - "quantile", "median", "tmm", or "zscore" (default: quantile)
         batch_correction: Apply batch correction (ComBat method, default: True)
-        imputation_method: Missing value imputation - "knn", "minimum", or "median" (default: knn)
+        imputation_method: Missing value imputation - "knn", "minprob", "svd", "minimum",
+            "median", or "none" (default: knn)
         outlier_threshold: MAD threshold for outlier detection (default: 3.0)
         output_dir: Directory to save preprocessed data files
 
@@ -399,7 +470,8 @@ def preprocess_multiomics_data(
         })
 
     # Real implementation
-    result = preprocess_multiomics_data_impl(
+    result = await run_tool(
+        "preprocess_multiomics_data", preprocess_multiomics_data_impl,
         rna_path=rna_path,
         protein_path=protein_path,
         phospho_path=phospho_path,
@@ -415,7 +487,7 @@ def preprocess_multiomics_data(
 
 
 @mcp.tool()
-def visualize_data_quality(
+async def visualize_data_quality(
     data_paths: Dict[str, str],
     metadata_path: Optional[str] = None,
     output_dir: Optional[str] = None,
@@ -493,7 +565,8 @@ def visualize_data_quality(
         })
 
     # Real implementation
-    result = visualize_data_quality_impl(
+    result = await run_tool(
+        "visualize_data_quality", visualize_data_quality_impl,
         data_paths=data_paths,
         metadata_path=metadata_path,
         output_dir=output_dir,
@@ -505,7 +578,7 @@ def visualize_data_quality(
 
 
 @mcp.tool()
-def run_halla_analysis(
+async def run_halla_analysis(
     data_path: str,
     modality1: str,
     modality2: str,
@@ -513,6 +586,11 @@ def run_halla_analysis(
     method: str = "spearman",
     chunk_size: int = 1000,
     use_r_halla: bool = False,
+    top_k: int = 1000,
+    resume: bool = True,
+    fnr_threshold: float = 0.2,
+    max_blocks: int = 100,
+    feature_selection: str = "variance",
 ) -> Dict[str, Any]:
     """Run HAllA hierarchical all-against-all association testing.
 
@@ -527,41 +605,66 @@ def run_halla_analysis(
         data_path: Path to integrated multi-omics data (from integrate_omics_data)
         modality1: First modality ("rna", "protein", or "phospho")
         modality2: Second modality ("rna", "protein", or "phospho")
-        fdr_threshold: FDR threshold for reference only (p-values returned are NOMINAL)
-        method: Correlation method - "spearman", "pearson", or "mi" (mutual information)
-        chunk_size: Features per chunk (default: 1000, ~5 min/chunk vs days for full dataset)
+        fdr_threshold: Within-run BH threshold for block discovery (association
+            p-values returned are still NOMINAL)
+        method: Correlation method - "spearman", "pearson", or "mi" (normalized mutual
+            information on quantile bins; permutation p-values, correlation field = NMI)
+        chunk_size: Tile edge in features (default: 1000); the test matrix is split into
+            chunk_size × chunk_size tiles computed in parallel (MULTIOMICS_N_JOBS workers)
         use_r_halla: Use R-based HAllA if available (default: False, use Python alternative)
+        top_k: Number of strongest associations returned (default: 1000); every
+            tested pair is kept in the on-disk result store
+        resume: Continue an interrupted run on the same data from its completed tiles
+        fnr_threshold: Tolerated fraction of non-significant pairs in a block (default: 0.2)
+        max_blocks: Number of strongest blocks returned (default: 100)
+        feature_selection: Ranking used to reduce modalities above
+            MULTIOMICS_MAX_FEATURES before testing - "variance", "mad", "cv",
+            "missingness" or "trend"
 
     Returns:
         Dictionary with:
-        - associations: List of feature pairs with NOMINAL p-values
+        - blocks: Association blocks (feature cluster pairs), strongest first
+        - associations: Top-K feature pairs with NOMINAL p-values
+        - result_store: On-disk store of all associations (see query_halla_associations)
         - chunks_processed: Chunking strategy information
-        - clusters: Hierarchical cluster assignments
+        - clusters: Block discovery summary (blocks found, clusters involved)
         - statistics: Summary statistics
+        - feature_prefilter: Features per modality before/after the prefilter
         - nominal_p_values: Flag indicating p-values are NOMINAL
         - recommendation: "Apply FDR after Stouffer's"
 
     Example:
         ```
         result = run_halla_analysis(
-            data_path="/workspace/cache/integrated_data.pkl",
+            data_path="/workspace/cache/integrated_data",
             modality1="rna",
             modality2="protein",
             chunk_size=1000,
             method="spearman"
         )
         # Returns associations with NOMINAL p-values for Stouffer's meta-analysis
-        # Full dataset: 20K RNA × 7K protein = 140M tests (would take days)
-        # Chunked: 1000 features/chunk = ~5 min/chunk
+        # Full dataset: 20K RNA × 7K protein = 140M tests, streamed to result_store
         ```
     """
     logger.info(f"run_halla_analysis called: {modality1} vs {modality2}")
-    logger.info(f"Chunk size: {chunk_size} features (~5 min/chunk)")
+    logger.info(f"Chunk size: {chunk_size} features")
     logger.info(f"IMPORTANT: Returns NOMINAL p-values for Stouffer's meta-analysis")
 
     if config.dry_run:
         # Mock response
         return add_dry_run_warning({
+            "blocks": [
+                {
+                    "block_id": 1,
+                    "features1": [f"{modality1}_gene_{i}" for i in range(1, 6)],
+                    "features2": [f"{modality2}_protein_{i}" for i in range(1, 4)],
+                    "n_pairs": 15,
+                    "n_significant": 14,
+                    "fraction_significant": 14 / 15,
+                    "best_q_value": 0.0004,
+                    "mean_association": 0.78,
+                },
+            ],
             "associations": [
                 {
                     "feature1": f"{modality1}_gene_{i}",
@@ -578,6 +681,7 @@ def run_halla_analysis(
                 "strategy": "1000 features per chunk = ~5 min each (not days)",
             },
             "clusters": {
+                "blocks_found": 1,
                 "modality1_clusters": 5,
                 "modality2_clusters": 4,
                 "total_associations": 47,
@@ -594,7 +698,8 @@ def run_halla_analysis(
         })
 
     # Real implementation
-    result = run_halla_analysis_impl(
+    result = await run_tool(
+        "run_halla_analysis", run_halla_analysis_impl,
         data_path=data_path,
         modality1=modality1,
         modality2=modality2,
@@ -602,13 +707,94 @@ def run_halla_analysis(
         method=method,
         chunk_size=chunk_size,
         use_r_halla=use_r_halla,
+        top_k=top_k,
+        resume=resume,
+        fnr_threshold=fnr_threshold,
+        max_blocks=max_blocks,
+        feature_selection=feature_selection,
     )
 
     return add_research_disclaimer(result, "analysis")
 
 
 @mcp.tool()
-def calculate_stouffer_meta(
+async def query_halla_associations(
+    result_store: str,
+    max_p_value: Optional[float] = None,
+    min_abs_correlation: Optional[float] = None,
+    feature: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100,
+    sort_by_p_value: bool = True,
+) -> Dict[str, Any]:
+    """Page through or filter all associations from a HAllA run.
+
+    run_halla_analysis returns only the top-K associations; every tested pair
+    is streamed to an on-disk result store. This tool scans that store without
+    loading it into memory.
+
+    Args:
+        result_store: Store directory (result_store from run_halla_analysis)
+        max_p_value: Keep associations with NOMINAL p <= this value
+        min_abs_correlation: Keep associations with |correlation| >= this value
+        feature: Keep associations involving this feature (either modality)
+        offset: Number of matching associations to skip (for paging)
+        limit: Maximum number of associations to return (default: 100)
+        sort_by_p_value: Order by nominal p-value (default: True)
+
+    Returns:
+        Dictionary with:
+        - associations: Matching feature pairs with NOMINAL p-values
+        - total_matching: Number of stored associations matching the filters
+        - offset, limit: Paging information
+
+    Example:
+        ```
+        page = query_halla_associations(
+            result_store="/workspace/cache/multiomics/halla/rna_vs_protein_spearman",
+            feature="TP53",
+            max_p_value=0.001
+        )
+        ```
+    """
+    logger.info(f"query_halla_associations called: {result_store}")
+
+    if config.dry_run:
+        return add_dry_run_warning({
+            "associations": [
+                {
+                    "feature1": feature or f"rna_gene_{i}",
+                    "feature2": f"protein_{i}",
+                    "correlation": 0.75 + (i * 0.01),
+                    "p_value_nominal": 0.001 / (i + 1),
+                    "chunk_id": 0,
+                }
+                for i in range(offset, offset + min(limit, 10))
+            ],
+            "total_matching": 47,
+            "offset": offset,
+            "limit": limit,
+            "result_store": result_store,
+            "nominal_p_values": True,
+            "status": "success (DRY_RUN mode)",
+        })
+
+    result = await run_tool(
+        "query_halla_associations", query_halla_associations_impl,
+        result_store=result_store,
+        max_p_value=max_p_value,
+        min_abs_correlation=min_abs_correlation,
+        feature=feature,
+        offset=offset,
+        limit=limit,
+        sort_by_p_value=sort_by_p_value,
+    )
+
+    return add_research_disclaimer(result, "analysis")
+
+
+@mcp.tool()
+async def calculate_stouffer_meta(
     p_values_dict: Dict[str, List[float]],
     effect_sizes_dict: Optional[Dict[str, List[float]]] = None,
     weights: Optional[Dict[str, float]] = None,
@@ -722,7 +908,8 @@ def calculate_stouffer_meta(
         })
 
     # Real implementation
-    result = calculate_stouffer_meta_impl(
+    result = await run_tool(
+        "calculate_stouffer_meta", calculate_stouffer_meta_impl,
         p_values_dict=p_values_dict,
         effect_sizes_dict=effect_sizes_dict,
         weights=weights,
@@ -734,35 +921,130 @@ def calculate_stouffer_meta(
 
 
 @mcp.tool()
-def create_multiomics_heatmap(
+async def calculate_stouffer_meta_from_stores(
+    result_stores: Dict[str, str],
+    weights: Optional[Dict[str, float]] = None,
+    use_directionality: bool = True,
+    top_k: int = 1000,
+) -> Dict[str, Any]:
+    """Combine HAllA association p-values across result stores with Stouffer's method.
+
+    Use this instead of calculate_stouffer_meta when the inputs are full HAllA
+    runs (millions of feature pairs). Each store's NOMINAL p-values are
+    streamed from disk, feature pairs are matched by name across stores, and
+    FDR correction is applied AFTER combination.
+
+    Args:
+        result_stores: Dict of name -> result_store path from run_halla_analysis
+        weights: Dict of name -> weight (default: equal weights)
+        use_directionality: Use the correlation sign for directionality (default: True)
+        top_k: Maximum number of significant pairs to return (default: 1000)
+
+    Returns:
+        Dictionary with:
+        - significant_pairs: Strongest pairs passing FDR (meta_p, meta_z, q_value)
+        - statistics: Tested/significant pair counts and FDR settings
+        - p_value_types: Clarifies which values are nominal vs FDR-corrected
+
+    Example:
+        ```
+        result = calculate_stouffer_meta_from_stores(
+            result_stores={
+                "cohort_a": "/workspace/cache/multiomics/halla/a/rna_vs_protein_spearman",
+                "cohort_b": "/workspace/cache/multiomics/halla/b/rna_vs_protein_spearman",
+            }
+        )
+        ```
+    """
+    logger.info(f"calculate_stouffer_meta_from_stores called with {len(result_stores)} stores")
+
+    if config.dry_run:
+        return add_dry_run_warning({
+            "significant_pairs": [
+                {
+                    "feature1": f"rna_gene_{i}",
+                    "feature2": f"protein_{i}",
+                    "meta_p": 1e-6 * (i + 1),
+                    "meta_z": 4.9 - (i * 0.1),
+                    "q_value": 1e-4 * (i + 1),
+                    "n_modalities": len(result_stores),
+                }
+                for i in range(min(top_k, 5))
+            ],
+            "statistics": {
+                "total_pairs": 150000,
+                "significant_pairs": 5,
+                "pairs_returned": min(top_k, 5),
+                "fdr_threshold": config.fdr_threshold,
+                "directionality_used": use_directionality,
+                "weights_used": weights is not None,
+                "result_stores": list(result_stores.keys()),
+                "fdr_method": "Benjamini-Hochberg (applied AFTER combination)",
+            },
+            "p_value_types": {
+                "meta_p": "NOMINAL (combined, before FDR)",
+                "q_value": "FDR-CORRECTED (use these for significance)",
+            },
+            "status": "success (DRY_RUN mode)",
+        })
+
+    result = await run_tool(
+        "calculate_stouffer_meta_from_stores", calculate_stouffer_meta_from_stores_impl,
+        result_stores=result_stores,
+        weights=weights,
+        use_directionality=use_directionality,
+        fdr_threshold=config.fdr_threshold,
+        top_k=top_k,
+    )
+
+    return add_research_disclaimer(result, "analysis")
+
+
+@mcp.tool()
+async def create_multiomics_heatmap(
     data_path: str,
     features: Optional[List[str]] = None,
     cluster_rows: bool = True,
     cluster_cols: bool = True,
     output_path: Optional[str] = None,
+    modalities: Optional[List[str]] = None,
+    top_features: int = 1000,
+    metric: str = "correlation",
+    optimal_ordering: bool = False,
+    feature_selection: str = "variance",
 ) -> Dict[str, Any]:
     """Create integrated heatmap visualization across multiple omics modalities.
 
     Generates publication-quality heatmap with hierarchical clustering and
-    annotation tracks for treatment groups and data modalities.
+    annotation tracks for treatment groups and data modalities. Rows are
+    z-scored features; clustering uses average linkage, and the linkage for a
+    feature selection is cached so re-rendering it skips clustering.
 
     Args:
         data_path: Path to integrated multi-omics data
-        features: List of feature names to include (default: top significant features)
+        features: List of feature names to include, e.g. "TP53" or "protein:TP53"
+            (default: top-ranked features of each modality)
         cluster_rows: Apply hierarchical clustering to rows (features)
         cluster_cols: Apply hierarchical clustering to columns (samples)
         output_path: Path to save plot (PNG or PDF)
+        modalities: Modalities to include (default: all available)
+        top_features: Number of top-ranked features when features is not given
+            (capped at MULTIOMICS_MAX_FEATURES, as are requested features)
+        metric: Distance between rows/columns - "correlation" or "euclidean"
+        optimal_ordering: Apply optimal leaf ordering (slow above ~2,000 features)
+        feature_selection: Ranking of the top features - "variance", "mad", "cv",
+            "missingness" or "trend"
 
     Returns:
         Dictionary with:
         - plot_path: Path to saved visualization
-        - cluster_info: Cluster assignments
-        - figure_data: Plotly JSON for interactive plot
+        - cluster_info: Cluster assignments (feature cluster sizes, sample clusters)
+        - figure_data: Heatmap dimensions, selection and leaf order
 
     Example:
         ```
         result = create_multiomics_heatmap(
-            data_path="/workspace/cache/integrated_data.pkl",
+            data_path="/workspace/cache/integrated_data",
             features=["TP53", "MYC", "EGFR"],
             cluster_rows=True,
             cluster_cols=True,
@@ -790,41 +1072,63 @@ def create_multiomics_heatmap(
             "status": "success (DRY_RUN mode)",
         })
 
-    # TODO: Implement visualization
-    raise NotImplementedError("Heatmap visualization not yet implemented")
+    result = await run_tool(
+        "create_multiomics_heatmap", create_multiomics_heatmap_impl,
+        data_path=data_path,
+        features=features,
+        cluster_rows=cluster_rows,
+        cluster_cols=cluster_cols,
+        output_path=output_path,
+        modalities=modalities,
+        top_features=top_features,
+        metric=metric,
+        optimal_ordering=optimal_ordering,
+        feature_selection=feature_selection,
+    )
+    return add_research_disclaimer(result, "analysis")
 
 
 @mcp.tool()
-def run_multiomics_pca(
+async def run_multiomics_pca(
     data_path: str,
     modalities: Optional[List[str]] = None,
     n_components: int = 3,
     scale_features: bool = True,
     output_path: Optional[str] = None,
+    method: str = "auto",
+    feature_selection: str = "variance",
 ) -> Dict[str, Any]:
     """Run Principal Component Analysis on integrated multi-omics data.
 
     Performs PCA for dimensionality reduction and sample clustering visualization.
-    Can analyze individual modalities or concatenated multi-omics data.
+    Can analyze individual modalities or concatenated multi-omics data. Only the
+    requested modalities are read, and each modality block is weighted by
+    1/sqrt(its total variance) so large modalities do not dominate.
 
     Args:
         data_path: Path to integrated multi-omics data
         modalities: List of modalities to include (default: all available)
         n_components: Number of principal components to compute (default: 3)
         scale_features: Apply feature scaling before PCA
-        output_path: Path to save 2D and 3D PCA plots
+        output_path: Path to save the PC1/PC2 plot (default: next to the cached projection)
+        method: Solver - "auto", "gram" (exact, streams feature chunks with memory
+            bounded by n_samples²) or "randomized" (randomized SVD, for large cohorts)
+        feature_selection: Ranking used to reduce modalities above
+            MULTIOMICS_MAX_FEATURES - "variance", "mad", "cv", "missingness" or "trend"
 
     Returns:
         Dictionary with:
         - variance_explained: Fraction of variance per component
-        - loadings: Feature loadings on each PC
+        - loadings: Top feature loadings (with modality) on each PC
         - sample_coordinates: PC coordinates for each sample
         - plot_path: Path to saved visualization
+        - projection_path: Cached projection (means, scales, loadings, scores)
+          reusable by visualization tools; repeated calls hit this cache
 
     Example:
         ```
         result = run_multiomics_pca(
-            data_path="/workspace/cache/integrated_data.pkl",
+            data_path="/workspace/cache/integrated_data",
             modalities=["rna", "protein"],
             n_components=3,
             output_path="/workspace/plots/pca.png"
@@ -856,16 +1160,27 @@ def run_multiomics_pca(
             "status": "success (DRY_RUN mode)",
         })
 
-    # TODO: Implement PCA analysis
-    raise NotImplementedError("PCA analysis not yet implemented")
+    result = await run_tool(
+        "run_multiomics_pca", run_multiomics_pca_impl,
+        data_path=data_path,
+        modalities=modalities,
+        n_components=n_components,
+        scale_features=scale_features,
+        output_path=output_path,
+        method=method,
+        feature_selection=feature_selection,
+    )
+    return add_research_disclaimer(result, "analysis")
 
 
 @mcp.tool()
-def predict_upstream_regulators(
+async def predict_upstream_regulators(
     differential_genes: Dict[str, Dict[str, float]],
     regulator_types: Optional[List[str]] = None,
     fdr_threshold: float = 0.05,
     activation_zscore_threshold: float = 2.0,
+    network_files: Optional[Dict[str, str]] = None,
+    universe_size: Optional[int] = None,
 ) -> Dict[str, Any]:
     """Predict upstream regulators from differential expression data.
 
@@ -892,6 +1207,12 @@ def predict_upstream_regulators(
         fdr_threshold: FDR threshold for significant regulators (default: 0.05)
         activation_zscore_threshold: |Z-score| threshold for activation/inhibition
                                      (default: 2.0, ~p < 0.05)
+        network_files: Regulator type -> local prior-knowledge file replacing the
+                       built-in tables: CollecTRI/DoRothEA regulons
+                       ("transcription_factor"), PhosphoSitePlus kinase-substrate
+                       table ("kinase"), DGIdb interactions ("drug")
+        universe_size: Number of genes tested, for the enrichment background
+                       (default: ~20,000 protein-coding genes)
 
     Returns:
         Dictionary with:
@@ -1016,40 +1337,272 @@ def predict_upstream_regulators(
         })
 
     # Real implementation
-    result = predict_upstream_regulators_impl(
+    result = await run_tool(
+        "predict_upstream_regulators", predict_upstream_regulators_impl,
         differential_genes=differential_genes,
         regulator_types=regulator_types,
         fdr_threshold=fdr_threshold,
         activation_zscore_threshold=activation_zscore_threshold,
+        network_files=network_files,
+        universe_size=universe_size,
+    )
+
+    return add_research_disclaimer(result, "analysis")
+
+
+@mcp.tool()
+async def infer_regulator_activity(
+    data_path: str,
+    modality: str = "rna",
+    regulator_type: str = "transcription_factor",
+    network_file: Optional[str] = None,
+    method: str = "ulm",
+    n_permutations: Optional[int] = None,
+    min_targets: int = 5,
+    top_k: int = 25,
+) -> Dict[str, Any]:
+    """Infer per-sample regulator activities across a cohort.
+
+    Complements predict_upstream_regulators (one differential gene list) by
+    scoring every regulator in every sample of the integrated expression
+    matrix, like decoupler's ULM and weighted-mean methods.
+
+    Methods:
+    - ulm: Regress each sample's expression on the regulator's signed target
+      weights; activity = t-statistic of the slope
+    - wmean: Weighted mean of target expression, normalized against a
+      feature-permutation null
+
+    Args:
+        data_path: Path to integrated data (cache_path from integrate_omics_data)
+        modality: Modality holding the regulators' targets (default: rna)
+        regulator_type: "transcription_factor", "kinase", or "drug"
+        network_file: Local prior-knowledge network (CollecTRI/DoRothEA,
+                      PhosphoSitePlus, DGIdb); default: built-in example table
+        method: "ulm" or "wmean" (default: ulm)
+        n_permutations: Permutations for empirical p-values
+                        (default: 0 for ulm = parametric, 1000 for wmean)
+        min_targets: Minimum targets among measured features (default: 5)
+        top_k: Number of regulators summarized in the response (default: 25)
+
+    Returns:
+        Dictionary with:
+        - regulators: Top regulators by mean |activity| with counts of samples
+          where they are significantly active or inhibited (FDR)
+        - output_files: CSV tables (regulators × samples) of activities,
+          p-values and q-values
+        - statistics: Matrix sizes, method and p-value type
+
+    Example:
+        ```
+        result = infer_regulator_activity(
+            data_path="/workspace/cache/multiomics/datasets/<dataset_id>",
+            network_file="/data/priors/collectri_human.tsv",
+            method="ulm"
+        )
+        ```
+    """
+    logger.info(f"infer_regulator_activity called: {regulator_type} on {modality} ({method})")
+
+    result = await run_tool(
+        "infer_regulator_activity", infer_regulator_activity_impl,
+        data_path=data_path,
+        modality=modality,
+        regulator_type=regulator_type,
+        network_file=network_file,
+        method=method,
+        n_permutations=n_permutations,
+        min_targets=min_targets,
+        fdr_threshold=config.fdr_threshold,
+        top_k=top_k,
     )
 
+    if config.dry_run:
+        return add_dry_run_warning(result)
+
     return add_research_disclaimer(result, "analysis")
 
 
+# ============================================================================
+# JOBS
+# ============================================================================
+
+# Tool implementations that can be submitted as background jobs
+JOB_TOOLS: Dict[str, Callable[..., Any]] = {
+    "integrate_omics_data": integrate_omics_data_impl,
+    "validate_multiomics_data": validate_multiomics_data_impl,
+    "preprocess_multiomics_data": preprocess_multiomics_data_impl,
+    "visualize_data_quality": visualize_data_quality_impl,
+    "run_halla_analysis": run_halla_analysis_impl,
+    "calculate_stouffer_meta_from_stores": calculate_stouffer_meta_from_stores_impl,
+    "create_multiomics_heatmap": create_multiomics_heatmap_impl,
+    "run_multiomics_pca": run_multiomics_pca_impl,
+    "infer_regulator_activity": infer_regulator_activity_impl,
+}
+
+
+def _job_or_error(action: Callable[[str], Any], job_id: str) -> Any:
+    try:
+        return action(job_id)
+    except JobNotFound as e:
+        return {"job_id": job_id, "status": "not_found", "error": str(e.args[0])}
+
+
+@mcp.tool()
+def submit_analysis_job(tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Submit a long-running analysis as a background job and return its handle.
+
+    Use for runs that may take minutes (HAllA on large modalities,
+    preprocessing of full cohorts). The job shares the server's worker pool
+    and per-tool concurrency limits with direct tool calls.
+
+    Args:
+        tool: Tool to run, e.g. "run_halla_analysis" or "preprocess_multiomics_data"
+        arguments: The tool's arguments, as for a direct call
+
+    Returns:
+        Dictionary with:
+        - job_id: Handle for get_job_status, get_job_results and cancel_job
+        - status: "running", or "queued" when the tool is at its concurrency limit
+
+    Example:
+        ```
+        job = submit_analysis_job(
+            tool="run_halla_analysis",
+            arguments={"data_path": "/workspace/cache/integrated_data",
+                       "modality1": "rna", "modality2": "protein"}
+        )
+        status = get_job_status(job["job_id"])  # progress and ETA from HAllA tiles
+        ```
+    """
+    logger.info(f"submit_analysis_job called: tool={tool}")
+    if tool not in JOB_TOOLS:
+        raise ValueError(f"Tool '{tool}' cannot run as a job. Available: {sorted(JOB_TOOLS)}")
+
+    if config.dry_run:
+        return add_dry_run_warning({
+            "job_id": None,
+            "tool": tool,
+            "status": "not_submitted",
+            "message": "Jobs run real analyses; call the tool directly for DRY_RUN results",
+        })
+
+    job = get_job_manager().submit(tool, JOB_TOOLS[tool], **arguments)
+    return get_job_manager().status(job.job_id)
+
+
+@mcp.tool()
+def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Get the status of a submitted job.
+
+    Args:
+        job_id: Handle returned by submit_analysis_job (or by a tool call that
+            outlived MULTIOMICS_TIMEOUT_SECONDS)
+
+    Returns:
+        Dictionary with status (queued, running, cancelling, completed, failed,
+        cancelled), queue position, timing and the latest progress report
+        (HAllA: tiles completed, fraction complete, ETA)
+    """
+    return _job_or_error(get_job_manager().status, job_id)
+
+
+@mcp.tool()
+def get_job_results(job_id: str) -> Dict[str, Any]:
+    """Get the results of a completed job.
+
+    Args:
+        job_id: Handle returned by submit_analysis_job
+
+    Returns:
+        The tool's results, or the job status if it has not completed
+    """
+    manager = get_job_manager()
+    status = _job_or_error(manager.status, job_id)
+    if status["status"] != "completed":
+        return status
+    return add_research_disclaimer(manager.result(job_id), "analysis")
+
+
+@mcp.tool()
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a job.
+
+    Queued jobs are cancelled immediately. Running jobs stop at their next
+    progress report (HAllA: after the current tile; completed tiles are
+    checkpointed, so resubmitting with resume=True continues from there);
+    jobs without progress reports finish but their results are discarded.
+
+    Args:
+        job_id: Handle returned by submit_analysis_job
+
+    Returns:
+        Job status after the request
+    """
+    logger.info(f"cancel_job called: job_id={job_id}")
+    return _job_or_error(get_job_manager().cancel, job_id)
+
+
+@mcp.tool()
+def list_jobs(tool: Optional[str] = None) -> Dict[str, Any]:
+    """List submitted jobs and the worker pool's limits.
+
+    Args:
+        tool: Only list jobs of this tool
+
+    Returns:
+        Dictionary with jobs and pool configuration
+    """
+    manager = get_job_manager()
+    return {
+        "jobs": manager.list_jobs(tool),
+        "workers": manager.max_workers,
+        "tool_concurrency": manager.tool_concurrency,
+    }
+
+
 # ============================================================================
 # COST TRACKING & ESTIMATION
 # ============================================================================
 
 
+# Typical feature counts per modality when the caller does not know them
+DEFAULT_FEATURE_COUNTS = {"rna": 20000, "protein": 7000, "phospho": 5000}
+
+
 @mcp.tool()
 async def estimate_analysis_cost(
     num_samples: int,
     modalities: List[str],
     include_halla: bool = False,
-    include_upstream: bool = False
+    include_upstream: bool = False,
+    num_features: Optional[Dict[str, int]] = None,
+    include_pca: bool = False,
+    include_heatmap: bool = False,
+    instance_type: str = "aws_batch_medium",
 ) -> Dict[str, Any]:
-    """Estimate cost for multi-omics analysis before execution.
+    """Estimate cost, runtime and memory for multi-omics analysis before execution.
 
     Helps researchers budget for computational costs before running analysis.
+    Wall time and peak memory of each tool are predicted from benchmark-
+    calibrated scaling curves (shared/utils/runtime_models.json), e.g. HAllA
+    scales with f1·f2·n, so oversized jobs can be queued or rejected up front.
 
     Args:
         num_samples: Number of samples to analyze
         modalities: List of modalities (e.g., ["rna", "protein", "phospho"])
-        include_halla: Include HAllA association testing
+        include_halla: Include HAllA association testing (every modality pair)
         include_upstream: Include upstream regulator prediction
+        num_features: Features per modality (default: 20,000 RNA, 7,000
+            protein, 5,000 phospho); HAllA and PCA use at most
+            MULTIOMICS_MAX_FEATURES per modality
+        include_pca: Include multi-omics PCA
+        include_heatmap: Include the clustered heatmap
+        instance_type: Instance the analysis runs on (e.g., "aws_batch_medium")
 
     Returns:
-        Dictionary with cost estimates and breakdown
+        Dictionary with cost estimates and breakdown, per-tool runtime
+        predictions and scheduling flags
 
     Example:
         >>> cost = await estimate_analysis_cost(
@@ -1057,9 +1610,25 @@ async def estimate_analysis_cost(
         ...     modalities=["rna", "protein", "phospho"],
         ...     include_halla=True
         ... )
-        >>> print(f"Estimated cost: ${cost['total_usd']:.2f}")
+        >>> print(f"Estimated cost: ${cost['estimated_cost_usd']:.2f}")
     """
     estimator = CostEstimator()
+    features = {m: int((num_features or {}).get(m, DEFAULT_FEATURE_COUNTS.get(m, 5000)))
+                for m in modalities}
+    # HAllA and PCA prefilter every modality to max_features (see feature_selection.py)
+    kept = {m: min(n, config.max_features) for m, n in features.items()}
+
+    runs = [("integrate_omics_data", {"features": sum(features.values()), "n": num_samples})]
+    if include_halla:
+        runs += [("run_halla_analysis", {"f1": kept[m1], "f2": kept[m2], "n": num_samples})
+                 for m1, m2 in combinations(modalities, 2)]
+    if include_pca:
+        runs.append(("run_multiomics_pca", {"features": sum(kept.values()), "n": num_samples}))
+    if include_heatmap:
+        rows = min(HEATMAP_TOP_FEATURES, config.max_features, sum(features.values()))
+        runs.append(("create_multiomics_heatmap", {"rows": rows, "n": num_samples}))
+    runtime = [{**estimator.tool_runtime_cost(tool, instance_type, **sizes), "sizes": sizes}
+               for tool, sizes in runs]
 
     # Base integration cost
     integration_cost = estimator.multiomics_integration_cost(
@@ -1073,20 +1642,17 @@ async def estimate_analysis_cost(
         "validation": num_samples * 0.02,  # Input validation
     }
 
-    # Optional analyses
-    if include_halla:
-        # HAllA is computationally expensive
-        costs["halla_analysis"] = num_samples * 0.50 * len(modalities)
-
     if include_upstream:
         # Upstream regulator prediction
         costs["upstream_prediction"] = 0.30  # Fixed cost per analysis
 
-    # Compute and storage
-    estimated_duration_hours = (num_samples * len(modalities)) / 100.0  # Rough estimate
-    costs["compute"] = estimator.compute_cost("aws_batch_medium", estimated_duration_hours)
-
-    estimated_size_gb = num_samples * len(modalities) * 0.1  # ~100MB per sample-modality
+    # Compute from predicted wall time; storage for the integrated store and HAllA result stores
+    wall_seconds = sum(run["wall_seconds"] for run in runtime)
+    costs["compute"] = estimator.compute_cost(instance_type, wall_seconds / 3600)
+    tested_pairs = sum(run["sizes"]["f1"] * run["sizes"]["f2"]
+                       for run in runtime if run["tool"] == "run_halla_analysis")
+    estimated_size_gb = (sum(features.values()) * num_samples * 8
+                         + tested_pairs * ASSOCIATION_DTYPE.itemsize) / 1e9
     costs["storage_30days"] = estimator.storage_cost(estimated_size_gb, duration_days=30)
 
     # Total
@@ -1103,19 +1669,42 @@ async def estimate_analysis_cost(
         budget_tier = "high"
         recommendation = "Large-scale comprehensive analysis"
 
+    peak_memory_mb = max(run["peak_memory_mb"] for run in runtime)
+    slow_tools = [run["tool"] for run in runtime if run["wall_seconds"] > config.timeout_seconds]
+    oversized = [run["tool"] for run in runtime if not run["fits_instance"]]
+    if oversized:
+        recommendation = (f"Predicted memory exceeds {instance_type} for {', '.join(oversized)}: "
+                          f"use a larger instance or lower MULTIOMICS_MAX_FEATURES")
+
     return {
         "estimated_cost_usd": total,
         "breakdown": costs,
+        "runtime": runtime,
+        "estimated_wall_seconds": wall_seconds,
+        "peak_memory_mb": peak_memory_mb,
+        "estimated_storage_gb": estimated_size_gb,
+        "scheduling": {
+            "instance_type": instance_type,
+            "fits_instance": not oversized,
+            "oversized_tools": oversized,
+            # Direct calls beyond the timeout return a job handle; submit these as jobs
+            "background_job_recommended": slow_tools,
+            "extrapolated": any(run["extrapolated"] for run in runtime),
+        },
         "parameters": {
             "num_samples": num_samples,
             "modalities": modalities,
+            "num_features": features,
             "include_halla": include_halla,
             "include_upstream": include_upstream,
+            "include_pca": include_pca,
+            "include_heatmap": include_heatmap,
         },
         "budget_tier": budget_tier,
         "recommendation": recommendation,
         "notes": [
-            "Costs are estimates based on typical analysis patterns",
+            "Wall time and memory are predicted from benchmark-calibrated runtime models "
+            "(one worker); recalibrate with tests/benchmarks/calibrate_runtime_models.py",
             "Actual costs may vary based on data complexity",
             "Includes 30-day data caching by default",
             "Use DRY_RUN mode for testing without charges"
@@ -1141,6 +1730,7 @@ def get_config_resource() -> str:
 ## Data Paths
 - Data Directory: {config.data_dir}
 - Cache Directory: {config.cache_dir}
+- Dataset Cache Budget: {config.cache_max_gb} GB
 
 ## Analysis Parameters
 - Max Features: {config.max_features}
@@ -0,0 +1,70 @@
+"""Association methods available to HAllA.
+
+Dispatches between the block-matrix correlation engine (correlation.py) and
+normalized mutual information (mutual_information.py). Both follow the same
+two-step pattern: prepare each modality once, then score any block of
+feature pairs at once, returning (statistic, nominal p-value, sample count)
+matrices.
+"""
+
+from dataclasses import fields
+from typing import Tuple, Union
+
+import numpy as np
+
+from .correlation import (
+    CORRELATION_METHODS,
+    PreparedFeatures,
+    correlation_block,
+    correlation_coefficients,
+    prepare_features,
+)
+from .mutual_information import BinnedFeatures, mi_block, prepare_bins
+
+ASSOCIATION_METHODS = CORRELATION_METHODS + ("mi",)
+
+Prepared = Union[PreparedFeatures, BinnedFeatures]
+
+
+def prepare_association_features(values: np.ndarray, method: str = "spearman") -> Prepared:
+    """Prepare a features × samples matrix for :func:`association_block`.
+
+    Args:
+        values: Features × samples matrix (NaN = missing)
+        method: "spearman", "pearson" or "mi"
+
+    Returns:
+        PreparedFeatures (correlation) or BinnedFeatures (mutual information)
+    """
+    if method not in ASSOCIATION_METHODS:
+        raise ValueError(f"Unknown method: {method}. Use one of: {', '.join(ASSOCIATION_METHODS)}")
+    if method == "mi":
+        return prepare_bins(values)
+    return prepare_features(values, method)
+
+
+def association_block(block1: Prepared, block2: Prepared) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Association statistic, nominal p-values and sample counts for a block.
+
+    The statistic is the correlation coefficient, or the normalized mutual
+    information (0-1) for binned features.
+    """
+    if isinstance(block1, BinnedFeatures):
+        return mi_block(block1, block2)
+    return correlation_block(block1, block2)
+
+
+def association_statistic(block1: Prepared, block2: Prepared) -> np.ndarray:
+    """Association statistic only (no p-values) for every pair of a block."""
+    if isinstance(block1, BinnedFeatures):
+        return mi_block(block1, block2, n_permutations=0)[0]
+    return correlation_coefficients(block1, block2)[0]
+
+
+def take_features(prepared: Prepared, index: np.ndarray) -> Prepared:
+    """Prepared features for an arbitrary subset of rows (copies)."""
+    values = {}
+    for field in fields(prepared):
+        value = getattr(prepared, field.name)
+        values[field.name] = value[index] if isinstance(value, np.ndarray) else value
+    return type(prepared)(**values)
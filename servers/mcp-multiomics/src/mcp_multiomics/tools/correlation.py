@@ -0,0 +1,178 @@
+"""Block-matrix correlation engine for all-against-all association testing.
+
+Each modality is transformed once (ranked for Spearman), centered and scaled
+per feature. A block of correlations between features of two modalities is
+then a single matrix product ``X_block @ Y.T``, and nominal p-values follow
+from the t-distribution for the whole block at once.
+
+Missing values are handled with pairwise-complete observations: with the
+observed-value masks ``Mx`` and ``My``, the per-pair sample counts, sums and
+sums of squares are themselves matrix products (``Mx @ My.T``, ``X @ My.T``,
+...), so no Python loop over feature pairs is ever needed. For Spearman with
+missing values, features are ranked over their own observed samples (not
+re-ranked per pair), the usual approximation for pairwise-complete rank
+correlation; without missing values results equal ``scipy.stats.spearmanr``.
+
+Usage:
+    prepared1 = prepare_features(data1.to_numpy(), method="spearman")
+    prepared2 = prepare_features(data2.to_numpy(), method="spearman")
+    r, p, n = correlation_block(prepared1.rows(0, 1000), prepared2)
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import special, stats
+
+CORRELATION_METHODS = ("spearman", "pearson")
+
+# Pairs observed in fewer samples than this get no correlation / p-value
+MIN_SAMPLES = 3
+
+
+@dataclass
+class PreparedFeatures:
+    """Feature matrix transformed for correlation by matrix products.
+
+    Without missing values, every row has zero mean and unit norm, so the
+    correlation of two rows is their dot product. With missing values, rows
+    are centered on their observed mean, missing entries are zero and
+    ``mask`` marks the observed entries (1.0) for pairwise-complete sums.
+    Rows with zero variance are all NaN (correlation undefined).
+    """
+    values: np.ndarray
+    mask: Optional[np.ndarray] = None
+
+    @property
+    def n_features(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def n_samples(self) -> int:
+        return self.values.shape[1]
+
+    def rows(self, start: int, stop: int) -> "PreparedFeatures":
+        """View of a contiguous block of features (no copy)."""
+        mask = None if self.mask is None else self.mask[start:stop]
+        return PreparedFeatures(self.values[start:stop], mask)
+
+
+def prepare_features(
+    values: np.ndarray,
+    method: str = "spearman",
+    dtype=np.float64,
+) -> PreparedFeatures:
+    """Rank (Spearman) and standardize a features × samples matrix once.
+
+    Args:
+        values: Features × samples matrix (NaN = missing)
+        method: "spearman" or "pearson"
+        dtype: Working dtype; float32 halves memory at ~1e-6 precision
+
+    Returns:
+        PreparedFeatures ready for :func:`correlation_block`
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown method: {method}")
+
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    has_missing = bool(missing.any())
+
+    if method == "spearman":
+        values = stats.rankdata(values, axis=1, nan_policy="omit" if has_missing else "propagate")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if not has_missing:
+            centered = values - values.mean(axis=1, keepdims=True)
+            norms = np.sqrt(np.einsum("ij,ij->i", centered, centered))
+            # Relative test: rows that are constant up to rounding are undefined
+            constant = norms <= 1e-12 * np.maximum(np.abs(values).max(axis=1), 1.0)
+            centered /= np.where(constant, 1.0, norms)[:, None]
+            centered[constant] = np.nan
+            return PreparedFeatures(centered.astype(dtype, copy=False))
+
+        observed = ~missing
+        counts = observed.sum(axis=1)
+        means = np.where(observed, values, 0.0).sum(axis=1) / np.maximum(counts, 1)
+        centered = np.where(observed, values - means[:, None], 0.0)
+
+    return PreparedFeatures(centered.astype(dtype, copy=False), observed.astype(dtype))
+
+
+def correlation_block(
+    block1: PreparedFeatures,
+    block2: PreparedFeatures,
+    min_samples: int = MIN_SAMPLES,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Correlations and nominal p-values for every pair of two feature blocks.
+
+    Args:
+        block1: Prepared features (rows of the first modality)
+        block2: Prepared features (rows of the second modality)
+        min_samples: Pairs with fewer complete samples get NaN results
+
+    Returns:
+        Tuple of (correlations, p-values, complete-sample counts), each of
+        shape (block1.n_features, block2.n_features)
+    """
+    r, n = correlation_coefficients(block1, block2, min_samples)
+    return r, correlation_pvalues(r, n), n
+
+
+def correlation_coefficients(
+    block1: PreparedFeatures,
+    block2: PreparedFeatures,
+    min_samples: int = MIN_SAMPLES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Correlations and complete-sample counts for every pair (no p-values).
+
+    Returns:
+        Tuple of (correlations, complete-sample counts)
+    """
+    x, y = block1.values, block2.values
+
+    if block1.mask is None and block2.mask is None:
+        r = x @ y.T
+        n = np.full(r.shape, block1.n_samples, dtype=np.int32)
+    else:
+        mx = block1.mask if block1.mask is not None else np.ones_like(x)
+        my = block2.mask if block2.mask is not None else np.ones_like(y)
+        # Complete rows carry NaNs only when constant; zero them here and
+        # let the zero variance below mark their correlations undefined
+        x = np.nan_to_num(x, nan=0.0) if block1.mask is None else x
+        y = np.nan_to_num(y, nan=0.0) if block2.mask is None else y
+
+        n = mx @ my.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sum_x = x @ my.T
+            sum_y = mx @ y.T
+            sum_xx = (x * x) @ my.T
+            sum_yy = mx @ (y * y).T
+            cov = x @ y.T - sum_x * sum_y / n
+            var_x = sum_xx - sum_x * sum_x / n
+            var_y = sum_yy - sum_y * sum_y / n
+            # Zero variance within the pairwise-complete samples: undefined
+            defined = (var_x > 1e-10 * sum_xx) & (var_y > 1e-10 * sum_yy)
+            r = np.where(defined, cov / np.sqrt(var_x * var_y), np.nan)
+        n = np.rint(n).astype(np.int32)
+
+    r = np.clip(r, -1.0, 1.0, out=r)
+    r[n < min_samples] = np.nan
+    return r, n
+
+
+def correlation_pvalues(r: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Two-sided p-values for correlations via the t-distribution (n - 2 df).
+
+    Matches ``scipy.stats.pearsonr`` / ``spearmanr``; |r| = 1 gives p = 0.
+    """
+    r = np.asarray(r, dtype=np.float64)
+    df = np.asarray(n, dtype=np.float64) - 2.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.abs(r) * np.sqrt(df / ((1.0 - r) * (1.0 + r)))
+        p = 2.0 * special.stdtr(df, -t)
+    p[np.abs(r) >= 1.0] = 0.0
+    p[np.isnan(r) | (df <= 0)] = np.nan
+    return p
@@ -0,0 +1,394 @@
+"""Content-addressed cache of integrated multi-omics datasets.
+
+Every integrated dataset is identified by a key: the SHA-256 of its input
+file contents and integration parameters. Integrating the same files with the
+same parameters again (in any session) reuses the stored dataset instead of
+re-reading and re-normalizing the inputs, and different patients or sessions
+never overwrite each other's data.
+
+Cache layout (under MULTIOMICS_CACHE_DIR/datasets):
+    index.json              Datasets (inputs, parameters, size, sessions,
+                            derived results) and a memo of input file hashes
+                            by (size, mtime)
+    .index.lock             Serializes index updates across server processes
+    <key>/                  IntegratedDataStore (see integrated_store.py)
+    <key>/.last_access      Touched on every reuse; its mtime orders LRU eviction
+    <key>/.lease-<pid>-<id> Held while a job reads the dataset
+
+Results derived from a cached dataset elsewhere in MULTIOMICS_CACHE_DIR
+(rankings, PCA projections, linkages, HAllA stores, regulator activities) are
+recorded with the dataset: they count towards the disk budget
+(MULTIOMICS_CACHE_MAX_GB) and are removed when the dataset is evicted.
+
+After each new dataset or derived result is stored, least recently used
+datasets are evicted until the cache fits its budget. Datasets leased by a
+running job in a live process are never evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from ..config import config
+from .integrated_store import IntegratedDataStore, is_integrated_store
+
+try:
+    import fcntl
+except ImportError:  # Windows: thread lock only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached dataset (e.g. when integration output changes)
+CACHE_FORMAT_VERSION = 2
+
+INDEX_FILE = "index.json"
+LOCK_FILE = ".index.lock"
+ACCESS_FILE = ".last_access"
+LEASE_PREFIX = ".lease-"
+
+_thread_lock = threading.Lock()
+
+
+def _digest(payload: Any) -> str:
+    """SHA-256 of a JSON-serializable payload (stable key order)."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_key(input_hashes: Dict[str, str], params: Dict[str, Any]) -> str:
+    """Content key of an integrated dataset.
+
+    Args:
+        input_hashes: Input name (rna, protein, ..., metadata) -> content hash
+        params: Integration parameters that change the output
+    """
+    return _digest({
+        "format": CACHE_FORMAT_VERSION,
+        "inputs": input_hashes,
+        "params": params,
+    })
+
+
+def _directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _path_size(path: Path) -> int:
+    """Size of a file or directory tree (0 if it no longer exists)."""
+    try:
+        return _directory_size(path) if path.is_dir() else path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    except OSError:
+        return False
+    return True
+
+
+class DatasetCache:
+    """On-disk integrated datasets addressed by content key, with LRU eviction."""
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> Path:
+        """Store directory of one dataset."""
+        return self.root / key
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, Any]]:
+        """Read-modify-write the index under a thread and file lock."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with _thread_lock, open(self.root / LOCK_FILE, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self._read_index()
+            yield index
+            self._write_index(index)
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.root / INDEX_FILE) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"datasets": {}, "files": {}}
+
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        fd, tmp_file = tempfile.mkstemp(prefix=f".{INDEX_FILE}-", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_file, self.root / INDEX_FILE)
+
+    def hash_inputs(self, paths: Dict[str, str]) -> Dict[str, str]:
+        """Content hashes of input files.
+
+        Hashes are memoized in the index by absolute path, size and mtime,
+        so unchanged multi-GB inputs are not re-read on every call.
+
+        Raises:
+            FileNotFoundError: An input file does not exist
+        """
+        hashes = {}
+        memo_updates = {}
+        memo = self._read_index().get("files", {})
+        for name, file_path in paths.items():
+            resolved = Path(file_path).resolve()
+            stat = resolved.stat()
+            signature = [stat.st_size, stat.st_mtime_ns]
+            cached = memo.get(str(resolved))
+            if cached is not None and cached["signature"] == signature:
+                hashes[name] = cached["sha256"]
+            else:
+                hashes[name] = hash_file(resolved)
+                memo_updates[str(resolved)] = {"signature": signature, "sha256": hashes[name]}
+
+        if memo_updates:
+            with self._locked() as index:
+                index.setdefault("files", {}).update(memo_updates)
+        return hashes
+
+    # ------------------------------------------------------------------
+    # Datasets
+    # ------------------------------------------------------------------
+
+    def get(self, key: str, session_id: Optional[str] = None) -> Optional[IntegratedDataStore]:
+        """Open a cached dataset (marking it as used), or None if not cached."""
+        path = self.path(key)
+        if not is_integrated_store(path):
+            return None
+        self.touch(key)
+        if session_id is not None:
+            with self._locked() as index:
+                entry = index["datasets"].get(key)
+                if entry is not None and session_id not in entry["sessions"]:
+                    entry["sessions"].append(session_id)
+        return IntegratedDataStore(path)
+
+    def put(
+        self,
+        key: str,
+        dataframes: Dict[str, pd.DataFrame],
+        metadata: Optional[pd.DataFrame] = None,
+        info: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+        feature_stats: Optional[Dict[str, pd.DataFrame]] = None,
+    ) -> IntegratedDataStore:
+        """Store a new dataset under ``key``, then evict down to the disk budget.
+
+        Args:
+            key: Content key (see :func:`dataset_key`)
+            dataframes: Dict of modality -> aligned features × samples DataFrame
+            metadata: Sample metadata DataFrame (optional)
+            info: JSON-serializable description kept in the index and manifest
+            session_id: Session that created the dataset (optional)
+            feature_stats: Per-feature statistics of the unnormalized values
+                by modality (optional, see IntegratedDataStore.write)
+
+        Returns:
+            The stored dataset
+        """
+        path = self.path(key)
+        if not is_integrated_store(path):
+            # Concurrent writers of the same key hold identical content: the
+            # first store renamed into place wins and later copies are dropped,
+            # so a store already returned to a caller is never replaced
+            IntegratedDataStore.write(path, dataframes, metadata, info={**(info or {}), "dataset_id": key},
+                                      replace=False, feature_stats=feature_stats)
+        self.touch(key)
+
+        with self._locked() as index:
+            entry = index["datasets"].setdefault(key, {
+                "dataset_id": key,
+                "created_at": datetime.now().isoformat(),
+                "size_bytes": _directory_size(path),
+                "modalities": list(dataframes),
+                "info": info or {},
+                "sessions": [],
+                "derived": [],
+            })
+            if session_id is not None and session_id not in entry["sessions"]:
+                entry["sessions"].append(session_id)
+            self._evict(index, keep={key})
+        return IntegratedDataStore(path)
+
+    def add_derived(self, key: str, path: Path) -> None:
+        """Record a result derived from dataset ``key``, then evict down to the budget.
+
+        Derived results count towards the budget and are removed with their dataset.
+        """
+        with self._locked() as index:
+            entry = index["datasets"].get(key)
+            if entry is None:
+                return
+            derived = entry.setdefault("derived", [])
+            if str(path) not in derived:
+                derived.append(str(path))
+            self._evict(index, keep={key})
+
+    @contextmanager
+    def lease(self, key: str) -> Iterator[None]:
+        """Keep dataset ``key`` (and its derived results) from being evicted."""
+        lease_file = self.path(key) / f"{LEASE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        lease_file.touch()
+        try:
+            yield
+        finally:
+            lease_file.unlink(missing_ok=True)
+
+    def leased(self, key: str) -> bool:
+        """True if a live process holds a lease on dataset ``key``."""
+        for lease_file in self.path(key).glob(f"{LEASE_PREFIX}*"):
+            pid = lease_file.name[len(LEASE_PREFIX):].split("-", 1)[0]
+            if pid.isdigit() and _process_alive(int(pid)):
+                return True
+        return False
+
+    def touch(self, key: str) -> None:
+        """Mark a dataset as just used (LRU order)."""
+        (self.path(key) / ACCESS_FILE).touch()
+
+    def last_access(self, key: str) -> float:
+        try:
+            return (self.path(key) / ACCESS_FILE).stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def list(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Available datasets, most recently used first.
+
+        Args:
+            session_id: Only datasets created or reused by this session
+        """
+        datasets = []
+        for key, entry in self._read_index()["datasets"].items():
+            if session_id is not None and session_id not in entry["sessions"]:
+                continue
+            if not is_integrated_store(self.path(key)):
+                continue
+            last_access = self.last_access(key)
+            datasets.append({
+                **entry,
+                "cache_path": str(self.path(key)),
+                "last_accessed": datetime.fromtimestamp(last_access).isoformat(),
+            })
+        datasets.sort(key=lambda dataset: dataset["last_accessed"], reverse=True)
+        return datasets
+
+    def total_bytes(self) -> int:
+        """Disk use of all datasets and their derived results."""
+        return sum(_entry_bytes(entry) for entry in self._read_index()["datasets"].values())
+
+    def evict(self, keep: Iterable[str] = ()) -> List[str]:
+        """Remove least recently used datasets until the cache fits its budget."""
+        with self._locked() as index:
+            return self._evict(index, keep=set(keep))
+
+    def _evict(self, index: Dict[str, Any], keep: set) -> List[str]:
+        datasets = index["datasets"]
+        # Forget datasets whose directory was removed outside the cache
+        for key in [key for key in datasets if not is_integrated_store(self.path(key))]:
+            del datasets[key]
+
+        if self.max_bytes is None:
+            return []
+        sizes = {key: _entry_bytes(entry) for key, entry in datasets.items()}
+        total = sum(sizes.values())
+        evicted = []
+        for key in sorted(datasets, key=self.last_access):
+            if total <= self.max_bytes:
+                break
+            if key in keep or self.leased(key):
+                continue
+            entry = datasets.pop(key)
+            total -= sizes[key]
+            for derived in entry.get("derived", []):
+                _remove(Path(derived))
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            evicted.append(key)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} cached datasets (cache now {total / 1e9:.2f} GB)")
+        if total > self.max_bytes:
+            logger.warning(f"Dataset cache is {total / 1e9:.2f} GB, over its "
+                           f"{self.max_bytes / 1e9:.2f} GB budget (remaining datasets are in use)")
+        return evicted
+
+
+def _entry_bytes(entry: Dict[str, Any]) -> int:
+    return entry["size_bytes"] + sum(_path_size(Path(path)) for path in entry.get("derived", []))
+
+
+def configured_cache() -> DatasetCache:
+    """The integrated-dataset cache under the configured cache directory."""
+    return DatasetCache(config.cache_dir / "datasets", max_bytes=int(config.cache_max_gb * 1e9))
+
+
+def _cached_dataset(data_path: Optional[str]) -> Optional[Tuple[DatasetCache, str]]:
+    """(cache, key) if ``data_path`` is a dataset of the configured cache, else None."""
+    if not data_path:
+        return None
+    cache = configured_cache()
+    path = Path(data_path).resolve()
+    if path.parent != cache.root.resolve() or not is_integrated_store(path):
+        return None
+    return cache, path.name
+
+
+def record_derived(data_path: str, path: Path) -> None:
+    """Attribute a derived result to the cached dataset it was computed from.
+
+    No-op for data outside the dataset cache (explicit store or pickle paths).
+    """
+    cached = _cached_dataset(data_path)
+    if cached is not None:
+        cache, key = cached
+        cache.add_derived(key, Path(path).resolve())
+
+
+def dataset_lease(data_path: Optional[str]) -> ContextManager[None]:
+    """Lease on the cached dataset at ``data_path`` (no-op for other data)."""
+    cached = _cached_dataset(data_path)
+    if cached is None:
+        return nullcontext()
+    cache, key = cached
+    return cache.lease(key)
@@ -0,0 +1,251 @@
+"""Feature-selection prefilter enforcing MULTIOMICS_MAX_FEATURES.
+
+All-against-all tools scale with the square of the number of features, so
+HAllA, PCA and the heatmap first reduce every modality with more than
+``config.max_features`` features to its top-ranked features. Rankings use
+per-feature statistics computed chunk by chunk from the integrated store
+with NaN-aware reductions:
+
+    variance     Sample variance
+    mad          Median absolute deviation (robust to outlier samples)
+    cv           Coefficient of variation, SD / |mean| (for unnormalized,
+                 positive-valued data such as intensities or counts)
+    missingness  Fraction of observed values (most complete first)
+    trend        Residual of log variance over the mean-variance trend
+                 (highly variable features relative to their abundance)
+
+Ties, including the missingness ranking, are broken by variance and then by
+store order. Features with more than ``max_missing`` missing values are never
+selected. Rankings are persisted under MULTIOMICS_CACHE_DIR/feature_selection,
+keyed by dataset and method, so later tools reuse them.
+
+Z-scoring (integrate_omics_data with ``normalize=True``) gives every feature
+unit variance, so integration records the statistics of the values before
+normalization in the store and rankings use those. Z-scored stores written
+without them only support the scale-free mad and missingness rankings.
+"""
+
+import hashlib
+import json
+import logging
+import warnings
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import config
+from .dataset_cache import record_derived
+from .normalization import row_mean_std
+from .utils import ModalitySource, dataset_signature, write_cache_file
+
+logger = logging.getLogger(__name__)
+
+FEATURE_SELECTION_METHODS = ("variance", "mad", "cv", "missingness", "trend")
+
+# Rankings that z-scoring makes meaningless (every feature has mean 0, variance 1)
+SCALE_DEPENDENT_METHODS = ("variance", "cv", "trend")
+
+# Mean-abundance bins of the mean-variance trend
+TREND_BINS = 20
+
+# Bump to invalidate persisted rankings
+RANKING_VERSION = 2
+
+
+def frame_statistics(frames: Iterable[pd.DataFrame], include_mad: bool = False) -> pd.DataFrame:
+    """Per-feature mean, variance, missing fraction (and MAD) of features × samples chunks.
+
+    Args:
+        frames: Consecutive feature-row chunks of one modality
+        include_mad: Also compute the median absolute deviation (two NaN medians per row)
+
+    Returns:
+        DataFrame indexed by feature
+    """
+    parts = []
+    for chunk in frames:
+        values = chunk.to_numpy(dtype=np.float64)
+        mean, std = row_mean_std(values)
+        stats = {
+            "mean": mean,
+            "variance": std ** 2,
+            "missing_fraction": np.isnan(values).mean(axis=1),
+        }
+        if include_mad:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # All-missing rows
+                median = np.nanmedian(values, axis=1)
+                stats["mad"] = np.nanmedian(np.abs(values - median[:, None]), axis=1)
+        parts.append(pd.DataFrame(stats, index=chunk.index))
+    return pd.concat(parts)
+
+
+def feature_statistics(source: ModalitySource, modality: str, include_mad: bool = False) -> pd.DataFrame:
+    """Per-feature mean, variance, missing fraction (and MAD) of one modality.
+
+    Statistics recorded in the store at integration (those of the values
+    before normalization) are used when present; otherwise they are computed
+    chunk by chunk from the stored values.
+
+    Args:
+        source: Dataset to read
+        modality: Modality to summarize
+        include_mad: Also compute the median absolute deviation (two NaN medians per row)
+
+    Returns:
+        DataFrame indexed by feature
+    """
+    if source.store is not None:
+        recorded = source.store.feature_stats(modality)
+        if recorded is not None and (not include_mad or "mad" in recorded):
+            return recorded
+    return frame_statistics(source.chunks(modality), include_mad=include_mad)
+
+
+def _is_zscored(source: ModalitySource, modality: str) -> bool:
+    """True if the store holds z-scored values without their original statistics."""
+    if source.store is None or not source.store.manifest.get("params", {}).get("normalize"):
+        return False
+    return source.store.feature_stats(modality) is None
+
+
+def trend_residuals(mean: np.ndarray, variance: np.ndarray, n_bins: int = TREND_BINS) -> np.ndarray:
+    """Log variance minus the median log variance of features with similar means.
+
+    The trend is the median log variance in quantile bins of the mean,
+    linearly interpolated between bin centers.
+    """
+    log_var = np.log(np.where(variance > 0, variance, np.nan))
+    valid = np.isfinite(mean) & np.isfinite(log_var)
+    residuals = np.full(len(mean), np.nan)
+    if valid.sum() < 2:
+        return residuals
+    x, y = mean[valid], log_var[valid]
+    edges = np.unique(np.quantile(x, np.linspace(0, 1, n_bins + 1)))
+    bins = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, max(len(edges) - 2, 0))
+    order = np.argsort(bins, kind="stable")
+    _, starts = np.unique(bins[order], return_index=True)
+    groups = np.split(order, starts[1:])
+    centers = np.array([np.median(x[g]) for g in groups])
+    trend = np.array([np.median(y[g]) for g in groups])
+    residuals[valid] = y - np.interp(x, centers, trend)
+    return residuals
+
+
+def _check_method(method: str) -> None:
+    if method not in FEATURE_SELECTION_METHODS:
+        raise ValueError(
+            f"Unknown feature selection method '{method}'. "
+            f"Use one of: {', '.join(FEATURE_SELECTION_METHODS)}"
+        )
+
+
+def score_features(stats: pd.DataFrame, method: str) -> np.ndarray:
+    """Selection score of every feature (higher is better; NaN ranks last)."""
+    _check_method(method)
+    if method == "variance":
+        return stats["variance"].to_numpy()
+    if method == "mad":
+        return stats["mad"].to_numpy()
+    if method == "cv":
+        mean = stats["mean"].abs().to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(mean > 0, np.sqrt(stats["variance"].to_numpy()) / mean, np.nan)
+    if method == "missingness":
+        return 1.0 - stats["missing_fraction"].to_numpy()
+    return trend_residuals(stats["mean"].to_numpy(), stats["variance"].to_numpy())
+
+
+def _ranking_path(source: ModalitySource, modality: str, method: str, max_missing: float) -> Path:
+    payload = json.dumps({
+        "version": RANKING_VERSION, "data": dataset_signature(source.data_path),
+        "modality": modality, "method": method, "max_missing": max_missing,
+    }, sort_keys=True)
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:24]
+    return config.cache_dir / "feature_selection" / f"{digest}.npz"
+
+
+def rank_features(source: ModalitySource, modality: str, method: str = "variance",
+                  max_missing: float = 0.5) -> pd.Series:
+    """Eligible features of one modality, best first, with their scores.
+
+    Rankings are read from / persisted to the cache.
+
+    Raises:
+        ValueError: Unknown method, or a scale-dependent method on a z-scored
+            store without recorded statistics
+    """
+    _check_method(method)
+    if method in SCALE_DEPENDENT_METHODS and _is_zscored(source, modality):
+        raise ValueError(
+            f"Feature selection by {method} is meaningless on {modality}: the dataset was "
+            f"integrated with normalize=True and has no recorded pre-normalization statistics. "
+            f"Use 'mad' or 'missingness', or re-run integrate_omics_data."
+        )
+    path = _ranking_path(source, modality, method, max_missing)
+    features = source.features(modality)
+    if path.is_file():
+        with np.load(path) as ranking:
+            return pd.Series(ranking["scores"], index=features[ranking["order"]])
+
+    stats = feature_statistics(source, modality, include_mad=method == "mad")
+    scores = score_features(stats, method)
+    eligible = np.flatnonzero(stats["missing_fraction"].to_numpy() <= max_missing)
+    # Best score first; ties by variance, then store order (lexsort: last key is primary)
+    variance = np.nan_to_num(stats["variance"].to_numpy()[eligible], nan=-np.inf)
+    primary = np.nan_to_num(scores[eligible], nan=-np.inf)
+    order = eligible[np.lexsort((np.arange(len(eligible)), -variance, -primary))]
+
+    write_cache_file(path, lambda f: np.savez(f, order=order, scores=scores[order]))
+    record_derived(source.data_path, path)
+    return pd.Series(scores[order], index=features[order])
+
+
+def select_features(
+    source: ModalitySource,
+    modalities: List[str],
+    max_features: Optional[int] = None,
+    method: str = "variance",
+    max_missing: float = 0.5,
+) -> Dict[str, List[str]]:
+    """Top features of every modality with more than ``max_features`` features.
+
+    Args:
+        source: Dataset to read
+        modalities: Modalities to consider
+        max_features: Limit per modality (default: MULTIOMICS_MAX_FEATURES)
+        method: Ranking statistic (see FEATURE_SELECTION_METHODS)
+        max_missing: Features with a larger missing fraction are never selected
+
+    Returns:
+        Dict of modality -> selected feature names in store order, only for
+        modalities that were reduced (others are used in full)
+    """
+    max_features = max_features or config.max_features
+    selection = {}
+    for modality in modalities:
+        n_features = source.n_features(modality)
+        if n_features <= max_features:
+            continue
+        ranking = rank_features(source, modality, method, max_missing)
+        features = source.features(modality)
+        keep = np.sort(features.get_indexer(ranking.index[:max_features]))
+        selection[modality] = list(features[keep])
+        logger.info(f"Prefilter {modality}: kept {len(selection[modality])} of {n_features} "
+                    f"features by {method}")
+    return selection
+
+
+def selection_summary(source: ModalitySource, selection: Dict[str, List[str]],
+                      modalities: List[str], method: str,
+                      max_features: Optional[int] = None) -> Dict[str, Any]:
+    """Report of a prefilter for tool results."""
+    return {
+        "method": method,
+        "max_features": max_features or config.max_features,
+        "features_before": {m: source.n_features(m) for m in modalities},
+        "features_after": {m: len(selection[m]) if m in selection else source.n_features(m)
+                           for m in modalities},
+    }
@@ -1,8 +1,12 @@
 """HAllA (Hierarchical All-against-All) association analysis for multi-omics data.
 
 Based on bioinformatician feedback:
-- Chunking strategy: 1000 features per chunk (~5 min each, not days)
+- Chunking strategy: the test matrix is split into 1000 × 1000 feature tiles,
+  each scored as one block-matrix product (correlation.py) and run in
+  parallel by the tile scheduler (halla_scheduler.py)
 - Returns NOMINAL p-values (FDR applied AFTER Stouffer's combination)
+- Hierarchical block discovery (halla_blocks.py) reports clusters of features
+  in both modalities whose pairs are jointly associated
 - Supports both R-based HAllA and Python correlation alternative
 
 Reference:
@@ -11,17 +15,19 @@ multiomic datasets. Bioinformatics 33(14):i81-i89.
 """
 
 import logging
-import pickle
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Optional, Tuple
 
-import numpy as np
 import pandas as pd
-from scipy import stats
-from scipy.cluster import hierarchy
-from scipy.spatial.distance import pdist
 
 from ..config import config
+from .associations import prepare_association_features
+from .dataset_cache import record_derived
+from .halla_blocks import DEFAULT_FNR_THRESHOLD, discover_blocks
+from .halla_scheduler import TileScheduler, data_fingerprint, prepared_fields
+from .halla_store import AssociationStore, TopKAssociations
+from .feature_selection import select_features, selection_summary
+from .utils import ModalitySource, dataset_signature
 
 logger = logging.getLogger(__name__)
 
@@ -48,28 +54,55 @@ def run_halla_analysis_impl(
     method: str = "spearman",
     chunk_size: int = 1000,
     use_r_halla: bool = False,
+    top_k: int = 1000,
+    n_jobs: Optional[int] = None,
+    resume: bool = True,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    fnr_threshold: float = DEFAULT_FNR_THRESHOLD,
+    max_blocks: int = 100,
+    max_features: Optional[int] = None,
+    feature_selection: str = "variance",
 ) -> Dict[str, Any]:
     """Run HAllA association testing between two omics modalities.
 
     Implements chunking strategy to handle large datasets efficiently:
-    - Full dataset (20K RNA × 7K protein) = days of computation
-    - Chunked (1000 features/chunk) = ~5 min per chunk
+    - Each modality is ranked/standardized once
+    - The test matrix is split along both feature axes into tiles of
+      chunk_size × chunk_size, each a single matrix product with
+      vectorized p-values, computed in parallel worker processes
 
     CRITICAL: Returns NOMINAL p-values, not FDR-corrected.
     FDR correction should be applied AFTER Stouffer's meta-analysis.
 
     Args:
-        data_path: Path to integrated multi-omics data (pickle file)
+        data_path: Path to integrated multi-omics data (cache_path from
+            integrate_omics_data; legacy pickle files are still read)
         modality1: First modality ("rna", "protein", or "phospho")
         modality2: Second modality ("rna", "protein", or "phospho")
-        fdr_threshold: FDR threshold for final reporting (but p-values are nominal)
+        fdr_threshold: FDR threshold for block discovery within this run
+            (association p-values are still returned NOMINAL)
         method: Correlation method - "spearman", "pearson", or "mi"
+            (normalized mutual information with permutation p-values)
         chunk_size: Number of features per chunk (default: 1000, per Erik's feedback)
         use_r_halla: Use R-based HAllA if available (default: False, use Python)
+        top_k: Number of strongest associations (smallest p) returned and
+            clustered; all tested pairs are written to the result store
+        n_jobs: Worker processes for tiles (default: config.n_jobs, -1 = all CPUs)
+        resume: Skip tiles completed by an interrupted run on the same data
+        progress_callback: Called with progress/ETA after every completed tile
+        fnr_threshold: Tolerated fraction of non-significant pairs in a block
+        max_blocks: Number of strongest association blocks returned
+        max_features: Features kept per modality before testing (default:
+            MULTIOMICS_MAX_FEATURES); larger modalities are prefiltered
+        feature_selection: Prefilter ranking - "variance", "mad", "cv",
+            "missingness" or "trend" (see feature_selection.py)
 
     Returns:
         Dictionary with:
-        - associations: List of feature pairs with NOMINAL p-values
+        - blocks: Significant cluster-pair blocks (HAllA output), strongest first
+        - associations: Top-K feature pairs with NOMINAL p-values
+        - result_store: Directory of the on-disk store with every tested pair
+          (page through it with query_halla_associations)
         - chunks_processed: Information about chunking strategy
         - statistics: Summary statistics
         - nominal_p_values: Explicitly labeled as nominal (not FDR-corrected)
@@ -109,24 +142,18 @@ def run_halla_analysis_impl(
             "status": "success (DRY_RUN mode)",
         }
 
-    # Load integrated data
+    # Prefilter modalities above max_features, then load only the kept rows
+    # of the two modalities being tested
     logger.info(f"Loading integrated data from {data_path}")
-    try:
-        with open(data_path, 'rb') as f:
-            integrated_data = pickle.load(f)
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Integrated data not found at {data_path}. "
-            "Run integrate_omics_data first."
-        )
-
-    # Extract modality data
-    if modality1 not in integrated_data or modality2 not in integrated_data:
-        available = list(integrated_data.keys())
-        raise ValueError(
-            f"Modalities {modality1} and/or {modality2} not found. "
-            f"Available: {available}"
-        )
+    source = ModalitySource(data_path)
+    modalities = list(dict.fromkeys([modality1, modality2]))
+    missing = [m for m in modalities if m not in source.modalities]
+    if missing:
+        raise ValueError(f"Modalities {', '.join(missing)} not found. Available: {source.modalities}")
+    selection = select_features(source, modalities, max_features, feature_selection)
+    prefilter = selection_summary(source, selection, modalities, feature_selection, max_features)
+    integrated_data = {modality: source.load(modality, selection.get(modality))
+                       for modality in modalities}
 
     data1 = integrated_data[modality1]  # Features × Samples
     data2 = integrated_data[modality2]
@@ -137,14 +164,19 @@ def run_halla_analysis_impl(
     # Decide whether to use R-based HAllA or Python correlation
     if use_r_halla and R_AVAILABLE:
         logger.info("Using R-based HAllA implementation")
-        return _run_r_halla(data1, data2, modality1, modality2, method, chunk_size, fdr_threshold)
+        result = _run_r_halla(data1, data2, modality1, modality2, method, chunk_size, fdr_threshold)
     else:
         if use_r_halla and not R_AVAILABLE:
             logger.warning("R-based HAllA requested but rpy2 not available - using Python alternative")
         logger.info("Using Python correlation-based alternative to HAllA")
-        return _run_python_correlation_halla(
-            data1, data2, modality1, modality2, method, chunk_size, fdr_threshold
+        result = _run_python_correlation_halla(
+            data1, data2, modality1, modality2, method, chunk_size, fdr_threshold,
+            top_k=top_k, n_jobs=n_jobs, resume=resume, progress_callback=progress_callback,
+            fnr_threshold=fnr_threshold, max_blocks=max_blocks,
+            dataset=dataset_signature(data_path),
         )
+    result["feature_prefilter"] = prefilter
+    return result
 
 
 def _run_python_correlation_halla(
@@ -155,12 +187,31 @@ def _run_python_correlation_halla(
     method: str,
     chunk_size: int,
     fdr_threshold: float,
+    top_k: int = 1000,
+    store_dir: Optional[Path] = None,
+    n_jobs: Optional[int] = None,
+    resume: bool = True,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    fnr_threshold: float = DEFAULT_FNR_THRESHOLD,
+    max_blocks: int = 100,
+    dataset: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     """Python-based correlation analysis as HAllA alternative.
 
     Implements chunking strategy to handle large feature sets:
-    - Process 1000 features at a time
-    - Each chunk takes ~5 minutes instead of days for full dataset
+    - Rank/standardize both modalities once
+    - Split the test matrix into chunk_size × chunk_size tiles, each one
+      block-matrix product, run on a process pool with both prepared
+      matrices in shared memory (see halla_scheduler.py)
+    - Stream each tile's results to an on-disk AssociationStore and keep
+      only the top-K associations in memory (memory stays flat)
+    - Checkpoint completed tiles so an interrupted run can resume
+    - Cluster each modality and search cluster pairs top-down for blocks of
+      jointly significant associations (within-run BH + FNR rule)
+
+    The default store directory is keyed by the dataset identity (``dataset``,
+    from dataset_signature) and the data fingerprint, so runs on different
+    datasets never share or overwrite a result store handed out earlier.
 
     Returns NOMINAL p-values (not FDR-corrected).
     """
@@ -168,71 +219,85 @@ def _run_python_correlation_halla(
 
     n_features1 = data1.shape[0]
     n_features2 = data2.shape[0]
-    n_chunks = (max(n_features1, n_features2) + chunk_size - 1) // chunk_size
 
     logger.info(f"Total features: {n_features1} × {n_features2} = {n_features1 * n_features2:,} tests")
-    logger.info(f"Chunking strategy: {n_chunks} chunks of {chunk_size} features")
-    logger.info(f"Estimated time: ~{n_chunks * 5} minutes (5 min/chunk)")
 
-    all_associations = []
-    chunk_info = []
-
-    # Process in chunks
-    for chunk_idx in range(n_chunks):
-        start_idx = chunk_idx * chunk_size
-        end_idx = min(start_idx + chunk_size, n_features1)
-
-        logger.info(f"Processing chunk {chunk_idx + 1}/{n_chunks}: features {start_idx}-{end_idx}")
-
-        # Get chunk of features from modality1
-        chunk_data1 = data1.iloc[start_idx:end_idx, :]
-
-        # Compute correlations with all features in modality2
-        chunk_results = _compute_correlations(
-            chunk_data1, data2, modality1, modality2, method
+    # Transform each modality once (rank/standardize, or quantile-bin for
+    # mutual information); tiles are row views of these matrices
+    prepared1 = prepare_association_features(data1.to_numpy(dtype=float), method)
+    prepared2 = prepare_association_features(data2.to_numpy(dtype=float), method)
+
+    scheduler = TileScheduler(
+        prepared1, prepared2,
+        tile_rows=chunk_size, tile_cols=chunk_size,
+        n_jobs=config.n_jobs if n_jobs is None else n_jobs,
+        progress_callback=progress_callback,
+    )
+    logger.info(f"Tiling strategy: {len(scheduler.tiles)} tiles of up to {chunk_size} × {chunk_size} features")
+
+    fingerprint = data_fingerprint(
+        *prepared_fields(prepared1), *prepared_fields(prepared2),
+        method=method, chunk_size=chunk_size,
+        features1=data1.index.tolist(), features2=data2.index.tolist(), dataset=dataset,
+    )
+    if store_dir is None:
+        store_dir = config.cache_dir / "halla" / f"{modality1}_vs_{modality2}_{method}_{fingerprint[:24]}"
+        if dataset is not None:
+            record_derived(dataset["path"], store_dir)
+    store = AssociationStore(store_dir)
+    if not (resume and TileScheduler.load_checkpoint(store, fingerprint)):
+        store = AssociationStore.create(
+            store_dir, data1.index, data2.index,
+            metadata={"modality1": modality1, "modality2": modality2, "method": method},
         )
 
-        # Store results with chunk ID
-        for result in chunk_results:
-            result['chunk_id'] = chunk_idx
-            all_associations.append(result)
-
-        chunk_info.append({
-            "chunk_id": chunk_idx,
-            "features_processed": end_idx - start_idx,
-            "associations_found": len(chunk_results),
-        })
-
-        logger.info(f"Chunk {chunk_idx + 1} complete: {len(chunk_results)} associations")
-
-    # Sort by p-value (nominal)
-    all_associations.sort(key=lambda x: x['p_value_nominal'])
-
-    # Hierarchical clustering on top associations
-    top_associations = all_associations[:min(1000, len(all_associations))]
-    clusters = _perform_hierarchical_clustering(top_associations, data1, data2)
+    top_associations = TopKAssociations(top_k)
+    schedule = scheduler.run(store, top_associations, fingerprint=fingerprint, resume=resume)
+    total_found = schedule["n_records"]
 
     # Summary statistics
     total_tests = n_features1 * n_features2
-
-    logger.info(f"HAllA analysis complete: {len(all_associations)} associations")
+    store.finalize(total_associations_tested=total_tests)
+
+    # Strongest individual associations (sorted by nominal p-value)
+    associations = store.to_dicts(top_associations.result())
+
+    # Hierarchical block discovery over every tested pair
+    block_result = discover_blocks(
+        prepared1, prepared2, store,
+        features1=store.features(1), features2=store.features(2),
+        fdr_threshold=fdr_threshold, fnr_threshold=fnr_threshold, max_blocks=max_blocks,
+    )
+    blocks = block_result.pop("blocks")
+
+    logger.info(f"HAllA analysis complete: {total_found} associations, "
+                f"{block_result['blocks_found']} blocks")
+    logger.info(f"All associations stored in {store.path}")
     logger.info(f"IMPORTANT: P-values are NOMINAL - apply FDR after Stouffer's")
 
     return {
-        "associations": all_associations,
+        "blocks": blocks,
+        "associations": associations,
+        "result_store": str(store.path),
         "chunks_processed": {
-            "total_chunks": n_chunks,
+            "total_chunks": schedule["n_tiles"],
             "chunk_size": chunk_size,
-            "chunk_details": chunk_info,
-            "strategy": f"{chunk_size} features/chunk = ~5 min each",
+            "chunk_details": schedule["tile_details"],
+            "chunks_resumed": schedule["tiles_resumed"],
+            "workers": schedule["n_workers"],
+            "elapsed_seconds": schedule["elapsed_seconds"],
+            "strategy": f"{chunk_size} × {chunk_size} feature tiles, block-matrix correlation",
             "total_features_modality1": n_features1,
             "total_features_modality2": n_features2,
         },
-        "clusters": clusters,
+        "clusters": block_result,
         "statistics": {
             "method": method,
             "total_associations_tested": total_tests,
-            "total_associations_found": len(all_associations),
+            "total_associations_found": total_found,
+            "associations_returned": len(associations),
+            "blocks_found": block_result["blocks_found"],
+            "blocks_returned": len(blocks),
             "p_value_type": "NOMINAL (FDR should be applied AFTER Stouffer's)",
             "fdr_threshold_for_reference": fdr_threshold,
         },
@@ -242,112 +307,6 @@ def _run_python_correlation_halla(
     }
 
 
-def _compute_correlations(
-    data1: pd.DataFrame,
-    data2: pd.DataFrame,
-    modality1: str,
-    modality2: str,
-    method: str,
-) -> List[Dict[str, Any]]:
-    """Compute pairwise correlations between features in two datasets.
-
-    Returns NOMINAL p-values.
-    """
-    associations = []
-
-    for feature1 in data1.index:
-        for feature2 in data2.index:
-            # Get expression values across samples
-            values1 = data1.loc[feature1].values
-            values2 = data2.loc[feature2].values
-
-            # Skip if too many missing values
-            valid_mask = ~(np.isnan(values1) | np.isnan(values2))
-            if valid_mask.sum() < 3:
-                continue
-
-            values1_clean = values1[valid_mask]
-            values2_clean = values2[valid_mask]
-
-            # Compute correlation
-            if method == "spearman":
-                corr, p_value = stats.spearmanr(values1_clean, values2_clean)
-            elif method == "pearson":
-                corr, p_value = stats.pearsonr(values1_clean, values2_clean)
-            elif method == "mi":
-                # Mutual information (simplified - bin continuous data)
-                # For proper MI, would need more sophisticated binning
-                logger.warning("Mutual information not fully implemented - using Spearman")
-                corr, p_value = stats.spearmanr(values1_clean, values2_clean)
-            else:
-                raise ValueError(f"Unknown method: {method}")
-
-            associations.append({
-                "feature1": feature1,
-                "feature2": feature2,
-                "feature1_modality": modality1,
-                "feature2_modality": modality2,
-                "correlation": float(corr),
-                "p_value_nominal": float(p_value),  # NOMINAL p-value
-                "n_samples": int(valid_mask.sum()),
-            })
-
-    return associations
-
-
-def _perform_hierarchical_clustering(
-    associations: List[Dict[str, Any]],
-    data1: pd.DataFrame,
-    data2: pd.DataFrame,
-) -> Dict[str, Any]:
-    """Perform hierarchical clustering on associated features."""
-    if len(associations) < 2:
-        return {
-            "clusters_found": 0,
-            "note": "Not enough associations for clustering",
-        }
-
-    # Extract unique features from associations
-    features1 = sorted(set(a['feature1'] for a in associations))
-    features2 = sorted(set(a['feature2'] for a in associations))
-
-    logger.info(f"Clustering {len(features1)} features from modality 1")
-    logger.info(f"Clustering {len(features2)} features from modality 2")
-
-    # Hierarchical clustering on modality 1 features
-    if len(features1) > 1:
-        subset1 = data1.loc[features1]
-        try:
-            linkage1 = hierarchy.linkage(subset1, method='average')
-            clusters1 = hierarchy.fcluster(linkage1, t=0.5, criterion='distance')
-            n_clusters1 = len(set(clusters1))
-        except Exception as e:
-            logger.warning(f"Clustering modality 1 failed: {e}")
-            n_clusters1 = 1
-    else:
-        n_clusters1 = 1
-
-    # Hierarchical clustering on modality 2 features
-    if len(features2) > 1:
-        subset2 = data2.loc[features2]
-        try:
-            linkage2 = hierarchy.linkage(subset2, method='average')
-            clusters2 = hierarchy.fcluster(linkage2, t=0.5, criterion='distance')
-            n_clusters2 = len(set(clusters2))
-        except Exception as e:
-            logger.warning(f"Clustering modality 2 failed: {e}")
-            n_clusters2 = 1
-    else:
-        n_clusters2 = 1
-
-    return {
-        "modality1_clusters": int(n_clusters1),
-        "modality2_clusters": int(n_clusters2),
-        "total_features_clustered": len(features1) + len(features2),
-        "clustering_method": "average linkage hierarchical",
-    }
-
-
 def _run_r_halla(
     data1: pd.DataFrame,
     data2: pd.DataFrame,
@@ -418,3 +377,52 @@ def _run_r_halla(
         return _run_python_correlation_halla(
             data1, data2, modality1, modality2, method, chunk_size, fdr_threshold
         )
+
+
+def query_halla_associations_impl(
+    result_store: str,
+    max_p_value: Optional[float] = None,
+    min_abs_correlation: Optional[float] = None,
+    feature: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100,
+    sort_by_p_value: bool = True,
+) -> Dict[str, Any]:
+    """Page through or filter associations stored by a HAllA run.
+
+    Args:
+        result_store: Store directory (``result_store`` from run_halla_analysis)
+        max_p_value: Keep associations with NOMINAL p <= this value
+        min_abs_correlation: Keep associations with |correlation| >= this value
+        feature: Keep associations involving this feature (either modality)
+        offset: Number of matching associations to skip
+        limit: Maximum number of associations to return
+        sort_by_p_value: Order by nominal p-value (otherwise tested order)
+
+    Returns:
+        Dictionary with matching associations and paging information
+    """
+    store = AssociationStore(Path(result_store))
+    metadata = store.metadata
+    if not metadata.get("complete"):
+        logger.warning(f"HAllA result store {result_store} is incomplete (run did not finish)")
+
+    page = store.query(
+        max_p_value=max_p_value,
+        min_abs_correlation=min_abs_correlation,
+        feature=feature,
+        offset=offset,
+        limit=limit,
+        sort_by_p_value=sort_by_p_value,
+    )
+
+    return {
+        **page,
+        "result_store": str(store.path),
+        "modality1": metadata.get("modality1"),
+        "modality2": metadata.get("modality2"),
+        "method": metadata.get("method"),
+        "total_associations_stored": len(store),
+        "nominal_p_values": True,
+        "status": "success",
+    }
@@ -0,0 +1,270 @@
+"""Hierarchical all-against-all block discovery (the "HA" in HAllA).
+
+After every feature pair has been tested (halla_scheduler.py), HAllA looks for
+blocks: a cluster of modality-1 features and a cluster of modality-2 features
+whose pairs are jointly associated.
+
+1. Each modality is clustered hierarchically (average linkage) on the
+   distance 1 - |r| (or 1 - NMI for method="mi"). The condensed distance
+   array is filled block by block from the same association engine, in
+   float32: n(n-1)/2 × 4 bytes, the O(n²) memory of fastcluster-style linkage.
+2. Pair p-values are BH-adjusted over all tests of the run.
+3. Starting from the two roots, a cluster pair is reported as a block when
+   at least 1 - FNR of its pairs are significant. Otherwise the larger
+   cluster is split into its two children and both sub-blocks are tested.
+   A cluster pair without any significant pair is dropped with its whole
+   subtree (early termination).
+
+Features are reordered by dendrogram leaf order, so every cluster is a
+contiguous index range and the significant-pair count of any block is an
+O(1) lookup in a 2-D prefix sum. The search therefore costs time in the
+number of visited blocks, not their area.
+
+Reference:
+Rahnavard et al. (2017). High-sensitivity pattern discovery in large, paired
+multiomic datasets. Bioinformatics 33(14):i81-i89.
+"""
+
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy.cluster import hierarchy
+
+from .associations import Prepared, association_statistic, take_features
+from .halla_store import AssociationStore
+
+# Import shared multiple-testing utilities
+# In container: /app/shared/utils is in PYTHONPATH
+# In development: Try to add shared/utils to path
+try:
+    from multiple_testing import adjust_pvalues
+except ImportError:
+    # Development mode - add shared/utils to path
+    _shared_utils_path = Path(__file__).resolve().parents[5] / "shared" / "utils"
+    if str(_shared_utils_path) not in sys.path:
+        sys.path.insert(0, str(_shared_utils_path))
+    from multiple_testing import adjust_pvalues
+
+logger = logging.getLogger(__name__)
+
+# HAllA's default false-negative tolerance within a block
+DEFAULT_FNR_THRESHOLD = 0.2
+
+# Rows per block when filling the condensed distance array
+DISTANCE_BLOCK_ROWS = 1000
+
+
+def feature_distances(prepared: Prepared, block_rows: int = DISTANCE_BLOCK_ROWS) -> np.ndarray:
+    """Condensed float32 distances 1 - |association| between features of one modality.
+
+    Pairs with an undefined association (constant or too sparse features)
+    get the maximum distance 1.
+
+    Returns:
+        Condensed distance array of length n(n-1)/2 (scipy ``pdist`` layout)
+    """
+    n = prepared.n_features
+    condensed = np.empty(n * (n - 1) // 2, dtype=np.float32)
+    offset = 0
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        statistic = association_statistic(prepared.rows(start, stop), prepared.rows(start, n))
+        distances = 1.0 - np.abs(np.nan_to_num(statistic, nan=0.0))
+        for row in range(stop - start):
+            segment = distances[row, row + 1:]
+            condensed[offset:offset + len(segment)] = segment
+            offset += len(segment)
+    np.clip(condensed, 0.0, 1.0, out=condensed)
+    return condensed
+
+
+@dataclass
+class FeatureTree:
+    """Dendrogram with every node mapped to a contiguous leaf-order range."""
+    order: np.ndarray  # Feature index at each leaf position
+    start: np.ndarray  # First leaf position of each node (leaves 0..n-1, merges n..2n-2)
+    size: np.ndarray  # Number of features under each node
+    children: np.ndarray  # (left, right) node ids of each merge, -1 for leaves
+
+    @property
+    def root(self) -> int:
+        return len(self.start) - 1
+
+    def is_leaf(self, node: int) -> bool:
+        return self.children[node, 0] < 0
+
+    def features(self, node: int) -> np.ndarray:
+        return self.order[self.start[node]:self.start[node] + self.size[node]]
+
+
+def build_tree(prepared: Prepared) -> FeatureTree:
+    """Average-linkage tree of one modality's features."""
+    n = prepared.n_features
+    if n == 1:
+        return FeatureTree(np.zeros(1, dtype=np.intp), np.zeros(1, dtype=np.intp),
+                           np.ones(1, dtype=np.intp), np.full((1, 2), -1, dtype=np.intp))
+
+    # SciPy's nearest-neighbour-chain average linkage, O(n²) time and memory
+    linkage = hierarchy.linkage(feature_distances(prepared), method="average")
+    order = hierarchy.leaves_list(linkage)
+
+    n_nodes = 2 * n - 1
+    start = np.empty(n_nodes, dtype=np.intp)
+    size = np.ones(n_nodes, dtype=np.intp)
+    children = np.full((n_nodes, 2), -1, dtype=np.intp)
+    start[order] = np.arange(n)
+    for merge, (left, right) in enumerate(linkage[:, :2].astype(np.intp)):
+        node = n + merge
+        children[node] = (left, right)
+        start[node] = min(start[left], start[right])
+        size[node] = size[left] + size[right]
+    return FeatureTree(order, start, size, children)
+
+
+def pair_qvalues(store: AssociationStore, n_features1: int, n_features2: int) -> np.ndarray:
+    """BH-adjusted p-values of every stored pair as a float32 matrix (NaN = untested)."""
+    q_values = np.full((n_features1, n_features2), np.nan, dtype=np.float32)
+    for batch in store.iter_batches():
+        q_values[batch["feature1"], batch["feature2"]] = batch["p_value"]
+    # In place: the shared kernel allows ``out`` to alias the input
+    adjust_pvalues(q_values, method="fdr_bh", out=q_values)
+    return q_values
+
+
+def find_blocks(
+    tree1: FeatureTree,
+    tree2: FeatureTree,
+    q_values: np.ndarray,
+    fdr_threshold: float = 0.05,
+    fnr_threshold: float = DEFAULT_FNR_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """Top-down search for significant cluster-pair blocks.
+
+    Args:
+        tree1: Tree of modality-1 features
+        tree2: Tree of modality-2 features
+        q_values: FDR-adjusted p-values, modality-1 × modality-2 features
+        fdr_threshold: A pair is significant when q <= this value
+        fnr_threshold: A block is reported when the fraction of significant
+            pairs is at least 1 - fnr_threshold
+
+    Returns:
+        List of blocks (leaf-order node ids and significance counts), in
+        discovery order
+    """
+    # Significance in leaf order, summed into a 2-D prefix table
+    ordered_q = q_values[tree1.order][:, tree2.order]
+    prefix = np.zeros((ordered_q.shape[0] + 1, ordered_q.shape[1] + 1), dtype=np.int32)
+    np.cumsum(ordered_q <= fdr_threshold, axis=0, out=prefix[1:, 1:])
+    np.cumsum(prefix[1:, 1:], axis=1, out=prefix[1:, 1:])
+
+    def n_significant(node1: int, node2: int) -> int:
+        r0, c0 = tree1.start[node1], tree2.start[node2]
+        r1, c1 = r0 + tree1.size[node1], c0 + tree2.size[node2]
+        return int(prefix[r1, c1] - prefix[r0, c1] - prefix[r1, c0] + prefix[r0, c0])
+
+    blocks = []
+    stack = [(tree1.root, tree2.root)]
+    while stack:
+        node1, node2 = stack.pop()
+        n_pairs = int(tree1.size[node1] * tree2.size[node2])
+        significant = n_significant(node1, node2)
+        if significant == 0:
+            continue  # Nothing below this block can be significant
+        if significant >= (1.0 - fnr_threshold) * n_pairs:
+            block_q = ordered_q[tree1.start[node1]:tree1.start[node1] + tree1.size[node1],
+                                tree2.start[node2]:tree2.start[node2] + tree2.size[node2]]
+            blocks.append({
+                "node1": node1,
+                "node2": node2,
+                "n_pairs": n_pairs,
+                "n_significant": significant,
+                "best_q_value": float(np.nanmin(block_q)),
+            })
+            continue
+        if tree1.is_leaf(node1) and tree2.is_leaf(node2):
+            continue
+        # Split the larger cluster (a leaf cannot be split)
+        split_first = not tree1.is_leaf(node1) and (
+            tree2.is_leaf(node2) or tree1.size[node1] >= tree2.size[node2]
+        )
+        if split_first:
+            stack.extend((child, node2) for child in tree1.children[node1])
+        else:
+            stack.extend((node1, child) for child in tree2.children[node2])
+    return blocks
+
+
+def discover_blocks(
+    prepared1: Prepared,
+    prepared2: Prepared,
+    store: AssociationStore,
+    features1: List[str],
+    features2: List[str],
+    fdr_threshold: float = 0.05,
+    fnr_threshold: float = DEFAULT_FNR_THRESHOLD,
+    max_blocks: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Cluster both modalities and report significant association blocks.
+
+    Args:
+        prepared1: Prepared modality-1 features (same as used for testing)
+        prepared2: Prepared modality-2 features
+        store: Result store with every tested pair of the run
+        features1: Modality-1 feature names
+        features2: Modality-2 feature names
+        fdr_threshold: BH threshold for pair significance within this run
+        fnr_threshold: Tolerated fraction of non-significant pairs per block
+        max_blocks: Return at most this many blocks (strongest first)
+
+    Returns:
+        Dictionary with blocks (ranked by best q-value) and search statistics
+    """
+    logger.info("Clustering modality features for block discovery")
+    tree1 = build_tree(prepared1)
+    tree2 = build_tree(prepared2)
+
+    q_values = pair_qvalues(store, prepared1.n_features, prepared2.n_features)
+    n_significant_pairs = int(np.count_nonzero(q_values <= fdr_threshold))
+    raw_blocks = find_blocks(tree1, tree2, q_values, fdr_threshold, fnr_threshold)
+    del q_values
+
+    raw_blocks.sort(key=lambda block: (block["best_q_value"], -block["n_pairs"]))
+    n_found = len(raw_blocks)
+    clusters1 = {block["node1"] for block in raw_blocks}
+    clusters2 = {block["node2"] for block in raw_blocks}
+    if max_blocks is not None:
+        raw_blocks = raw_blocks[:max_blocks]
+
+    blocks = []
+    for rank, block in enumerate(raw_blocks, start=1):
+        index1 = np.sort(tree1.features(block["node1"]))
+        index2 = np.sort(tree2.features(block["node2"]))
+        statistic = association_statistic(take_features(prepared1, index1),
+                                          take_features(prepared2, index2))
+        blocks.append({
+            "block_id": rank,
+            "features1": [features1[i] for i in index1],
+            "features2": [features2[i] for i in index2],
+            "n_pairs": block["n_pairs"],
+            "n_significant": block["n_significant"],
+            "fraction_significant": block["n_significant"] / block["n_pairs"],
+            "best_q_value": block["best_q_value"],
+            "mean_association": float(np.nanmean(statistic)) if np.isfinite(statistic).any() else None,
+        })
+
+    logger.info(f"Block discovery: {n_found} blocks from {n_significant_pairs} significant pairs")
+    return {
+        "blocks": blocks,
+        "blocks_found": n_found,
+        "significant_pairs": n_significant_pairs,
+        "fdr_threshold": fdr_threshold,
+        "fnr_threshold": fnr_threshold,
+        "clustering_method": "average linkage on 1 - |association|",
+        "modality1_clusters": len(clusters1),
+        "modality2_clusters": len(clusters2),
+    }
@@ -0,0 +1,380 @@
+"""2-D tile scheduler for all-against-all HAllA correlation.
+
+The modality-1 × modality-2 test matrix is partitioned along both feature
+axes into tiles. Tiles are dispatched to a process pool; the prepared
+(ranked/standardized) matrices of both modalities are placed in shared memory
+once, so workers attach to them at start-up and each task carries only the
+four tile bounds. Workers return the tile's association records, which the
+parent appends to the AssociationStore as tiles complete. Workers are started
+with forkserver (spawn where unavailable), never fork: the scheduler runs in a
+job thread of the server, and forking a multi-threaded process can deadlock
+the child on locks other threads held (logging, allocator).
+
+After every completed tile a checkpoint (completed tile ids and the record
+count on disk) is written atomically to the store directory. A rerun with the
+same inputs and tiling skips completed tiles: records written after the last
+checkpoint are truncated, and the top-K selection is rebuilt from the stored
+records.
+
+Usage:
+    scheduler = TileScheduler(prepared1, prepared2, tile_rows=1000, tile_cols=1000, n_jobs=-1)
+    summary = scheduler.run(store, top_associations, fingerprint=fingerprint)
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, fields
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .associations import Prepared, association_block
+from .halla_store import ASSOCIATION_DTYPE, RECORDS_FILE, AssociationStore, TopKAssociations, make_records
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "tiles.json"
+
+# Seconds between progress log lines (every tile is still checkpointed)
+PROGRESS_LOG_INTERVAL = 10.0
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+@dataclass(frozen=True)
+class Tile:
+    """Block of the test matrix: modality-1 rows × modality-2 columns."""
+    tile_id: int
+    row_start: int
+    row_stop: int
+    col_start: int
+    col_stop: int
+
+    @property
+    def n_tests(self) -> int:
+        return (self.row_stop - self.row_start) * (self.col_stop - self.col_start)
+
+
+def plan_tiles(n_features1: int, n_features2: int, tile_rows: int, tile_cols: int) -> List[Tile]:
+    """Partition the n_features1 × n_features2 test matrix into row-major tiles."""
+    if tile_rows < 1 or tile_cols < 1:
+        raise ValueError("Tile sizes must be at least 1")
+    tiles = []
+    for row_start in range(0, n_features1, tile_rows):
+        for col_start in range(0, n_features2, tile_cols):
+            tiles.append(Tile(
+                len(tiles),
+                row_start, min(row_start + tile_rows, n_features1),
+                col_start, min(col_start + tile_cols, n_features2),
+            ))
+    return tiles
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """Translate joblib-style n_jobs (-1 = all CPUs) to a worker count."""
+    n_cpus = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(n_cpus + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def prepared_fields(prepared: Prepared) -> List[Any]:
+    """Field values of a prepared dataclass, in order (for fingerprints)."""
+    return [getattr(prepared, field.name) for field in fields(prepared)]
+
+
+def data_fingerprint(*arrays: Any, **params: Any) -> str:
+    """SHA-256 over array shapes, dtypes and bytes plus run parameters.
+
+    Non-array positional values (None, flags) are hashed by their repr.
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        if not isinstance(array, np.ndarray):
+            digest.update(f"{array!r}|".encode())
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.shape}|{array.dtype.str}|".encode())
+        digest.update(memoryview(array).cast("B"))
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def compute_tile(prepared1: Prepared, prepared2: Prepared, tile: Tile) -> np.ndarray:
+    """Association records (NaN-free pairs) for one tile."""
+    corr, p_values, n_samples = association_block(
+        prepared1.rows(tile.row_start, tile.row_stop),
+        prepared2.rows(tile.col_start, tile.col_stop),
+    )
+    rows, cols = np.nonzero(~np.isnan(corr))
+    return make_records(
+        rows + tile.row_start, cols + tile.col_start,
+        corr[rows, cols], p_values[rows, cols], n_samples[rows, cols], tile.tile_id,
+    )
+
+
+# ----------------------------------------------------------------------
+# Shared memory
+# ----------------------------------------------------------------------
+
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+# Worker-side state, set once per process by _init_worker
+_worker_blocks: List[shared_memory.SharedMemory] = []
+_worker_prepared: Dict[int, Prepared] = {}
+
+
+def _share(array: np.ndarray, blocks: List[shared_memory.SharedMemory]) -> ArraySpec:
+    """Copy an array into a new shared-memory block; return its attach spec."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block.name, array.shape, array.dtype.str
+
+
+def _attach(spec: ArraySpec) -> np.ndarray:
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    _worker_blocks.append(block)  # Keep the mapping alive for the process lifetime
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _share_prepared(prepared: Prepared, blocks: List[shared_memory.SharedMemory]):
+    """Shared-memory specs for the array fields of a prepared dataclass."""
+    shared, plain = {}, {}
+    for field in fields(prepared):
+        value = getattr(prepared, field.name)
+        if isinstance(value, np.ndarray):
+            shared[field.name] = _share(value, blocks)
+        else:
+            plain[field.name] = value
+    return type(prepared), shared, plain
+
+
+def _init_worker(specs: Dict[int, Tuple[type, Dict[str, ArraySpec], Dict[str, Any]]]) -> None:
+    for axis, (cls, shared, plain) in specs.items():
+        arrays = {name: _attach(spec) for name, spec in shared.items()}
+        _worker_prepared[axis] = cls(**arrays, **plain)
+
+
+def _mp_context():
+    """Thread-safe start method for the worker pool (see module docstring)."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _compute_shared_tile(tile: Tile) -> Tuple[int, np.ndarray]:
+    return tile.tile_id, compute_tile(_worker_prepared[1], _worker_prepared[2], tile)
+
+
+# ----------------------------------------------------------------------
+# Scheduler
+# ----------------------------------------------------------------------
+
+class TileScheduler:
+    """Run correlation tiles in parallel and stream them to an AssociationStore."""
+
+    def __init__(
+        self,
+        prepared1: Prepared,
+        prepared2: Prepared,
+        tile_rows: int = 1000,
+        tile_cols: int = 1000,
+        n_jobs: int = -1,
+        progress_callback: Optional[ProgressCallback] = None,
+    ):
+        self.prepared1 = prepared1
+        self.prepared2 = prepared2
+        self.tiles = plan_tiles(prepared1.n_features, prepared2.n_features, tile_rows, tile_cols)
+        self.n_workers = min(resolve_n_jobs(n_jobs), max(len(self.tiles), 1))
+        self.progress_callback = progress_callback
+
+    # Checkpoints ----------------------------------------------------------
+
+    @staticmethod
+    def load_checkpoint(store: AssociationStore, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Checkpoint of an interrupted run with the same fingerprint, if any."""
+        checkpoint_file = store.path / CHECKPOINT_FILE
+        if not checkpoint_file.exists():
+            return None
+        try:
+            with open(checkpoint_file) as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if checkpoint.get("fingerprint") != fingerprint:
+            return None
+        return checkpoint
+
+    def _write_checkpoint(self, store: AssociationStore, fingerprint: str,
+                          completed: Set[int], n_records: int) -> None:
+        tmp_file = store.path / f"{CHECKPOINT_FILE}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({
+                "fingerprint": fingerprint,
+                "n_tiles": len(self.tiles),
+                "completed_tiles": sorted(completed),
+                "n_records": n_records,
+            }, f)
+        tmp_file.replace(store.path / CHECKPOINT_FILE)
+
+    @staticmethod
+    def _restore(store: AssociationStore, checkpoint: Dict[str, Any],
+                 top_associations: TopKAssociations) -> int:
+        """Drop records written after the checkpoint and refill the top-K."""
+        n_records = int(checkpoint["n_records"])
+        with open(store.path / RECORDS_FILE, "r+b") as f:
+            f.truncate(n_records * ASSOCIATION_DTYPE.itemsize)
+        for batch in store.iter_batches():
+            top_associations.push(np.asarray(batch))
+        return n_records
+
+    # Execution ------------------------------------------------------------
+
+    def run(
+        self,
+        store: AssociationStore,
+        top_associations: TopKAssociations,
+        fingerprint: str,
+        resume: bool = True,
+    ) -> Dict[str, Any]:
+        """Compute every tile not already completed and append it to ``store``.
+
+        Args:
+            store: Store created (or reopened, when resuming) for this run
+            top_associations: Top-K selection to update with every tile
+            fingerprint: Identity of inputs and tiling (see data_fingerprint);
+                a checkpoint is only reused when it matches
+            resume: Skip tiles completed by an earlier, interrupted run
+
+        Returns:
+            Dictionary with per-tile details, tiles resumed and timing
+        """
+        checkpoint = self.load_checkpoint(store, fingerprint) if resume else None
+        completed: Set[int] = set()
+        n_records = 0
+        if checkpoint is not None:
+            completed = set(checkpoint["completed_tiles"])
+            n_records = self._restore(store, checkpoint, top_associations)
+            logger.info(f"Resuming HAllA run: {len(completed)}/{len(self.tiles)} tiles already complete")
+        self._write_checkpoint(store, fingerprint, completed, n_records)
+
+        pending = [tile for tile in self.tiles if tile.tile_id not in completed]
+        tile_details = {}
+        progress = _Progress(self.tiles, completed, self.progress_callback)
+
+        def on_tile_done(tile_id: int, records: np.ndarray) -> None:
+            nonlocal n_records
+            store.append(records)
+            top_associations.push(records)
+            n_records += len(records)
+            completed.add(tile_id)
+            self._write_checkpoint(store, fingerprint, completed, n_records)
+            tile_details[tile_id] = len(records)
+            progress.update(self.tiles[tile_id])
+
+        logger.info(f"Scheduling {len(pending)} of {len(self.tiles)} tiles on {self.n_workers} worker(s)")
+        if self.n_workers <= 1 or len(pending) <= 1:
+            for tile in pending:
+                on_tile_done(tile.tile_id, compute_tile(self.prepared1, self.prepared2, tile))
+        else:
+            self._run_pool(pending, on_tile_done)
+
+        return {
+            "n_tiles": len(self.tiles),
+            "tiles_resumed": len(self.tiles) - len(pending),
+            "n_workers": self.n_workers,
+            "elapsed_seconds": round(progress.elapsed, 3),
+            "tile_details": [
+                {**_tile_bounds(self.tiles[tile_id]), "associations_found": count}
+                for tile_id, count in sorted(tile_details.items())
+            ],
+            "n_records": n_records,
+        }
+
+    def _run_pool(self, pending: Sequence[Tile],
+                  on_tile_done: Callable[[int, np.ndarray], None]) -> None:
+        blocks: List[shared_memory.SharedMemory] = []
+        try:
+            specs = {
+                axis: _share_prepared(prepared, blocks)
+                for axis, prepared in ((1, self.prepared1), (2, self.prepared2))
+            }
+            with ProcessPoolExecutor(max_workers=self.n_workers, mp_context=_mp_context(),
+                                     initializer=_init_worker, initargs=(specs,)) as pool:
+                # Bound in-flight tiles so finished results do not pile up in memory
+                queue = list(pending)
+                running = set()
+                while queue or running:
+                    while queue and len(running) < 2 * self.n_workers:
+                        running.add(pool.submit(_compute_shared_tile, queue.pop(0)))
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        on_tile_done(*future.result())
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+
+def _tile_bounds(tile: Tile) -> Dict[str, int]:
+    return {
+        "tile_id": tile.tile_id,
+        "features1": [tile.row_start, tile.row_stop],
+        "features2": [tile.col_start, tile.col_stop],
+    }
+
+
+class _Progress:
+    """Tracks completed tests and estimates time remaining from throughput."""
+
+    def __init__(self, tiles: Sequence[Tile], completed: Set[int],
+                 callback: Optional[ProgressCallback]):
+        self.total_tiles = len(tiles)
+        self.total_tests = sum(tile.n_tests for tile in tiles)
+        self.done_tiles = len(completed)
+        self.done_tests = sum(tiles[i].n_tests for i in completed)
+        self.resumed_tests = self.done_tests
+        self.callback = callback
+        self.start = time.monotonic()
+        self._last_log = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    def update(self, tile: Tile) -> None:
+        self.done_tiles += 1
+        self.done_tests += tile.n_tests
+        elapsed = self.elapsed
+        # Throughput counts only tests computed in this run
+        rate = (self.done_tests - self.resumed_tests) / elapsed if elapsed > 0 else 0.0
+        remaining = self.total_tests - self.done_tests
+        eta = remaining / rate if rate > 0 else None
+
+        state = {
+            "tiles_completed": self.done_tiles,
+            "total_tiles": self.total_tiles,
+            "fraction_complete": self.done_tests / self.total_tests if self.total_tests else 1.0,
+            "elapsed_seconds": elapsed,
+            "eta_seconds": eta,
+        }
+        if self.callback is not None:
+            self.callback(state)
+
+        finished = self.done_tiles == self.total_tiles
+        if finished or elapsed - self._last_log >= PROGRESS_LOG_INTERVAL:
+            self._last_log = elapsed
+            eta_text = f", ETA {eta:.0f}s" if eta is not None and not finished else ""
+            logger.info(
+                f"HAllA tiles {self.done_tiles}/{self.total_tiles} "
+                f"({100 * state['fraction_complete']:.1f}%), elapsed {elapsed:.1f}s{eta_text}"
+            )
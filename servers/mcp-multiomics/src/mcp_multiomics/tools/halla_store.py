@@ -0,0 +1,287 @@
+"""Out-of-core result store for HAllA association tests.
+
+Full all-against-all runs produce one record per tested feature pair (tens
+of millions for 20K RNA × 7K protein), far too many to hold as Python dicts.
+Records are streamed chunk by chunk to a flat binary file of fixed-width
+structured records and read back through ``np.memmap``, so memory stays flat
+regardless of the number of tests. Only a bounded top-K selection (smallest
+nominal p-values) is kept in memory for clustering and the tool response.
+
+Store layout (one directory per run):
+    associations.bin   Packed ASSOCIATION_DTYPE records, in tested order
+    features1.json     Modality 1 feature names (record field feature1 indexes it)
+    features2.json     Modality 2 feature names
+    store.json         Run metadata, record count and completion status
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+ASSOCIATION_DTYPE = np.dtype([
+    ("p_value", "<f8"),
+    ("feature1", "<i4"),
+    ("feature2", "<i4"),
+    ("correlation", "<f4"),
+    ("n_samples", "<i4"),
+    ("chunk_id", "<i4"),
+])
+
+RECORDS_FILE = "associations.bin"
+METADATA_FILE = "store.json"
+
+# Records read per batch when scanning the store (~28 MB)
+SCAN_BATCH_SIZE = 1_000_000
+
+
+def make_records(
+    feature1: np.ndarray,
+    feature2: np.ndarray,
+    correlation: np.ndarray,
+    p_value: np.ndarray,
+    n_samples: np.ndarray,
+    chunk_id: int,
+) -> np.ndarray:
+    """Pack per-pair result arrays into ASSOCIATION_DTYPE records."""
+    records = np.empty(len(p_value), dtype=ASSOCIATION_DTYPE)
+    records["p_value"] = p_value
+    records["feature1"] = feature1
+    records["feature2"] = feature2
+    records["correlation"] = correlation
+    records["n_samples"] = n_samples
+    records["chunk_id"] = chunk_id
+    return records
+
+
+class TopKAssociations:
+    """Bounded selection of the ``k`` records with the smallest p-values.
+
+    Each push merges the incoming batch with the current selection using
+    ``np.argpartition``, so memory is O(k + batch) however many records pass
+    through. Ties at the cut-off keep the earliest records.
+    """
+
+    def __init__(self, k: int):
+        self.k = max(int(k), 0)
+        self._records = np.empty(0, dtype=ASSOCIATION_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def push(self, records: np.ndarray) -> None:
+        """Offer a batch of records."""
+        if self.k == 0 or len(records) == 0:
+            return
+        if len(self._records) == self.k:
+            # Only records beating the current worst can enter
+            records = records[records["p_value"] < self._records["p_value"].max()]
+            if len(records) == 0:
+                return
+        merged = np.concatenate([self._records, records])
+        if len(merged) > self.k:
+            keep = np.argpartition(merged["p_value"], self.k - 1, kind="introselect")[:self.k]
+            merged = merged[np.sort(keep)]
+        self._records = merged
+
+    def result(self) -> np.ndarray:
+        """Selected records sorted by p-value (stable)."""
+        order = np.argsort(self._records["p_value"], kind="stable")
+        return self._records[order]
+
+
+class AssociationStore:
+    """Append-only, memory-mapped store of association records."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._features: Dict[int, List[str]] = {}
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def create(
+        cls,
+        path: Path,
+        features1: Sequence[Any],
+        features2: Sequence[Any],
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> "AssociationStore":
+        """Create (or truncate) a store for a new run."""
+        store = cls(path)
+        store.path.mkdir(parents=True, exist_ok=True)
+        for axis, names in ((1, features1), (2, features2)):
+            with open(store.path / f"features{axis}.json", "w") as f:
+                json.dump([str(name) for name in names], f)
+        (store.path / RECORDS_FILE).write_bytes(b"")
+        store._write_metadata({
+            **(metadata or {}),
+            "n_features1": len(features1),
+            "n_features2": len(features2),
+            "n_records": 0,
+            "complete": False,
+        })
+        return store
+
+    def append(self, records: np.ndarray) -> None:
+        """Append a batch of ASSOCIATION_DTYPE records."""
+        if records.dtype != ASSOCIATION_DTYPE:
+            raise ValueError(f"Expected ASSOCIATION_DTYPE records, got {records.dtype}")
+        with open(self.path / RECORDS_FILE, "ab") as f:
+            f.write(np.ascontiguousarray(records).tobytes())
+
+    def finalize(self, **summary: Any) -> None:
+        """Record the final record count and mark the store complete."""
+        self._write_metadata({
+            **self.metadata,
+            **summary,
+            "n_records": self._records_on_disk(),
+            "complete": True,
+        })
+
+    def _write_metadata(self, metadata: Dict[str, Any]) -> None:
+        tmp_file = self.path / f"{METADATA_FILE}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(metadata, f, indent=2)
+        tmp_file.replace(self.path / METADATA_FILE)
+        self._metadata = metadata
+
+    def _records_on_disk(self) -> int:
+        return (self.path / RECORDS_FILE).stat().st_size // ASSOCIATION_DTYPE.itemsize
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            metadata_file = self.path / METADATA_FILE
+            if not metadata_file.exists():
+                raise FileNotFoundError(f"No HAllA result store at {self.path}")
+            with open(metadata_file) as f:
+                self._metadata = json.load(f)
+        return self._metadata
+
+    def features(self, axis: int) -> List[str]:
+        """Feature names of modality 1 or 2."""
+        if axis not in self._features:
+            with open(self.path / f"features{axis}.json") as f:
+                self._features[axis] = json.load(f)
+        return self._features[axis]
+
+    def __len__(self) -> int:
+        return self._records_on_disk()
+
+    def records(self) -> np.ndarray:
+        """All records as a read-only memory map (nothing is loaded eagerly)."""
+        n_records = len(self)
+        if n_records == 0:
+            return np.empty(0, dtype=ASSOCIATION_DTYPE)
+        return np.memmap(self.path / RECORDS_FILE, dtype=ASSOCIATION_DTYPE,
+                         mode="r", shape=(n_records,))
+
+    def iter_batches(self, batch_size: int = SCAN_BATCH_SIZE) -> Iterator[np.ndarray]:
+        """Yield consecutive record batches from the memory map."""
+        records = self.records()
+        for start in range(0, len(records), batch_size):
+            yield records[start:start + batch_size]
+
+    def to_dicts(self, records: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert records to association dicts with feature names."""
+        features1, features2 = self.features(1), self.features(2)
+        modality1 = self.metadata.get("modality1")
+        modality2 = self.metadata.get("modality2")
+        return [
+            {
+                "feature1": features1[f1],
+                "feature2": features2[f2],
+                "feature1_modality": modality1,
+                "feature2_modality": modality2,
+                "correlation": correlation,
+                "p_value_nominal": p_value,  # NOMINAL p-value
+                "n_samples": n,
+                "chunk_id": chunk_id,
+            }
+            for f1, f2, correlation, p_value, n, chunk_id in zip(
+                records["feature1"].tolist(),
+                records["feature2"].tolist(),
+                records["correlation"].astype(float).tolist(),
+                records["p_value"].tolist(),
+                records["n_samples"].tolist(),
+                records["chunk_id"].tolist(),
+            )
+        ]
+
+    def query(
+        self,
+        max_p_value: Optional[float] = None,
+        min_abs_correlation: Optional[float] = None,
+        feature: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by_p_value: bool = True,
+    ) -> Dict[str, Any]:
+        """Filter and page through stored associations.
+
+        The store is scanned batch by batch; with ``sort_by_p_value`` only the
+        best ``offset + limit`` matches are retained while scanning.
+
+        Args:
+            max_p_value: Keep associations with nominal p <= this value
+            min_abs_correlation: Keep associations with |correlation| >= this value
+            feature: Keep associations involving this feature (either modality)
+            offset: Number of matching associations to skip
+            limit: Maximum number of associations to return
+            sort_by_p_value: Order by p-value (otherwise stored order)
+
+        Returns:
+            Dictionary with total_matching, offset, limit and associations
+        """
+        feature_ids = {}
+        if feature is not None:
+            for axis in (1, 2):
+                names = self.features(axis)
+                feature_ids[axis] = [i for i, name in enumerate(names) if name == feature]
+
+        window = TopKAssociations(offset + limit) if sort_by_p_value else None
+        page = []
+        total = 0
+        for batch in self.iter_batches():
+            keep = np.ones(len(batch), dtype=bool)
+            if max_p_value is not None:
+                keep &= batch["p_value"] <= max_p_value
+            if min_abs_correlation is not None:
+                keep &= np.abs(batch["correlation"]) >= min_abs_correlation
+            if feature is not None:
+                keep &= (np.isin(batch["feature1"], feature_ids[1]) |
+                         np.isin(batch["feature2"], feature_ids[2]))
+            matches = np.asarray(batch[keep])
+
+            if window is not None:
+                window.push(matches)
+            else:
+                # Stored order: collect only the requested page
+                lo = max(offset - total, 0)
+                hi = max(offset + limit - total, 0)
+                if hi > 0 and lo < len(matches):
+                    page.append(matches[lo:hi])
+            total += len(matches)
+
+        if window is not None:
+            selected = window.result()[offset:offset + limit]
+        elif page:
+            selected = np.concatenate(page)
+        else:
+            selected = np.empty(0, dtype=ASSOCIATION_DTYPE)
+
+        return {
+            "total_matching": int(total),
+            "offset": offset,
+            "limit": limit,
+            "associations": self.to_dicts(selected),
+        }
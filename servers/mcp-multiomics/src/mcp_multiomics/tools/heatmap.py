@@ -0,0 +1,393 @@
+"""Clustered multi-omics heatmaps.
+
+Features are either the ones requested or the top-ranked features of each
+modality (by default the most variable, see feature_selection.py; streamed
+from the integrated store, so only the selected rows are ever loaded), never
+more than MULTIOMICS_MAX_FEATURES rows. Rows are z-scored, and rows and columns are clustered with
+average linkage on float32 condensed distance vectors built blockwise from a
+matrix product, with optional optimal leaf ordering. Linkages are cached per
+dataset and feature selection, so re-rendering the same selection with other
+options skips clustering.
+
+The matrix is drawn as a single rasterized image and the dendrograms as line
+collections, so rendering cost does not grow with the number of cells drawn
+as vector patches; 5,000 features × 500 samples render in a few seconds.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.cluster import hierarchy
+
+from ..config import config
+from .dataset_cache import record_derived
+from .feature_selection import rank_features
+from .normalization import row_mean_std
+from .utils import ModalitySource, dataset_signature, write_cache_file
+
+logger = logging.getLogger(__name__)
+
+HEATMAP_METRICS = ("correlation", "euclidean")
+
+DEFAULT_TOP_FEATURES = 1000
+
+# Rows of the distance matrix computed per matrix product
+DISTANCE_BLOCK_ROWS = 1024
+
+# Optimal leaf ordering is roughly cubic; warn above this many leaves
+OPTIMAL_ORDERING_WARN_LEAVES = 2000
+
+# Axis labels are only drawn up to this many rows/columns
+MAX_LABELS = 100
+
+# z-scores are clipped to ±Z_CLIP for the color scale
+Z_CLIP = 3.0
+
+
+# ----------------------------------------------------------------------
+# Feature selection
+# ----------------------------------------------------------------------
+
+def _match_features(source: ModalitySource, modalities: List[str],
+                    features: Sequence[str]) -> Dict[str, List[str]]:
+    """Resolve "modality:feature" or bare feature names against the dataset."""
+    selection = {}
+    found = set()
+    for modality in modalities:
+        available = source.features(modality)
+        wanted = [f.split(":", 1)[1] if f.startswith(f"{modality}:") else f for f in features]
+        names = [name for name in dict.fromkeys(wanted) if name in available]
+        if names:
+            selection[modality] = names
+            found.update(names)
+    missing = [f for f in features if f.split(":", 1)[-1] not in found and f not in found]
+    if not selection:
+        raise ValueError("None of the requested features are in the integrated data")
+    if missing:
+        logger.warning(f"{len(missing)} requested features not found: {missing[:10]}")
+    return selection
+
+
+def select_top_features(source: ModalitySource, modalities: List[str], n_features: int,
+                        method: str = "variance") -> Dict[str, List[str]]:
+    """Top-ranked features (see feature_selection.py), split evenly across modalities.
+
+    Modalities with fewer features than their share pass the remainder on to
+    the larger ones. Selected features keep their store order.
+    """
+    selection = {}
+    by_size = sorted(modalities, key=source.n_features)
+    remaining = n_features
+    for i, modality in enumerate(by_size):
+        quota = min(remaining // (len(by_size) - i), source.n_features(modality))
+        ranking = rank_features(source, modality, method)
+        features = source.features(modality)
+        top = np.sort(features.get_indexer(ranking.index[:quota]))
+        selection[modality] = list(features[top])
+        remaining -= len(top)
+    return {modality: selection[modality] for modality in modalities if selection[modality]}
+
+
+# ----------------------------------------------------------------------
+# Clustering
+# ----------------------------------------------------------------------
+
+def _row_zscore(values: np.ndarray) -> np.ndarray:
+    mean, std = row_mean_std(values)
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+    return np.nan_to_num((values - mean[:, None]) / std[:, None]).astype(np.float32)
+
+
+def condensed_distances(values: np.ndarray, metric: str = "correlation") -> np.ndarray:
+    """Condensed float32 distance vector between the rows of ``values``.
+
+    Equivalent to ``scipy.spatial.distance.pdist`` for "correlation" and
+    "euclidean", but built from blockwise float32 matrix products.
+    """
+    if metric not in HEATMAP_METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(HEATMAP_METRICS)}")
+    x = np.asarray(values, dtype=np.float32)
+    if metric == "correlation":
+        x = x - x.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        x = x / np.where(norms > 0, norms, 1)
+    squared = np.einsum("ij,ij->i", x, x)
+
+    n = len(x)
+    condensed = np.empty(n * (n - 1) // 2, dtype=np.float32)
+    pos = 0
+    for start in range(0, n - 1, DISTANCE_BLOCK_ROWS):
+        stop = min(start + DISTANCE_BLOCK_ROWS, n - 1)
+        products = x[start:stop] @ x[start + 1:].T
+        for row in range(stop - start):
+            i = start + row
+            dots = products[row, row:]
+            if metric == "correlation":
+                block = 1.0 - dots
+            else:
+                block = np.sqrt(np.maximum(squared[i] + squared[i + 1:] - 2 * dots, 0))
+            condensed[pos:pos + len(block)] = block
+            pos += len(block)
+    return np.maximum(condensed, 0, out=condensed)
+
+
+def cluster(values: np.ndarray, metric: str = "correlation",
+            optimal_ordering: bool = False) -> np.ndarray:
+    """Average-linkage matrix of the rows of ``values``."""
+    distances = condensed_distances(values, metric)
+    linkage = hierarchy.linkage(distances, method="average")
+    if optimal_ordering:
+        if len(values) > OPTIMAL_ORDERING_WARN_LEAVES:
+            logger.warning(f"Optimal leaf ordering of {len(values)} leaves may take minutes")
+        linkage = hierarchy.optimal_leaf_ordering(linkage, distances)
+    return linkage
+
+
+def _cached_linkage(cache_key: Dict[str, Any], values: np.ndarray, metric: str,
+                    optimal_ordering: bool, data_path: Optional[str] = None) -> Tuple[np.ndarray, bool]:
+    payload = json.dumps(cache_key, sort_keys=True, default=str)
+    path = config.cache_dir / "heatmap" / f"{hashlib.sha256(payload.encode()).hexdigest()[:24]}.npy"
+    if path.is_file():
+        return np.load(path), True
+    linkage = cluster(values, metric, optimal_ordering)
+    write_cache_file(path, lambda f: np.save(f, linkage))
+    if data_path:
+        record_derived(data_path, path)
+    return linkage, False
+
+
+# ----------------------------------------------------------------------
+# Rendering
+# ----------------------------------------------------------------------
+
+def _dendrogram_segments(linkage: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """Line segments ((position, height) pairs) of a dendrogram, without recursion."""
+    n = len(order)
+    position = np.empty(2 * n - 1)
+    position[order] = np.arange(n)
+    height = np.zeros(2 * n - 1)
+    segments = np.empty((n - 1, 3, 2, 2))
+    for k, (a, b, h, _) in enumerate(linkage):
+        a, b = int(a), int(b)
+        position[n + k] = (position[a] + position[b]) / 2
+        height[n + k] = h
+        segments[k] = [
+            [[position[a], height[a]], [position[a], h]],
+            [[position[a], h], [position[b], h]],
+            [[position[b], height[b]], [position[b], h]],
+        ]
+    return segments.reshape(-1, 2, 2)
+
+
+def _render(matrix: np.ndarray, row_labels: List[str], col_labels: List[str],
+            row_modalities: List[str], groups: Optional[pd.Series],
+            row_linkage: Optional[np.ndarray], col_linkage: Optional[np.ndarray],
+            row_order: np.ndarray, col_order: np.ndarray, plot_path: Path) -> None:
+    import matplotlib
+    matplotlib.use("Agg")  # Non-interactive backend for server use
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    n_rows, n_cols = matrix.shape
+    fig = plt.figure(figsize=(min(4 + n_cols * 0.05, 16), min(4 + n_rows * 0.02, 14)))
+    grid = fig.add_gridspec(3, 4, width_ratios=[1.5, 0.25, 8, 0.25], height_ratios=[1.5, 0.25, 8],
+                            wspace=0.02, hspace=0.02)
+    image_kwargs = {"aspect": "auto", "interpolation": "nearest", "interpolation_stage": "data",
+                    "rasterized": True}
+
+    heatmap = fig.add_subplot(grid[2, 2])
+    image = heatmap.imshow(matrix[np.ix_(row_order, col_order)], cmap="RdBu_r",
+                           vmin=-Z_CLIP, vmax=Z_CLIP, **image_kwargs)
+    heatmap.set_yticks([])
+    heatmap.set_xticks([])
+    if n_rows <= MAX_LABELS:
+        heatmap.yaxis.tick_right()
+        heatmap.set_yticks(range(n_rows), [row_labels[i] for i in row_order], fontsize=6)
+    if n_cols <= MAX_LABELS:
+        heatmap.set_xticks(range(n_cols), [col_labels[i] for i in col_order], fontsize=6, rotation=90)
+
+    # Modality track
+    modality_names = list(dict.fromkeys(row_modalities))
+    codes = np.array([modality_names.index(m) for m in row_modalities])[row_order]
+    track = fig.add_subplot(grid[2, 1])
+    track.imshow(codes[:, None], cmap="tab10", vmin=0, vmax=9, **image_kwargs)
+    track.set_axis_off()
+
+    # Sample group track
+    if groups is not None:
+        group_names = list(pd.unique(groups.dropna()))
+        group_codes = np.array([group_names.index(g) if g in group_names else np.nan
+                                for g in groups])[col_order]
+        group_track = fig.add_subplot(grid[1, 2])
+        group_track.imshow(group_codes[None, :], cmap="Set2", vmin=0, vmax=7, **image_kwargs)
+        group_track.set_axis_off()
+
+    for linkage, order, cell, horizontal in ((row_linkage, row_order, grid[2, 0], False),
+                                             (col_linkage, col_order, grid[0, 2], True)):
+        if linkage is None:
+            continue
+        ax = fig.add_subplot(cell)
+        segments = _dendrogram_segments(linkage, order)
+        if not horizontal:
+            segments = segments[..., ::-1]
+        ax.add_collection(LineCollection(segments, colors="black", linewidths=0.4))
+        top = max(float(linkage[:, 2].max()), 1e-12)
+        if horizontal:
+            ax.set_xlim(-0.5, len(order) - 0.5)
+            ax.set_ylim(0, top * 1.02)
+        else:
+            ax.set_ylim(len(order) - 0.5, -0.5)
+            ax.set_xlim(top * 1.02, 0)
+        ax.set_axis_off()
+
+    colorbar = fig.add_subplot(grid[2, 3])
+    fig.colorbar(image, cax=colorbar, label="z-score")
+    title = f"Multi-omics heatmap ({', '.join(modality_names)})"
+    if groups is not None:
+        title += f" — samples by {groups.name}"
+    fig.suptitle(title, fontsize=10)
+    plot_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(plot_path, dpi=150)
+    plt.close(fig)
+
+
+# ----------------------------------------------------------------------
+# Tool implementation
+# ----------------------------------------------------------------------
+
+def create_multiomics_heatmap_impl(
+    data_path: str,
+    features: Optional[List[str]] = None,
+    cluster_rows: bool = True,
+    cluster_cols: bool = True,
+    output_path: Optional[str] = None,
+    modalities: Optional[List[str]] = None,
+    top_features: int = DEFAULT_TOP_FEATURES,
+    metric: str = "correlation",
+    optimal_ordering: bool = False,
+    n_row_clusters: int = 4,
+    n_col_clusters: int = 2,
+    feature_selection: str = "variance",
+) -> Dict[str, Any]:
+    """Create a clustered heatmap of integrated multi-omics data.
+
+    Args:
+        data_path: Path to integrated data (cache_path from integrate_omics_data)
+        features: Feature names ("TP53" or "protein:TP53"); default: top-ranked features
+        cluster_rows: Cluster rows (features)
+        cluster_cols: Cluster columns (samples)
+        output_path: Path of the plot (PNG or PDF; default: cache_dir/heatmap)
+        modalities: Modalities to include (default: all)
+        top_features: Number of top-ranked features when ``features`` is not given
+            (at most MULTIOMICS_MAX_FEATURES)
+        metric: "correlation" or "euclidean" distance between z-scored rows/columns
+        optimal_ordering: Reorder leaves to minimize adjacent distances (slow above ~2,000 leaves)
+        n_row_clusters: Number of feature clusters reported
+        n_col_clusters: Number of sample clusters reported
+        feature_selection: Ranking of top features - "variance", "mad", "cv",
+            "missingness" or "trend"
+
+    Returns:
+        Dictionary with plot path, cluster assignments and figure summary
+    """
+    if metric not in HEATMAP_METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(HEATMAP_METRICS)}")
+    source = ModalitySource(data_path)
+    modalities = modalities or source.modalities
+    missing = [m for m in modalities if m not in source.modalities]
+    if missing:
+        raise ValueError(f"Modalities {', '.join(missing)} not found. Available: {source.modalities}")
+
+    # Row clustering is quadratic in the number of rows: cap at max_features
+    if features:
+        if len(features) > config.max_features:
+            logger.warning(f"{len(features)} features requested; keeping the first "
+                           f"{config.max_features} (MULTIOMICS_MAX_FEATURES)")
+        selection = _match_features(source, modalities, features[:config.max_features])
+    else:
+        selection = select_top_features(source, modalities, min(top_features, config.max_features),
+                                        feature_selection)
+    blocks = [source.load(modality, names) for modality, names in selection.items()]
+    matrix = _row_zscore(np.vstack([block.to_numpy(dtype=np.float64) for block in blocks]))
+    row_modalities = [m for m, names in selection.items() for _ in names]
+    row_labels = [f"{m}:{name}" for m, names in selection.items() for name in names]
+    col_labels = [str(s) for s in source.samples]
+    logger.info(f"Heatmap of {matrix.shape[0]} features × {matrix.shape[1]} samples")
+
+    cache_key = {
+        "data": dataset_signature(data_path),
+        "rows": hashlib.sha256("\n".join(row_labels).encode()).hexdigest(),
+        "metric": metric,
+        "method": "average",
+        "optimal_ordering": optimal_ordering,
+    }
+    linkages, cache_hits = {}, {}
+    for axis, enabled, values in (("rows", cluster_rows, matrix), ("cols", cluster_cols, matrix.T)):
+        if enabled and len(values) > 1:
+            linkages[axis], cache_hits[axis] = _cached_linkage({**cache_key, "axis": axis},
+                                                               values, metric, optimal_ordering,
+                                                               data_path)
+        else:
+            linkages[axis] = None
+    row_order = (hierarchy.leaves_list(linkages["rows"]) if linkages["rows"] is not None
+                 else np.arange(matrix.shape[0]))
+    col_order = (hierarchy.leaves_list(linkages["cols"]) if linkages["cols"] is not None
+                 else np.arange(matrix.shape[1]))
+
+    metadata = source.metadata()
+    groups = None
+    if metadata is not None:
+        column = next((c for c in ("Response", "Treatment", "Group", "Batch") if c in metadata.columns),
+                      None)
+        if column:
+            groups = metadata[column].reindex(col_labels).rename(column)
+
+    if output_path:
+        plot_path = Path(output_path)
+    else:
+        digest = hashlib.sha256(json.dumps(cache_key, sort_keys=True, default=str).encode())
+        plot_path = config.cache_dir / "heatmap" / f"{digest.hexdigest()[:24]}.png"
+    _render(matrix, row_labels, col_labels, row_modalities, groups, linkages["rows"],
+            linkages["cols"], row_order, col_order, plot_path)
+    if not output_path:
+        record_derived(data_path, plot_path)
+
+    cluster_info: Dict[str, Any] = {
+        "row_linkage": "average" if linkages["rows"] is not None else None,
+        "col_linkage": "average" if linkages["cols"] is not None else None,
+        "metric": metric,
+        "optimal_ordering": optimal_ordering,
+        "linkage_cache_hit": cache_hits,
+    }
+    if linkages["rows"] is not None:
+        row_clusters = hierarchy.fcluster(linkages["rows"], n_row_clusters, criterion="maxclust")
+        cluster_info["row_clusters"] = int(row_clusters.max())
+        cluster_info["row_cluster_sizes"] = {
+            int(c): int(n) for c, n in zip(*np.unique(row_clusters, return_counts=True))
+        }
+    if linkages["cols"] is not None:
+        col_clusters = hierarchy.fcluster(linkages["cols"], n_col_clusters, criterion="maxclust")
+        cluster_info["col_clusters"] = int(col_clusters.max())
+        cluster_info["sample_clusters"] = {s: int(c) for s, c in zip(col_labels, col_clusters)}
+
+    return {
+        "plot_path": str(plot_path),
+        "cluster_info": cluster_info,
+        "figure_data": {
+            "type": "heatmap",
+            "rows": int(matrix.shape[0]),
+            "cols": int(matrix.shape[1]),
+            "features_per_modality": {m: len(names) for m, names in selection.items()},
+            "feature_selection": "requested" if features else f"top_{feature_selection}",
+            "row_order": [row_labels[i] for i in row_order[:MAX_LABELS]],
+            "col_order": [col_labels[i] for i in col_order],
+            "value": f"row z-score, clipped to ±{Z_CLIP:g}",
+            "format": plot_path.suffix.lstrip(".") or "png",
+        },
+        "status": "success",
+    }
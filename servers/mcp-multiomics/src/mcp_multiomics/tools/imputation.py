@@ -0,0 +1,380 @@
+"""Scalable missing-value imputation for multi-omics feature tables.
+
+All backends take a features × samples table (NaN = missing) and fill it in
+chunks of feature rows, so peak memory stays close to the size of the table
+itself even for 60k-feature phosphoproteomics data. Features without any
+observed value stay missing, except with the left-censored backends (minprob,
+minimum), which treat them as entirely below the detection limit.
+
+Backends:
+    knn: Feature-neighbour KNN (Troyanskaya et al. 2001). Each feature's
+        missing values are the mean of its nearest features' standardized
+        values in that sample, rescaled to the feature's own mean and SD.
+        Neighbours are found with a ball tree in a low-dimensional PCA space
+        of the feature profiles instead of all-pairs NaN-Euclidean distances.
+    minprob: Left-censored MinProb (Lazar et al. 2016). Draws from a normal
+        distribution centred on a low quantile of each sample, for values
+        missing because they fell below the detection limit (log-scale data).
+    svd: Iterative low-rank SVD imputation (SVDimpute, Troyanskaya et al. 2001)
+    minimum: Global minimum of the table (0.01 if the minimum is not positive)
+    median: Feature median
+
+Further backends can be added with :func:`register_imputer`.
+:func:`impute_modalities` imputes several modalities in parallel threads
+(NumPy and the ball tree release the GIL) and reports time and memory.
+"""
+
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from .halla_scheduler import resolve_n_jobs
+from .normalization import Table, _as_array, _like, row_mean_std
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Feature rows processed per chunk (~80 MB at 1000 float64 samples)
+CHUNK_ROWS = 10000
+
+Imputer = Callable[..., np.ndarray]
+
+IMPUTERS: Dict[str, Imputer] = {}
+
+
+def register_imputer(name: str) -> Callable[[Imputer], Imputer]:
+    """Decorator registering an imputation backend under ``name``.
+
+    A backend takes a features × samples floating array (NaN = missing) plus
+    keyword options, fills it in place and returns it.
+    """
+    def decorator(func: Imputer) -> Imputer:
+        IMPUTERS[name] = func
+        return func
+    return decorator
+
+
+def _chunks(n_rows: int, chunk_rows: int):
+    for start in range(0, n_rows, chunk_rows):
+        yield slice(start, min(start + chunk_rows, n_rows))
+
+
+def _top_components(values: np.ndarray, rank: int, chunk_rows: int) -> np.ndarray:
+    """Top ``rank`` right singular vectors (samples × rank) of a complete matrix.
+
+    Uses the samples × samples Gram matrix accumulated over feature chunks,
+    so only one chunk is ever copied.
+    """
+    n_samples = values.shape[1]
+    gram = np.zeros((n_samples, n_samples))
+    for rows in _chunks(len(values), chunk_rows):
+        block = values[rows].astype(np.float64, copy=False)
+        gram += block.T @ block
+    _, eigenvectors = np.linalg.eigh(gram)
+    return eigenvectors[:, ::-1][:, :rank].astype(values.dtype)
+
+
+def _standardize(values: np.ndarray, missing: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Z-scores of every feature with missing values set to 0 (the feature mean).
+
+    Returns:
+        Tuple of (z-scores, feature means, feature SDs); features with fewer
+        than two observations get SD 1
+    """
+    mean, std = row_mean_std(values)
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+    mean = np.nan_to_num(mean)
+    z = (values - mean[:, None].astype(values.dtype)) / std[:, None].astype(values.dtype)
+    z[missing] = 0
+    return z, mean, std
+
+
+@register_imputer("knn")
+def knn_impute(
+    values: np.ndarray,
+    n_neighbors: int = 5,
+    n_components: int = 10,
+    n_candidates: Optional[int] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> np.ndarray:
+    """Impute from the nearest features, found with a ball tree in PCA space.
+
+    Args:
+        values: Features × samples array, filled in place
+        n_neighbors: Observed neighbours averaged per missing value
+        n_components: Dimensions of the PCA space used for the neighbour search
+        n_candidates: Neighbours retrieved per feature, so that ``n_neighbors``
+            of them are usually observed in each sample (default: 3 × n_neighbors)
+        chunk_rows: Features imputed per chunk
+
+    Returns:
+        The imputed array
+    """
+    missing = np.isnan(values)
+    query = np.flatnonzero(missing.any(axis=1) & ~missing.all(axis=1))
+    n_features, n_samples = values.shape
+    if len(query) == 0:
+        return values
+
+    z, mean, std = _standardize(values, missing)
+    n_candidates = min(n_candidates or 3 * n_neighbors, n_features - 1)
+    if n_candidates < 1 or n_samples < 2:
+        # No other features to borrow from: fall back to the feature mean
+        values[query] = np.where(missing[query], mean[query, None], values[query])
+        return values
+
+    # Feature profiles in PCA space (centered over features)
+    rank = max(1, min(n_components, n_samples - 1))
+    centered = z - z.mean(axis=0, dtype=np.float64).astype(z.dtype)
+    points = centered @ _top_components(centered, rank, chunk_rows)
+    del centered
+    tree = BallTree(points)
+
+    # Bound the (features × candidates × samples) neighbour block per chunk
+    chunk_rows = max(1, min(chunk_rows, (64 << 20) // max(n_candidates * n_samples * z.itemsize, 1)))
+    for rows in _chunks(len(query), chunk_rows):
+        features = query[rows]
+        neighbors = tree.query(points[features], k=n_candidates + 1, return_distance=False,
+                               dualtree=True)
+        # Drop each feature from its own neighbour list (or the farthest if absent)
+        is_self = neighbors == features[:, None]
+        order = np.argsort(is_self, axis=1, kind="stable")
+        neighbors = np.take_along_axis(neighbors, order, axis=1)[:, :n_candidates]
+
+        observed = ~missing[neighbors]  # chunk × candidates × samples
+        # Nearest n_neighbors observed candidates per sample
+        use = observed & (np.cumsum(observed, axis=1) <= n_neighbors)
+        counts = use.sum(axis=1)
+        sums = np.einsum("fcs,fcs->fs", z[neighbors], use, dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z_hat = np.where(counts > 0, sums / counts, 0.0)
+
+        estimate = mean[features, None] + std[features, None] * z_hat
+        block = values[features]
+        values[features] = np.where(missing[features], estimate, block)
+    return values
+
+
+@register_imputer("minprob")
+def minprob_impute(
+    values: np.ndarray,
+    q: float = 0.01,
+    tune_sigma: float = 1.0,
+    random_state: Optional[int] = 0,
+    chunk_rows: int = CHUNK_ROWS,
+) -> np.ndarray:
+    """Left-censored imputation from a low quantile of each sample.
+
+    Missing values in sample j are drawn from N(mu_j, sigma) with mu_j the
+    ``q`` quantile of the sample's observed values and sigma the median SD of
+    features with at most 50% missing values, times ``tune_sigma``.
+
+    Args:
+        values: Features × samples array (log scale), filled in place
+        q: Quantile of each sample's observed values used as the mean
+        tune_sigma: Multiplier of the SD
+        random_state: Seed for reproducible draws
+        chunk_rows: Features imputed per chunk
+
+    Returns:
+        The imputed array
+    """
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+
+    observed_columns = ~missing.all(axis=0)
+    mu = np.full(values.shape[1], np.nan)
+    mu[observed_columns] = np.nanquantile(values[:, observed_columns], q, axis=0)
+
+    mostly_observed = missing.mean(axis=1) <= 0.5
+    _, std = row_mean_std(values[mostly_observed])
+    std = std[np.isfinite(std)]
+    sigma = float(np.median(std)) * tune_sigma if len(std) else 0.0
+
+    rng = np.random.default_rng(random_state)
+    for rows in _chunks(len(values), chunk_rows):
+        block = values[rows]
+        r, c = np.nonzero(missing[rows])
+        block[r, c] = mu[c] + sigma * rng.standard_normal(len(r))
+    return values
+
+
+@register_imputer("svd")
+def svd_impute(
+    values: np.ndarray,
+    rank: int = 5,
+    max_iter: int = 50,
+    tol: float = 1e-5,
+    chunk_rows: int = CHUNK_ROWS,
+) -> np.ndarray:
+    """Iterative low-rank SVD imputation.
+
+    Missing values start at the feature mean and are repeatedly replaced by
+    their rank-``rank`` SVD reconstruction until the relative change of the
+    imputed values falls below ``tol``. Each iteration needs one pass over
+    the features for the samples × samples Gram matrix and one over the
+    features with missing values.
+
+    Args:
+        values: Features × samples array, filled in place
+        rank: Rank of the reconstruction (capped at n_samples - 1)
+        max_iter: Maximum number of iterations
+        tol: Convergence threshold on the relative change of imputed values
+        chunk_rows: Features processed per chunk
+
+    Returns:
+        The imputed array
+    """
+    missing = np.isnan(values)
+    query = np.flatnonzero(missing.any(axis=1) & ~missing.all(axis=1))
+    if len(query) == 0:
+        return values
+
+    mean, _ = row_mean_std(values)
+    mean = np.nan_to_num(mean)
+    centered = values - mean[:, None].astype(values.dtype)
+    centered[missing] = 0
+    rank = max(1, min(rank, values.shape[1] - 1))
+    total = max(float(np.sum(centered * centered, dtype=np.float64)), np.finfo(float).tiny)
+
+    for iteration in range(max_iter):
+        components = _top_components(centered, rank, chunk_rows)
+        change = 0.0
+        for rows in _chunks(len(query), chunk_rows):
+            features = query[rows]
+            block = centered[features]
+            reconstruction = (block @ components) @ components.T
+            update = np.where(missing[features], reconstruction, block)
+            change += float(np.sum((update - block) ** 2, dtype=np.float64))
+            centered[features] = update
+        if change / total < tol:
+            break
+    logger.debug(f"SVD imputation stopped after {iteration + 1} iterations")
+
+    values[query] = np.where(missing[query], centered[query] + mean[query, None], values[query])
+    return values
+
+
+@register_imputer("minimum")
+def minimum_impute(values: np.ndarray) -> np.ndarray:
+    """Fill with the table's minimum (0.01 if the minimum is not positive)."""
+    minimum = np.nanmin(values) if not np.isnan(values).all() else np.nan
+    values[np.isnan(values)] = minimum if minimum > 0 else 0.01
+    return values
+
+
+@register_imputer("median")
+def median_impute(values: np.ndarray, chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """Fill with each feature's median."""
+    for rows in _chunks(len(values), chunk_rows):
+        block = values[rows]
+        missing = np.isnan(block)
+        fillable = missing.any(axis=1) & ~missing.all(axis=1)
+        if fillable.any():
+            medians = np.nanmedian(block[fillable], axis=1)
+            block[fillable] = np.where(missing[fillable], medians[:, None], block[fillable])
+    return values
+
+
+def impute(data: Table, method: str = "knn", dtype=None, copy: bool = True, **kwargs) -> Table:
+    """Impute missing values with one of the registered backends.
+
+    Args:
+        data: Features × samples table (NaN = missing)
+        method: Backend name (see :data:`IMPUTERS`)
+        dtype: Compute and return in this floating dtype (default: float64,
+            or the input's floating dtype)
+        copy: If False, impute in place where possible
+        **kwargs: Passed to the backend
+
+    Returns:
+        Imputed table of the same type and shape
+    """
+    if method not in IMPUTERS:
+        raise ValueError(
+            f"Unknown imputation method '{method}'. Use one of: {', '.join(IMPUTERS)}"
+        )
+    values = _as_array(data, dtype, copy)
+    return _like(data, IMPUTERS[method](values, **kwargs))
+
+
+def impute_modalities(
+    dataframes: Dict[str, pd.DataFrame],
+    method: str = "knn",
+    n_jobs: int = 1,
+    **kwargs: Any,
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Any]]:
+    """Impute every modality, in parallel threads.
+
+    Args:
+        dataframes: Dict of modality -> features × samples DataFrame
+        method: Backend name (see :data:`IMPUTERS`)
+        n_jobs: Modalities imputed concurrently (-1 = all CPUs)
+        **kwargs: Passed to the backend
+
+    Returns:
+        Tuple of (imputed DataFrames, statistics). Statistics hold per-modality
+        missing counts, seconds and working-copy size, the step's wall time,
+        the working memory of the imputed tables (each backend fills one
+        copy of its table; chunk buffers come on top), and the high-water
+        mark of the whole server process's resident memory, which includes
+        every other concurrent job.
+    """
+    if method not in IMPUTERS:
+        raise ValueError(
+            f"Unknown imputation method '{method}'. Use one of: {', '.join(IMPUTERS)}"
+        )
+
+    def run(item: Tuple[str, pd.DataFrame]) -> Tuple[str, pd.DataFrame, float]:
+        modality, df = item
+        start = time.perf_counter()
+        imputed = impute(df, method, **kwargs)
+        return modality, imputed, time.perf_counter() - start
+
+    start = time.perf_counter()
+    n_workers = max(1, min(resolve_n_jobs(n_jobs), len(dataframes)))
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        results = list(pool.map(run, dataframes.items()))
+
+    imputed = {}
+    modalities = {}
+    for modality, df, seconds in results:
+        missing_before = int(dataframes[modality].isna().to_numpy().sum())
+        missing_after = int(df.isna().to_numpy().sum())
+        imputed[modality] = df
+        modalities[modality] = {
+            "missing_before": missing_before,
+            "missing_after": missing_after,
+            "values_imputed": missing_before - missing_after,
+            "time_seconds": round(seconds, 4),
+            "working_memory_mb": round(df.to_numpy().nbytes / 2**20, 2),
+        }
+
+    return imputed, {
+        "method": method,
+        "modalities": modalities,
+        "n_workers": n_workers,
+        "wall_time_seconds": round(time.perf_counter() - start, 4),
+        "working_memory_mb": round(sum(m["working_memory_mb"] for m in modalities.values()), 2),
+        "process_peak_rss_mb": _process_peak_rss_mb(),
+    }
+
+
+def _process_peak_rss_mb() -> Optional[float]:
+    """Resident-memory high-water mark of the whole process (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 2)
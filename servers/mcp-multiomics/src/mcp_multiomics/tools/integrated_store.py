@@ -0,0 +1,325 @@
+"""Memory-mapped columnar store for integrated multi-omics data.
+
+integrate_omics_data used to pickle every modality into one file, so each
+downstream tool unpickled the whole package even when it needed two
+modalities or a few hundred features. The store keeps each modality as its
+own ``.npy`` matrix (features × samples, row-major) read through
+``np.load(mmap_mode="r")``: opening a store reads only the JSON manifest,
+loading a modality touches only its file, and loading a feature subset
+touches only the pages holding those rows.
+
+Store layout (one directory per integrated dataset):
+    manifest.json             Format version, samples and per-modality shape/dtype
+    <modality>/values.npy     Features × samples matrix (NaN = missing)
+    <modality>/features.json  Feature names (row order of values.npy)
+    <modality>/feature_stats.npz  Per-feature statistics of the values before
+                              normalization (mean, variance, ...), optional
+    sample_metadata.json      Sample metadata table (pandas "table" JSON), optional
+"""
+
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = "mcp-multiomics-integrated"
+STORE_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VALUES_FILE = "values.npy"
+FEATURES_FILE = "features.json"
+FEATURE_STATS_FILE = "feature_stats.npz"
+SAMPLE_METADATA_FILE = "sample_metadata.json"
+
+# Feature rows per chunk when iterating a modality (~40 MB at 1000 float64 samples)
+CHUNK_ROWS = 5000
+
+
+def is_integrated_store(path: Path) -> bool:
+    """True if ``path`` is an integrated-data store directory."""
+    return (Path(path) / MANIFEST_FILE).is_file()
+
+
+class IntegratedDataStore:
+    """Read-only view of an integrated-data store with lazy, partial loads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        manifest_file = self.path / MANIFEST_FILE
+        if not manifest_file.is_file():
+            raise FileNotFoundError(f"No integrated data store at {self.path}")
+        with open(manifest_file) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get("format") != STORE_FORMAT:
+            raise ValueError(f"{self.path} is not an integrated data store")
+        self._features: Dict[str, pd.Index] = {}
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def write(
+        cls,
+        path: Path,
+        dataframes: Dict[str, pd.DataFrame],
+        metadata: Optional[pd.DataFrame] = None,
+        info: Optional[Dict[str, Any]] = None,
+        replace: bool = True,
+        feature_stats: Optional[Dict[str, pd.DataFrame]] = None,
+    ) -> "IntegratedDataStore":
+        """Write aligned modalities to a new store, replacing any store at ``path``.
+
+        The store is assembled in a temporary sibling directory and renamed
+        into place, so readers never see a partially written store.
+
+        Args:
+            path: Store directory
+            dataframes: Dict of modality -> features × samples DataFrame (same samples)
+            metadata: Sample metadata DataFrame (optional)
+            info: Extra JSON-serializable fields for the manifest
+            replace: Replace a store already at ``path``; if False, a store
+                written there first (e.g. by a concurrent writer of the same
+                content) is kept and this copy is discarded
+            feature_stats: Dict of modality -> per-feature statistics of the
+                unnormalized values (numeric columns, indexed like the modality)
+
+        Returns:
+            The written store
+        """
+        samples = None
+        for modality, df in dataframes.items():
+            if samples is None:
+                samples = list(df.columns)
+            elif list(df.columns) != samples:
+                raise ValueError(f"Modality {modality} is not aligned to the common samples")
+        return cls.write_chunks(
+            path, samples or [], {modality: (len(df), [df]) for modality, df in dataframes.items()},
+            metadata, info, replace, feature_stats,
+        )
+
+    @classmethod
+    def write_chunks(
+        cls,
+        path: Path,
+        samples: Sequence[str],
+        modalities: Dict[str, Tuple[int, Iterable[pd.DataFrame]]],
+        metadata: Optional[pd.DataFrame] = None,
+        info: Optional[Dict[str, Any]] = None,
+        replace: bool = True,
+        feature_stats: Optional[Dict[str, pd.DataFrame]] = None,
+    ) -> "IntegratedDataStore":
+        """Write modalities chunk by chunk, replacing any store at ``path``.
+
+        Each modality's matrix is preallocated on disk and filled one chunk
+        at a time, so memory is bounded by a single chunk whatever the size
+        of the dataset. The dtype of a modality is that of its first chunk
+        (float32 or float64).
+
+        Args:
+            path: Store directory
+            samples: Sample names (columns of every chunk)
+            modalities: Dict of modality -> (number of features, iterable of
+                features × samples DataFrames in row order)
+            metadata: Sample metadata DataFrame (optional)
+            info: Extra JSON-serializable fields for the manifest
+            replace: Replace a store already at ``path`` (see :meth:`write`)
+            feature_stats: Per-feature statistics by modality (see :meth:`write`)
+
+        Returns:
+            The written store (or, with ``replace=False``, the one that won)
+        """
+        path = Path(path)
+        samples = [str(sample) for sample in samples]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(tempfile.mkdtemp(prefix=f".{path.name}.tmp-", dir=path.parent))
+
+        try:
+            written = {}
+            for modality, (n_features, chunks) in modalities.items():
+                modality_dir = tmp_path / modality
+                modality_dir.mkdir()
+                written[modality] = _write_modality(modality, modality_dir, samples, n_features, chunks)
+                if feature_stats and modality in feature_stats:
+                    _write_feature_stats(modality, modality_dir, feature_stats[modality])
+                    written[modality]["has_feature_stats"] = True
+
+            if metadata is not None:
+                metadata.to_json(tmp_path / SAMPLE_METADATA_FILE, orient="table")
+
+            with open(tmp_path / MANIFEST_FILE, "w") as f:
+                json.dump({
+                    "format": STORE_FORMAT,
+                    "version": STORE_VERSION,
+                    **(info or {}),
+                    "samples": samples,
+                    "modalities": written,
+                    "has_sample_metadata": metadata is not None,
+                }, f, indent=2)
+
+            if not replace and is_integrated_store(path):
+                # Another writer finished first: keep its store
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return cls(path)
+            if path.exists():
+                shutil.rmtree(path)
+            try:
+                tmp_path.rename(path)
+            except OSError:
+                # Lost a race for an empty path (ENOTEMPTY/EEXIST)
+                if replace or not is_integrated_store(path):
+                    raise
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        return cls(path)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @property
+    def modalities(self) -> List[str]:
+        return list(self.manifest["modalities"])
+
+    @property
+    def samples(self) -> List[str]:
+        return self.manifest["samples"]
+
+    def shape(self, modality: str) -> tuple:
+        """(n_features, n_samples) of one modality, from the manifest only."""
+        return tuple(self._modality_info(modality)["shape"])
+
+    def features(self, modality: str) -> pd.Index:
+        """Feature names of one modality."""
+        if modality not in self._features:
+            self._modality_info(modality)
+            with open(self.path / modality / FEATURES_FILE) as f:
+                self._features[modality] = pd.Index(json.load(f))
+        return self._features[modality]
+
+    def values(self, modality: str) -> np.ndarray:
+        """Read-only memory map of a modality's features × samples matrix."""
+        self._modality_info(modality)
+        return np.load(self.path / modality / VALUES_FILE, mmap_mode="r")
+
+    def load(
+        self,
+        modality: str,
+        features: Optional[Sequence[str]] = None,
+        samples: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """Load one modality (or a feature/sample subset) into memory.
+
+        Args:
+            modality: Modality name
+            features: Feature names to load, in the requested order (default: all)
+            samples: Sample names to load, in the requested order (default: all)
+
+        Returns:
+            Features × samples DataFrame
+        """
+        values = self.values(modality)
+        feature_index = self.features(modality)
+        sample_index = pd.Index(self.samples)
+
+        rows = slice(None)
+        if features is not None:
+            rows = _positions(feature_index, features, f"features of {modality}")
+            feature_index = feature_index[rows]
+        columns = slice(None)
+        if samples is not None:
+            columns = _positions(sample_index, samples, "samples")
+            sample_index = sample_index[columns]
+
+        # Row selection first: only the selected feature rows are paged in
+        block = np.array(values[rows])
+        if samples is not None:
+            block = block[:, columns]
+        return pd.DataFrame(block, index=feature_index, columns=sample_index)
+
+    def iter_chunks(self, modality: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Yield consecutive feature-row chunks of one modality as DataFrames."""
+        values = self.values(modality)
+        feature_index = self.features(modality)
+        columns = pd.Index(self.samples)
+        for start in range(0, len(feature_index), chunk_rows):
+            stop = start + chunk_rows
+            yield pd.DataFrame(np.array(values[start:stop]),
+                               index=feature_index[start:stop], columns=columns)
+
+    def feature_stats(self, modality: str) -> Optional[pd.DataFrame]:
+        """Per-feature statistics recorded at write time, or None if none were stored."""
+        if not self._modality_info(modality).get("has_feature_stats"):
+            return None
+        with np.load(self.path / modality / FEATURE_STATS_FILE) as stats:
+            return pd.DataFrame({name: stats[name] for name in stats.files},
+                                index=self.features(modality))
+
+    def sample_metadata(self) -> Optional[pd.DataFrame]:
+        """Sample metadata table, or None if none was stored."""
+        if not self.manifest.get("has_sample_metadata"):
+            return None
+        return pd.read_json(self.path / SAMPLE_METADATA_FILE, orient="table")
+
+    def _modality_info(self, modality: str) -> Dict[str, Any]:
+        try:
+            return self.manifest["modalities"][modality]
+        except KeyError:
+            raise ValueError(
+                f"Modality {modality} not found. Available: {self.modalities}"
+            ) from None
+
+
+def _write_modality(modality: str, modality_dir: Path, samples: List[str], n_features: int,
+                    chunks: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+    """Stream ``chunks`` into ``modality_dir``; returns the manifest entry."""
+    values = None
+    features: List[str] = []
+    for chunk in chunks:
+        if [str(column) for column in chunk.columns] != samples:
+            raise ValueError(f"Modality {modality} is not aligned to the common samples")
+        block = chunk.to_numpy()
+        if values is None:
+            dtype = block.dtype if block.dtype in (np.float32, np.float64) else np.dtype(np.float64)
+            values = np.lib.format.open_memmap(modality_dir / VALUES_FILE, mode="w+", dtype=dtype,
+                                               shape=(n_features, len(samples)))
+        if len(features) + len(block) > n_features:
+            raise ValueError(f"Modality {modality} has more than the declared {n_features} features")
+        values[len(features):len(features) + len(block)] = block
+        features.extend(str(name) for name in chunk.index)
+    if len(features) != n_features:
+        raise ValueError(f"Modality {modality} has {len(features)} features, expected {n_features}")
+    if values is None:
+        values = np.lib.format.open_memmap(modality_dir / VALUES_FILE, mode="w+", dtype=np.float64,
+                                           shape=(0, len(samples)))
+    values.flush()
+    with open(modality_dir / FEATURES_FILE, "w") as f:
+        json.dump(features, f)
+    return {"shape": [n_features, len(samples)], "dtype": values.dtype.name}
+
+
+def _write_feature_stats(modality: str, modality_dir: Path, stats: pd.DataFrame) -> None:
+    with open(modality_dir / FEATURES_FILE) as f:
+        features = json.load(f)
+    if [str(name) for name in stats.index] != features:
+        raise ValueError(f"Feature statistics of {modality} are not aligned to its features")
+    np.savez(modality_dir / FEATURE_STATS_FILE,
+             **{str(column): stats[column].to_numpy(dtype=np.float64) for column in stats.columns})
+
+
+def _positions(index: pd.Index, names: Sequence[str], what: str) -> np.ndarray:
+    """Positions of ``names`` in ``index``; raises ValueError for unknown names."""
+    positions = index.get_indexer(list(names))
+    if (positions < 0).any():
+        missing = [name for name, pos in zip(names, positions) if pos < 0]
+        raise ValueError(f"Unknown {what}: {missing[:10]}")
+    return positions
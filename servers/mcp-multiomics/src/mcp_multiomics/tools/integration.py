@@ -4,8 +4,6 @@ import logging
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-import pandas as pd
-
 from ..config import config
 from ..validation import (
     ValidationError,
@@ -18,10 +16,12 @@ from .utils import (
     align_samples,
     calculate_qc_metrics,
     filter_missing_features,
-    load_omics_data,
     normalize_zscore,
-    save_integrated_data,
+    to_feature_matrix,
 )
+from .dataset_cache import DatasetCache, configured_cache, dataset_key
+from .feature_selection import frame_statistics
+from .integrated_store import CHUNK_ROWS
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +33,14 @@ def integrate_omics_data_impl(
     metadata_path: Optional[str] = None,
     normalize: bool = True,
     filter_missing: float = 0.5,
+    session_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """Implementation of multi-omics data integration.
 
+    Integrated datasets are cached by content (input file hashes plus
+    parameters), so integrating the same inputs again returns the cached
+    dataset without reloading them.
+
     Args:
         rna_path: Path to RNA expression data
         protein_path: Path to protein abundance data (optional)
@@ -43,12 +48,40 @@ def integrate_omics_data_impl(
         metadata_path: Path to sample metadata (optional)
         normalize: Apply Z-score normalization
         filter_missing: Remove features with >X fraction missing
+        session_id: Session/patient identifier recorded in the dataset index
 
     Returns:
         Dictionary with integration results
     """
     logger.info("Starting multi-omics data integration")
 
+    # =========================================================================
+    # CACHE: Reuse a dataset integrated from the same inputs and parameters
+    # =========================================================================
+
+    inputs = {
+        name: path
+        for name, path in (("rna", rna_path), ("protein", protein_path),
+                           ("phospho", phospho_path), ("metadata", metadata_path))
+        if path
+    }
+    params = {"normalize": normalize, "filter_missing": filter_missing}
+    cache = dataset_cache()
+    try:
+        dataset_id = dataset_key(cache.hash_inputs(inputs), params)
+    except FileNotFoundError:
+        dataset_id = None  # Reported by validation below
+    if dataset_id is not None:
+        store = cache.get(dataset_id, session_id=session_id)
+        if store is not None:
+            logger.info(f"Reusing cached integrated dataset {dataset_id[:12]}")
+            return {
+                **store.manifest["result"],
+                "dataset_id": dataset_id,
+                "cache_path": str(store.path),
+                "cache_hit": True,
+            }
+
     # =========================================================================
     # VALIDATION: Check input files before processing
     # =========================================================================
@@ -121,33 +154,17 @@ def integrate_omics_data_impl(
     logger.info("✅ All input files validated successfully")
 
     # =========================================================================
-    # Load data files
+    # Use the tables parsed during validation (each file is read only once)
     # =========================================================================
 
-    dataframes = {}
-    original_counts = {}
-
-    logger.info(f"Loading RNA data from {rna_path}")
-    dataframes["rna"] = load_omics_data(rna_path)
-    original_counts["rna"] = dataframes["rna"].shape[0]
-
+    dataframes = {"rna": to_feature_matrix(rna_df)}
     if protein_path:
-        logger.info(f"Loading protein data from {protein_path}")
-        dataframes["protein"] = load_omics_data(protein_path)
-        original_counts["protein"] = dataframes["protein"].shape[0]
-
+        dataframes["protein"] = to_feature_matrix(protein_df)
     if phospho_path:
-        logger.info(f"Loading phosphorylation data from {phospho_path}")
-        dataframes["phospho"] = load_omics_data(phospho_path)
-        original_counts["phospho"] = dataframes["phospho"].shape[0]
+        dataframes["phospho"] = to_feature_matrix(phospho_df)
+    original_counts = {modality: df.shape[0] for modality, df in dataframes.items()}
 
-    # Load metadata if provided
-    metadata = None
-    if metadata_path:
-        logger.info(f"Loading metadata from {metadata_path}")
-        metadata = pd.read_csv(metadata_path)
-        if "Sample" in metadata.columns:
-            metadata = metadata.set_index("Sample")
+    metadata = meta_df.set_index("Sample") if metadata_path else None
 
     # Align samples across modalities
     logger.info("Aligning samples across modalities")
@@ -162,11 +179,20 @@ def integrate_omics_data_impl(
             for modality, df in aligned_data.items()
         }
 
-    # Apply normalization
+    # Apply normalization (in place: aligned frames are private copies).
+    # Feature selection ranks on the statistics of the values before z-scoring
+    feature_stats = None
     if normalize:
+        feature_stats = {
+            modality: frame_statistics(
+                (df.iloc[start:start + CHUNK_ROWS] for start in range(0, len(df), CHUNK_ROWS)),
+                include_mad=True,
+            )
+            for modality, df in aligned_data.items()
+        }
         logger.info("Applying Z-score normalization")
         aligned_data = {
-            modality: normalize_zscore(df)
+            modality: normalize_zscore(df, copy=False)
             for modality, df in aligned_data.items()
         }
 
@@ -175,12 +201,6 @@ def integrate_omics_data_impl(
     qc_metrics["normalization"] = "z-score" if normalize else "none"
     qc_metrics["missing_threshold"] = filter_missing
 
-    # Save integrated data to cache
-    cache_path = config.cache_dir / "integrated_data.pkl"
-    config.cache_dir.mkdir(parents=True, exist_ok=True)
-    logger.info(f"Saving integrated data to {cache_path}")
-    save_integrated_data(aligned_data, metadata, str(cache_path))
-
     # Prepare metadata summary
     metadata_summary = None
     if metadata is not None:
@@ -219,9 +239,60 @@ def integrate_omics_data_impl(
         },
         "metadata": metadata_summary,
         "qc_metrics": qc_metrics,
-        "cache_path": str(cache_path),
         "status": "success",
     }
 
+    # Save integrated data to the content-addressed cache
+    if dataset_id is None:
+        dataset_id = dataset_key(cache.hash_inputs(inputs), params)
+    logger.info(f"Saving integrated dataset {dataset_id[:12]} to {cache.root}")
+    store = cache.put(
+        dataset_id,
+        aligned_data,
+        metadata,
+        info={"inputs": inputs, "params": params, "result": result},
+        session_id=session_id,
+        feature_stats=feature_stats,
+    )
+    result.update({"dataset_id": dataset_id, "cache_path": str(store.path), "cache_hit": False})
+
     logger.info("Multi-omics integration complete")
     return result
+
+
+def dataset_cache() -> DatasetCache:
+    """The integrated-dataset cache under the configured cache directory."""
+    return configured_cache()
+
+
+def list_integrated_datasets_impl(session_id: Optional[str] = None) -> Dict[str, Any]:
+    """List cached integrated datasets, most recently used first.
+
+    Args:
+        session_id: Only datasets created or reused by this session
+
+    Returns:
+        Dictionary with datasets (dataset_id, cache_path, modalities, inputs,
+        sessions, size and access times) and total cache size
+    """
+    cache = dataset_cache()
+    datasets = [
+        {
+            "dataset_id": entry["dataset_id"],
+            "cache_path": entry["cache_path"],
+            "modalities": entry["modalities"],
+            "inputs": entry["info"].get("inputs", {}),
+            "params": entry["info"].get("params", {}),
+            "sessions": entry["sessions"],
+            "size_mb": round(entry["size_bytes"] / 1e6, 2),
+            "created_at": entry["created_at"],
+            "last_accessed": entry["last_accessed"],
+        }
+        for entry in cache.list(session_id=session_id)
+    ]
+    return {
+        "datasets": datasets,
+        "total_size_gb": round(cache.total_bytes() / 1e9, 3),
+        "cache_max_gb": config.cache_max_gb,
+        "status": "success",
+    }
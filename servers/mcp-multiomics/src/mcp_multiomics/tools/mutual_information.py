@@ -0,0 +1,330 @@
+"""Normalized mutual information for all-against-all association testing.
+
+Each feature is discretized once into equal-frequency (quantile) bins and
+stored as integer bin codes plus their one-hot encoding. The joint
+histograms of every feature pair in a block are then a single matrix
+product of the one-hot encodings, ``(f1·B × samples) @ (samples × f2·B)``,
+exactly like the correlation path (correlation.py) with B² outputs per pair.
+Missing values have an all-zero one-hot column, so every joint histogram
+counts pairwise-complete samples only.
+
+NMI is ``2·MI / (H(X) + H(Y))`` (arithmetic normalization, as in
+``sklearn.metrics.normalized_mutual_info_score``), using the marginals of the
+pairwise-complete joint histogram.
+
+P-values come from a permutation test that reuses the bin codes: permuting
+one feature's samples keeps both marginal bin counts fixed, so the null
+distribution of MI depends only on the sorted marginal count vectors of the
+pair (its "signature"), not on the features themselves or their bin order.
+With quantile bins almost all features share a handful of signatures, so one
+null distribution of ``n_permutations`` shuffled contingency tables is
+simulated per signature (cached, seeded by the signature) and looked up for
+every pair that has it.
+
+Usage:
+    binned1 = prepare_bins(data1.to_numpy())
+    binned2 = prepare_bins(data2.to_numpy())
+    nmi, p, n = mi_block(binned1.rows(0, 1000), binned2)
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy import special, stats
+
+from .correlation import MIN_SAMPLES
+
+DEFAULT_PERMUTATIONS = 1000
+
+# Upper bound on joint-histogram cells materialized at once (~64 MB per pass)
+MAX_BLOCK_CELLS = 8_000_000
+
+# Null distributions by signature (marginal counts + permutations), per process
+_null_cache: Dict[bytes, np.ndarray] = {}
+_NULL_CACHE_SIZE = 4096
+
+
+def default_n_bins(n_samples: int) -> int:
+    """Bins per feature: round(sqrt(n_samples)), at least 2."""
+    return max(2, int(round(np.sqrt(n_samples))))
+
+
+@dataclass
+class BinnedFeatures:
+    """Features discretized into quantile bins.
+
+    ``codes`` holds the bin index of every sample (-1 = missing) and
+    ``onehot`` its float32 one-hot encoding (features × bins × samples), the
+    operand of the joint-histogram matrix product.
+    """
+    codes: np.ndarray
+    onehot: np.ndarray
+    has_missing: bool = False
+
+    @property
+    def n_features(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def n_samples(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def n_bins(self) -> int:
+        return self.onehot.shape[1]
+
+    def rows(self, start: int, stop: int) -> "BinnedFeatures":
+        """View of a contiguous block of features (no copy)."""
+        return BinnedFeatures(self.codes[start:stop], self.onehot[start:stop], self.has_missing)
+
+
+def prepare_bins(values: np.ndarray, n_bins: Optional[int] = None) -> BinnedFeatures:
+    """Discretize a features × samples matrix into equal-frequency bins.
+
+    Bins are assigned from average ranks over each feature's observed
+    samples, so tied values always share a bin.
+
+    Args:
+        values: Features × samples matrix (NaN = missing)
+        n_bins: Bins per feature (default: round(sqrt(n_samples)))
+
+    Returns:
+        BinnedFeatures ready for :func:`mi_block`
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_features, n_samples = values.shape
+    if n_bins is None:
+        n_bins = default_n_bins(n_samples)
+
+    missing = np.isnan(values)
+    has_missing = bool(missing.any())
+    ranks = stats.rankdata(values, axis=1, nan_policy="omit" if has_missing else "propagate")
+    n_observed = (~missing).sum(axis=1, keepdims=True)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scaled = (ranks - 1.0) * n_bins / n_observed
+    codes = np.where(missing, -1, np.minimum(np.floor(np.nan_to_num(scaled)), n_bins - 1))
+    codes = codes.astype(np.int16)
+
+    onehot = np.zeros((n_features, n_bins, n_samples), dtype=np.float32)
+    feature_idx, sample_idx = np.nonzero(~missing)
+    onehot[feature_idx, codes[feature_idx, sample_idx], sample_idx] = 1.0
+    return BinnedFeatures(codes, onehot, has_missing)
+
+
+def _entropy(counts: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Entropy (nats) of count vectors along the last axis."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.log(n) - special.xlogy(counts, counts).sum(axis=-1) / n
+
+
+def _xlogx_table(n_samples: int) -> np.ndarray:
+    """c·log(c) for every possible integer count 0..n_samples."""
+    counts = np.arange(n_samples + 1, dtype=np.float64)
+    return special.xlogy(counts, counts)
+
+
+def mutual_information_from_counts(joint: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """MI (nats), marginal entropies and sample counts from joint histograms.
+
+    Args:
+        joint: Joint counts with the two bin axes last (..., B1, B2)
+
+    Returns:
+        Tuple of (MI, H(X), H(Y), n) over the leading axes
+    """
+    joint = np.asarray(joint, dtype=np.float64)
+    margin1 = joint.sum(axis=-1)
+    margin2 = joint.sum(axis=-2)
+    n = margin1.sum(axis=-1)
+    h1 = _entropy(margin1, n)
+    h2 = _entropy(margin2, n)
+    h12 = _entropy(joint.reshape(joint.shape[:-2] + (-1,)), n)
+    mi = np.maximum(h1 + h2 - h12, 0.0)
+    return mi, h1, h2, n
+
+
+def _block_statistics(block1: BinnedFeatures, block2: BinnedFeatures):
+    """MI, entropies, counts and (with missing values) pairwise margins of a block.
+
+    The joint histograms come from one float32 matrix product of the one-hot
+    encodings; as exact integer counts, their c·log(c) terms are looked up
+    in a table instead of evaluating logarithms per cell.
+    """
+    f1, b1, s = block1.onehot.shape
+    f2, b2, _ = block2.onehot.shape
+    joint = block1.onehot.reshape(f1 * b1, s) @ block2.onehot.reshape(f2 * b2, s).T
+    counts = np.rint(joint).astype(np.int32).reshape(f1, b1, f2, b2)
+    table = _xlogx_table(s)
+    joint_xlogx = table[counts].sum(axis=(1, 3))
+
+    if not (block1.has_missing or block2.has_missing):
+        # Every pair sees all samples: margins are per-feature bin counts
+        n = np.full((f1, f2), float(s))
+        margin1 = block1.onehot.sum(axis=2).astype(np.int32)
+        margin2 = block2.onehot.sum(axis=2).astype(np.int32)
+        h1 = np.log(s) - table[margin1].sum(axis=1) / s
+        h2 = np.log(s) - table[margin2].sum(axis=1) / s
+        h1, h2 = np.broadcast_to(h1[:, None], n.shape), np.broadcast_to(h2[None, :], n.shape)
+        margins = None
+    else:
+        margin1 = counts.sum(axis=3).transpose(0, 2, 1)  # (f1, f2, b1)
+        margin2 = counts.sum(axis=1)  # (f1, f2, b2)
+        n = margin1.sum(axis=-1).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            h1 = np.log(n) - table[margin1].sum(axis=-1) / n
+            h2 = np.log(n) - table[margin2].sum(axis=-1) / n
+        margins = (margin1, margin2)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        h12 = np.log(n) - joint_xlogx / n
+    mi = np.maximum(h1 + h2 - h12, 0.0)
+    return mi, h1, h2, n, margins
+
+
+def mi_block(
+    block1: BinnedFeatures,
+    block2: BinnedFeatures,
+    n_permutations: int = DEFAULT_PERMUTATIONS,
+    min_samples: int = MIN_SAMPLES,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Normalized MI and permutation p-values for every pair of two blocks.
+
+    Args:
+        block1: Binned features (rows of the first modality)
+        block2: Binned features (rows of the second modality)
+        n_permutations: Shuffles per null distribution; p-values are
+            ``(1 + #null >= observed) / (1 + n_permutations)``
+        min_samples: Pairs with fewer complete samples get NaN results
+
+    Returns:
+        Tuple of (NMI, p-values, complete-sample counts), each of shape
+        (block1.n_features, block2.n_features). Pairs involving a feature
+        that is constant over their complete samples are NaN.
+    """
+    f1, f2 = block1.n_features, block2.n_features
+    nmi = np.full((f1, f2), np.nan)
+    p_values = np.full((f1, f2), np.nan)
+    n_samples = np.zeros((f1, f2), dtype=np.int32)
+
+    # Bound the (rows, B1, f2, B2) joint-count tensor
+    cells_per_row = max(f2 * block1.n_bins * block2.n_bins, 1)
+    step = max(MAX_BLOCK_CELLS // cells_per_row, 1)
+    for start in range(0, f1, step):
+        stop = min(start + step, f1)
+        rows = block1.rows(start, stop)
+        mi, h1, h2, n, margins = _block_statistics(rows, block2)
+
+        defined = (n >= min_samples) & (h1 > 1e-12) & (h2 > 1e-12)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            nmi[start:stop] = np.where(defined, 2.0 * mi / (h1 + h2), np.nan)
+        n_samples[start:stop] = np.rint(n).astype(np.int32)
+        if n_permutations > 0:
+            p_values[start:stop] = _permutation_pvalues(
+                rows, block2, margins, mi, defined, n_permutations,
+            )
+    return np.clip(nmi, 0.0, 1.0, out=nmi), p_values, n_samples
+
+
+def _permutation_pvalues(
+    block1: BinnedFeatures,
+    block2: BinnedFeatures,
+    margins: Optional[Tuple[np.ndarray, np.ndarray]],
+    mi: np.ndarray,
+    defined: np.ndarray,
+    n_permutations: int,
+) -> np.ndarray:
+    """Look up every defined pair's MI in the null of its marginal signature."""
+    p_values = np.full(mi.shape, np.nan)
+    pair_rows, pair_cols = np.nonzero(defined)
+    if margins is not None:
+        # Pairwise-complete margins differ per pair
+        keys = np.concatenate([np.sort(margins[0][pair_rows, pair_cols], axis=1),
+                               np.sort(margins[1][pair_rows, pair_cols], axis=1)], axis=1)
+        signatures, inverse = _unique_rows(keys)
+        split = block1.n_bins
+        groups = [(signature[:split], signature[split:]) for signature in signatures]
+    else:
+        # Margins are per-feature: combine per-modality signatures
+        sig1, inv1 = _unique_rows(np.sort(block1.onehot.sum(axis=2).astype(np.int32), axis=1))
+        sig2, inv2 = _unique_rows(np.sort(block2.onehot.sum(axis=2).astype(np.int32), axis=1))
+        inverse = inv1[pair_rows] * len(sig2) + inv2[pair_cols]
+        groups = [(sig1[g // len(sig2)], sig2[g % len(sig2)]) for g in range(len(sig1) * len(sig2))]
+
+    observed = mi[pair_rows, pair_cols]
+    pair_p = np.empty(len(observed))
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(groups) + 1))
+    for g, (margin1, margin2) in enumerate(groups):
+        members = order[bounds[g]:bounds[g + 1]]
+        if len(members) == 0:
+            continue
+        null = null_distribution(margin1, margin2, n_permutations)
+        # Count null values >= observed (small tolerance for float round-off)
+        n_extreme = len(null) - np.searchsorted(null, observed[members] - 1e-10, side="left")
+        pair_p[members] = (1.0 + n_extreme) / (1.0 + n_permutations)
+    p_values[pair_rows, pair_cols] = pair_p
+    return p_values
+
+
+def _unique_rows(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique rows of an integer matrix and the inverse index.
+
+    Rows are hashed to one int64 so a single 1-D sort finds the groups (far
+    faster than ``np.unique(axis=0)``); a collision check falls back to the
+    exact row-wise unique.
+    """
+    if len(keys) == 0:
+        return keys, np.zeros(0, dtype=np.intp)
+    coefficients = np.random.default_rng(0).integers(1, 2**62, size=keys.shape[1], dtype=np.int64)
+    with np.errstate(over="ignore"):
+        hashes = keys.astype(np.int64) @ coefficients
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    signatures = keys[first]
+    if not (signatures[inverse] == keys).all():
+        signatures, inverse = np.unique(keys, axis=0, return_inverse=True)
+    return signatures, inverse.ravel()
+
+
+def null_distribution(margin1: np.ndarray, margin2: np.ndarray, n_permutations: int) -> np.ndarray:
+    """Sorted permutation null of MI for contingency tables with these margins.
+
+    Args:
+        margin1: Sample count per bin of the first feature
+        margin2: Sample count per bin of the second feature
+        n_permutations: Number of shuffles
+
+    Returns:
+        Sorted array of ``n_permutations`` MI values (nats)
+    """
+    # MI does not depend on bin order: key the cache on sorted margins
+    margin1 = np.sort(np.asarray(margin1, dtype=np.int64))
+    margin2 = np.sort(np.asarray(margin2, dtype=np.int64))
+    key = margin1.tobytes() + b"|" + margin2.tobytes() + b"|" + str(n_permutations).encode()
+    if key in _null_cache:
+        return _null_cache[key]
+
+    b1, b2 = len(margin1), len(margin2)
+    x = np.repeat(np.arange(b1), margin1)
+    y = np.repeat(np.arange(b2), margin2)
+    n = len(x)
+    # Seed from the signature: identical pairs get identical p-values anywhere
+    seed = int.from_bytes(hashlib.sha256(key).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+
+    null = np.empty(n_permutations)
+    batch = max(1, min(n_permutations, MAX_BLOCK_CELLS // max(n, b1 * b2)))
+    for start in range(0, n_permutations, batch):
+        stop = min(start + batch, n_permutations)
+        shuffled = rng.permuted(np.broadcast_to(y, (stop - start, n)), axis=1)
+        cells = (np.arange(stop - start)[:, None] * (b1 * b2) + x * b2 + shuffled).ravel()
+        joint = np.bincount(cells, minlength=(stop - start) * b1 * b2).reshape(-1, b1, b2)
+        null[start:stop] = mutual_information_from_counts(joint)[0]
+    null.sort()
+
+    if len(_null_cache) >= _NULL_CACHE_SIZE:
+        _null_cache.clear()
+    _null_cache[key] = null
+    return null
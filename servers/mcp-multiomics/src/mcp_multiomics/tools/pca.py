@@ -0,0 +1,422 @@
+"""Principal component analysis of integrated multi-omics data.
+
+Samples are the observations and the features of all requested modalities
+are concatenated. Each feature is centered (and optionally scaled to unit
+variance), then each modality block is weighted by 1 / sqrt(its total
+variance) so that every modality contributes equally regardless of its
+number of features (block scaling, as in multiple factor analysis).
+
+Two solvers:
+    gram: Streams feature chunks from the integrated store, accumulating the
+        samples × samples Gram matrix, then takes its eigendecomposition and
+        computes loadings in a second pass. Exact, and memory is bounded by
+        n_samples² plus one chunk, independent of the number of features.
+    randomized: Randomized truncated SVD (Halko et al.) of the standardized
+        matrix held in memory as float32. Used for cohorts too large for an
+        n_samples² Gram matrix.
+
+The fitted projection (feature means, scales, loadings and sample scores) is
+cached under MULTIOMICS_CACHE_DIR/pca, keyed by dataset and parameters, so a
+repeated call or a visualization tool can reuse it without recomputing.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.utils.extmath import randomized_svd
+
+from ..config import config
+from .dataset_cache import record_derived
+from .integrated_store import CHUNK_ROWS
+from .normalization import row_mean_std
+from .feature_selection import select_features
+from .utils import ModalitySource, dataset_signature, write_cache_file
+
+logger = logging.getLogger(__name__)
+
+PCA_METHODS = ("auto", "gram", "randomized")
+
+# Above this many samples "auto" uses randomized SVD instead of the Gram matrix
+GRAM_MAX_SAMPLES = 5000
+
+# Bump to invalidate cached projections
+PROJECTION_VERSION = 2
+
+
+@dataclass
+class PCAProjection:
+    """A fitted multi-omics PCA that can project new samples."""
+
+    features: List[str]              # "modality:feature", in column order
+    blocks: Dict[str, Tuple[int, int]]  # modality -> [start, stop) in features
+    means: np.ndarray                # per feature
+    scales: np.ndarray               # per feature: SD (or 1) × block weight
+    loadings: np.ndarray             # features × components
+    samples: List[str]
+    scores: np.ndarray               # samples × components
+    explained_variance: np.ndarray
+    explained_variance_ratio: np.ndarray
+    method: str                      # solver that fitted it: "gram" or "randomized"
+
+    def transform(self, dataframes: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Scores of new samples (features × samples DataFrames per modality).
+
+        Modalities are matched by sample name, in the sample order of the first
+        modality (samples only in later modalities follow). Features or samples
+        missing from a modality count as average (zero after centering).
+        """
+        samples = pd.Index([])
+        for modality in self.blocks:
+            samples = samples.append(dataframes[modality].columns.difference(samples, sort=False))
+        scores = np.zeros((len(samples), self.loadings.shape[1]))
+        for modality, (start, stop) in self.blocks.items():
+            names = [name.split(":", 1)[1] for name in self.features[start:stop]]
+            values = dataframes[modality].reindex(index=names, columns=samples).to_numpy(dtype=np.float64)
+            z = np.nan_to_num((values - self.means[start:stop, None]) / self.scales[start:stop, None])
+            scores += z.T @ self.loadings[start:stop]
+        return pd.DataFrame(scores, index=samples,
+                            columns=[f"PC{i + 1}" for i in range(self.loadings.shape[1])])
+
+    def save(self, path: Path) -> None:
+        write_cache_file(path, lambda f: np.savez(
+            f,
+            header=np.array(json.dumps({
+                "version": PROJECTION_VERSION,
+                "features": self.features,
+                "blocks": self.blocks,
+                "samples": self.samples,
+                "method": self.method,
+            })),
+            means=self.means, scales=self.scales, loadings=self.loadings, scores=self.scores,
+            explained_variance=self.explained_variance,
+            explained_variance_ratio=self.explained_variance_ratio,
+        ))
+
+    @classmethod
+    def load(cls, path: Path) -> "PCAProjection":
+        with np.load(path) as archive:
+            header = json.loads(str(archive["header"]))
+            if header["version"] != PROJECTION_VERSION:
+                raise ValueError(f"Unsupported PCA projection version in {path}")
+            return cls(
+                features=header["features"],
+                blocks={modality: tuple(bounds) for modality, bounds in header["blocks"].items()},
+                samples=header["samples"],
+                method=header["method"],
+                **{key: archive[key] for key in (
+                    "means", "scales", "loadings", "scores",
+                    "explained_variance", "explained_variance_ratio",
+                )},
+            )
+
+
+def _standardize(values: np.ndarray, scale: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Center (and scale) every feature row; missing values become 0."""
+    mean, std = row_mean_std(values)
+    mean = np.nan_to_num(mean)
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0) if scale else np.ones_like(mean)
+    z = np.nan_to_num((values - mean[:, None]) / std[:, None])
+    return z, mean, std
+
+
+# ----------------------------------------------------------------------
+# Solvers
+# ----------------------------------------------------------------------
+
+def _flip_signs(loadings: np.ndarray, scores: np.ndarray) -> None:
+    """Deterministic signs: the largest |loading| of every component is positive."""
+    largest = np.argmax(np.abs(loadings), axis=0)
+    signs = np.sign(loadings[largest, np.arange(loadings.shape[1])])
+    signs[signs == 0] = 1
+    loadings *= signs
+    scores *= signs
+
+
+def _fit_gram(source: ModalitySource, selection: Dict[str, List[str]], modalities: List[str],
+              n_components: int, scale: bool, chunk_rows: int) -> Dict[str, Any]:
+    n_samples = len(source.samples)
+    grams, totals, stats = {}, {}, {}
+    for modality in modalities:
+        gram = np.zeros((n_samples, n_samples))
+        total = 0.0
+        means, stds = [], []
+        for chunk in source.chunks(modality, chunk_rows, selection.get(modality)):
+            z, mean, std = _standardize(chunk.to_numpy(dtype=np.float64), scale)
+            gram += z.T @ z
+            total += float(np.einsum("fs,fs->", z, z))
+            means.append(mean)
+            stds.append(std)
+        grams[modality], totals[modality] = gram, total
+        stats[modality] = (np.concatenate(means), np.concatenate(stds))
+
+    weights = {m: 1.0 / np.sqrt(totals[m]) if totals[m] > 0 else 1.0 for m in modalities}
+    gram = sum(weights[m] ** 2 * grams[m] for m in modalities)
+    eigenvalues, eigenvectors = np.linalg.eigh(gram)
+    eigenvalues = np.maximum(eigenvalues[::-1][:n_components], 0.0)
+    u = eigenvectors[:, ::-1][:, :n_components]
+    singular = np.sqrt(eigenvalues)
+
+    # Second pass: loadings = Xᵀ U / S
+    loadings = []
+    with np.errstate(invalid="ignore", divide="ignore"):
+        inverse = np.where(singular > 0, 1.0 / singular, 0.0)
+    for modality in modalities:
+        means, stds = stats[modality]
+        start = 0
+        for chunk in source.chunks(modality, chunk_rows, selection.get(modality)):
+            stop = start + len(chunk)
+            z = np.nan_to_num((chunk.to_numpy(dtype=np.float64) - means[start:stop, None])
+                              / stds[start:stop, None])
+            loadings.append(weights[modality] * (z @ u) * inverse)
+            start = stop
+
+    return {
+        "loadings": np.vstack(loadings), "scores": u * singular,
+        "singular": singular, "total": float(np.trace(gram)),
+        "stats": stats, "weights": weights,
+    }
+
+
+def _fit_randomized(source: ModalitySource, selection: Dict[str, List[str]], modalities: List[str],
+                    n_components: int, scale: bool, chunk_rows: int,
+                    random_state: int) -> Dict[str, Any]:
+    blocks, stats, weights = [], {}, {}
+    for modality in modalities:
+        parts, means, stds = [], [], []
+        for chunk in source.chunks(modality, chunk_rows, selection.get(modality)):
+            z, mean, std = _standardize(chunk.to_numpy(dtype=np.float64), scale)
+            parts.append(z.astype(np.float32))
+            means.append(mean)
+            stds.append(std)
+        block = np.vstack(parts)
+        total = float(np.einsum("fs,fs->", block, block, dtype=np.float64))
+        weights[modality] = 1.0 / np.sqrt(total) if total > 0 else 1.0
+        block *= np.float32(weights[modality])
+        blocks.append(block)
+        stats[modality] = (np.concatenate(means), np.concatenate(stds))
+
+    matrix = np.vstack(blocks)  # features × samples
+    u, singular, vt = randomized_svd(matrix, n_components, n_iter=7, random_state=random_state)
+    total = float(np.einsum("fs,fs->", matrix, matrix, dtype=np.float64))
+    return {
+        "loadings": u.astype(np.float64), "scores": vt.T.astype(np.float64) * singular,
+        "singular": singular.astype(np.float64), "total": total,
+        "stats": stats, "weights": weights,
+    }
+
+
+def fit_pca(
+    data_path: str,
+    modalities: Optional[List[str]] = None,
+    n_components: int = 3,
+    scale_features: bool = True,
+    method: str = "auto",
+    chunk_rows: int = CHUNK_ROWS,
+    random_state: int = 0,
+    max_features: Optional[int] = None,
+    feature_selection: str = "variance",
+) -> PCAProjection:
+    """Fit a block-scaled PCA of the requested modalities.
+
+    Args:
+        data_path: Integrated data store (or legacy pickle)
+        modalities: Modalities to include (default: all)
+        n_components: Number of components
+        scale_features: Scale every feature to unit variance before block scaling
+        method: "gram", "randomized" or "auto" (gram up to GRAM_MAX_SAMPLES samples)
+        chunk_rows: Feature rows read per chunk
+        random_state: Seed of the randomized solver
+        max_features: Features kept per modality (default: MULTIOMICS_MAX_FEATURES);
+            larger modalities are prefiltered with ``feature_selection``
+        feature_selection: Prefilter ranking (see feature_selection.py)
+
+    Returns:
+        Fitted projection
+    """
+    if method not in PCA_METHODS:
+        raise ValueError(f"Unknown PCA method '{method}'. Use one of: {', '.join(PCA_METHODS)}")
+    source = ModalitySource(data_path)
+    modalities = modalities or source.modalities
+    missing = [m for m in modalities if m not in source.modalities]
+    if missing:
+        raise ValueError(f"Modalities {', '.join(missing)} not found. Available: {source.modalities}")
+
+    selection = select_features(source, modalities, max_features, feature_selection)
+    n_features = {m: len(selection[m]) if m in selection else source.n_features(m) for m in modalities}
+
+    n_samples = len(source.samples)
+    n_components = max(1, min(n_components, n_samples - 1))
+    if method == "auto":
+        method = "gram" if n_samples <= GRAM_MAX_SAMPLES else "randomized"
+    logger.info(f"PCA ({method}): {n_samples} samples, "
+                f"{sum(n_features.values())} features from {modalities}")
+
+    if method == "gram":
+        fit = _fit_gram(source, selection, modalities, n_components, scale_features, chunk_rows)
+    else:
+        fit = _fit_randomized(source, selection, modalities, n_components, scale_features,
+                              chunk_rows, random_state)
+    _flip_signs(fit["loadings"], fit["scores"])
+
+    features, blocks, means, scales = [], {}, [], []
+    for modality in modalities:
+        mean, std = fit["stats"][modality]
+        names = selection.get(modality, source.features(modality))
+        blocks[modality] = (len(features), len(features) + len(names))
+        features.extend(f"{modality}:{name}" for name in names)
+        means.append(mean)
+        scales.append(std / fit["weights"][modality])
+
+    eigenvalues = fit["singular"] ** 2
+    return PCAProjection(
+        features=features,
+        blocks=blocks,
+        means=np.concatenate(means),
+        scales=np.concatenate(scales),
+        loadings=fit["loadings"].astype(np.float32),
+        samples=[str(s) for s in source.samples],
+        scores=fit["scores"],
+        explained_variance=eigenvalues / max(n_samples - 1, 1),
+        explained_variance_ratio=eigenvalues / fit["total"] if fit["total"] > 0
+        else np.zeros_like(eigenvalues),
+        method=method,
+    )
+
+
+# ----------------------------------------------------------------------
+# Tool implementation
+# ----------------------------------------------------------------------
+
+def projection_cache_path(data_path: str, **params: Any) -> Path:
+    """Cache file of a PCA projection of ``data_path`` with the given parameters."""
+    payload = json.dumps({"version": PROJECTION_VERSION, "data": dataset_signature(data_path),
+                          "params": params}, sort_keys=True, default=str)
+    return config.cache_dir / "pca" / f"{hashlib.sha256(payload.encode()).hexdigest()[:24]}.npz"
+
+
+def _plot_scores(projection: PCAProjection, metadata: Optional[pd.DataFrame], plot_path: Path) -> None:
+    import matplotlib
+    matplotlib.use("Agg")  # Non-interactive backend for server use
+    import matplotlib.pyplot as plt
+
+    scores = projection.scores
+    fig, ax = plt.subplots(figsize=(6, 5))
+    group_column = None
+    if metadata is not None:
+        group_column = next((c for c in ("Response", "Treatment", "Group", "Batch")
+                             if c in metadata.columns), None)
+    y = scores[:, 1] if scores.shape[1] > 1 else np.zeros(len(scores))
+    if group_column:
+        groups = metadata[group_column].reindex(projection.samples)
+        for group in pd.unique(groups.dropna()):
+            mask = (groups == group).to_numpy()
+            ax.scatter(scores[mask, 0], y[mask], label=str(group), s=20)
+        ax.legend(title=group_column, fontsize=8)
+    else:
+        ax.scatter(scores[:, 0], y, s=20)
+    ratio = projection.explained_variance_ratio
+    ax.set_xlabel(f"PC1 ({ratio[0] * 100:.1f}%)")
+    if len(ratio) > 1:
+        ax.set_ylabel(f"PC2 ({ratio[1] * 100:.1f}%)")
+    ax.set_title(f"Multi-omics PCA ({', '.join(projection.blocks)})")
+    fig.tight_layout()
+    plot_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(plot_path, dpi=150)
+    plt.close(fig)
+
+
+def run_multiomics_pca_impl(
+    data_path: str,
+    modalities: Optional[List[str]] = None,
+    n_components: int = 3,
+    scale_features: bool = True,
+    output_path: Optional[str] = None,
+    method: str = "auto",
+    top_features: int = 10,
+    feature_selection: str = "variance",
+) -> Dict[str, Any]:
+    """Run block-scaled PCA on integrated multi-omics data.
+
+    Args:
+        data_path: Path to integrated data (cache_path from integrate_omics_data)
+        modalities: Modalities to include (default: all available)
+        n_components: Number of principal components (default: 3)
+        scale_features: Scale features to unit variance before block scaling
+        output_path: Path of the PC1/PC2 plot (default: next to the cached projection)
+        method: "auto", "gram" (streaming, exact) or "randomized"
+        top_features: Features with the largest |loading| reported per component
+        feature_selection: Ranking used to reduce modalities above
+            MULTIOMICS_MAX_FEATURES (see feature_selection.py)
+
+    Returns:
+        Dictionary with variance explained, top loadings per component,
+        sample coordinates, plot path and the cached projection path
+    """
+    logger.info(f"Running multi-omics PCA on {data_path}")
+    cache_file = projection_cache_path(
+        data_path, modalities=modalities, n_components=n_components,
+        scale_features=scale_features, method=method,
+        max_features=config.max_features, feature_selection=feature_selection,
+    )
+
+    cache_hit = cache_file.is_file()
+    if cache_hit:
+        logger.info(f"Reusing cached PCA projection {cache_file}")
+        projection = PCAProjection.load(cache_file)
+    else:
+        projection = fit_pca(data_path, modalities, n_components, scale_features, method,
+                             feature_selection=feature_selection)
+        projection.save(cache_file)
+        record_derived(data_path, cache_file)
+
+    plot_path = Path(output_path) if output_path else cache_file.with_suffix(".png")
+    if not (cache_hit and plot_path.is_file()):
+        _plot_scores(projection, ModalitySource(data_path).metadata(), plot_path)
+        if not output_path:
+            record_derived(data_path, plot_path)
+
+    components = [f"PC{i + 1}" for i in range(projection.loadings.shape[1])]
+    loadings = {}
+    for i, component in enumerate(components):
+        column = projection.loadings[:, i]
+        top = np.argsort(-np.abs(column), kind="stable")[:top_features]
+        loadings[component] = {
+            "top_features": [
+                {
+                    "modality": projection.features[j].split(":", 1)[0],
+                    "feature": projection.features[j].split(":", 1)[1],
+                    "loading": float(column[j]),
+                }
+                for j in top
+            ],
+            "n_features": len(projection.features),
+        }
+
+    return {
+        "variance_explained": [float(v) for v in projection.explained_variance_ratio],
+        "loadings": loadings,
+        "sample_coordinates": {
+            sample: [float(v) for v in row] for sample, row in zip(projection.samples, projection.scores)
+        },
+        "plot_path": str(plot_path),
+        "projection_path": str(cache_file),
+        "cache_hit": cache_hit,
+        "statistics": {
+            "total_variance": float(projection.explained_variance_ratio.sum()),
+            "n_features": len(projection.features),
+            "n_samples": len(projection.samples),
+            "features_per_modality": {m: stop - start for m, (start, stop) in projection.blocks.items()},
+            "modalities_used": list(projection.blocks),
+            "block_scaling": "1/sqrt(total block variance)",
+            "feature_selection": feature_selection,
+            "max_features": config.max_features,
+            "method": projection.method,
+        },
+        "status": "success",
+    }
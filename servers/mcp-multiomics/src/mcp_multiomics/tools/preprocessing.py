@@ -12,10 +12,11 @@ import numpy as np
 import pandas as pd
 from scipy import stats
 from sklearn.decomposition import PCA
-from sklearn.impute import KNNImputer
 from sklearn.preprocessing import StandardScaler
 
 from ..config import config
+from .imputation import IMPUTERS, impute_modalities
+from .normalization import NORMALIZATION_METHODS, batch_correct, normalize
 
 logger = logging.getLogger(__name__)
 
@@ -291,7 +292,7 @@ def preprocess_multiomics_data_impl(
         metadata_path: Path to metadata with Batch column (required for batch correction)
         normalize_method: "quantile", "median", "tmm", or "zscore"
         batch_correction: Apply batch correction if multiple batches detected
-        imputation_method: "knn", "minimum", "median", or "none"
+        imputation_method: "knn", "minprob", "svd", "minimum", "median", or "none"
         outlier_threshold: Z-score threshold for outlier detection (default: 3.0)
         output_dir: Directory to save preprocessed data (default: cache_dir)
 
@@ -349,6 +350,18 @@ def preprocess_multiomics_data_impl(
             "status": "success (DRY_RUN mode)",
         }
 
+    if normalize_method not in NORMALIZATION_METHODS:
+        raise ValueError(
+            f"Unknown normalize_method '{normalize_method}'. "
+            f"Use one of: {', '.join(NORMALIZATION_METHODS)}"
+        )
+
+    if imputation_method != "none" and imputation_method not in IMPUTERS:
+        raise ValueError(
+            f"Unknown imputation_method '{imputation_method}'. "
+            f"Use one of: {', '.join(IMPUTERS)}, none"
+        )
+
     preprocessing_results = {
         "status": "processing",
         "steps_completed": [],
@@ -396,36 +409,14 @@ def preprocess_multiomics_data_impl(
     if imputation_method != "none":
         logger.info(f"Step 2: Imputing missing values using {imputation_method}...")
 
-        imputation_stats = {}
-        for mod, df in dataframes.items():
-            missing_before = df.isna().sum().sum()
-
-            if imputation_method == "knn":
-                # KNN imputation (good for proteomics)
-                imputer = KNNImputer(n_neighbors=5)
-                df_imputed = pd.DataFrame(
-                    imputer.fit_transform(df.T).T,
-                    index=df.index,
-                    columns=df.columns
-                )
-            elif imputation_method == "minimum":
-                # Minimum value imputation (common for proteomics)
-                min_val = df.min().min() if df.min().min() > 0 else 0.01
-                df_imputed = df.fillna(min_val)
-            elif imputation_method == "median":
-                # Median imputation
-                df_imputed = df.fillna(df.median(axis=1), axis=0)
-
-            missing_after = df_imputed.isna().sum().sum()
-            imputation_stats[mod] = {
-                "missing_before": int(missing_before),
-                "missing_after": int(missing_after),
-                "values_imputed": int(missing_before - missing_after),
-            }
-
-            dataframes[mod] = df_imputed
+        # Chunked backends, modalities imputed in parallel (see imputation.py)
+        dataframes, imputation_report = impute_modalities(
+            dataframes, imputation_method, n_jobs=config.n_jobs
+        )
+        imputation_stats = imputation_report.pop("modalities")
 
         preprocessing_results["qc_metrics"]["imputation"] = imputation_stats
+        preprocessing_results["qc_metrics"]["imputation_performance"] = imputation_report
         preprocessing_results["steps_completed"].append("imputation")
         logger.info(f"Imputation complete: {sum(s['values_imputed'] for s in imputation_stats.values())} values imputed")
 
@@ -440,39 +431,21 @@ def preprocess_multiomics_data_impl(
         if batch_col and metadata[batch_col].nunique() > 1:
             logger.info(f"Step 3: Applying batch correction (detected {metadata[batch_col].nunique()} batches)...")
 
-            # Simple batch correction using z-score per batch
+            # Simple batch correction using z-score per batch, rescaled to the
+            # global feature mean/SD (vectorized over batches, see normalization.py)
             # (In production, would use ComBat or similar)
             batch_stats = {}
             for mod, df in dataframes.items():
-                # Align metadata to samples
-                metadata_aligned = metadata.loc[metadata.index.intersection(df.columns)]
-
-                df_corrected = df.copy()
-                for batch in metadata_aligned[batch_col].unique():
-                    batch_samples = metadata_aligned[metadata_aligned[batch_col] == batch].index
-                    batch_samples = [s for s in batch_samples if s in df.columns]
-
-                    if len(batch_samples) > 1:
-                        # Z-score within batch, then scale to global mean/std
-                        batch_data = df[batch_samples]
-                        global_mean = df.mean(axis=1)
-                        global_std = df.std(axis=1)
-
-                        # Standardize within batch
-                        batch_standardized = (batch_data.T - batch_data.mean(axis=1)) / (batch_data.std(axis=1) + 1e-8)
+                # Batch label of every sample (NaN for samples without metadata)
+                sample_batches = metadata[batch_col].reindex(df.columns)
 
-                        # Scale to global distribution
-                        batch_corrected = (batch_standardized * global_std + global_mean).T
-
-                        df_corrected[batch_samples] = batch_corrected
+                dataframes[mod] = batch_correct(df, sample_batches.to_numpy())
 
                 batch_stats[mod] = {
-                    "batches": int(metadata_aligned[batch_col].nunique()),
+                    "batches": int(sample_batches.nunique()),
                     "method": "z-score_batch_correction",
                 }
 
-                dataframes[mod] = df_corrected
-
             preprocessing_results["qc_metrics"]["batch_correction"] = batch_stats
             preprocessing_results["steps_completed"].append("batch_correction")
             logger.info("Batch correction complete")
@@ -507,33 +480,11 @@ def preprocess_multiomics_data_impl(
     normalization_stats = {}
 
     for mod, df in dataframes.items():
+        # Vectorized, NaN-aware normalization (see normalization.py)
         if normalize_method == "zscore":
-            # Z-score normalization (feature-wise)
-            df_norm = (df.T - df.mean(axis=1)) / (df.std(axis=1) + 1e-8)
-            df_norm = df_norm.T
-        elif normalize_method == "quantile":
-            # Quantile normalization (simplified)
-            df_norm = df.copy()
-            # Sort each column
-            sorted_data = np.sort(df.values, axis=0)
-            # Calculate mean for each rank
-            mean_per_rank = sorted_data.mean(axis=1)
-            # Replace with mean values
-            for col_idx in range(df.shape[1]):
-                rank_order = df.iloc[:, col_idx].argsort().argsort()
-                df_norm.iloc[:, col_idx] = mean_per_rank[rank_order]
-        elif normalize_method == "median":
-            # Median normalization (sample-wise)
-            sample_medians = df.median(axis=0)
-            global_median = sample_medians.median()
-            scale_factors = global_median / sample_medians
-            df_norm = df * scale_factors
-        elif normalize_method == "tmm":
-            # TMM normalization (simplified, for RNA-seq)
-            # In production would use edgeR
-            sample_totals = df.sum(axis=0)
-            scale_factors = sample_totals / sample_totals.median()
-            df_norm = df / scale_factors
+            df_norm = normalize(df, "zscore", eps=1e-8)
+        else:
+            df_norm = normalize(df, normalize_method)
 
         normalization_stats[mod] = {
             "method": normalize_method,
@@ -0,0 +1,385 @@
+"""Sample-wise regulator activity inference (decoupler-style ULM and weighted mean).
+
+Instead of scoring one differential expression list, activity inference
+scores every regulator in every sample of an expression matrix, giving
+per-patient TF or kinase activities for a whole cohort.
+
+Methods (network weights W: regulators × features, expression Y: features × samples):
+    ulm: Univariate linear model per regulator and sample: regress the
+        sample's feature values on the regulator's edge weights (0 for
+        non-targets) and report the slope's t-statistic. All slopes are one
+        sparse product W @ Yc (Yc = Y centered per sample), and the
+        t-statistics follow from the correlation r as r * sqrt(df / (1 - r²)).
+    wmean: Weighted mean of target values, W @ Y / sum(|W|), normalized
+        against a permutation null (z-score of the estimate).
+
+Permutation nulls shuffle feature labels. Rather than permuting the dense
+expression matrix, each permutation relabels the sparse network's column
+indices, and a batch of permuted networks is stacked into one sparse matrix
+so a whole batch costs a single sparse × dense product (in float32, which
+halves its memory traffic; statistics accumulate in float64). Empirical p-values
+are two-sided: (1 + #{|null| >= |observed|}) / (1 + n_permutations).
+"""
+
+import hashlib
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+
+# Import shared multiple-testing utilities
+# In container: /app/shared/utils is in PYTHONPATH
+# In development: Try to add shared/utils to path
+try:
+    from multiple_testing import adjust_pvalues
+except ImportError:
+    # Development mode - add shared/utils to path
+    _shared_utils_path = Path(__file__).resolve().parents[5] / "shared" / "utils"
+    if str(_shared_utils_path) not in sys.path:
+        sys.path.insert(0, str(_shared_utils_path))
+    from multiple_testing import adjust_pvalues
+
+from ..config import config
+from .dataset_cache import record_derived
+from .regulator_network import RegulatorNetwork, read_network
+from .upstream_regulators import BUILTIN_NETWORKS
+from .utils import dataset_signature, load_modalities
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_METHODS = ("ulm", "wmean")
+
+# Bytes of null statistics computed per permutation batch
+BATCH_BYTES = 128 << 20
+
+
+def _center_samples(expression: np.ndarray) -> np.ndarray:
+    """Center every sample across features; missing values become the sample mean (0)."""
+    centered = expression - np.nanmean(expression, axis=0, keepdims=True)
+    return np.nan_to_num(centered, nan=0.0)
+
+
+def _stack_permutations(weights: sparse.csr_matrix, permutations: np.ndarray) -> sparse.csr_matrix:
+    """Vertically stack copies of ``weights`` with permuted feature labels.
+
+    Args:
+        weights: Regulators × features CSR matrix
+        permutations: (batch, n_features) array; row b maps feature j to
+            feature permutations[b, j]
+    """
+    n_batch = len(permutations)
+    n_regulators, n_features = weights.shape
+    indices = np.take_along_axis(
+        permutations, np.broadcast_to(weights.indices, (n_batch, weights.nnz)), axis=1
+    )
+    indptr = (weights.indptr[None, :-1] + weights.nnz * np.arange(n_batch)[:, None]).ravel()
+    indptr = np.append(indptr, weights.nnz * n_batch)
+    data = np.tile(weights.data, n_batch)
+    return sparse.csr_matrix((data, indices.ravel(), indptr), shape=(n_batch * n_regulators, n_features))
+
+
+def _index_dtype(n_features: int) -> np.dtype:
+    return np.dtype(np.int32 if n_features < 2 ** 31 else np.int64)
+
+
+def _permutation_batches(n_permutations: int, n_features: int, batch_size: int, random_state):
+    rng = np.random.default_rng(random_state)
+    labels = np.arange(n_features, dtype=_index_dtype(n_features))
+    for start in range(0, n_permutations, batch_size):
+        size = min(batch_size, n_permutations - start)
+        yield rng.permuted(np.tile(labels, (size, 1)), axis=1)
+
+
+def _batch_size(n_regulators: int, n_samples: int, n_features: int, nnz: int) -> int:
+    """Permutations per batch so that one batch stays within BATCH_BYTES.
+
+    Per permutation: the label permutation (tiled, then permuted: two
+    n_features index arrays), the stacked network's indices, float32 data
+    and row pointers, and the null statistics (float32 product, float64 copy).
+    """
+    index_bytes = _index_dtype(n_features).itemsize
+    per_permutation = (
+        2 * n_features * index_bytes
+        + nnz * (index_bytes + 4)
+        + (n_regulators + 1) * 8
+        + n_regulators * n_samples * (4 + 8)
+    )
+    return max(1, BATCH_BYTES // max(per_permutation, 1))
+
+
+def _ulm_t(cross: np.ndarray, ss_w: np.ndarray, ss_y: np.ndarray, df: int) -> np.ndarray:
+    """ULM slope t-statistics from centered cross products."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cross / np.sqrt(ss_w[:, None] * ss_y[None, :])
+        r = np.clip(r, -1.0, 1.0)
+        t = r * np.sqrt(df / np.maximum(1.0 - r * r, np.finfo(float).tiny))
+    return np.nan_to_num(t, nan=0.0)
+
+
+def ulm(
+    network: RegulatorNetwork,
+    expression: pd.DataFrame,
+    n_permutations: int = 0,
+    random_state: Optional[int] = 0,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Univariate linear model activities.
+
+    Args:
+        network: Network aligned to the expression features (see RegulatorNetwork.align)
+        expression: Features × samples DataFrame
+        n_permutations: Feature-label permutations for empirical p-values
+            (0 = parametric t-distribution p-values)
+        random_state: Seed for the permutations
+
+    Returns:
+        Tuple of (t-statistics, p-values), both regulators × samples
+    """
+    weights = network.matrix.astype(np.float64)
+    y = _center_samples(expression.to_numpy(dtype=np.float64))
+    n_features = y.shape[0]
+    df = n_features - 2
+
+    ss_w = np.asarray(weights.multiply(weights).sum(axis=1)).ravel() - (
+        np.asarray(weights.sum(axis=1)).ravel() ** 2 / n_features
+    )
+    ss_y = np.einsum("fs,fs->s", y, y)
+    t = _ulm_t(weights @ y, ss_w, ss_y, df)
+
+    if n_permutations > 0:
+        exceed = np.zeros_like(t)
+        n_regulators = len(weights.indptr) - 1
+        batch_size = _batch_size(n_regulators, y.shape[1], n_features, weights.nnz)
+        null_weights, null_y = weights.astype(np.float32), y.astype(np.float32)
+        for permutations in _permutation_batches(n_permutations, n_features, batch_size, random_state):
+            stacked = _stack_permutations(null_weights, permutations)
+            null = _ulm_t((stacked @ null_y).astype(np.float64), np.tile(ss_w, len(permutations)), ss_y, df)
+            exceed += (np.abs(null.reshape(len(permutations), n_regulators, -1)) >= np.abs(t)).sum(axis=0)
+        p_values = (exceed + 1) / (n_permutations + 1)
+    else:
+        p_values = 2 * stats.t.sf(np.abs(t), df)
+
+    return _frames(network, expression, t, p_values)
+
+
+def wmean(
+    network: RegulatorNetwork,
+    expression: pd.DataFrame,
+    n_permutations: int = 1000,
+    random_state: Optional[int] = 0,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Weighted-mean activities normalized against a permutation null.
+
+    Args:
+        network: Network aligned to the expression features (see RegulatorNetwork.align)
+        expression: Features × samples DataFrame
+        n_permutations: Feature-label permutations (at least 2)
+        random_state: Seed for the permutations
+
+    Returns:
+        Tuple of (normalized activities, empirical p-values), both regulators × samples
+    """
+    if n_permutations < 2:
+        raise ValueError("wmean needs at least 2 permutations to normalize activities")
+    weights = network.matrix.astype(np.float64)
+    y = np.nan_to_num(expression.to_numpy(dtype=np.float64), nan=0.0)
+    n_features = y.shape[0]
+    n_regulators = len(weights.indptr) - 1
+
+    abs_sum = np.asarray(abs(weights).sum(axis=1)).ravel()
+    abs_sum[abs_sum == 0] = 1.0
+    estimate = (weights @ y) / abs_sum[:, None]
+
+    null_sum = np.zeros_like(estimate)
+    null_sq = np.zeros_like(estimate)
+    exceed = np.zeros_like(estimate)
+    batch_size = _batch_size(n_regulators, y.shape[1], n_features, weights.nnz)
+    null_weights, null_y = weights.astype(np.float32), y.astype(np.float32)
+    for permutations in _permutation_batches(n_permutations, n_features, batch_size, random_state):
+        stacked = _stack_permutations(null_weights, permutations)
+        null = ((stacked @ null_y).astype(np.float64).reshape(len(permutations), n_regulators, -1)
+                / abs_sum[None, :, None])
+        null_sum += null.sum(axis=0)
+        null_sq += (null * null).sum(axis=0)
+        exceed += (np.abs(null) >= np.abs(estimate)).sum(axis=0)
+
+    null_mean = null_sum / n_permutations
+    null_std = np.sqrt(np.maximum(null_sq / n_permutations - null_mean ** 2, 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normalized = np.nan_to_num((estimate - null_mean) / null_std, nan=0.0, posinf=0.0, neginf=0.0)
+    p_values = (exceed + 1) / (n_permutations + 1)
+    return _frames(network, expression, normalized, p_values)
+
+
+def _frames(network, expression, scores, p_values) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    kwargs = {"index": network.regulators, "columns": expression.columns}
+    return pd.DataFrame(scores, **kwargs), pd.DataFrame(p_values, **kwargs)
+
+
+def infer_activities(
+    network: RegulatorNetwork,
+    expression: pd.DataFrame,
+    method: str = "ulm",
+    min_targets: int = 5,
+    **kwargs: Any,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Align a network to an expression matrix and infer activities.
+
+    Args:
+        network: Regulator network (any target order)
+        expression: Features × samples DataFrame
+        method: "ulm" or "wmean"
+        min_targets: Regulators with fewer targets among the features are skipped
+        **kwargs: Passed to the method (n_permutations, random_state)
+
+    Returns:
+        Tuple of (activities, p-values), both regulators × samples
+    """
+    methods = {"ulm": ulm, "wmean": wmean}
+    if method not in methods:
+        raise ValueError(f"Unknown activity method '{method}'. Use one of: {', '.join(ACTIVITY_METHODS)}")
+    aligned = network.align(expression.index, min_targets=min_targets)
+    return methods[method](aligned, expression, **kwargs)
+
+
+def _default_output_dir(data_path: str, network_file: Optional[str], regulator_type: str,
+                        **params: Any) -> Path:
+    """Output directory keyed by dataset identity, network and parameters."""
+    if network_file:
+        stat = Path(network_file).stat()
+        network = {"path": str(Path(network_file).resolve()), "size": stat.st_size,
+                   "mtime_ns": stat.st_mtime_ns}
+    else:
+        network = {"builtin": regulator_type}
+    payload = json.dumps({"data": dataset_signature(data_path), "network": network, "params": params},
+                         sort_keys=True, default=str)
+    return config.cache_dir / "regulator_activity" / hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def infer_regulator_activity_impl(
+    data_path: str,
+    modality: str = "rna",
+    regulator_type: str = "transcription_factor",
+    network_file: Optional[str] = None,
+    method: str = "ulm",
+    n_permutations: Optional[int] = None,
+    min_targets: int = 5,
+    fdr_threshold: float = 0.05,
+    top_k: int = 25,
+    random_state: Optional[int] = 0,
+    output_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Infer per-sample regulator activities from an integrated expression matrix.
+
+    Args:
+        data_path: Path to integrated data (cache_path from integrate_omics_data)
+        modality: Modality holding the regulators' targets ("rna", "protein", "phospho")
+        regulator_type: "transcription_factor", "kinase" or "drug"
+        network_file: Prior-knowledge network file (see regulator_network.py);
+            default: the built-in example table of the regulator type
+        method: "ulm" (univariate linear model t-values) or "wmean"
+            (permutation-normalized weighted mean)
+        n_permutations: Feature-label permutations for empirical p-values
+            (default: 0 for ulm, i.e. parametric p-values; 1000 for wmean)
+        min_targets: Minimum targets among the modality's features per regulator
+        fdr_threshold: FDR threshold for counting significant samples per regulator
+        top_k: Number of regulators summarized in the response (all are written
+            to the output files)
+        random_state: Seed for the permutations
+        output_dir: Directory for the activity and p-value tables (default: a
+            directory under cache_dir/regulator_activity keyed by the dataset,
+            network and parameters, so other datasets never overwrite them)
+
+    Returns:
+        Dictionary with:
+        - regulators: Top regulators by mean |activity| with per-sample summaries
+        - output_files: CSV tables of activities, p-values and BH q-values
+          (regulators × samples)
+        - statistics: Matrix sizes, method and permutation details
+    """
+    logger.info(f"Inferring {regulator_type} activities ({method}) on {modality}")
+
+    if config.dry_run:
+        logger.info("DRY_RUN mode detected - returning mock regulator activity results")
+        return {
+            "regulators": [
+                {"name": "MYC", "mean_activity": 2.4, "samples_active": 9,
+                 "samples_inhibited": 0, "samples_significant": 9},
+                {"name": "TP53", "mean_activity": -1.9, "samples_active": 1,
+                 "samples_inhibited": 8, "samples_significant": 7},
+            ],
+            "output_files": {},
+            "statistics": {"method": method, "regulators_scored": 10, "samples": 15},
+            "status": "success (DRY_RUN mode)",
+        }
+
+    if regulator_type not in BUILTIN_NETWORKS:
+        raise ValueError(f"Unknown regulator type '{regulator_type}'. Use: {', '.join(BUILTIN_NETWORKS)}")
+    if n_permutations is None:
+        n_permutations = 1000 if method == "wmean" else 0
+
+    expression = load_modalities(data_path, [modality])[modality]
+    network = (read_network(network_file) if network_file
+               else RegulatorNetwork.from_dict(BUILTIN_NETWORKS[regulator_type]))
+
+    activities, p_values = infer_activities(
+        network, expression, method, min_targets=min_targets,
+        n_permutations=n_permutations, random_state=random_state,
+    )
+    q_values = pd.DataFrame(
+        adjust_pvalues(p_values.to_numpy().ravel(), method="fdr_bh").reshape(p_values.shape),
+        index=p_values.index, columns=p_values.columns,
+    ) if len(p_values) else p_values
+
+    output_path = Path(output_dir) if output_dir else _default_output_dir(
+        data_path, network_file, regulator_type,
+        min_targets=min_targets, n_permutations=n_permutations, random_state=random_state,
+    )
+    output_path.mkdir(parents=True, exist_ok=True)
+    if not output_dir:
+        record_derived(data_path, output_path)
+    prefix = f"{modality}_{regulator_type}_{method}"
+    output_files = {}
+    for name, table in (("activities", activities), ("p_values", p_values), ("q_values", q_values)):
+        output_files[name] = str(output_path / f"{prefix}_{name}.csv")
+        table.to_csv(output_files[name])
+
+    significant = q_values.to_numpy() <= fdr_threshold
+    values = activities.to_numpy()
+    summary = pd.DataFrame({
+        "mean_activity": values.mean(axis=1) if values.size else [],
+        "samples_active": ((values > 0) & significant).sum(axis=1),
+        "samples_inhibited": ((values < 0) & significant).sum(axis=1),
+        "samples_significant": significant.sum(axis=1),
+    }, index=activities.index)
+    top = summary.reindex(summary["mean_activity"].abs().sort_values(ascending=False).index[:top_k])
+
+    return {
+        "regulators": [
+            {
+                "name": name,
+                "mean_activity": float(row.mean_activity),
+                "samples_active": int(row.samples_active),
+                "samples_inhibited": int(row.samples_inhibited),
+                "samples_significant": int(row.samples_significant),
+            }
+            for name, row in top.iterrows()
+        ],
+        "output_files": output_files,
+        "statistics": {
+            "method": method,
+            "regulators_scored": len(activities),
+            "regulators_in_network": len(network),
+            "features": int(expression.shape[0]),
+            "samples": int(expression.shape[1]),
+            "n_permutations": n_permutations,
+            "p_value_type": "empirical (permutation)" if n_permutations else "parametric (t-distribution)",
+            "fdr_method": "Benjamini-Hochberg over all regulator × sample tests",
+            "fdr_threshold": fdr_threshold,
+        },
+        "status": "success",
+    }
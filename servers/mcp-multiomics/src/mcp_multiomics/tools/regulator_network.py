@@ -0,0 +1,387 @@
+"""Signed regulator-target networks for upstream regulator analysis.
+
+A :class:`RegulatorNetwork` holds prior knowledge as a sparse regulators ×
+targets matrix (CSR). Entries carry the mode of regulation: positive weights
+for activation, negative for repression or inhibition. Networks are built
+from in-memory dicts (the built-in example tables) or ingested from large
+local files:
+
+    TF regulons (DoRothEA / CollecTRI, decoupler layout):
+        source, target, weight or mor, optional confidence (A-E)
+    Kinase-substrate tables (PhosphoSitePlus Kinase_Substrate_Dataset):
+        GENE (or KINASE), SUB_GENE, optional SUB_MOD_RSD, KIN_ORGANISM, SUB_ORGANISM
+    Drug-gene interactions (DGIdb interactions.tsv):
+        drug_name (or drug_claim_name), gene_name, optional interaction_types
+
+Column names are matched case-insensitively; ``.csv``, ``.tsv``/``.txt`` and
+their ``.gz`` variants are read with pandas. Parsed files are memoized per
+process by path, size and modification time.
+
+:func:`score_enrichment` scores every regulator against a differential
+expression list at once: target overlaps, sums and squared sums of signed
+fold changes are sparse matrix-vector products, and the one-sided Fisher
+exact p-values are vectorized hypergeometric tail probabilities.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse, special
+
+logger = logging.getLogger(__name__)
+
+# Approximate number of human protein-coding genes (default enrichment universe)
+DEFAULT_UNIVERSE_SIZE = 20000
+
+# DGIdb interaction types by mode of regulation (others count as activating,
+# like the unsigned built-in tables)
+INHIBITING_INTERACTIONS = {
+    "inhibitor", "antagonist", "blocker", "negative modulator", "inverse agonist",
+    "suppressor", "antibody", "channel blocker", "allosteric inhibitor",
+}
+
+_network_cache: Dict[Tuple, "RegulatorNetwork"] = {}
+
+
+class RegulatorNetwork:
+    """Sparse signed regulators × targets matrix with name indexes."""
+
+    def __init__(self, matrix: sparse.spmatrix, regulators: Sequence[str], targets: Sequence[str]):
+        self.matrix = sparse.csr_matrix(matrix, dtype=np.float32)
+        self.regulators = pd.Index(regulators)
+        self.targets = pd.Index(targets)
+        if self.matrix.shape != (len(self.regulators), len(self.targets)):
+            raise ValueError(
+                f"Matrix shape {self.matrix.shape} does not match "
+                f"{len(self.regulators)} regulators × {len(self.targets)} targets"
+            )
+
+    def __len__(self) -> int:
+        return len(self.regulators)
+
+    @property
+    def n_edges(self) -> int:
+        return self.matrix.nnz
+
+    @classmethod
+    def from_edges(
+        cls,
+        sources: Sequence[str],
+        targets: Sequence[str],
+        weights: Optional[Sequence[float]] = None,
+    ) -> "RegulatorNetwork":
+        """Build a network from an edge list.
+
+        Regulators and targets keep their order of first appearance. Repeated
+        edges (e.g. several phosphosites of one substrate) are averaged.
+
+        Args:
+            sources: Regulator of every edge
+            targets: Target of every edge
+            weights: Signed edge weights (default: 1 = activating)
+        """
+        source_codes, regulator_names = pd.factorize(pd.Series(sources, dtype=object))
+        target_codes, target_names = pd.factorize(pd.Series(targets, dtype=object))
+        if weights is None:
+            weights = np.ones(len(source_codes), dtype=np.float32)
+        weights = np.asarray(weights, dtype=np.float32)
+        shape = (len(regulator_names), len(target_names))
+
+        # COO -> CSR sums duplicates; divide by their count to average
+        summed = sparse.csr_matrix((weights, (source_codes, target_codes)), shape=shape)
+        counts = sparse.csr_matrix(
+            (np.ones(len(weights), dtype=np.float32), (source_codes, target_codes)), shape=shape
+        )
+        summed.data /= counts.data
+        summed.eliminate_zeros()
+        return cls(summed, regulator_names, target_names)
+
+    @classmethod
+    def from_dict(cls, regulator_targets: Dict[str, Sequence[str]]) -> "RegulatorNetwork":
+        """Unsigned network from a regulator -> targets dict."""
+        sources = [regulator for regulator, targets in regulator_targets.items() for _ in targets]
+        targets = [target for targets in regulator_targets.values() for target in targets]
+        return cls.from_edges(sources, targets)
+
+    def subset(self, regulators: Sequence[str]) -> "RegulatorNetwork":
+        """Network restricted to the given regulators (in that order)."""
+        rows = self.regulators.get_indexer(list(regulators))
+        if (rows < 0).any():
+            raise ValueError(f"Unknown regulators: {[r for r, i in zip(regulators, rows) if i < 0][:10]}")
+        return RegulatorNetwork(self.matrix[rows], self.regulators[rows], self.targets)
+
+    def align(self, features: Sequence[str], min_targets: int = 1) -> "RegulatorNetwork":
+        """Network over the given features (as targets, in that order).
+
+        Features without regulators get empty columns, and regulators with
+        fewer than ``min_targets`` targets among the features are dropped.
+        """
+        features = pd.Index(features)
+        positions = self.targets.get_indexer(features)
+        present = np.flatnonzero(positions >= 0)
+        # Column selector: network target column -> feature column
+        selector = sparse.csr_matrix(
+            (np.ones(len(present), dtype=np.float32), (positions[present], present)),
+            shape=(len(self.targets), len(features)),
+        )
+        matrix = (self.matrix @ selector).tocsr()
+        keep = np.flatnonzero(np.diff(matrix.indptr) >= min_targets)
+        return RegulatorNetwork(matrix[keep], self.regulators[keep], features)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Edge list with columns source, target, weight."""
+        coo = self.matrix.tocoo()
+        return pd.DataFrame({
+            "source": self.regulators[coo.row],
+            "target": self.targets[coo.col],
+            "weight": coo.data,
+        })
+
+
+# ----------------------------------------------------------------------
+# File ingestion
+# ----------------------------------------------------------------------
+
+def _read_table(path: Path) -> pd.DataFrame:
+    suffixes = [suffix.lower() for suffix in path.suffixes if suffix.lower() != ".gz"]
+    sep = "\t" if suffixes and suffixes[-1] in (".tsv", ".txt", ".tab") else ","
+    table = pd.read_csv(path, sep=sep, dtype=str, low_memory=False)
+    table.columns = [str(column).strip().lower() for column in table.columns]
+    return table
+
+
+def _numeric(column: pd.Series, default: float = 1.0) -> np.ndarray:
+    return pd.to_numeric(column, errors="coerce").fillna(default).to_numpy(dtype=np.float32)
+
+
+def _regulon_edges(table: pd.DataFrame, min_confidence: Optional[str]) -> pd.DataFrame:
+    """DoRothEA / CollecTRI edges (decoupler layout)."""
+    if min_confidence is not None and "confidence" in table:
+        table = table[table["confidence"].str.upper() <= min_confidence.upper()]
+    weight_column = "weight" if "weight" in table else "mor" if "mor" in table else None
+    weights = _numeric(table[weight_column]) if weight_column else np.ones(len(table), np.float32)
+    return pd.DataFrame({"source": table["source"], "target": table["target"], "weight": weights})
+
+
+def _kinase_substrate_edges(table: pd.DataFrame, organism: Optional[str], site_level: bool) -> pd.DataFrame:
+    """PhosphoSitePlus kinase-substrate edges (phosphorylation counts as activating)."""
+    if organism is not None:
+        for column in ("kin_organism", "sub_organism"):
+            if column in table:
+                table = table[table[column].str.lower() == organism.lower()]
+    source = table["gene"] if "gene" in table else table["kinase"]
+    target = table["sub_gene"]
+    if site_level and "sub_mod_rsd" in table:
+        # Match phospho feature names such as TP53_S15
+        target = target + "_" + table["sub_mod_rsd"]
+    return pd.DataFrame({"source": source, "target": target, "weight": 1.0})
+
+
+def _drug_target_edges(table: pd.DataFrame) -> pd.DataFrame:
+    """DGIdb drug-gene edges, negative for inhibiting interaction types."""
+    source = table["drug_name"] if "drug_name" in table else table["drug_claim_name"]
+    weight = np.ones(len(table), dtype=np.float32)
+    types_column = "interaction_types" if "interaction_types" in table else (
+        "interaction_type" if "interaction_type" in table else None
+    )
+    if types_column:
+        types = table[types_column].fillna("").str.lower().str.split(",")
+        inhibiting = types.map(lambda values: any(v.strip() in INHIBITING_INTERACTIONS for v in values))
+        weight[inhibiting.to_numpy()] = -1.0
+    return pd.DataFrame({"source": source, "target": table["gene_name"], "weight": weight})
+
+
+def read_network(
+    path: str,
+    min_confidence: Optional[str] = None,
+    organism: Optional[str] = "human",
+    site_level: bool = False,
+) -> RegulatorNetwork:
+    """Ingest a regulator network file (layout detected from its columns).
+
+    Args:
+        path: DoRothEA/CollecTRI, PhosphoSitePlus or DGIdb table (see module docstring)
+        min_confidence: Lowest DoRothEA confidence level kept (e.g. "C" keeps A-C)
+        organism: Kinase and substrate organism kept from PhosphoSitePlus (None = all)
+        site_level: Use substrate sites (GENE_S15) as PhosphoSitePlus targets,
+            to score phosphosite features instead of genes
+
+    Returns:
+        Regulator network
+
+    Raises:
+        ValueError: The file's columns match none of the supported layouts
+    """
+    resolved = Path(path).resolve()
+    stat = resolved.stat()
+    key = (str(resolved), stat.st_size, stat.st_mtime_ns, min_confidence, organism, site_level)
+    if key in _network_cache:
+        return _network_cache[key]
+
+    table = _read_table(resolved)
+    columns = set(table.columns)
+    if {"source", "target"} <= columns:
+        edges = _regulon_edges(table, min_confidence)
+    elif "sub_gene" in columns and columns & {"gene", "kinase"}:
+        edges = _kinase_substrate_edges(table, organism, site_level)
+    elif "gene_name" in columns and columns & {"drug_name", "drug_claim_name"}:
+        edges = _drug_target_edges(table)
+    else:
+        raise ValueError(
+            f"Unrecognized regulator network layout in {path}. Expected source/target "
+            f"(DoRothEA, CollecTRI), GENE/SUB_GENE (PhosphoSitePlus) or "
+            f"drug_name/gene_name (DGIdb) columns; found: {sorted(columns)[:20]}"
+        )
+
+    edges = edges.dropna(subset=["source", "target"])
+    network = RegulatorNetwork.from_edges(edges["source"].to_numpy(), edges["target"].to_numpy(),
+                                          edges["weight"].to_numpy())
+    logger.info(f"Loaded {len(network)} regulators, {network.n_edges} edges from {path}")
+    _network_cache[key] = network
+    return network
+
+
+# ----------------------------------------------------------------------
+# Enrichment scoring
+# ----------------------------------------------------------------------
+
+def hypergeom_upper_tail(k: np.ndarray, total: int, successes: np.ndarray, draws: int) -> np.ndarray:
+    """P(X >= k) for X ~ Hypergeometric(total, successes, draws), vectorized.
+
+    Equals the one-sided (greater) Fisher exact test p-value. The tail terms
+    of all regulators are evaluated in one ragged log-space pass (one term
+    per possible overlap above k, so at most the network's edge count)
+    instead of one scipy.stats call per value.
+    """
+    k = np.asarray(k, dtype=np.int64)
+    successes = np.asarray(successes, dtype=np.int64)
+    upper = np.minimum(successes, draws)
+    n_terms = np.maximum(upper - k + 1, 0)
+    p_values = np.zeros(len(k))
+    rows = np.flatnonzero(n_terms > 0)
+    if len(rows) == 0:
+        return p_values
+
+    # Ragged ranges k..upper of every row, flattened
+    counts = n_terms[rows]
+    starts = np.cumsum(counts) - counts
+    owner = np.repeat(np.arange(len(rows)), counts)
+    x = k[rows][owner] + np.arange(counts.sum()) - starts[owner]
+    big_k = successes[rows][owner]
+
+    def log_choose(n, r):
+        return special.gammaln(n + 1) - special.gammaln(r + 1) - special.gammaln(n - r + 1)
+
+    log_pmf = (log_choose(big_k, x) + log_choose(total - big_k, draws - x)
+               - log_choose(total, draws))
+    # Group-wise log-sum-exp
+    peak = np.maximum.reduceat(log_pmf, starts)
+    tail = np.add.reduceat(np.exp(log_pmf - peak[owner]), starts)
+    p_values[rows] = np.minimum(np.exp(peak) * tail, 1.0)
+    return p_values
+
+
+def score_enrichment(
+    network: RegulatorNetwork,
+    log2fc: Dict[str, float],
+    universe_size: Optional[int] = None,
+    min_overlap: int = 2,
+) -> pd.DataFrame:
+    """Enrichment and signed activation z-scores of every regulator.
+
+    For each regulator with at least ``min_overlap`` targets among the
+    differential genes:
+
+    - p_value: One-sided Fisher exact test (hypergeometric upper tail) of its
+      targets among the differential genes, see :func:`hypergeom_upper_tail`
+    - z_score: sqrt(n) × mean / SD of the target fold changes, each multiplied
+      by the sign of its edge (so repressed targets going down count as
+      activation)
+    - targets_consistent: Targets whose signed fold change agrees with z
+
+    Args:
+        network: Regulator network
+        log2fc: Differential gene -> log2 fold change
+        universe_size: Number of genes tested (default: DEFAULT_UNIVERSE_SIZE,
+            raised to the network's targets plus differential genes if larger)
+        min_overlap: Minimum targets among the differential genes
+
+    Returns:
+        DataFrame indexed by regulator, sorted by p-value, with columns
+        p_value, z_score, targets_in_dataset, targets_consistent
+    """
+    genes = pd.Index(list(log2fc))
+    columns = network.targets.get_indexer(genes)
+    hit = columns >= 0
+
+    # DEG indicator and fold-change vectors over the network's targets
+    n_targets = len(network.targets)
+    fc = np.zeros(n_targets)
+    fc[columns[hit]] = np.fromiter((log2fc[gene] for gene in genes[hit]), dtype=np.float64, count=int(hit.sum()))
+    in_deg = np.zeros(n_targets)
+    in_deg[columns[hit]] = 1.0
+
+    signs = network.matrix.sign()
+    membership = abs(signs)
+    positive = signs.maximum(0)
+    negative = (-signs).maximum(0)
+
+    overlap = membership @ in_deg
+    signed_sum = signs @ fc
+    square_sum = membership @ (fc * fc)
+    consistent_up = positive @ (fc > 0) + negative @ (fc < 0)
+
+    set_size = np.diff(network.matrix.indptr)
+    n_deg = len(genes)
+    if universe_size is None:
+        universe_size = max(DEFAULT_UNIVERSE_SIZE, n_targets + int((~hit).sum()))
+
+    keep = np.flatnonzero(overlap >= min_overlap)
+    a = overlap[keep]
+    p_values = hypergeom_upper_tail(a.astype(np.int64), universe_size, set_size[keep], n_deg)
+
+    mean = signed_sum[keep] / a
+    std = np.sqrt(np.maximum(square_sum[keep] / a - mean * mean, 0.0))
+    z_scores = mean / (std + 1e-10) * np.sqrt(a)
+    consistent = np.where(z_scores > 0, consistent_up[keep], a - consistent_up[keep])
+
+    scores = pd.DataFrame({
+        "p_value": p_values,
+        "z_score": z_scores,
+        "targets_in_dataset": a.astype(int),
+        "targets_consistent": consistent.astype(int),
+    }, index=network.regulators[keep])
+    order = np.argsort(p_values, kind="stable")
+    return scores.iloc[order]
+
+
+def load_networks(
+    regulator_types: Sequence[str],
+    defaults: Dict[str, Dict[str, List[str]]],
+    network_files: Optional[Dict[str, str]] = None,
+    **read_kwargs: Any,
+) -> Dict[str, RegulatorNetwork]:
+    """Networks of the requested regulator types: ingested files, else built-in tables.
+
+    Args:
+        regulator_types: Regulator types to load
+        defaults: Regulator type -> built-in regulator -> targets dict
+        network_files: Regulator type -> network file (optional)
+        **read_kwargs: Passed to :func:`read_network`
+    """
+    network_files = network_files or {}
+    unknown = set(network_files) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown regulator types {sorted(unknown)}. Use: {', '.join(defaults)}")
+    return {
+        regulator_type: (
+            read_network(network_files[regulator_type], **read_kwargs)
+            if regulator_type in network_files
+            else RegulatorNetwork.from_dict(defaults[regulator_type])
+        )
+        for regulator_type in regulator_types
+        if regulator_type in defaults
+    }
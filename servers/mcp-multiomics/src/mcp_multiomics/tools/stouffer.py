@@ -28,11 +28,26 @@ Reference: Erik Jessen PhD & Jessie Hohenstein, 2025 bioinformatician review
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
-from scipy import stats
-from statsmodels.stats.multitest import multipletests
+from scipy import special
+
+from .halla_store import SCAN_BATCH_SIZE, AssociationStore
+
+# Import shared multiple-testing utilities
+# In container: /app/shared/utils is in PYTHONPATH
+# In development: Try to add shared/utils to path
+try:
+    from multiple_testing import adjust_pvalues, multipletests
+except ImportError:
+    # Development mode - add shared/utils to path
+    _shared_utils_path = Path(__file__).resolve().parents[5] / "shared" / "utils"
+    if str(_shared_utils_path) not in sys.path:
+        sys.path.insert(0, str(_shared_utils_path))
+    from multiple_testing import adjust_pvalues, multipletests
 
 logger = logging.getLogger(__name__)
 
@@ -63,24 +78,29 @@ class StoufferMetaAnalysis:
     ) -> np.ndarray:
         """Convert p-values to Z-scores (standard normal deviates).
 
+        Works elementwise on arrays of any shape. Missing p-values (NaN) and
+        missing effect sizes give NaN Z-scores. Float32 input stays float32.
+
         Args:
-            p_values: Array of p-values (0 < p < 1)
+            p_values: Array of p-values (0 < p < 1, NaN = missing)
             effect_sizes: Optional effect sizes for directionality
 
         Returns:
             Array of Z-scores
         """
-        # Clip p-values to avoid numerical issues
-        p_values = np.clip(p_values, 1e-300, 1 - 1e-15)
+        p_values = _as_float_array(p_values)
+
+        # Clip p-values to avoid numerical issues (NaN passes through)
+        p_values = np.clip(p_values, np.finfo(p_values.dtype).tiny, 1.0)
 
-        # Convert to two-tailed Z-scores
-        z_scores = stats.norm.ppf(1 - p_values / 2)
+        # Two-tailed Z-scores: Φ^(-1)(1 - p/2) = -Φ^(-1)(p/2), accurate for tiny p
+        z_scores = special.ndtri(p_values / 2)
+        np.negative(z_scores, out=z_scores)
 
         # Apply directionality from effect sizes
         if self.use_directionality and effect_sizes is not None:
-            signs = np.sign(effect_sizes)
             # Negative effect size means Z-score should be negative
-            z_scores = z_scores * signs
+            z_scores *= np.sign(np.asarray(effect_sizes, dtype=z_scores.dtype))
 
         return z_scores
 
@@ -93,42 +113,89 @@ class StoufferMetaAnalysis:
         Returns:
             Array of two-tailed p-values
         """
-        # Two-tailed p-value: p = 2 * (1 - Φ(|Z|))
-        p_values = 2 * (1 - stats.norm.cdf(np.abs(z_scores)))
+        # Two-tailed p-value: p = 2 * (1 - Φ(|Z|)) = 2 * Φ(-|Z|)
+        z_scores = _as_float_array(z_scores)
+        p_values = special.ndtr(-np.abs(z_scores))
+        p_values *= 2
         return p_values
 
     def combine_z_scores(
         self,
         z_scores: np.ndarray,
         weights: Optional[np.ndarray] = None,
-    ) -> float:
+    ) -> Union[float, np.ndarray]:
         """Combine Z-scores using Stouffer's method.
 
         Formula: Z_meta = Σ(w_i * Z_i) / sqrt(Σ(w_i^2))
 
+        Sums run over the observed (non-NaN) modalities only, so a feature
+        missing from some modalities is combined from the remaining ones.
+
         Args:
-            z_scores: Array of Z-scores from different modalities
+            z_scores: Z-scores from different modalities, either one value per
+                modality or a modalities × features matrix
             weights: Optional weights (e.g., sqrt of sample sizes)
 
         Returns:
-            Combined Z-score
+            Combined Z-score (float for 1-D input, array per feature otherwise;
+            NaN where no modality is observed)
         """
+        z_scores = _as_float_array(z_scores)
         if weights is None:
             weights = np.ones(len(z_scores))
 
-        # Stouffer's formula with weights
-        numerator = np.sum(weights * z_scores)
-        denominator = np.sqrt(np.sum(weights ** 2))
+        numerator = np.zeros(z_scores.shape[1:], dtype=z_scores.dtype)
+        weight_sq = np.zeros_like(numerator)
+        for z_row, weight in zip(z_scores, np.asarray(weights, dtype=float)):
+            _accumulate(numerator, weight_sq, z_row, weight)
+        z_meta = _finish_z(numerator, weight_sq)
+
+        return float(z_meta) if z_meta.ndim == 0 else z_meta
+
+    def combine(
+        self,
+        p_values: np.ndarray,
+        effect_sizes: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Vectorized Stouffer combination of a modalities × features matrix.
+
+        One modality row is converted and accumulated at a time, so the
+        temporary memory is a few feature-length vectors regardless of the
+        number of modalities.
+
+        Args:
+            p_values: Modalities × features NOMINAL p-values (NaN = missing);
+                float32 input is combined in float32
+            effect_sizes: Optional modalities × features effect sizes
+            weights: Optional per-modality weights (default: equal)
+
+        Returns:
+            Tuple of (meta Z-scores, meta p-values, observed modality counts)
+        """
+        p_values = _as_float_array(p_values)
+        if weights is None:
+            weights = np.ones(len(p_values))
 
-        z_meta = numerator / denominator
+        numerator = np.zeros(p_values.shape[1:], dtype=p_values.dtype)
+        weight_sq = np.zeros_like(numerator)
+        n_observed = np.zeros(numerator.shape, dtype=np.int32)
+        for row, weight in enumerate(np.asarray(weights, dtype=float)):
+            effects = effect_sizes[row] if effect_sizes is not None else None
+            z_row = self.p_to_z(p_values[row], effects)
+            _accumulate(numerator, weight_sq, z_row, weight)
+            n_observed += ~np.isnan(z_row)
 
-        return z_meta
+        z_meta = _finish_z(numerator, weight_sq)
+        return z_meta, self.z_to_p(z_meta), n_observed
 
     def meta_analyze(
         self,
         p_values_dict: Dict[str, List[float]],
         effect_sizes_dict: Optional[Dict[str, List[float]]] = None,
         weights: Optional[Dict[str, float]] = None,
+        fdr_threshold: float = 0.05,
+        dtype: np.dtype = np.float64,
     ) -> Dict[str, Any]:
         """Perform Stouffer's meta-analysis across omics modalities.
 
@@ -143,16 +210,23 @@ class StoufferMetaAnalysis:
         5. Apply FDR correction (Benjamini-Hochberg) → q-values
         6. Return both meta_p_values (nominal) and q_values (FDR-corrected)
 
+        Features missing in a modality (None or NaN) are combined from the
+        modalities where they were measured. Features missing everywhere get
+        None and are excluded from the FDR correction.
+
         Args:
             p_values_dict: Dict of modality -> list of NOMINAL p-values
             effect_sizes_dict: Dict of modality -> list of effect sizes (for directionality)
             weights: Dict of modality -> weight (default: equal weights)
+            fdr_threshold: q-value threshold for significant_features
+            dtype: Floating-point precision (np.float32 halves memory)
 
         Returns:
             Dictionary with:
             - meta_p_values: Combined p-values (nominal, before FDR)
             - q_values: FDR-corrected p-values (use these for significance)
             - meta_z_scores: Combined Z-scores
+            - n_modalities: Number of modalities observed per feature
             - significant_features: Features passing FDR threshold
         """
         logger.info(f"Starting Stouffer's meta-analysis for {len(p_values_dict)} modalities")
@@ -170,21 +244,18 @@ class StoufferMetaAnalysis:
                     f"expected {n_features}"
                 )
 
+        # Convert to numpy arrays (None -> NaN)
+        p_values_matrix = np.array([p_values_dict[mod] for mod in modalities], dtype=dtype)
+
+        effect_sizes_matrix = None
+        if effect_sizes_dict is not None and self.use_directionality:
+            effect_sizes_matrix = np.array([effect_sizes_dict[mod] for mod in modalities], dtype=dtype)
+
         # VALIDATION: Check if p-values look like they might be FDR-corrected
         # (Warning, not error - user might have legitimate reasons)
-        all_p_values = np.concatenate([np.array(p_values_dict[mod]) for mod in modalities])
-        min_p = np.min(all_p_values)
-
-        if min_p > 0.001:
-            logger.warning(
-                f"WARNING: Minimum p-value is {min_p:.4f}. "
-                "This is unusually high for nominal p-values from association testing. "
-                "Are you sure these are NOMINAL p-values and not already FDR-corrected? "
-                "If these are q-values, DO NOT use Stouffer's method."
-            )
+        _check_nominal(p_values_matrix)
 
         logger.info(f"Processing {n_features} features across {len(modalities)} modalities")
-        logger.info(f"P-value range: {min_p:.2e} to {np.max(all_p_values):.2e}")
 
         # Prepare weights array
         if weights is None:
@@ -192,40 +263,10 @@ class StoufferMetaAnalysis:
         else:
             weights_array = np.array([weights.get(mod, 1.0) for mod in modalities])
 
-        # Convert to numpy arrays
-        p_values_matrix = np.array([p_values_dict[mod] for mod in modalities])
-
-        effect_sizes_matrix = None
-        if effect_sizes_dict is not None and self.use_directionality:
-            effect_sizes_matrix = np.array([effect_sizes_dict[mod] for mod in modalities])
-
-        # Initialize results
-        meta_p_values = []
-        meta_z_scores = []
-
-        # Process each feature
-        for feat_idx in range(n_features):
-            # Get p-values and effect sizes for this feature
-            p_vals = p_values_matrix[:, feat_idx]
-
-            eff_sizes = None
-            if effect_sizes_matrix is not None:
-                eff_sizes = effect_sizes_matrix[:, feat_idx]
-
-            # Convert p-values to Z-scores
-            z_scores = self.p_to_z(p_vals, eff_sizes)
-
-            # Combine Z-scores
-            z_meta = self.combine_z_scores(z_scores, weights_array)
-            meta_z_scores.append(z_meta)
-
-            # Convert back to p-value
-            p_meta = self.z_to_p(np.array([z_meta]))[0]
-            meta_p_values.append(p_meta)
-
-        # Convert to numpy arrays
-        meta_p_values = np.array(meta_p_values)
-        meta_z_scores = np.array(meta_z_scores)
+        # All features at once: one vectorized pass per modality
+        meta_z_scores, meta_p_values, n_observed = self.combine(
+            p_values_matrix, effect_sizes_matrix, weights_array,
+        )
 
         logger.info("=" * 70)
         logger.info("APPLYING FDR CORRECTION (Step 3 of workflow)")
@@ -233,27 +274,185 @@ class StoufferMetaAnalysis:
         logger.info("Method: Benjamini-Hochberg FDR correction")
 
         # Apply FDR correction (THIS IS THE CORRECT TIMING - AFTER COMBINATION)
-        reject, q_values, _, _ = multipletests(
+        # Features without any observation stay NaN and are not counted as tests
+        reject, q_values = multipletests(
             meta_p_values,
             method="fdr_bh",
-            alpha=0.05,
+            alpha=fdr_threshold,
         )
 
         # Identify significant features
-        significant_indices = np.where(reject)[0]
+        significant_indices = np.flatnonzero(reject)
 
-        logger.info(f"Output: {len(significant_indices)} significant features (q < 0.05)")
-        logger.info(f"FDR-corrected q-value range: {np.min(q_values):.2e} to {np.max(q_values):.2e}")
+        logger.info(f"Output: {len(significant_indices)} significant features (q < {fdr_threshold})")
+        if np.isfinite(q_values).any():
+            logger.info(
+                f"FDR-corrected q-value range: {np.nanmin(q_values):.2e} to {np.nanmax(q_values):.2e}"
+            )
         logger.info("=" * 70)
 
         return {
-            "meta_p_values": meta_p_values.tolist(),
-            "meta_z_scores": meta_z_scores.tolist(),
-            "q_values": q_values.tolist(),
+            "meta_p_values": _to_list(meta_p_values),
+            "meta_z_scores": _to_list(meta_z_scores),
+            "q_values": _to_list(q_values),
+            "n_modalities": n_observed.tolist(),
             "significant_features": significant_indices.tolist(),
             "n_significant": len(significant_indices),
         }
 
+    def meta_analyze_stores(
+        self,
+        stores: Dict[str, AssociationStore],
+        weights: Optional[Dict[str, float]] = None,
+        fdr_threshold: float = 0.05,
+        dtype: np.dtype = np.float32,
+        batch_size: int = SCAN_BATCH_SIZE,
+    ) -> Dict[str, Any]:
+        """Stouffer's meta-analysis of feature pairs streamed from HAllA result stores.
+
+        Each store (one HAllA run, e.g. per cohort or per modality pair) is
+        scanned batch by batch from its memory map. Pairs are matched across
+        stores by feature names, and the correlation sign gives the
+        directionality. Only three dense pair matrices (weighted Z sum,
+        weight² sum, observation count) are kept, so memory is independent of
+        the number of stores and records.
+
+        Args:
+            stores: Dict of name -> AssociationStore (each pair stored once)
+            weights: Dict of store name -> weight (default: equal weights)
+            fdr_threshold: q-value threshold for significance
+            dtype: Floating-point precision of the pair matrices
+            batch_size: Records converted per batch
+
+        Returns:
+            Dictionary with features1/features2 names and feature1 ×
+            feature2 matrices meta_z_scores, meta_p_values, q_values
+            (NaN = pair not tested in any store) and n_modalities, plus
+            n_tested and n_significant
+        """
+        names = list(stores)
+        features1 = _union_features([stores[name].features(1) for name in names])
+        features2 = _union_features([stores[name].features(2) for name in names])
+        logger.info(
+            f"Streaming Stouffer's meta-analysis over {len(names)} result stores "
+            f"({len(features1)} × {len(features2)} feature pairs)"
+        )
+
+        numerator = np.zeros(len(features1) * len(features2), dtype=dtype)
+        weight_sq = np.zeros_like(numerator)
+        n_observed = np.zeros(numerator.shape, dtype=np.uint16)
+        min_p = np.inf
+        for name in names:
+            store = stores[name]
+            if not store.metadata.get("complete"):
+                logger.warning(f"HAllA result store {store.path} is incomplete (run did not finish)")
+            weight = float((weights or {}).get(name, 1.0))
+            map1 = _feature_index(store.features(1), features1)
+            map2 = _feature_index(store.features(2), features2)
+
+            for batch in store.iter_batches(batch_size):
+                p_values = batch["p_value"].astype(dtype)
+                z_scores = self.p_to_z(p_values, batch["correlation"])
+                observed = ~np.isnan(z_scores)
+                if not observed.all():
+                    batch, z_scores = batch[observed], z_scores[observed]
+                    p_values = p_values[observed]
+                if len(batch) == 0:
+                    continue
+                min_p = min(min_p, float(p_values.min()))
+
+                pair = map1[batch["feature1"]] * len(features2) + map2[batch["feature2"]]
+                # Pairs are unique within a store, so buffered fancy-index adds are exact
+                z_scores *= weight
+                numerator[pair] += z_scores
+                weight_sq[pair] += weight * weight
+                n_observed[pair] += 1
+
+        _check_nominal(np.array([min_p]))
+
+        # Meta Z in the numerator buffer, meta p in the weight buffer
+        meta_z_scores = _finish_z(numerator, weight_sq, out=numerator)
+        meta_p_values = special.ndtr(-np.abs(meta_z_scores), out=weight_sq)
+        meta_p_values *= 2
+        q_values = adjust_pvalues(meta_p_values, method="fdr_bh")
+
+        n_tested = int(np.count_nonzero(n_observed))
+        n_significant = int(np.count_nonzero(q_values <= fdr_threshold))
+        logger.info(f"Output: {n_significant} of {n_tested} pairs significant (q < {fdr_threshold})")
+
+        shape = (len(features1), len(features2))
+        return {
+            "features1": features1,
+            "features2": features2,
+            "meta_z_scores": meta_z_scores.reshape(shape),
+            "meta_p_values": meta_p_values.reshape(shape),
+            "q_values": q_values.reshape(shape),
+            "n_modalities": n_observed.reshape(shape),
+            "n_tested": n_tested,
+            "n_significant": n_significant,
+        }
+
+
+def _as_float_array(values: Any) -> np.ndarray:
+    """Array view of ``values``, keeping float32/float64 and casting anything else to float64."""
+    values = np.asarray(values)
+    if values.dtype not in (np.float32, np.float64):
+        values = values.astype(np.float64)
+    return values
+
+
+def _accumulate(numerator: np.ndarray, weight_sq: np.ndarray, z_scores: np.ndarray, weight: float) -> None:
+    """Add one modality's weighted Z-scores, skipping missing (NaN) entries."""
+    observed = ~np.isnan(z_scores)
+    np.add(numerator, weight * z_scores, out=numerator, where=observed)
+    np.add(weight_sq, weight * weight, out=weight_sq, where=observed)
+
+
+def _finish_z(numerator: np.ndarray, weight_sq: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Z_meta = Σ(w Z) / sqrt(Σ w²); NaN where nothing was observed. Overwrites ``weight_sq``."""
+    np.sqrt(weight_sq, out=weight_sq)
+    if out is None:
+        out = np.empty_like(numerator)
+    missing = weight_sq == 0
+    np.divide(numerator, weight_sq, out=out, where=~missing)
+    out[missing] = np.nan
+    return out
+
+
+def _check_nominal(p_values: np.ndarray) -> None:
+    """Warn when the smallest p-value suggests FDR-corrected input."""
+    if not np.isfinite(p_values).any():
+        logger.warning("No observed p-values to combine")
+        return
+    min_p = float(np.nanmin(p_values))
+    if min_p > 0.001:
+        logger.warning(
+            f"WARNING: Minimum p-value is {min_p:.4f}. "
+            "This is unusually high for nominal p-values from association testing. "
+            "Are you sure these are NOMINAL p-values and not already FDR-corrected? "
+            "If these are q-values, DO NOT use Stouffer's method."
+        )
+
+
+def _to_list(values: np.ndarray) -> List[Optional[float]]:
+    """Float list for JSON output, with None for NaN."""
+    if not np.isnan(values).any():
+        return values.tolist()
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+
+def _union_features(feature_lists: List[List[str]]) -> List[str]:
+    """Feature names of all stores, first occurrence order."""
+    return list(dict.fromkeys(name for names in feature_lists for name in names))
+
+
+def _feature_index(names: List[str], union: List[str]) -> np.ndarray:
+    """Position of each store feature in the union feature list."""
+    position = {name: i for i, name in enumerate(union)}
+    return np.array([position[name] for name in names], dtype=np.int64)
+
 
 def calculate_stouffer_meta_impl(
     p_values_dict: Dict[str, List[float]],
@@ -305,6 +504,7 @@ def calculate_stouffer_meta_impl(
         p_values_dict=p_values_dict,
         effect_sizes_dict=effect_sizes_dict,
         weights=weights,
+        fdr_threshold=fdr_threshold,
     )
 
     # Get number of features
@@ -318,15 +518,16 @@ def calculate_stouffer_meta_impl(
             "meta_p": float(results["meta_p_values"][idx]),
             "meta_z": float(results["meta_z_scores"][idx]),
             "q_value": float(results["q_values"][idx]),
+            "n_modalities": results["n_modalities"][idx],
             "modality_contributions": {
-                modality: float(p_values_dict[modality][idx])
+                modality: _optional_float(p_values_dict[modality][idx])
                 for modality in p_values_dict.keys()
             },
         }
 
         if effect_sizes_dict is not None:
             feature_info["effect_sizes"] = {
-                modality: float(effect_sizes_dict[modality][idx])
+                modality: _optional_float(effect_sizes_dict[modality][idx])
                 for modality in effect_sizes_dict.keys()
             }
 
@@ -362,3 +563,90 @@ def calculate_stouffer_meta_impl(
     }
 
     return result
+
+
+def calculate_stouffer_meta_from_stores_impl(
+    result_stores: Dict[str, str],
+    weights: Optional[Dict[str, float]] = None,
+    use_directionality: bool = True,
+    fdr_threshold: float = 0.05,
+    top_k: int = 1000,
+) -> Dict[str, Any]:
+    """Stouffer's meta-analysis of HAllA associations read from result stores.
+
+    Same workflow as :func:`calculate_stouffer_meta_impl`, but each "modality"
+    is a HAllA result store (``result_store`` from run_halla_analysis) and the
+    combined features are its feature pairs. NOMINAL pair p-values are
+    streamed from disk, so tens of millions of associations never become
+    Python lists; only the top_k strongest significant pairs are returned.
+
+    Args:
+        result_stores: Dict of name -> HAllA result store directory
+        weights: Dict of name -> weight (default: equal weights)
+        use_directionality: Use the correlation sign for directionality
+        fdr_threshold: FDR threshold for identifying significant pairs
+        top_k: Maximum number of significant pairs to return
+
+    Returns:
+        Dictionary with the strongest significant pairs (meta_p, meta_z,
+        q_value) and summary statistics
+    """
+    analyzer = StoufferMetaAnalysis(use_directionality=use_directionality)
+    stores = {name: AssociationStore(Path(path)) for name, path in result_stores.items()}
+
+    results = analyzer.meta_analyze_stores(
+        stores,
+        weights=weights,
+        fdr_threshold=fdr_threshold,
+    )
+
+    # Strongest significant pairs by meta p-value
+    q_values = results["q_values"].ravel()
+    meta_p_values = results["meta_p_values"].ravel()
+    significant = np.flatnonzero(q_values <= fdr_threshold)
+    if len(significant) > top_k:
+        keep = np.argpartition(meta_p_values[significant], top_k - 1)[:top_k]
+        significant = significant[keep]
+    significant = significant[np.argsort(meta_p_values[significant], kind="stable")]
+
+    features1, features2 = results["features1"], results["features2"]
+    rows, cols = np.divmod(significant, len(features2))
+    meta_z_scores = results["meta_z_scores"].ravel()
+    n_modalities = results["n_modalities"].ravel()
+    significant_pairs = [
+        {
+            "feature1": features1[row],
+            "feature2": features2[col],
+            "meta_p": float(meta_p_values[idx]),
+            "meta_z": float(meta_z_scores[idx]),
+            "q_value": float(q_values[idx]),
+            "n_modalities": int(n_modalities[idx]),
+        }
+        for idx, row, col in zip(significant.tolist(), rows.tolist(), cols.tolist())
+    ]
+
+    return {
+        "significant_pairs": significant_pairs,
+        "statistics": {
+            "total_pairs": results["n_tested"],
+            "significant_pairs": results["n_significant"],
+            "pairs_returned": len(significant_pairs),
+            "fdr_threshold": fdr_threshold,
+            "directionality_used": use_directionality,
+            "weights_used": weights is not None,
+            "result_stores": list(result_stores.keys()),
+            "fdr_method": "Benjamini-Hochberg (applied AFTER combination)",
+        },
+        "p_value_types": {
+            "meta_p": "NOMINAL (combined, before FDR)",
+            "q_value": "FDR-CORRECTED (use these for significance)",
+        },
+        "status": "success",
+    }
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    """float(value), or None for a missing value."""
+    if value is None or np.isnan(value):
+        return None
+    return float(value)
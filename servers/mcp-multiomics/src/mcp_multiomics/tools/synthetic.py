@@ -0,0 +1,398 @@
+"""Seeded synthetic multi-omics cohorts with ground truth, for benchmarking.
+
+Generates RNA, protein and phosphosite matrices (log2 scale, features ×
+samples) from 10 to 1,000 samples and 1,000 to 200,000 features without
+real patient data. Values are built gene by gene from a shared signal, so
+the modalities are correlated the way real data are:
+
+    gene signal   = loading × module factor          (co-expression modules)
+                  + log2 fold change × response      (differential genes)
+    RNA           = mean + signal + batch shift + noise
+    protein       = mean + signal of its gene + batch shift + noise
+    phosphosite   = mean + signal of its parent gene + batch shift + noise
+
+Genes in the same module share one latent sample factor, which gives the
+block structure HAllA looks for; every gene belongs to at most one module or
+is differential between Resistant and Sensitive samples. Values go missing
+more often at low abundance (left-censoring, as in proteomics), at a
+per-modality average rate.
+
+Matrices are generated in blocks of GENERATION_ROWS features, each from its
+own seeded stream, and streamed to disk (integrated store or CSV/TSV files),
+so memory stays bounded by one block at any cohort size and the same seed
+always produces the same data. The ground truth (modules, differential genes,
+feature mappings) is written next to the data; ``true_associations`` expands
+it into the truly associated feature pairs for scoring HAllA, and the
+differential genes score Stouffer's meta-analysis.
+
+Usage:
+    python -m mcp_multiomics.tools.synthetic --samples 200 --genes 20000 \\
+        --proteins 7000 --phospho 5000 --output /tmp/cohort
+"""
+
+import argparse
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from .integrated_store import IntegratedDataStore
+
+logger = logging.getLogger(__name__)
+
+MODALITIES = ("rna", "protein", "phospho")
+
+# Features per generated block (each block has its own random stream)
+GENERATION_ROWS = 1000
+
+GROUND_TRUTH_FILE = "ground_truth.json"
+
+# Ground-truth block of the differential genes (modules are numbered from 0)
+RESPONSE_BLOCK = -2
+
+
+@dataclass
+class SyntheticCohortConfig:
+    """Parameters of a synthetic cohort."""
+
+    n_samples: int = 15
+    n_genes: int = 1000
+    n_proteins: int = 500
+    n_phospho: int = 300
+    seed: int = 42
+    resistant_fraction: float = 0.5
+    module_size: int = 25
+    module_fraction: float = 0.2
+    loading_range: Tuple[float, float] = (0.8, 1.5)
+    differential_fraction: float = 0.05
+    log2_fold_change_range: Tuple[float, float] = (1.0, 2.5)
+    n_batches: int = 3
+    batch_effect_sd: float = 0.3
+    noise_sd: Dict[str, float] = field(
+        default_factory=lambda: {"rna": 0.8, "protein": 1.0, "phospho": 1.2})
+    missing_rate: Dict[str, float] = field(
+        default_factory=lambda: {"rna": 0.0, "protein": 0.1, "phospho": 0.25})
+    dtype: str = "float64"
+
+    def __post_init__(self):
+        if self.n_samples < 4:
+            raise ValueError("n_samples must be at least 4")
+        if self.n_genes < 1:
+            raise ValueError("n_genes must be positive")
+        if not 0 <= self.n_proteins <= self.n_genes:
+            raise ValueError("n_proteins must be between 0 and n_genes (one protein per gene)")
+        if self.n_phospho < 0 or (self.n_phospho and not self.n_proteins):
+            raise ValueError("Phosphosites need proteins to belong to")
+        if self.module_fraction + self.differential_fraction > 1:
+            raise ValueError("module_fraction + differential_fraction must not exceed 1")
+
+
+class SyntheticCohort:
+    """A seeded synthetic multi-omics cohort, generated block by block on demand."""
+
+    def __init__(self, config: Optional[SyntheticCohortConfig] = None, **params: Any):
+        self.config = config or SyntheticCohortConfig(**params)
+        cfg = self.config
+        rng = np.random.default_rng([cfg.seed, 0])
+        n = cfg.n_samples
+
+        # Samples: response groups and batches
+        self.samples = [f"Sample_{i + 1:04d}" for i in range(n)]
+        n_resistant = int(round(n * cfg.resistant_fraction))
+        self.response = np.array(["Resistant"] * n_resistant + ["Sensitive"] * (n - n_resistant))
+        self.batch = rng.permutation(np.arange(n) % cfg.n_batches)
+        self._response_factor = np.where(self.response == "Sensitive", 0.5, -0.5)
+
+        # Genes: modules, differential genes and baseline abundance
+        n_genes = cfg.n_genes
+        self.genes = np.array([f"GENE{i + 1:06d}" for i in range(n_genes)])
+        order = rng.permutation(n_genes)
+        n_modules = int(n_genes * cfg.module_fraction) // cfg.module_size
+        self.module = np.full(n_genes, -1)
+        self.module[order[:n_modules * cfg.module_size]] = np.repeat(np.arange(n_modules), cfg.module_size)
+        self.loading = np.zeros(n_genes)
+        in_module = self.module >= 0
+        self.loading[in_module] = (rng.uniform(*cfg.loading_range, in_module.sum())
+                                   * rng.choice([-1, 1], in_module.sum()))
+        n_differential = int(n_genes * cfg.differential_fraction)
+        differential = order[n_modules * cfg.module_size:][:n_differential]
+        self.log2_fold_change = np.zeros(n_genes)
+        self.log2_fold_change[differential] = (rng.uniform(*cfg.log2_fold_change_range, n_differential)
+                                               * rng.choice([-1, 1], n_differential))
+        self.gene_mean = rng.normal(6.0, 2.0, n_genes)
+        self.factors = rng.standard_normal((n_modules, n))
+
+        # Proteins map to genes, phosphosites to proteins
+        self.protein_gene = np.sort(rng.choice(n_genes, cfg.n_proteins, replace=False))
+        self.site_protein = np.sort(rng.integers(0, max(cfg.n_proteins, 1), cfg.n_phospho))
+        site_rank = np.arange(cfg.n_phospho) - np.searchsorted(self.site_protein, self.site_protein)
+        residues = rng.choice(["S", "T", "Y"], cfg.n_phospho, p=[0.85, 0.13, 0.02])
+        self.sites = np.array([
+            f"{self.genes[self.protein_gene[p]]}_{residue}{17 + 23 * rank}"
+            for p, residue, rank in zip(self.site_protein, residues, site_rank)
+        ], dtype=object)
+        self.feature_mean = {
+            "rna": self.gene_mean,
+            "protein": rng.normal(-0.5, 0.5, cfg.n_proteins) + self.gene_mean[self.protein_gene],
+            "phospho": rng.normal(-1.5, 0.7, cfg.n_phospho)
+                       + self.gene_mean[self.protein_gene[self.site_protein]],
+        }
+
+    # ------------------------------------------------------------------
+    # Features
+    # ------------------------------------------------------------------
+
+    @property
+    def modalities(self) -> List[str]:
+        return [m for m in MODALITIES if self.n_features(m)]
+
+    def n_features(self, modality: str) -> int:
+        return len(self.feature_gene(modality))
+
+    def feature_gene(self, modality: str) -> np.ndarray:
+        """Index of the gene behind each feature of ``modality``."""
+        if modality == "rna":
+            return np.arange(self.config.n_genes)
+        if modality == "protein":
+            return self.protein_gene
+        if modality == "phospho":
+            return self.protein_gene[self.site_protein]
+        raise ValueError(f"Unknown modality '{modality}'. Use one of: {', '.join(MODALITIES)}")
+
+    def feature_names(self, modality: str) -> np.ndarray:
+        if modality == "phospho":
+            return self.sites
+        return self.genes[self.feature_gene(modality)]
+
+    def _total_variance(self, modality: str, genes: np.ndarray) -> np.ndarray:
+        """Variance of each feature across samples (signal + batch + noise)."""
+        cfg = self.config
+        response_var = self._response_factor.var()
+        batch_var = cfg.batch_effect_sd ** 2 * (1 - 1 / cfg.n_batches)
+        return (self.loading[genes] ** 2 + self.log2_fold_change[genes] ** 2 * response_var
+                + batch_var + cfg.noise_sd[modality] ** 2)
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+
+    def iter_chunks(self, modality: str) -> Iterator[pd.DataFrame]:
+        """Features × samples blocks of ``modality`` in feature order."""
+        cfg = self.config
+        genes = self.feature_gene(modality)
+        names = self.feature_names(modality)
+        mean = self.feature_mean[modality]
+        # Left-censoring: low-abundance features go missing more often
+        quantile = norm.cdf(mean, loc=mean.mean(), scale=mean.std() or 1.0) if len(mean) else mean
+        p_missing = np.clip(2 * cfg.missing_rate[modality] * (1 - quantile), 0, 0.95)
+        modality_index = MODALITIES.index(modality) + 1
+
+        for block, start in enumerate(range(0, len(genes), GENERATION_ROWS)):
+            rows = slice(start, min(start + GENERATION_ROWS, len(genes)))
+            rng = np.random.default_rng([cfg.seed, modality_index, block])
+            g = genes[rows]
+            n_rows = len(g)
+
+            values = np.empty((n_rows, cfg.n_samples))
+            in_module = self.module[g] >= 0
+            values[:] = mean[rows, None]
+            values[in_module] += self.loading[g[in_module], None] * self.factors[self.module[g[in_module]]]
+            values += self.log2_fold_change[g, None] * self._response_factor
+            values += rng.normal(0, cfg.batch_effect_sd, (n_rows, cfg.n_batches))[:, self.batch]
+            values += rng.normal(0, cfg.noise_sd[modality], values.shape)
+            values[rng.random(values.shape) < p_missing[rows, None]] = np.nan
+
+            yield pd.DataFrame(values.astype(cfg.dtype, copy=False), index=names[rows],
+                               columns=self.samples)
+
+    def metadata(self) -> pd.DataFrame:
+        """Sample metadata (Sample, Response, Batch)."""
+        return pd.DataFrame({
+            "Sample": self.samples,
+            "Response": self.response,
+            "Batch": self.batch + 1,
+        })
+
+    # ------------------------------------------------------------------
+    # Ground truth
+    # ------------------------------------------------------------------
+
+    def ground_truth(self) -> Dict[str, Any]:
+        """JSON-serializable ground truth of the cohort."""
+        modules = [
+            {"module": int(m), "genes": self.genes[self.module == m].tolist(),
+             "loadings": np.round(self.loading[self.module == m], 6).tolist()}
+            for m in range(len(self.factors))
+        ]
+        differential = np.flatnonzero(self.log2_fold_change)
+        return {
+            "config": asdict(self.config),
+            "samples": self.metadata().to_dict(orient="list"),
+            "modules": modules,
+            "differential": {
+                "genes": self.genes[differential].tolist(),
+                # Sensitive vs Resistant
+                "log2_fold_change": np.round(self.log2_fold_change[differential], 6).tolist(),
+            },
+            "features": {
+                "protein_gene": self.genes[self.protein_gene].tolist(),
+                "phospho_protein": self.genes[self.protein_gene[self.site_protein]].tolist(),
+            },
+        }
+
+    def true_associations(self, modality1: str, modality2: str) -> pd.DataFrame:
+        """Truly associated feature pairs between two modalities.
+
+        Features are associated when their genes share a module, or are both
+        differential (they then covary with response).
+
+        Returns:
+            DataFrame with feature1, feature2, block (module, or -2 for the
+            response block) and expected_correlation
+        """
+        response_sd = self._response_factor.std()
+        parts = []
+        sides = []
+        for modality in (modality1, modality2):
+            genes = self.feature_gene(modality)
+            block = np.where(self.module[genes] >= 0, self.module[genes],
+                             np.where(self.log2_fold_change[genes] != 0, RESPONSE_BLOCK, -1))
+            coefficient = np.where(block == RESPONSE_BLOCK, self.log2_fold_change[genes] * response_sd,
+                                   self.loading[genes])
+            sd = np.sqrt(self._total_variance(modality, genes))
+            sides.append((block, coefficient / sd))
+
+        (block1, scaled1), (block2, scaled2) = sides
+        names1, names2 = self.feature_names(modality1), self.feature_names(modality2)
+        order2 = np.argsort(block2, kind="stable")
+        for b in np.unique(block1[block1 != -1]):
+            i = np.flatnonzero(block1 == b)
+            j = order2[np.searchsorted(block2[order2], b, "left"):np.searchsorted(block2[order2], b, "right")]
+            if not len(j):
+                continue
+            ii, jj = np.repeat(i, len(j)), np.tile(j, len(i))
+            if modality1 == modality2:
+                keep = ii < jj
+                ii, jj = ii[keep], jj[keep]
+            parts.append(pd.DataFrame({
+                "feature1": names1[ii], "feature2": names2[jj], "block": int(b),
+                "expected_correlation": scaled1[ii] * scaled2[jj],
+            }))
+        columns = ["feature1", "feature2", "block", "expected_correlation"]
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def write_store(self, path: Path) -> Path:
+        """Stream the cohort into an integrated-data store (as integrate_omics_data writes)."""
+        metadata = self.metadata().set_index("Sample")
+        IntegratedDataStore.write_chunks(
+            path, self.samples,
+            {m: (self.n_features(m), self.iter_chunks(m)) for m in self.modalities},
+            metadata=metadata,
+            info={"synthetic": {"seed": self.config.seed}},
+        )
+        return Path(path)
+
+    def write_tables(self, directory: Path, sep: str = ",") -> Dict[str, Path]:
+        """Stream the cohort to one CSV/TSV file per modality plus metadata.
+
+        Tables have the layout integrate_omics_data reads: a first column of
+        feature names followed by one column per sample.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = ".tsv" if sep == "\t" else ".csv"
+        index_label = {"rna": "gene_id", "protein": "protein_id", "phospho": "site_id"}
+        paths = {}
+        for modality in self.modalities:
+            path = paths[modality] = directory / f"{modality}{suffix}"
+            with open(path, "w", newline="") as f:
+                for i, chunk in enumerate(self.iter_chunks(modality)):
+                    chunk.to_csv(f, sep=sep, header=i == 0, index_label=index_label[modality],
+                                 float_format="%.4f")
+        paths["metadata"] = directory / f"metadata{suffix}"
+        self.metadata().to_csv(paths["metadata"], sep=sep, index=False)
+        return paths
+
+    def write(self, directory: Path, fmt: str = "store") -> Dict[str, Path]:
+        """Write the cohort and its ground truth to ``directory``.
+
+        Args:
+            directory: Output directory
+            fmt: "store" (integrated-data store in ``directory/integrated``),
+                "csv" or "tsv"
+
+        Returns:
+            Dict of written paths (store or per-modality tables, ground_truth)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if fmt == "store":
+            paths = {"store": self.write_store(directory / "integrated")}
+        elif fmt in ("csv", "tsv"):
+            paths = self.write_tables(directory, sep="\t" if fmt == "tsv" else ",")
+        else:
+            raise ValueError(f"Unknown format '{fmt}'. Use 'store', 'csv' or 'tsv'")
+        paths["ground_truth"] = directory / GROUND_TRUTH_FILE
+        with open(paths["ground_truth"], "w") as f:
+            json.dump(self.ground_truth(), f)
+        logger.info(f"Synthetic cohort ({self.config.n_samples} samples, "
+                    f"{sum(self.n_features(m) for m in self.modalities)} features) written to {directory}")
+        return paths
+
+
+def score_associations(found: pd.DataFrame, truth: pd.DataFrame) -> Dict[str, float]:
+    """Precision and recall of reported feature pairs against the ground truth.
+
+    Args:
+        found: Reported pairs (feature1, feature2 columns), e.g. HAllA associations
+        truth: Output of ``SyntheticCohort.true_associations`` for the same modalities
+
+    Returns:
+        Dictionary with n_found, n_true, true_positives, precision and recall
+    """
+    true_pairs = set(zip(truth["feature1"], truth["feature2"]))
+    found_pairs = set(zip(found["feature1"], found["feature2"]))
+    hits = len(found_pairs & true_pairs)
+    return {
+        "n_found": len(found_pairs),
+        "n_true": len(true_pairs),
+        "true_positives": hits,
+        "precision": hits / len(found_pairs) if found_pairs else float("nan"),
+        "recall": hits / len(true_pairs) if true_pairs else float("nan"),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic multi-omics cohort.")
+    parser.add_argument("--output", type=Path, required=True, help="Output directory")
+    parser.add_argument("--samples", type=int, default=15)
+    parser.add_argument("--genes", type=int, default=1000)
+    parser.add_argument("--proteins", type=int, default=500)
+    parser.add_argument("--phospho", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--format", choices=["store", "csv", "tsv"], default="store")
+    parser.add_argument("--float32", action="store_true", help="Store values as float32")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    cohort = SyntheticCohort(
+        n_samples=args.samples, n_genes=args.genes, n_proteins=args.proteins,
+        n_phospho=args.phospho, seed=args.seed, n_batches=args.batches,
+        dtype="float32" if args.float32 else "float64",
+    )
+    for name, path in cohort.write(args.output, args.format).items():
+        print(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,14 +14,27 @@ open-source databases and enrichment methods.
 """
 
 import logging
+import sys
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from scipy import stats
-from statsmodels.stats.multitest import multipletests
+
+# Import shared multiple-testing utilities
+# In container: /app/shared/utils is in PYTHONPATH
+# In development: Try to add shared/utils to path
+try:
+    from multiple_testing import adjust_pvalues
+except ImportError:
+    # Development mode - add shared/utils to path
+    _shared_utils_path = Path(__file__).resolve().parents[5] / "shared" / "utils"
+    if str(_shared_utils_path) not in sys.path:
+        sys.path.insert(0, str(_shared_utils_path))
+    from multiple_testing import adjust_pvalues
 
 from ..config import config
+from .regulator_network import RegulatorNetwork, load_networks, score_enrichment
 
 logger = logging.getLogger(__name__)
 
@@ -69,12 +82,20 @@ DRUG_TARGETS = {
     "Ibrutinib": ["BTK", "NFKB1", "BCL2", "MYC"],  # BTK inhibitor
 }
 
+BUILTIN_NETWORKS = {
+    "kinase": KINASE_TARGETS,
+    "transcription_factor": TF_TARGETS,
+    "drug": DRUG_TARGETS,
+}
+
 
 def predict_upstream_regulators_impl(
     differential_genes: Dict[str, Dict[str, float]],
     regulator_types: Optional[List[str]] = None,
     fdr_threshold: float = 0.05,
     activation_zscore_threshold: float = 2.0,
+    network_files: Optional[Dict[str, str]] = None,
+    universe_size: Optional[int] = None,
 ) -> Dict[str, Any]:
     """Predict upstream regulators from differential expression data.
 
@@ -97,6 +118,13 @@ def predict_upstream_regulators_impl(
         fdr_threshold: FDR threshold for significant enrichment (default: 0.05)
         activation_zscore_threshold: |Z-score| threshold for activation/inhibition
                                      (default: 2.0, roughly p < 0.05)
+        network_files: Regulator type -> prior-knowledge network file replacing
+                       the built-in example tables, e.g. a CollecTRI/DoRothEA
+                       regulon for "transcription_factor", a PhosphoSitePlus
+                       kinase-substrate table for "kinase", DGIdb interactions
+                       for "drug" (see regulator_network.py for layouts)
+        universe_size: Number of genes tested for the enrichment background
+                       (default: ~20,000 protein-coding genes)
 
     Returns:
         Dictionary with:
@@ -215,7 +243,6 @@ def predict_upstream_regulators_impl(
         regulator_types = ["kinase", "transcription_factor", "drug"]
 
     # Prepare differential gene data
-    deg_genes = set(differential_genes.keys())
     deg_log2fc = {gene: data["log2fc"] for gene, data in differential_genes.items()}
 
     logger.info(f"Analyzing regulator types: {regulator_types}")
@@ -226,41 +253,19 @@ def predict_upstream_regulators_impl(
         "drugs": [],
     }
 
-    # Analyze kinases
-    if "kinase" in regulator_types:
-        logger.info("Analyzing kinase regulators...")
-        kinase_results = _analyze_regulators(
-            KINASE_TARGETS,
-            deg_genes,
-            deg_log2fc,
-            "kinase",
-            activation_zscore_threshold,
-        )
-        results["kinases"] = kinase_results
-
-    # Analyze transcription factors
-    if "transcription_factor" in regulator_types:
-        logger.info("Analyzing transcription factor regulators...")
-        tf_results = _analyze_regulators(
-            TF_TARGETS,
-            deg_genes,
-            deg_log2fc,
-            "transcription_factor",
-            activation_zscore_threshold,
-        )
-        results["transcription_factors"] = tf_results
-
-    # Analyze drug responses
-    if "drug" in regulator_types:
-        logger.info("Analyzing drug response predictions...")
-        drug_results = _analyze_regulators(
-            DRUG_TARGETS,
-            deg_genes,
+    # Regulator networks: ingested prior-knowledge files or the built-in tables
+    networks = load_networks(regulator_types, BUILTIN_NETWORKS, network_files=network_files)
+    result_keys = {"kinase": "kinases", "transcription_factor": "transcription_factors", "drug": "drugs"}
+
+    for regulator_type, network in networks.items():
+        logger.info(f"Analyzing {regulator_type} regulators ({len(network)} in network)...")
+        results[result_keys[regulator_type]] = _analyze_regulators(
+            network,
             deg_log2fc,
-            "drug",
+            regulator_type,
             activation_zscore_threshold,
+            universe_size=universe_size,
         )
-        results["drugs"] = drug_results
 
     # Apply FDR correction across all regulators
     all_p_values = []
@@ -272,7 +277,7 @@ def predict_upstream_regulators_impl(
             all_regulators.append((reg_type, reg))
 
     if len(all_p_values) > 0:
-        _, q_values, _, _ = multipletests(all_p_values, method="fdr_bh")
+        q_values = adjust_pvalues(np.asarray(all_p_values), method="fdr_bh")
 
         # Update q-values in results
         idx = 0
@@ -291,9 +296,9 @@ def predict_upstream_regulators_impl(
     # Generate statistics
     results["statistics"] = {
         "total_genes_analyzed": len(differential_genes),
-        "kinases_tested": len(KINASE_TARGETS),
-        "tfs_tested": len(TF_TARGETS),
-        "drugs_tested": len(DRUG_TARGETS),
+        "kinases_tested": len(networks["kinase"]) if "kinase" in networks else 0,
+        "tfs_tested": len(networks["transcription_factor"]) if "transcription_factor" in networks else 0,
+        "drugs_tested": len(networks["drug"]) if "drug" in networks else 0,
         "significant_kinases": len(results["kinases"]),
         "significant_tfs": len(results["transcription_factors"]),
         "significant_drugs": len(results["drugs"]),
@@ -336,92 +341,54 @@ def predict_upstream_regulators_impl(
 
 
 def _analyze_regulators(
-    regulator_db: Dict[str, List[str]],
-    deg_genes: set,
+    network: RegulatorNetwork,
     deg_log2fc: Dict[str, float],
     regulator_type: str,
     zscore_threshold: float,
+    universe_size: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """Analyze regulators using enrichment and activation scoring.
 
     Args:
-        regulator_db: Dict of regulator -> list of targets
-        deg_genes: Set of differential genes
-        deg_log2fc: Dict of gene -> log2 fold change
+        network: Regulator-target network (see regulator_network.py)
+        deg_log2fc: Dict of differential gene -> log2 fold change
         regulator_type: "kinase", "transcription_factor", or "drug"
         zscore_threshold: Threshold for significant activation/inhibition
+        universe_size: Number of genes tested (default: ~20,000 protein-coding genes)
 
     Returns:
-        List of regulator predictions with statistics
+        List of regulator predictions with statistics, sorted by p-value
     """
-    results = []
-
-    total_genes_in_universe = 20000  # Approximate human protein-coding genes
-
-    for regulator, targets in regulator_db.items():
-        # Count overlapping targets
-        targets_set = set(targets)
-        overlap = targets_set & deg_genes
-
-        if len(overlap) < 2:
-            # Need at least 2 targets for meaningful analysis
-            continue
-
-        # Fisher's exact test for enrichment
-        # 2x2 contingency table:
-        # | In DEG | Not in DEG |
-        # |--------|------------|
-        # | a      | b          | <- Regulator targets
-        # | c      | d          | <- Not regulator targets
-
-        a = len(overlap)  # Targets in DEG
-        b = len(targets_set) - a  # Targets not in DEG
-        c = len(deg_genes) - a  # DEG not targets
-        d = total_genes_in_universe - a - b - c  # Neither
-
-        _, p_value = stats.fisher_exact([[a, b], [c, d]], alternative="greater")
-
-        # Calculate activation Z-score
-        # Positive if targets are upregulated, negative if downregulated
-        target_fc = [deg_log2fc[gene] for gene in overlap if gene in deg_log2fc]
-
-        if len(target_fc) > 0:
-            z_score = np.mean(target_fc) / (np.std(target_fc) + 1e-10) * np.sqrt(len(target_fc))
-        else:
-            z_score = 0.0
+    # Fisher's exact test and activation Z-score for every regulator at once;
+    # regulators need at least 2 targets in the DEGs for meaningful analysis
+    scores = score_enrichment(network, deg_log2fc, universe_size=universe_size, min_overlap=2)
 
+    results = []
+    for regulator, p_value, z_score, n_targets, n_consistent in zip(
+        scores.index, scores["p_value"], scores["z_score"],
+        scores["targets_in_dataset"], scores["targets_consistent"],
+    ):
         # Determine activation state
         if abs(z_score) >= zscore_threshold:
-            if z_score > 0:
-                activation_state = "Activated"
-            else:
-                activation_state = "Inhibited"
+            activation_state = "Activated" if z_score > 0 else "Inhibited"
         else:
             activation_state = "Ambiguous"
 
-        # Calculate consistency (how many targets change in expected direction)
         if regulator_type == "drug":
             # For drugs, negative Z-score means drug would inhibit the pathway
             prediction = "Inhibits pathway" if z_score < 0 else "Mimics pathway"
         else:
             prediction = None
 
-        targets_consistent = sum(1 for fc in target_fc if (fc > 0) == (z_score > 0))
-
-        result = {
+        results.append({
             "name": regulator,
             "activation_state": activation_state if regulator_type != "drug" else None,
-            "prediction": prediction if regulator_type == "drug" else None,
+            "prediction": prediction,
             "z_score": float(z_score),
             "p_value": float(p_value),
             "q_value": None,  # Will be filled in after FDR correction
-            "targets_in_dataset": len(overlap),
-            "targets_consistent": int(targets_consistent),
-        }
-
-        results.append(result)
-
-    # Sort by p-value
-    results.sort(key=lambda x: x["p_value"])
+            "targets_in_dataset": int(n_targets),
+            "targets_consistent": int(n_consistent),
+        })
 
     return results
@@ -1,12 +1,20 @@
 """Utility functions for multi-omics analysis."""
 
+import logging
+import os
+import tempfile
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from scipy import stats
 
+from . import normalization
+from .integrated_store import CHUNK_ROWS, IntegratedDataStore, is_integrated_store
+
+logger = logging.getLogger(__name__)
+
 
 def load_omics_data(file_path: str) -> pd.DataFrame:
     """Load omics data from CSV or TSV file.
@@ -30,6 +38,23 @@ def load_omics_data(file_path: str) -> pd.DataFrame:
     return df
 
 
+def to_feature_matrix(table: pd.DataFrame) -> pd.DataFrame:
+    """Use the first column of a parsed table (see validation.read_table) as the feature index.
+
+    Gives the same frame as :func:`load_omics_data` without reading the file again.
+
+    Args:
+        table: Parsed file with feature IDs in its first column
+
+    Returns:
+        DataFrame with features as rows, samples as columns
+    """
+    matrix = table.set_index(table.columns[0])
+    if str(matrix.index.name).startswith("Unnamed: "):
+        matrix.index.name = None  # Blank header cell, as with index_col=0
+    return matrix
+
+
 def align_samples(
     dataframes: Dict[str, pd.DataFrame]
 ) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
@@ -68,28 +93,27 @@ def filter_missing_features(
     Returns:
         Filtered DataFrame
     """
-    missing_fraction = df.isna().sum(axis=1) / df.shape[1]
-    keep_features = missing_fraction <= threshold
+    keep_features = normalization.missing_fraction(df) <= threshold
     return df[keep_features]
 
 
-def normalize_zscore(df: pd.DataFrame) -> pd.DataFrame:
+def normalize_zscore(
+    df: pd.DataFrame, dtype=None, copy: bool = True
+) -> pd.DataFrame:
     """Apply Z-score normalization across samples for each feature.
 
+    Uses the sample standard deviation (ddof=1); constant features are left
+    unchanged. See :func:`normalization.zscore`.
+
     Args:
         df: DataFrame with features as rows, samples as columns
+        dtype: Output dtype (e.g. np.float32 to halve memory)
+        copy: If False, normalize in place (``df`` must not be used again)
 
     Returns:
         Normalized DataFrame
     """
-    # Calculate Z-scores for each row (feature)
-    # Use ddof=1 for sample standard deviation
-    normalized = df.apply(
-        lambda row: (row - row.mean()) / row.std(ddof=1) if row.std() > 0 else row,
-        axis=1,
-    )
-
-    return normalized
+    return normalization.zscore(df, ddof=1, dtype=dtype, copy=copy)
 
 
 def calculate_qc_metrics(
@@ -128,36 +152,180 @@ def save_integrated_data(
     metadata: Optional[pd.DataFrame],
     output_path: str,
 ) -> None:
-    """Save integrated multi-omics data to pickle file.
+    """Save integrated multi-omics data to a memory-mapped store directory.
+
+    See :mod:`integrated_store` for the layout.
 
     Args:
         dataframes: Dict of modality -> DataFrame
         metadata: Sample metadata DataFrame
-        output_path: Output file path
+        output_path: Output store directory
     """
-    data_package = {
-        "omics_data": dataframes,
-        "metadata": metadata,
-    }
-
-    import pickle
-
-    with open(output_path, "wb") as f:
-        pickle.dump(data_package, f)
+    IntegratedDataStore.write(Path(output_path), dataframes, metadata)
 
 
 def load_integrated_data(file_path: str) -> Tuple[Dict[str, pd.DataFrame], Optional[pd.DataFrame]]:
-    """Load integrated multi-omics data from pickle file.
+    """Load all integrated multi-omics data.
+
+    Prefer :func:`load_modalities` when only some modalities are needed.
 
     Args:
-        file_path: Path to integrated data file
+        file_path: Path to an integrated data store (or legacy pickle file)
 
     Returns:
         Tuple of (omics_dataframes, metadata)
     """
+    path = Path(file_path)
+    if is_integrated_store(path):
+        store = IntegratedDataStore(path)
+        return {modality: store.load(modality) for modality in store.modalities}, store.sample_metadata()
+    return _load_legacy_pickle(path)
+
+
+def load_modalities(
+    data_path: str,
+    modalities: List[str],
+    features: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Load only the requested modalities (and optionally features) of an integrated dataset.
+
+    From a store, only the requested modality files are read, and with
+    ``features`` only the pages holding those rows. Legacy pickle files are
+    still accepted but are read in full.
+
+    Args:
+        data_path: Path to an integrated data store (or legacy pickle file)
+        modalities: Modalities to load
+        features: Optional dict of modality -> feature names to load
+
+    Returns:
+        Dict of modality -> features × samples DataFrame
+
+    Raises:
+        FileNotFoundError: No integrated data at ``data_path``
+        ValueError: A requested modality is not in the dataset
+    """
+    path = Path(data_path)
+    features = features or {}
+    if is_integrated_store(path):
+        store = IntegratedDataStore(path)
+        _check_modalities(modalities, store.modalities)
+        return {modality: store.load(modality, features.get(modality)) for modality in modalities}
+
+    omics_data, _ = _load_legacy_pickle(path)
+    _check_modalities(modalities, list(omics_data))
+    return {
+        modality: omics_data[modality].loc[features[modality]] if modality in features
+        else omics_data[modality]
+        for modality in modalities
+    }
+
+
+class ModalitySource:
+    """Feature-chunked access to the modalities of an integrated dataset.
+
+    Stores are read chunk by chunk from their memory-mapped matrices; legacy
+    pickle files are read in full once.
+    """
+
+    def __init__(self, data_path: str):
+        self.data_path = data_path
+        path = Path(data_path)
+        if is_integrated_store(path):
+            self.store = IntegratedDataStore(path)
+            self.dataframes, self._metadata = None, None
+            self.modalities = self.store.modalities
+            self.samples = list(self.store.samples)
+        else:
+            self.store = None
+            self.dataframes, self._metadata = _load_legacy_pickle(path)
+            self.modalities = list(self.dataframes)
+            self.samples = list(next(iter(self.dataframes.values())).columns)
+
+    def features(self, modality: str) -> pd.Index:
+        if self.store is not None:
+            return self.store.features(modality)
+        return self.dataframes[modality].index
+
+    def n_features(self, modality: str) -> int:
+        if self.store is not None:
+            return self.store.shape(modality)[0]
+        return len(self.dataframes[modality])
+
+    def chunks(self, modality: str, chunk_rows: int = CHUNK_ROWS,
+               features: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yield consecutive features × samples blocks of one modality (or of ``features``)."""
+        if features is not None:
+            for start in range(0, len(features), chunk_rows):
+                yield self.load(modality, list(features[start:start + chunk_rows]))
+        elif self.store is not None:
+            yield from self.store.iter_chunks(modality, chunk_rows)
+        else:
+            df = self.dataframes[modality][self.samples]
+            for start in range(0, len(df), chunk_rows):
+                yield df.iloc[start:start + chunk_rows]
+
+    def load(self, modality: str, features: Optional[List[str]] = None) -> pd.DataFrame:
+        if self.store is not None:
+            return self.store.load(modality, features)
+        df = self.dataframes[modality][self.samples]
+        return df.loc[features] if features is not None else df
+
+    def metadata(self) -> Optional[pd.DataFrame]:
+        if self.store is not None:
+            return self.store.sample_metadata()
+        return self._metadata
+
+
+def dataset_signature(data_path: str) -> Dict[str, Any]:
+    """Identity of an integrated dataset (path, size, mtime) for derived-result cache keys."""
+    path = Path(data_path).resolve()
+    manifest = path / "manifest.json" if path.is_dir() else path
+    stat = manifest.stat()
+    return {"path": str(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_cache_file(path: Path, write: Callable[[BinaryIO], None]) -> None:
+    """Publish a derived-result cache file atomically.
+
+    ``write`` fills a unique temporary file next to ``path`` that is then
+    renamed into place, so concurrent writers never share a staging file and
+    readers never see a partial one. Writers of one cache key produce the same
+    content, so a file another writer published first is kept.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        if not path.exists():
+            os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def _check_modalities(requested: List[str], available: List[str]) -> None:
+    missing = [modality for modality in requested if modality not in available]
+    if missing:
+        raise ValueError(
+            f"Modalities {', '.join(missing)} not found. Available: {available}"
+        )
+
+
+def _load_legacy_pickle(path: Path) -> Tuple[Dict[str, pd.DataFrame], Optional[pd.DataFrame]]:
+    """Read a pre-store pickle: {"omics_data": ..., "metadata": ...} or a plain modality dict."""
+    if not path.is_file():
+        raise FileNotFoundError(
+            f"Integrated data not found at {path}. Run integrate_omics_data first."
+        )
+    logger.warning(f"Loading legacy pickle {path}; re-run integrate_omics_data to create a store")
+
     import pickle
 
-    with open(file_path, "rb") as f:
+    with open(path, "rb") as f:
         data_package = pickle.load(f)
 
-    return data_package["omics_data"], data_package.get("metadata")
+    if "omics_data" in data_package:
+        return data_package["omics_data"], data_package.get("metadata")
+    return data_package, None
@@ -4,6 +4,9 @@ import pandas as pd
 from pathlib import Path
 from typing import Tuple, List, Dict, Any, Optional
 
+# Bytes read to detect the delimiter from the header line
+SNIFF_BYTES = 65536
+
 
 class ValidationError(Exception):
     """Raised when input data fails validation."""
@@ -50,6 +53,34 @@ def validate_file_exists(file_path: str, file_type: str = "file") -> Tuple[bool,
     return True, []
 
 
+def sniff_delimiter(file_path: str) -> str:
+    """
+    Detect whether a table is tab- or comma-separated from its header line.
+
+    Args:
+        file_path: Path to data file
+
+    Returns:
+        "\\t" or ","
+    """
+    with open(file_path, "r", errors="replace") as f:
+        header = f.readline(SNIFF_BYTES)
+    return "\t" if "\t" in header else ","
+
+
+def read_table(file_path: str) -> pd.DataFrame:
+    """
+    Parse a TSV/CSV file in a single pass (delimiter taken from the header line).
+
+    Args:
+        file_path: Path to data file
+
+    Returns:
+        DataFrame with the file's columns (no index column set)
+    """
+    return pd.read_csv(file_path, sep=sniff_delimiter(file_path))
+
+
 def validate_multiomics_file(
     file_path: str,
     required_columns: List[str],
@@ -66,7 +97,8 @@ def validate_multiomics_file(
         allow_missing_columns: If True, warn but don't fail on missing columns
 
     Returns:
-        (is_valid, error_messages, dataframe or None)
+        (is_valid, error_messages, dataframe or None); the DataFrame is the
+        fully parsed file, so callers need not read it again
     """
     errors = []
 
@@ -75,15 +107,11 @@ def validate_multiomics_file(
     if not exists:
         return False, exist_errors, None
 
-    # Try to read as TSV/CSV
-    df = None
-    for sep, sep_name in [('\t', 'tab-separated'), (',', 'comma-separated')]:
-        try:
-            df = pd.read_csv(file_path, sep=sep, nrows=5)
-            if len(df.columns) > 1:  # Successfully parsed
-                break
-        except Exception as e:
-            continue
+    # Parse once; every check below runs on this DataFrame
+    try:
+        df = read_table(file_path)
+    except Exception:
+        df = None
 
     if df is None or len(df.columns) <= 1:
         errors.append(f"❌ Cannot parse {file_type} file as tab-separated or comma-separated: {file_path}")
@@ -106,24 +134,18 @@ def validate_multiomics_file(
             errors.append(f"💡 Column names are case-sensitive")
             return False, errors, None
 
-    # Read full file for additional checks
-    try:
-        df_full = pd.read_csv(file_path, sep='\t' if '\t' in open(file_path, 'r').read(1000) else ',')
-    except Exception as e:
-        errors.append(f"⚠️  Warning: Could not read full file for validation: {str(e)}")
-        return True, errors, df  # Still return success with partial data
-
     # Check for common issues
-    warnings = []
+    warnings = list(errors)
+    n_missing = df.isna().sum()
 
     # Check for all-missing columns
-    all_missing_cols = df_full.columns[df_full.isnull().all()].tolist()
+    all_missing_cols = n_missing.index[n_missing == len(df)].tolist()
     if all_missing_cols:
         warnings.append(f"⚠️  Columns with all missing values: {all_missing_cols[:5]}")
         warnings.append(f"💡 These columns will not contribute to analysis")
 
     # Check missing value percentage
-    missing_pct = (df_full.isnull().sum() / len(df_full) * 100)
+    missing_pct = n_missing / max(len(df), 1) * 100
     high_missing = missing_pct[missing_pct > 50].index.tolist()
     if high_missing:
         warnings.append(f"⚠️  Columns with >50% missing values: {high_missing[:5]}")
@@ -131,16 +153,12 @@ def validate_multiomics_file(
         warnings.append(f"💡 Consider removing these columns or using imputation")
 
     # Check for duplicate rows
-    n_duplicates = df_full.duplicated().sum()
+    n_duplicates = df.duplicated().sum()
     if n_duplicates > 0:
         warnings.append(f"⚠️  Found {n_duplicates} duplicate rows")
         warnings.append(f"💡 Duplicates will be kept but may affect statistical tests")
 
-    # Success with warnings
-    if warnings:
-        return True, warnings, df_full
-
-    return True, [], df_full
+    return True, warnings, df
 
 
 def validate_metadata_file(
@@ -166,7 +184,7 @@ def validate_metadata_file(
 
     # Try to read file
     try:
-        df = pd.read_csv(file_path, sep='\t' if '\t' in open(file_path, 'r').read(1000) else ',')
+        df = read_table(file_path)
     except Exception as e:
         errors.append(f"❌ Cannot parse metadata file: {file_path}")
         errors.append(f"💡 Error: {str(e)}")
@@ -9,6 +9,7 @@ import json
 import logging
 import os
 import subprocess
+import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -19,9 +20,22 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 from fastmcp import FastMCP
-from scipy.spatial.distance import cdist
+from scipy import sparse
+from scipy.spatial import cKDTree
 from scipy.stats import norm, fisher_exact
 
+# Import shared multiple-testing utilities
+# In container: /app/shared/utils is in PYTHONPATH
+# In development: Try to add shared/utils to path
+try:
+    from multiple_testing import adjust_pvalues
+except ImportError:
+    # Development mode - add shared/utils to path
+    _shared_utils_path = Path(__file__).resolve().parents[4] / "shared" / "utils"
+    if str(_shared_utils_path) not in sys.path:
+        sys.path.insert(0, str(_shared_utils_path))
+    from multiple_testing import adjust_pvalues
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -767,67 +781,131 @@ async def merge_tiles(
 # ============================================================================
 
 
-def _calculate_morans_i(
-    expression_values: np.ndarray,
+def _spatial_weights(
     coordinates: np.ndarray,
     distance_threshold: float = 100.0
-) -> tuple[float, float, float]:
-    """Calculate Moran's I statistic for spatial autocorrelation.
+) -> sparse.csr_matrix:
+    """Build a row-standardized sparse neighbor weights matrix.
+
+    Spots closer than ``distance_threshold`` are neighbors. Neighbor pairs are
+    found with a KD-tree, so memory scales with the number of neighbor pairs
+    rather than with the square of the number of spots.
 
     Args:
-        expression_values: Gene expression values (1D array)
         coordinates: Spatial coordinates (Nx2 array)
-        distance_threshold: Maximum distance for neighbors
+        distance_threshold: Maximum (exclusive) distance for neighbors
 
     Returns:
-        Tuple of (morans_i, z_score, p_value)
+        Row-standardized weights as an NxN CSR matrix
     """
-    n = len(expression_values)
+    coordinates = np.asarray(coordinates, dtype=float)
+    n = len(coordinates)
 
-    if n == 0:
-        return 0.0, 0.0, 1.0
+    pairs = cKDTree(coordinates).query_pairs(distance_threshold, output_type="ndarray")
+    if len(pairs):
+        # query_pairs is inclusive; neighbors are strictly closer than the threshold
+        gaps = np.linalg.norm(coordinates[pairs[:, 0]] - coordinates[pairs[:, 1]], axis=1)
+        pairs = pairs[gaps < distance_threshold]
 
-    # Build spatial weights matrix (neighbors within threshold)
-    distances = cdist(coordinates, coordinates)
-    weights = (distances < distance_threshold).astype(float)
-    np.fill_diagonal(weights, 0)  # No self-weighting
+    rows = np.concatenate([pairs[:, 0], pairs[:, 1]]) if len(pairs) else np.empty(0, dtype=int)
+    cols = np.concatenate([pairs[:, 1], pairs[:, 0]]) if len(pairs) else np.empty(0, dtype=int)
+    weights = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
 
     # Normalize weights (row-standardization)
-    row_sums = weights.sum(axis=1)
+    row_sums = np.asarray(weights.sum(axis=1)).ravel()
     row_sums[row_sums == 0] = 1  # Avoid division by zero
-    weights = weights / row_sums[:, np.newaxis]
+    return sparse.diags(1.0 / row_sums) @ weights
 
-    # Calculate Moran's I
-    mean_expr = expression_values.mean()
-    deviations = expression_values - mean_expr
 
-    numerator = np.sum(weights * np.outer(deviations, deviations))
-    denominator = np.sum(deviations ** 2)
+def _calculate_morans_i_batch(
+    expression_matrix: np.ndarray,
+    coordinates: np.ndarray,
+    distance_threshold: float = 100.0,
+    weights: Optional[sparse.csr_matrix] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calculate Moran's I for many genes sharing one set of spot coordinates.
 
-    if denominator == 0:
-        return 0.0, 0.0, 1.0
+    The weights matrix and its moments (W, S1, S2) depend only on the spot
+    layout, so they are computed once and every gene is scored with a single
+    sparse matrix product.
 
-    morans_i = (n / weights.sum()) * (numerator / denominator)
+    Args:
+        expression_matrix: Expression values (genes x spots)
+        coordinates: Spatial coordinates (spots x 2)
+        distance_threshold: Maximum distance for neighbors
+        weights: Optional precomputed weights from ``_spatial_weights`` (lets
+            callers reuse one matrix across datasets with the same spot layout)
 
-    # Calculate expected value and variance for z-score
-    W = weights.sum()
-    E_I = -1.0 / (n - 1)  # Expected value under null hypothesis
+    Returns:
+        Tuple of (morans_i, z_scores, p_values) arrays, one value per gene
+    """
+    expression_matrix = np.atleast_2d(np.asarray(expression_matrix, dtype=float))
+    n_genes, n = expression_matrix.shape
+
+    morans_i = np.zeros(n_genes)
+    z_scores = np.zeros(n_genes)
+    p_values = np.ones(n_genes)
+    if n == 0 or n_genes == 0:
+        return morans_i, z_scores, p_values
 
-    # Simplified variance calculation
-    S1 = 0.5 * np.sum((weights + weights.T) ** 2)
-    S2 = np.sum((weights.sum(axis=1) + weights.sum(axis=0)) ** 2)
+    if weights is None:
+        weights = _spatial_weights(coordinates, distance_threshold)
+    W = weights.sum()
 
+    # Calculate Moran's I for all genes: z^T W z / z^T z
+    deviations = expression_matrix - expression_matrix.mean(axis=1, keepdims=True)
+    numerator = np.einsum("gi,gi->g", deviations, (weights @ deviations.T).T)
+    denominator = np.einsum("gi,gi->g", deviations, deviations)
+
+    valid = denominator != 0
+    if W == 0:
+        return morans_i, z_scores, p_values
+    morans_i[valid] = (n / W) * (numerator[valid] / denominator[valid])
+
+    # Expected value and variance are shared by all genes
+    E_I = -1.0 / (n - 1)
+    S1 = 0.5 * (weights + weights.T).power(2).sum()
+    S2 = np.sum(
+        (np.asarray(weights.sum(axis=1)).ravel() + np.asarray(weights.sum(axis=0)).ravel()) ** 2
+    )
     var_I = ((n * S1 - S2 + 3 * W ** 2) / (W ** 2 * (n ** 2 - 1))) - E_I ** 2
 
     if var_I <= 0:
-        return float(morans_i), 0.0, 1.0
+        return morans_i, z_scores, p_values
+
+    # Calculate z-scores and p-values (two-tailed)
+    z_scores[valid] = (morans_i[valid] - E_I) / np.sqrt(var_I)
+    p_values[valid] = 2 * norm.sf(np.abs(z_scores[valid]))
+
+    return morans_i, z_scores, p_values
+
+
+def _calculate_morans_i(
+    expression_values: np.ndarray,
+    coordinates: np.ndarray,
+    distance_threshold: float = 100.0
+) -> tuple[float, float, float]:
+    """Calculate Moran's I statistic for spatial autocorrelation.
 
-    # Calculate z-score and p-value
-    z_score = (morans_i - E_I) / np.sqrt(var_I)
-    p_value = 2 * (1 - norm.cdf(abs(z_score)))  # Two-tailed test
+    Args:
+        expression_values: Gene expression values (1D array)
+        coordinates: Spatial coordinates (Nx2 array)
+        distance_threshold: Maximum distance for neighbors
+
+    Returns:
+        Tuple of (morans_i, z_score, p_value)
+    """
+    if len(expression_values) == 0:
+        return 0.0, 0.0, 1.0
+
+    morans_i, z_score, p_value = _calculate_morans_i_batch(
+        np.asarray(expression_values)[np.newaxis, :],
+        coordinates,
+        distance_threshold
+    )
 
     # Return Python native float types (not numpy types)
-    return float(morans_i), float(z_score), float(p_value)
+    return float(morans_i[0]), float(z_score[0]), float(p_value[0])
 
 
 @mcp.tool()
@@ -900,11 +978,22 @@ async def calculate_spatial_autocorrelation(
                 "message": "Provide coordinates_file or include x_coord/y_coord in expression file"
             }
 
-        # Calculate autocorrelation for each gene
+        # Calculate Moran's I for all found genes at once (weights built once)
+        found_genes = [gene for gene in genes if gene in expr_data.columns]
+        batch_i, batch_z, batch_p = _calculate_morans_i_batch(
+            expr_data[found_genes].values.T,
+            coordinates,
+            distance_threshold
+        )
+        gene_stats = {
+            gene: (batch_i[idx], batch_z[idx], batch_p[idx])
+            for idx, gene in enumerate(found_genes)
+        }
+
         autocorr_results = []
 
         for gene in genes:
-            if gene not in expr_data.columns:
+            if gene not in gene_stats:
                 autocorr_results.append({
                     "gene": gene,
                     "status": "not_found",
@@ -912,14 +1001,7 @@ async def calculate_spatial_autocorrelation(
                 })
                 continue
 
-            expression_values = expr_data[gene].values
-
-            # Calculate Moran's I
-            morans_i, z_score, p_value = _calculate_morans_i(
-                expression_values,
-                coordinates,
-                distance_threshold
-            )
+            morans_i, z_score, p_value = gene_stats[gene]
 
             # Interpret result
             if p_value < 0.05:
@@ -1098,22 +1180,7 @@ async def perform_differential_expression(
         # FDR correction using Benjamini-Hochberg
         if deg_results:
             pvalues = np.array([r['pvalue'] for r in deg_results])
-
-            # Benjamini-Hochberg FDR correction
-            n = len(pvalues)
-            sorted_indices = np.argsort(pvalues)
-            sorted_pvals = pvalues[sorted_indices]
-
-            # Calculate q-values
-            qvalues = np.zeros(n)
-            for i in range(n):
-                rank = i + 1
-                qvalues[sorted_indices[i]] = min(sorted_pvals[i] * n / rank, 1.0)
-
-            # Ensure monotonicity (q-values should not decrease)
-            for i in range(n - 2, -1, -1):
-                if qvalues[sorted_indices[i]] > qvalues[sorted_indices[i + 1]]:
-                    qvalues[sorted_indices[i]] = qvalues[sorted_indices[i + 1]]
+            qvalues = adjust_pvalues(pvalues, method="fdr_bh")
 
             # Add q-values and significance to results
             for i, result in enumerate(deg_results):
@@ -1821,13 +1888,13 @@ async def perform_pathway_enrichment(
     # Sort by p-value
     enrichment_results.sort(key=lambda x: x["p_value"])
 
-    # Apply Benjamini-Hochberg FDR correction
-    num_tests = len(enrichment_results)
-    for i, result in enumerate(enrichment_results):
-        rank = i + 1
-        # BH correction: p_adj = p_value * num_tests / rank
-        p_adj = min(1.0, result["p_value"] * num_tests / rank)
-        result["p_adj"] = round(float(p_adj), 6)
+    # Apply Benjamini-Hochberg FDR correction (monotone step-up)
+    if enrichment_results:
+        p_adjusted = adjust_pvalues(
+            np.array([result["p_value"] for result in enrichment_results]), method="fdr_bh"
+        )
+        for result, p_adj in zip(enrichment_results, p_adjusted):
+            result["p_adj"] = round(float(p_adj), 6)
 
     # Filter by significance
     significant_pathways = [p for p in enrichment_results if p["p_adj"] < p_value_cutoff]
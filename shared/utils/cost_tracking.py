@@ -24,6 +24,12 @@ from typing import Any, Dict, List, Optional, Callable
 from functools import wraps
 from contextlib import contextmanager
 
+try:
+    from .runtime_models import RuntimeModels, load_runtime_models
+except ImportError:
+    # Imported as a top-level module (shared/utils on PYTHONPATH)
+    from runtime_models import RuntimeModels, load_runtime_models
+
 logger = logging.getLogger(__name__)
 
 
@@ -76,6 +82,15 @@ PRICING = {
     }
 }
 
+# Instance memory (GB), checked against predicted peak memory
+INSTANCE_MEMORY_GB = {
+    "aws_batch_small": 8,
+    "aws_batch_medium": 16,
+    "aws_batch_large": 32,
+    "azure_standard_d4": 16,
+    "gcp_n1_standard_4": 15,
+}
+
 
 @dataclass
 class CostItem:
@@ -482,6 +497,42 @@ class CostEstimator:
         months = duration_days / 30.0
         return size_gb * monthly_rate * months
 
+    @staticmethod
+    def tool_runtime_cost(
+        tool: str,
+        instance_type: str = "aws_batch_medium",
+        models: Optional[RuntimeModels] = None,
+        **sizes: float
+    ) -> Dict[str, Any]:
+        """Predict wall time, peak memory and compute cost of one tool run.
+
+        Uses the benchmark-calibrated scaling curves in runtime_models.json
+        (see runtime_models.py), so a scheduler can reject or queue jobs that
+        would not fit the instance before running them.
+
+        Args:
+            tool: Tool name (e.g., "run_halla_analysis")
+            instance_type: Instance type the tool runs on
+            models: Runtime models (default: the bundled calibration)
+            **sizes: Input sizes named as in the tool's curve
+                (e.g., f1=20000, f2=7000, n=15 for HAllA)
+
+        Returns:
+            Dictionary with wall_seconds, peak_memory_mb, compute_usd,
+            fits_instance and extrapolated (sizes outside the calibrated range)
+        """
+        prediction = (models or load_runtime_models()).predict(tool, **sizes)
+        memory_gb = INSTANCE_MEMORY_GB.get(instance_type)
+        return {
+            "tool": tool,
+            "wall_seconds": prediction.wall_seconds,
+            "peak_memory_mb": prediction.peak_memory_mb,
+            "compute_usd": CostEstimator.compute_cost(instance_type, prediction.wall_seconds / 3600),
+            "instance_type": instance_type,
+            "fits_instance": memory_gb is None or prediction.peak_memory_mb <= memory_gb * 1024,
+            "extrapolated": prediction.extrapolated,
+        }
+
     @staticmethod
     def rna_seq_cost(num_samples: int) -> float:
         """Estimate RNA-seq analysis cost.
@@ -0,0 +1,315 @@
+"""
+Multiple-Testing Correction Utilities for Precision Medicine Workflows
+
+This module provides a single, vectorized implementation of the multiple-testing
+corrections used across the MCP servers and report tooling, so that every
+component reports identical q-values for identical p-values.
+
+Key capabilities:
+- Benjamini-Hochberg FDR (``fdr_bh``)
+- Benjamini-Yekutieli FDR under arbitrary dependence (``fdr_by``)
+- Storey q-values with a pi0 estimate (``qvalue``)
+- Holm step-down family-wise error control (``holm``)
+
+All corrections share one code path: a single ``argsort`` of the finite
+p-values, a cumulative min/max pass over the sorted values, and a scatter back
+to the original order. This is O(n log n) and allocates at most one sorted
+buffer plus the permutation index, which keeps HAllA-scale inputs (tens of
+millions of tests) tractable. NaN p-values are ignored when counting tests and
+are returned as NaN.
+
+Usage:
+    from shared.utils.multiple_testing import adjust_pvalues
+
+    q_values = adjust_pvalues(p_values, method="fdr_bh")
+
+    # Memory-lean: adjust a float32 buffer in place
+    adjust_pvalues(p_values_f32, method="fdr_bh", out=p_values_f32)
+
+References:
+- Benjamini & Hochberg (1995) J R Stat Soc B 57:289-300
+- Benjamini & Yekutieli (2001) Ann Stat 29:1165-1188
+- Storey (2002) J R Stat Soc B 64:479-498
+- Holm (1979) Scand J Stat 6:65-70
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.special import digamma
+
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+SUPPORTED_METHODS = ("fdr_bh", "fdr_by", "qvalue", "holm")
+
+# Aliases accepted for compatibility with statsmodels / scipy naming
+METHOD_ALIASES = {
+    "bh": "fdr_bh",
+    "benjamini-hochberg": "fdr_bh",
+    "by": "fdr_by",
+    "benjamini-yekutieli": "fdr_by",
+    "storey": "qvalue",
+    "holm-bonferroni": "holm",
+}
+
+
+# ============================================================================
+# CORE KERNEL
+# ============================================================================
+
+def _prepare_output(
+    p_values: np.ndarray,
+    dtype: Optional[np.dtype],
+    out: Optional[np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Validate inputs and return (flat p-values, flat output buffer)."""
+    p = np.asarray(p_values)
+    if dtype is None:
+        dtype = p.dtype if np.issubdtype(p.dtype, np.floating) else np.float64
+
+    if out is None:
+        out = np.empty(p.shape, dtype=dtype)
+    elif out.shape != p.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {p.shape}")
+    elif not np.issubdtype(out.dtype, np.floating):
+        raise ValueError("out must be a floating-point array")
+    elif not out.flags.c_contiguous:
+        raise ValueError("out must be C-contiguous")
+
+    p_flat = p.reshape(-1)
+    out_flat = out.reshape(-1)
+    if np.any(p_flat < 0) or np.any(p_flat > 1):
+        raise ValueError("p-values must lie in [0, 1]")
+
+    return p_flat, out_flat
+
+
+def _step_adjust(
+    p_values: np.ndarray,
+    step: str,
+    dtype: Optional[np.dtype] = None,
+    out: Optional[np.ndarray] = None,
+    scale: float = 1.0,
+) -> np.ndarray:
+    """Shared step-up / step-down kernel.
+
+    Args:
+        p_values: Array of p-values (any shape, NaN allowed)
+        step: "up" for BH-style corrections, "down" for Holm
+        dtype: Output dtype (default: input float dtype or float64)
+        out: Optional output buffer; may alias ``p_values`` for in-place use
+        scale: Extra multiplicative factor (BY harmonic sum, Storey pi0)
+
+    Returns:
+        Adjusted p-values with the same shape as the input
+    """
+    p_flat, out_flat = _prepare_output(p_values, dtype, out)
+    result = out if out is not None else out_flat.reshape(np.shape(p_values))
+
+    finite = ~np.isnan(p_flat)
+    n = int(np.count_nonzero(finite))
+    if n == 0:
+        out_flat[:] = np.nan
+        return result
+
+    if n == p_flat.size:
+        order = np.argsort(p_flat, kind="stable")
+    else:
+        order = np.flatnonzero(finite)
+        order = order[np.argsort(p_flat[order], kind="stable")]
+        out_flat[~finite] = np.nan
+
+    work_dtype = out_flat.dtype
+    # Fancy indexing copies, so ``out`` may safely alias ``p_values``
+    ranked = p_flat[order].astype(work_dtype, copy=False)
+
+    ranks = np.arange(1, n + 1, dtype=work_dtype)
+    if step == "up":
+        # p_(i) * n / i, then enforce monotonicity from the largest p down
+        ranked *= work_dtype.type(n * scale)
+        ranked /= ranks
+        np.minimum.accumulate(ranked[::-1], out=ranked[::-1])
+    else:
+        # p_(i) * (n - i + 1), then enforce monotonicity from the smallest p up
+        ranked *= (n + 1) - ranks
+        if scale != 1.0:
+            ranked *= work_dtype.type(scale)
+        np.maximum.accumulate(ranked, out=ranked)
+    del ranks
+
+    np.minimum(ranked, 1, out=ranked)
+    out_flat[order] = ranked
+    return result
+
+
+# ============================================================================
+# PUBLIC CORRECTIONS
+# ============================================================================
+
+def benjamini_hochberg(
+    p_values: np.ndarray,
+    dtype: Optional[np.dtype] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Benjamini-Hochberg FDR adjustment.
+
+    Args:
+        p_values: Array of nominal p-values (NaN allowed, ignored)
+        dtype: Output dtype, e.g. ``np.float32`` for large HAllA result sets
+        out: Optional output buffer; pass ``out=p_values`` to adjust in place
+
+    Returns:
+        Array of BH-adjusted p-values (q-values)
+    """
+    return _step_adjust(p_values, "up", dtype=dtype, out=out)
+
+
+def benjamini_yekutieli(
+    p_values: np.ndarray,
+    dtype: Optional[np.dtype] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Benjamini-Yekutieli FDR adjustment (valid under arbitrary dependence).
+
+    Args:
+        p_values: Array of nominal p-values (NaN allowed, ignored)
+        dtype: Output dtype
+        out: Optional output buffer; may alias ``p_values``
+
+    Returns:
+        Array of BY-adjusted p-values
+    """
+    n = int(np.count_nonzero(~np.isnan(np.asarray(p_values))))
+    # Harmonic number H_n = digamma(n + 1) + Euler-Mascheroni constant
+    harmonic = float(digamma(n + 1) + np.euler_gamma) if n else 1.0
+    return _step_adjust(p_values, "up", dtype=dtype, out=out, scale=harmonic)
+
+
+def estimate_pi0(p_values: np.ndarray, lambda_: float = 0.5) -> float:
+    """Estimate the proportion of true null hypotheses (Storey 2002).
+
+    Args:
+        p_values: Array of nominal p-values (NaN allowed, ignored)
+        lambda_: Tuning parameter in [0, 1)
+
+    Returns:
+        pi0 estimate clipped to (0, 1]
+    """
+    if not 0 <= lambda_ < 1:
+        raise ValueError("lambda_ must be in [0, 1)")
+
+    p = np.asarray(p_values)
+    n = int(np.count_nonzero(~np.isnan(p)))
+    if n == 0:
+        return 1.0
+
+    pi0 = np.count_nonzero(p > lambda_) / (n * (1.0 - lambda_))
+    return float(min(max(pi0, 1.0 / n), 1.0))
+
+
+def storey_qvalues(
+    p_values: np.ndarray,
+    lambda_: float = 0.5,
+    pi0: Optional[float] = None,
+    dtype: Optional[np.dtype] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Storey q-values: BH adjustment scaled by the estimated null proportion.
+
+    Args:
+        p_values: Array of nominal p-values (NaN allowed, ignored)
+        lambda_: Tuning parameter for the pi0 estimate
+        pi0: Optional fixed pi0 (skips estimation)
+        dtype: Output dtype
+        out: Optional output buffer; may alias ``p_values``
+
+    Returns:
+        Array of q-values
+    """
+    if pi0 is None:
+        pi0 = estimate_pi0(p_values, lambda_=lambda_)
+    elif not 0 < pi0 <= 1:
+        raise ValueError("pi0 must be in (0, 1]")
+    return _step_adjust(p_values, "up", dtype=dtype, out=out, scale=pi0)
+
+
+def holm(
+    p_values: np.ndarray,
+    dtype: Optional[np.dtype] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Holm step-down adjustment (family-wise error rate).
+
+    Args:
+        p_values: Array of nominal p-values (NaN allowed, ignored)
+        dtype: Output dtype
+        out: Optional output buffer; may alias ``p_values``
+
+    Returns:
+        Array of Holm-adjusted p-values
+    """
+    return _step_adjust(p_values, "down", dtype=dtype, out=out)
+
+
+def adjust_pvalues(
+    p_values: np.ndarray,
+    method: str = "fdr_bh",
+    dtype: Optional[np.dtype] = None,
+    out: Optional[np.ndarray] = None,
+    **kwargs,
+) -> np.ndarray:
+    """Adjust p-values for multiple testing.
+
+    Args:
+        p_values: Array of nominal p-values (NaN allowed, ignored)
+        method: One of "fdr_bh", "fdr_by", "qvalue", "holm" (or an alias)
+        dtype: Output dtype (default: input float dtype or float64)
+        out: Optional output buffer; may alias ``p_values`` for in-place use
+        **kwargs: Method-specific options (``lambda_``/``pi0`` for "qvalue")
+
+    Returns:
+        Array of adjusted p-values with the same shape as ``p_values``
+
+    Example:
+        >>> adjust_pvalues([0.01, 0.04, 0.03, 0.5], method="fdr_bh")
+        array([0.04      , 0.05333333, 0.05333333, 0.5       ])
+    """
+    method = METHOD_ALIASES.get(method.lower(), method.lower())
+
+    if method == "fdr_bh":
+        return benjamini_hochberg(p_values, dtype=dtype, out=out)
+    if method == "fdr_by":
+        return benjamini_yekutieli(p_values, dtype=dtype, out=out)
+    if method == "qvalue":
+        return storey_qvalues(p_values, dtype=dtype, out=out, **kwargs)
+    if method == "holm":
+        return holm(p_values, dtype=dtype, out=out)
+
+    raise ValueError(
+        f"Unknown multiple-testing method '{method}'. "
+        f"Supported: {', '.join(SUPPORTED_METHODS)}"
+    )
+
+
+def multipletests(
+    p_values: np.ndarray,
+    alpha: float = 0.05,
+    method: str = "fdr_bh",
+    dtype: Optional[np.dtype] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Adjust p-values and return (reject, adjusted) like statsmodels.
+
+    Args:
+        p_values: Array of nominal p-values
+        alpha: Significance threshold applied to the adjusted p-values
+        method: Correction method (see ``adjust_pvalues``)
+        dtype: Output dtype for the adjusted p-values
+
+    Returns:
+        Tuple of (boolean reject mask, adjusted p-values)
+    """
+    adjusted = adjust_pvalues(p_values, method=method, dtype=dtype)
+    return adjusted <= alpha, adjusted
@@ -0,0 +1,299 @@
+"""
+Benchmark-Calibrated Runtime and Memory Models for Analysis Tools
+
+This module predicts how long an analysis tool will run and how much memory it
+will need for a given input, before running it, so that cost estimates and
+schedulers can budget, queue or reject oversized jobs.
+
+Each tool has a scaling curve over its input sizes, linear in a few
+complexity terms:
+
+    wall_seconds   = overhead + Σ c_k · term_k
+    peak_memory_mb = baseline + Σ m_k · memory_term_k
+
+Every term is a product of named sizes, e.g. HAllA tests every feature pair
+on every sample (``f1·f2·n``) and clusters and adjusts every pair (``f1·f2``).
+A factor can be capped, ``min(features,5000)``, for buffers that stop growing
+at a fixed size (a streamed chunk, a tile, a maximum figure size).
+Coefficients are fitted by non-negative least squares on relative errors, so
+small and large calibration runs count alike and no term can make a larger
+input cheaper.
+
+Curves are fitted from timings over a grid of synthetic sizes
+(``tests/benchmarks/calibrate_runtime_models.py``) and stored as JSON in
+``runtime_models.json`` next to this module. Recalibrate on the deployment
+hardware; predictions outside the calibrated size range are flagged as
+extrapolated. Curves whose time or memory fit misses a calibration point by
+more than MAX_RELATIVE_ERROR are not saved, so no job is accepted or rejected
+on a curve that does not describe the tool.
+
+Usage:
+    from runtime_models import load_runtime_models
+
+    models = load_runtime_models()
+    prediction = models.predict("run_halla_analysis", f1=5000, f2=5000, n=200)
+    print(prediction.wall_seconds, prediction.peak_memory_mb)
+"""
+
+import json
+import logging
+import math
+import re
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import nnls
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODELS_PATH = Path(__file__).with_name("runtime_models.json")
+
+# Largest relative error (time or memory, over the calibration points) of a saved curve
+MAX_RELATIVE_ERROR = 0.5
+
+# Complexity terms: each a product of named sizes ([["f1", "f2", "n"]] is f1·f2·n),
+# optionally capped ("min(f1,1000)")
+Terms = List[List[str]]
+
+_CAPPED = re.compile(r"min\((\w+),\s*([\d.eE+]+)\)")
+
+
+def _parse_factor(factor: str) -> Tuple[str, float]:
+    """(size name, cap) of one term factor; the cap is inf for a plain name."""
+    match = _CAPPED.fullmatch(factor)
+    if match:
+        return match.group(1), float(match.group(2))
+    return factor, math.inf
+
+
+def evaluate_terms(terms: Terms, sizes: Mapping[str, float]) -> np.ndarray:
+    """Value of each complexity term for the given sizes.
+
+    Raises:
+        ValueError: If a size used by the terms is missing
+    """
+    parsed = [[_parse_factor(factor) for factor in term] for term in terms]
+    missing = sorted({name for term in parsed for name, _ in term} - set(sizes))
+    if missing:
+        raise ValueError(f"Missing size parameter(s): {', '.join(missing)}")
+    return np.array([math.prod(min(float(sizes[name]), cap) for name, cap in term)
+                     for term in parsed])
+
+
+def describe_terms(terms: Terms) -> str:
+    """Human-readable form of a set of terms, e.g. "f1*f2 + f1*f2*n"."""
+    return " + ".join("*".join(term) for term in terms)
+
+
+@dataclass
+class RuntimePrediction:
+    """Predicted resources of one tool run."""
+    tool: str
+    wall_seconds: float
+    peak_memory_mb: float
+    extrapolated: bool = False
+
+
+@dataclass
+class ScalingCurve:
+    """Fitted runtime and memory curve of one tool."""
+    tool: str
+    params: List[str]
+    time_terms: Terms
+    time_coefficients: List[float]
+    overhead_seconds: float
+    memory_terms: Terms
+    memory_coefficients: List[float]
+    baseline_mb: float
+    max_relative_error: float = float("nan")
+    max_memory_relative_error: float = float("nan")
+    n_points: int = 0
+    size_range: Dict[str, List[float]] = field(default_factory=dict)
+
+    def predict(self, **sizes: float) -> RuntimePrediction:
+        """Predict wall time and peak memory for the given sizes.
+
+        Args:
+            **sizes: One value per name in ``params``
+
+        Returns:
+            RuntimePrediction (``extrapolated`` when a size lies outside the
+            calibrated range)
+        """
+        seconds = self.overhead_seconds + evaluate_terms(self.time_terms, sizes) @ self.time_coefficients
+        memory = self.baseline_mb + evaluate_terms(self.memory_terms, sizes) @ self.memory_coefficients
+        extrapolated = any(
+            not lo <= float(sizes[name]) <= hi
+            for name, (lo, hi) in self.size_range.items() if name in sizes
+        )
+        return RuntimePrediction(self.tool, float(seconds), float(memory), extrapolated)
+
+    def within(self, max_error: float = MAX_RELATIVE_ERROR) -> bool:
+        """True if both fits are within ``max_error`` of every calibration point."""
+        return self.max_relative_error <= max_error and self.max_memory_relative_error <= max_error
+
+    def to_dict(self) -> Dict[str, Any]:
+        curve = asdict(self)
+        curve["time_formula"] = describe_terms(self.time_terms)
+        curve["memory_formula"] = describe_terms(self.memory_terms)
+        return curve
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ScalingCurve":
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in fields})
+
+
+def _fit_relative(terms: np.ndarray, observed: np.ndarray) -> Tuple[float, np.ndarray]:
+    """Non-negative intercept and coefficients minimizing squared relative error."""
+    design = np.column_stack([np.ones(len(observed)), terms]) / observed[:, None]
+    solution, _ = nnls(design, np.ones(len(observed)))
+    return float(solution[0]), solution[1:]
+
+
+def fit_curve(
+    tool: str,
+    points: List[Mapping[str, float]],
+    params: List[str],
+    time_terms: Terms,
+    memory_terms: Terms,
+) -> ScalingCurve:
+    """Fit a scaling curve to benchmark measurements.
+
+    Args:
+        tool: Tool name
+        points: Measurements, each with the sizes in ``params`` plus
+            ``seconds`` and ``peak_mb`` (both positive)
+        params: Size parameter names
+        time_terms: Complexity terms driving wall time
+        memory_terms: Complexity terms driving peak memory
+
+    Returns:
+        Fitted ScalingCurve
+
+    Raises:
+        ValueError: With fewer measurements than coefficients to fit
+    """
+    if len(points) <= max(len(time_terms), len(memory_terms)):
+        raise ValueError(f"{tool}: {len(points)} measurements cannot fit "
+                         f"{max(len(time_terms), len(memory_terms)) + 1} coefficients")
+    seconds = np.array([p["seconds"] for p in points], dtype=float)
+    peak_mb = np.array([p["peak_mb"] for p in points], dtype=float)
+    time_x = np.array([evaluate_terms(time_terms, p) for p in points])
+    memory_x = np.array([evaluate_terms(memory_terms, p) for p in points])
+
+    overhead, time_coefficients = _fit_relative(time_x, seconds)
+    baseline, memory_coefficients = _fit_relative(memory_x, peak_mb)
+    predicted = overhead + time_x @ time_coefficients
+    predicted_mb = baseline + memory_x @ memory_coefficients
+
+    return ScalingCurve(
+        tool=tool,
+        params=list(params),
+        time_terms=time_terms,
+        time_coefficients=time_coefficients.tolist(),
+        overhead_seconds=overhead,
+        memory_terms=memory_terms,
+        memory_coefficients=memory_coefficients.tolist(),
+        baseline_mb=baseline,
+        max_relative_error=float(np.max(np.abs(predicted - seconds) / seconds)),
+        max_memory_relative_error=float(np.max(np.abs(predicted_mb - peak_mb) / peak_mb)),
+        n_points=len(points),
+        size_range={name: [float(min(p[name] for p in points)), float(max(p[name] for p in points))]
+                    for name in params},
+    )
+
+
+def measure(fn: Callable[..., Any], *args: Any, repeat: int = 1, **kwargs: Any) -> Tuple[float, float]:
+    """Wall time (best of ``repeat`` runs) and peak traced memory of ``fn``.
+
+    A first run under ``tracemalloc`` records the peak allocation (NumPy
+    buffers included) and warms up imports and caches; the timed runs that
+    follow are untraced. Memory allocated in worker processes is not seen,
+    so benchmark multiprocess tools with one worker.
+
+    Returns:
+        Tuple of (seconds, peak_mb)
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    timings = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings), peak / 2 ** 20
+
+
+class RuntimeModels:
+    """Collection of per-tool scaling curves, stored as one JSON file."""
+
+    def __init__(self, curves: Optional[Dict[str, ScalingCurve]] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.curves = dict(curves or {})
+        self.metadata = dict(metadata or {})
+
+    def __contains__(self, tool: str) -> bool:
+        return tool in self.curves
+
+    @property
+    def tools(self) -> List[str]:
+        return sorted(self.curves)
+
+    def predict(self, tool: str, **sizes: float) -> RuntimePrediction:
+        """Predict wall time and peak memory of ``tool`` for the given sizes.
+
+        Raises:
+            KeyError: If no curve was calibrated for ``tool``
+            ValueError: If a required size is missing
+        """
+        if tool not in self.curves:
+            raise KeyError(f"No runtime model for '{tool}'. Calibrated tools: {', '.join(self.tools)}")
+        return self.curves[tool].predict(**sizes)
+
+    def save(self, path: Optional[Path] = None, max_error: float = MAX_RELATIVE_ERROR) -> Path:
+        """Write the curves as JSON.
+
+        Raises:
+            ValueError: If a curve's fit error exceeds ``max_error``
+        """
+        inaccurate = [tool for tool, curve in self.curves.items() if not curve.within(max_error)]
+        if inaccurate:
+            raise ValueError(f"Fit error above {max_error:.0%} for: {', '.join(sorted(inaccurate))}")
+        path = Path(path or DEFAULT_MODELS_PATH)
+        data = {"metadata": self.metadata,
+                "tools": {tool: curve.to_dict() for tool, curve in sorted(self.curves.items())}}
+        path.write_text(json.dumps(data, indent=2) + "\n")
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "RuntimeModels":
+        data = json.loads(Path(path or DEFAULT_MODELS_PATH).read_text())
+        curves = {tool: ScalingCurve.from_dict(curve) for tool, curve in data.get("tools", {}).items()}
+        return cls(curves, data.get("metadata"))
+
+
+_default_models: Optional[RuntimeModels] = None
+
+
+def load_runtime_models(path: Optional[Path] = None) -> RuntimeModels:
+    """Runtime models from ``path`` (default: the bundled runtime_models.json, cached)."""
+    global _default_models
+    if path is not None:
+        return RuntimeModels.load(path)
+    if _default_models is None:
+        _default_models = RuntimeModels.load(DEFAULT_MODELS_PATH)
+    return _default_models
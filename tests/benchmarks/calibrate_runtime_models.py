@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Calibrate the runtime models used by cost estimation.
+
+Times each multi-omics and spatial hot path over a grid of synthetic input
+sizes, fits one scaling curve per tool (see shared/utils/runtime_models.py)
+and writes them to shared/utils/runtime_models.json.
+
+Run on the hardware the servers are deployed on:
+
+    python tests/benchmarks/calibrate_runtime_models.py
+    python tests/benchmarks/calibrate_runtime_models.py --tools run_halla_analysis --repeat 5
+
+Every run uses a fresh cache directory, so cached datasets, projections and
+linkages never shortcut a measurement. HAllA is timed on one worker. Curves
+whose fit misses a measurement by more than --max-error are not saved (and a
+previous curve of that tool is dropped), so cost estimates never rely on them.
+"""
+
+import argparse
+import logging
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT / "shared" / "utils"))
+sys.path.insert(0, str(REPO_ROOT / "servers" / "mcp-multiomics" / "src"))
+sys.path.insert(0, str(REPO_ROOT / "servers" / "mcp-spatialtools" / "src"))
+
+os.environ.setdefault("MULTIOMICS_DRY_RUN", "false")
+os.environ.setdefault("SPATIAL_DRY_RUN", "false")
+
+from runtime_models import (  # noqa: E402
+    DEFAULT_MODELS_PATH, MAX_RELATIVE_ERROR, RuntimeModels, fit_curve, measure,
+)
+from mcp_multiomics.tools.integrated_store import CHUNK_ROWS  # noqa: E402
+
+logger = logging.getLogger("calibrate_runtime_models")
+
+
+def _samples(n: int) -> List[str]:
+    return [f"S{i:04d}" for i in range(n)]
+
+
+def _matrix(n_features: int, n: int, prefix: str, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(size=(n_features, n)),
+                        index=[f"{prefix}{i}" for i in range(n_features)], columns=_samples(n))
+
+
+class Workspace:
+    """Temporary directory handing out a fresh multiomics cache per run."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._runs = 0
+
+    def fresh_cache(self) -> None:
+        from mcp_multiomics.config import config
+
+        self._runs += 1
+        config.cache_dir = self.root / f"cache_{self._runs}"
+        config.cache_dir.mkdir()
+
+    def store(self, blocks: Dict[str, pd.DataFrame]) -> str:
+        from mcp_multiomics.tools.integrated_store import IntegratedDataStore
+
+        path = self.root / f"store_{self._runs}_{len(list(self.root.iterdir()))}"
+        IntegratedDataStore.write(path, blocks)
+        return str(path)
+
+
+# ----------------------------------------------------------------------
+# Benchmarked tools: sizes -> zero-argument callable
+# ----------------------------------------------------------------------
+
+def _integrate(ws: Workspace, features: int, n: int) -> Callable[[], Any]:
+    from mcp_multiomics.tools.integration import integrate_omics_data_impl
+
+    rna_path = ws.root / f"rna_{features}_{n}.csv"
+    _matrix(features, n, "G", 0).rename_axis("Gene").to_csv(rna_path)
+
+    def run():
+        ws.fresh_cache()
+        integrate_omics_data_impl(rna_path=str(rna_path))
+    return run
+
+
+def _halla(ws: Workspace, f1: int, f2: int, n: int) -> Callable[[], Any]:
+    from mcp_multiomics.config import config
+    from mcp_multiomics.tools.halla import run_halla_analysis_impl
+
+    config.max_features = max(f1, f2)
+    path = ws.store({"rna": _matrix(f1, n, "G", 1), "protein": _matrix(f2, n, "P", 2)})
+
+    def run():
+        ws.fresh_cache()
+        run_halla_analysis_impl(path, "rna", "protein", n_jobs=1, resume=False)
+    return run
+
+
+def _pca(ws: Workspace, features: int, n: int) -> Callable[[], Any]:
+    from mcp_multiomics.config import config
+    from mcp_multiomics.tools.pca import run_multiomics_pca_impl
+
+    config.max_features = features
+    path = ws.store({"rna": _matrix(features, n, "G", 3)})
+
+    def run():
+        ws.fresh_cache()
+        run_multiomics_pca_impl(path, n_components=3, method="gram")
+    return run
+
+
+def _heatmap(ws: Workspace, rows: int, n: int) -> Callable[[], Any]:
+    from mcp_multiomics.config import config
+    from mcp_multiomics.tools.heatmap import create_multiomics_heatmap_impl
+
+    config.max_features = rows
+    path = ws.store({"rna": _matrix(rows, n, "G", 4)})
+
+    def run():
+        ws.fresh_cache()
+        create_multiomics_heatmap_impl(path, top_features=rows,
+                                       output_path=str(ws.root / "heatmap.png"))
+    return run
+
+
+def _morans_i(ws: Workspace, genes: int, spots: int) -> Callable[[], Any]:
+    from mcp_spatialtools.server import _calculate_morans_i_batch
+
+    rng = np.random.default_rng(5)
+    side = int(np.ceil(np.sqrt(spots)))
+    grid = np.stack(np.meshgrid(np.arange(side), np.arange(side)), axis=-1).reshape(-1, 2)[:spots]
+    coordinates = grid * 100.0
+    expression = rng.poisson(5, size=(genes, spots)).astype(float)
+    # Visium spot pitch: six neighbors within 1.5 pitches
+    return lambda: _calculate_morans_i_batch(expression, coordinates, distance_threshold=150.0)
+
+
+def _combat(ws: Workspace, genes: int, spots: int) -> Callable[[], Any]:
+    from mcp_spatialtools.server import _combat_batch_correction
+
+    rng = np.random.default_rng(6)
+    data = pd.DataFrame(rng.lognormal(2, 1, size=(genes, spots)))
+    batch = np.arange(spots) % 3
+    return lambda: _combat_batch_correction(data, batch)
+
+
+# tool: (builder, size params, time terms, memory terms, size grid)
+BENCHMARKS = {
+    "integrate_omics_data": (
+        _integrate, ["features", "n"], [["features", "n"]], [["features", "n"]],
+        [{"features": f, "n": n} for f in (1000, 4000, 16000, 32000) for n in (10, 40, 160)],
+    ),
+    "run_halla_analysis": (
+        _halla, ["f1", "f2", "n"],
+        [["f1", "f2"], ["f1", "f2", "n"], ["f1", "f1"], ["f2", "f2"]],
+        # One 1000×1000 association tile at a time; f×f clustering of each modality
+        [["min(f1,1000)", "min(f2,1000)"], ["f1", "f1"], ["f2", "f2"]],
+        # f1 and f2 vary independently, so the per-modality terms are identifiable
+        [{"f1": f1, "f2": f2, "n": n}
+         for f1 in (250, 1000, 4000) for f2 in (250, 1000, 4000) for n in (10, 60, 200)],
+    ),
+    "run_multiomics_pca": (
+        _pca, ["features", "n"],
+        [["features", "n"], ["features", "n", "n"]],
+        # Gram matrix, one streamed chunk of features, per-feature means and scales
+        [["n", "n"], [f"min(features,{CHUNK_ROWS})", "n"], ["features"]],
+        [{"features": f, "n": n} for f in (2000, 8000, 32000) for n in (10, 50, 200, 400)],
+    ),
+    "create_multiomics_heatmap": (
+        _heatmap, ["rows", "n"],
+        [["rows", "n"], ["rows", "rows"], ["rows", "rows", "n"]],
+        # Rendered pixels: figure height stops growing at 500 rows, width at 240 samples
+        [["min(rows,500)"], ["min(n,240)"], ["min(rows,500)", "min(n,240)"]],
+        [{"rows": r, "n": n} for r in (250, 500, 1000, 2000) for n in (10, 40, 160)],
+    ),
+    "calculate_spatial_autocorrelation": (
+        _morans_i, ["genes", "spots"], [["spots"], ["genes", "spots"]], [["spots"], ["genes", "spots"]],
+        [{"genes": g, "spots": s} for g in (500, 2000, 8000) for s in (500, 2000)],
+    ),
+    "perform_batch_correction": (
+        _combat, ["genes", "spots"], [["genes", "spots"]], [["genes", "spots"]],
+        [{"genes": g, "spots": s} for g in (500, 2000, 8000) for s in (300, 1200)],
+    ),
+}
+
+
+def calibrate(tools: List[str], repeat: int, root: Path) -> RuntimeModels:
+    """Benchmark ``tools`` over their grids and fit their curves."""
+    ws = Workspace(root)
+    curves = {}
+    for tool in tools:
+        builder, params, time_term, memory_term, grid = BENCHMARKS[tool]
+        # One-time imports, font caches etc. must not count as the first point's memory
+        builder(ws, **grid[0])()
+        points = []
+        for sizes in grid:
+            run = builder(ws, **sizes)
+            seconds, peak_mb = measure(run, repeat=repeat)
+            points.append({**sizes, "seconds": seconds, "peak_mb": peak_mb})
+            logger.info(f"{tool} {sizes}: {seconds:.3f}s, {peak_mb:.1f} MB")
+        curves[tool] = fit_curve(tool, points, params, time_term, memory_term)
+        logger.info(f"{tool}: max relative error {curves[tool].max_relative_error:.0%} (time), "
+                    f"{curves[tool].max_memory_relative_error:.0%} (memory)")
+    return RuntimeModels(curves)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size (best is kept)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_MODELS_PATH)
+    parser.add_argument("--max-error", type=float, default=MAX_RELATIVE_ERROR,
+                        help="Largest relative fit error of a saved curve")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    for noisy in ("mcp_multiomics", "mcp_spatialtools", "matplotlib"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models = calibrate(args.tools, args.repeat, Path(tmp))
+
+    rejected = sorted(tool for tool, curve in models.curves.items() if not curve.within(args.max_error))
+    for tool in rejected:
+        logger.warning(f"{tool}: fit error above {args.max_error:.0%}, curve not saved")
+        del models.curves[tool]
+
+    # Recalibrating a subset keeps the other tools' curves (a rejected tool loses its old one)
+    if args.output.is_file():
+        previous = RuntimeModels.load(args.output)
+        kept = {tool: curve for tool, curve in previous.curves.items() if tool not in rejected}
+        models.curves = {**kept, **models.curves}
+    models.metadata = {
+        "calibrated_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "notes": "Wall time of one tool run on one worker; peak traced (Python + NumPy) memory",
+    }
+    print(f"Wrote {models.save(args.output, max_error=args.max_error)}")
+
+
+if __name__ == "__main__":
+    main()
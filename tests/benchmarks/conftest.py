@@ -0,0 +1,219 @@
+"""Benchmark fixtures: timing, peak memory and regression checks against baselines.
+
+Benchmarks use pytest-benchmark and only run when this directory is targeted
+(or with ``pytest tests --perf``, see tests/conftest.py):
+
+    pytest tests/benchmarks                        # check against baselines.json
+    pytest tests/benchmarks --perf-update          # record new baselines
+    pytest tests/benchmarks -k "small or medium"   # skip the large inputs
+
+Each benchmark times a hot path over several rounds (best round is compared)
+after one warm-up run that records peak memory: traced allocations (Python
+and NumPy, via tracemalloc) and, on Linux, peak resident set size growth.
+A benchmark fails when its best time or traced peak memory exceeds the
+baseline by more than the configured threshold plus a small absolute
+allowance (TIME_SLACK_SECONDS, MEMORY_SLACK_MB), so millisecond-scale hot
+paths don't fail on scheduler jitter. Peak RSS depends on what
+earlier benchmarks left in the allocator, so it is recorded but not gated.
+
+Baselines are machine-specific; record them on the machine that checks
+them and keep one file per machine with ``--perf-baseline``.
+"""
+
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT / "shared" / "utils"))
+sys.path.insert(0, str(REPO_ROOT / "servers" / "mcp-multiomics" / "src"))
+sys.path.insert(0, str(REPO_ROOT / "servers" / "mcp-spatialtools" / "src"))
+
+os.environ.setdefault("MULTIOMICS_DRY_RUN", "false")
+os.environ.setdefault("SPATIAL_DRY_RUN", "false")
+
+DEFAULT_BASELINE_PATH = Path(__file__).with_name("baselines.json")
+DEFAULT_TIME_THRESHOLD = 0.5
+DEFAULT_MEMORY_THRESHOLD = 0.25
+# Absolute allowances so tiny inputs don't fail on timer jitter and allocator noise
+TIME_SLACK_SECONDS = 0.005
+MEMORY_SLACK_MB = 2.0
+
+_results_key = pytest.StashKey[Dict[str, Dict[str, float]]]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf", "hot-path benchmark baselines")
+    group.addoption("--perf-baseline", type=Path, default=DEFAULT_BASELINE_PATH,
+                    help="Baseline JSON file (default: tests/benchmarks/baselines.json)")
+    group.addoption("--perf-update", action="store_true",
+                    help="Write the measured results into the baseline file instead of checking")
+    group.addoption("--perf-time-threshold", type=float, default=None,
+                    help=f"Allowed relative slowdown (default: from the baseline file, "
+                         f"else {DEFAULT_TIME_THRESHOLD})")
+    group.addoption("--perf-memory-threshold", type=float, default=None,
+                    help=f"Allowed relative peak-memory growth (default: from the baseline file, "
+                         f"else {DEFAULT_MEMORY_THRESHOLD})")
+
+
+def pytest_configure(config):
+    config.stash[_results_key] = {}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    results = config.stash.get(_results_key, {})
+    if not config.getoption("--perf-update", False) or not results:
+        return
+
+    path = config.getoption("--perf-baseline")
+    baseline = _load_baseline(path)
+    baseline["benchmarks"] = dict(sorted({**baseline.get("benchmarks", {}), **results}.items()))
+    baseline.setdefault("thresholds", {"time": DEFAULT_TIME_THRESHOLD,
+                                       "memory": DEFAULT_MEMORY_THRESHOLD})
+    baseline["metadata"] = {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+    session.config.get_terminal_writer().line(f"\nWrote {len(results)} baselines to {path}")
+
+
+def _load_baseline(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text()) if path.is_file() else {}
+
+
+@pytest.fixture(scope="session")
+def perf_baseline(pytestconfig) -> Dict[str, Any]:
+    return _load_baseline(pytestconfig.getoption("--perf-baseline"))
+
+
+@pytest.fixture(autouse=True)
+def real_analysis_env(tmp_path, monkeypatch):
+    """Real (non-DRY_RUN) analyses; multiomics caches under the test's temp directory."""
+    from mcp_multiomics.config import config
+
+    monkeypatch.setattr(config, "dry_run", False)
+    monkeypatch.setattr(config, "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(config, "data_dir", tmp_path / "data")
+    config.cache_dir.mkdir()
+    config.data_dir.mkdir()
+
+    import mcp_spatialtools.server as spatial_server
+    monkeypatch.setattr(spatial_server, "DRY_RUN", False)
+
+
+def _rss_mb(field: str) -> Optional[float]:
+    """VmRSS / VmHWM of this process in MB (Linux only)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_memory(fn: Callable[[], Any]) -> Tuple[Any, float, Optional[float]]:
+    """Run ``fn`` once and return (result, peak traced MB, peak RSS growth MB or None)."""
+    rss_before = _rss_mb("VmRSS") if _reset_peak_rss() else None
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    rss_peak = _rss_mb("VmHWM") if rss_before is not None else None
+    rss_growth = max(rss_peak - rss_before, 0.0) if rss_peak is not None else None
+    return result, peak / 2 ** 20, rss_growth
+
+
+@pytest.fixture
+def hot_path(benchmark, request, pytestconfig, perf_baseline):
+    """Benchmark a zero-argument callable and check it against its baseline.
+
+    Usage:
+        result = hot_path(lambda: run_halla_analysis_impl(path, "rna", "protein"),
+                          setup=fresh_cache, rounds=3)
+
+    ``setup`` runs (untimed) before the warm-up and before every round, e.g.
+    to start from an empty cache. Returns the result of the last round.
+    """
+    module = Path(str(request.node.fspath)).stem
+    key = f"{module}::{request.node.nodeid.split('::', 1)[1]}"
+    thresholds = perf_baseline.get("thresholds", {})
+    time_threshold = pytestconfig.getoption("--perf-time-threshold")
+    if time_threshold is None:
+        time_threshold = thresholds.get("time", DEFAULT_TIME_THRESHOLD)
+    memory_threshold = pytestconfig.getoption("--perf-memory-threshold")
+    if memory_threshold is None:
+        memory_threshold = thresholds.get("memory", DEFAULT_MEMORY_THRESHOLD)
+
+    def run(fn: Callable[[], Any], setup: Optional[Callable[[], None]] = None, rounds: int = 3) -> Any:
+        if setup is not None:
+            setup()
+        _, traced_mb, rss_mb = peak_memory(fn)
+
+        def prepare():
+            if setup is not None:
+                setup()
+            return (), {}
+
+        result = benchmark.pedantic(fn, setup=prepare, rounds=rounds, iterations=1)
+
+        measured = {
+            "min_seconds": benchmark.stats.stats.min,
+            "peak_traced_mb": round(traced_mb, 3),
+        }
+        if rss_mb is not None:
+            measured["peak_rss_mb"] = round(rss_mb, 3)
+        benchmark.extra_info.update(measured)
+        pytestconfig.stash[_results_key][key] = {
+            **measured, "min_seconds": round(measured["min_seconds"], 6)}
+
+        expected = perf_baseline.get("benchmarks", {}).get(key)
+        if expected is None or pytestconfig.getoption("--perf-update"):
+            return result
+
+        regressions = []
+        time_limit = expected["min_seconds"] * (1 + time_threshold) + TIME_SLACK_SECONDS
+        if measured["min_seconds"] > time_limit:
+            regressions.append(f"time {measured['min_seconds']:.4f}s > {time_limit:.4f}s "
+                               f"(baseline {expected['min_seconds']:.4f}s + {time_threshold:.0%} "
+                               f"+ {TIME_SLACK_SECONDS * 1000:g} ms)")
+        memory_limit = expected["peak_traced_mb"] * (1 + memory_threshold) + MEMORY_SLACK_MB
+        if traced_mb > memory_limit:
+            regressions.append(f"peak memory {traced_mb:.1f} MB > {memory_limit:.1f} MB "
+                               f"(baseline {expected['peak_traced_mb']:.1f} MB + {memory_threshold:.0%} "
+                               f"+ {MEMORY_SLACK_MB:g} MB)")
+        if regressions:
+            pytest.fail(f"Performance regression in {key}: " + "; ".join(regressions), pytrace=False)
+        return result
+
+    return run
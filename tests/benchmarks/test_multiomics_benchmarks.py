@@ -0,0 +1,131 @@
+"""Benchmarks of the multi-omics hot paths on synthetic cohorts.
+
+Inputs come from the seeded synthetic cohort generator, so every run times
+the same data. Each analysis starts from an empty cache.
+
+Run:
+    pytest tests/benchmarks/test_multiomics_benchmarks.py
+"""
+
+import itertools
+
+import pytest
+import numpy as np
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.halla import run_halla_analysis_impl
+from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.tools.preprocessing import (
+    preprocess_multiomics_data_impl,
+    validate_multiomics_data_impl,
+)
+from mcp_multiomics.tools.stouffer import calculate_stouffer_meta_impl
+from mcp_multiomics.tools.synthetic import SyntheticCohort
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    """Callable pointing the multiomics cache at a new empty directory."""
+    counter = itertools.count()
+
+    def reset():
+        cache_dir = tmp_path / f"cache_{next(counter)}"
+        cache_dir.mkdir()
+        monkeypatch.setattr(config, "cache_dir", cache_dir)
+    return reset
+
+
+def _cohort_tables(tmp_path, n_samples, n_genes):
+    cohort = SyntheticCohort(n_samples=n_samples, n_genes=n_genes, n_proteins=n_genes // 2,
+                             n_phospho=n_genes // 2, seed=1)
+    paths = cohort.write(tmp_path / "cohort", fmt="csv")
+    return {key: str(path) for key, path in paths.items()}
+
+
+class TestHAllA:
+    """HAllA association testing (tiled correlations + block discovery)."""
+
+    @pytest.mark.parametrize("f1,f2,n", [
+        pytest.param(500, 250, 20, id="small"),
+        pytest.param(2000, 1000, 60, id="medium"),
+        pytest.param(5000, 2500, 200, id="large"),
+    ])
+    def test_halla(self, hot_path, fresh_cache, monkeypatch, tmp_path, f1, f2, n):
+        monkeypatch.setattr(config, "max_features", max(f1, f2))
+        cohort = SyntheticCohort(n_samples=n, n_genes=f1, n_proteins=f2, n_phospho=0, seed=2)
+        store = str(cohort.write_store(tmp_path / "store"))
+
+        result = hot_path(
+            lambda: run_halla_analysis_impl(store, "rna", "protein", n_jobs=1, resume=False),
+            setup=fresh_cache,
+        )
+
+        assert result["statistics"]["total_associations_tested"] == f1 * f2
+
+
+class TestStouffer:
+    """Stouffer's meta-analysis across three modalities."""
+
+    @pytest.mark.parametrize("n_features", [
+        pytest.param(1000, id="small"),
+        pytest.param(20000, id="medium"),
+        pytest.param(200000, id="large"),
+    ])
+    def test_stouffer(self, hot_path, n_features):
+        rng = np.random.default_rng(3)
+        modalities = ("rna", "protein", "phospho")
+        p_values = {m: rng.uniform(1e-6, 1, n_features).tolist() for m in modalities}
+        effects = {m: rng.normal(0, 1, n_features).tolist() for m in modalities}
+
+        result = hot_path(lambda: calculate_stouffer_meta_impl(p_values, effects), rounds=5)
+
+        assert len(result["meta_p_values"]) == n_features
+
+
+class TestPreprocessing:
+    """Validation, preprocessing and integration of CSV inputs."""
+
+    SCALES = [
+        pytest.param(15, 1000, id="small"),
+        pytest.param(60, 5000, id="medium"),
+        pytest.param(200, 20000, id="large"),
+    ]
+
+    @pytest.mark.parametrize("n_samples,n_genes", SCALES)
+    def test_validate(self, hot_path, fresh_cache, tmp_path, n_samples, n_genes):
+        paths = _cohort_tables(tmp_path, n_samples, n_genes)
+
+        result = hot_path(
+            lambda: validate_multiomics_data_impl(paths["rna"], paths["protein"], paths["phospho"],
+                                                  paths["metadata"]),
+            setup=fresh_cache,
+        )
+
+        assert result["statistics"]
+
+    @pytest.mark.parametrize("n_samples,n_genes", SCALES)
+    def test_preprocess(self, hot_path, fresh_cache, tmp_path, n_samples, n_genes):
+        paths = _cohort_tables(tmp_path, n_samples, n_genes)
+
+        result = hot_path(
+            lambda: preprocess_multiomics_data_impl(
+                paths["rna"], paths["protein"], paths["phospho"], paths["metadata"],
+                output_dir=str(tmp_path / "preprocessed"),
+            ),
+            setup=fresh_cache,
+        )
+
+        assert result["status"] == "success"
+
+    @pytest.mark.parametrize("n_samples,n_genes", SCALES)
+    def test_integrate(self, hot_path, fresh_cache, tmp_path, n_samples, n_genes):
+        paths = _cohort_tables(tmp_path, n_samples, n_genes)
+
+        result = hot_path(
+            lambda: integrate_omics_data_impl(rna_path=paths["rna"], protein_path=paths["protein"],
+                                              phospho_path=paths["phospho"],
+                                              metadata_path=paths["metadata"]),
+            setup=fresh_cache,
+        )
+
+        assert len(result["common_samples"]) == n_samples
@@ -0,0 +1,168 @@
+"""Benchmarks of the spatial transcriptomics hot paths on synthetic data.
+
+Spots lie on a square grid with a 100 µm pitch; expression is seeded
+negative-binomial counts. Gene panels include the pathway and cell-type
+marker genes, followed by filler genes up to the requested size.
+
+Run:
+    pytest tests/benchmarks/test_spatial_benchmarks.py
+"""
+
+import asyncio
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_spatialtools.server import (
+    OVARIAN_CANCER_CELL_SIGNATURES,
+    OVARIAN_CANCER_PATHWAYS,
+    _calculate_morans_i,
+    _calculate_morans_i_batch,
+    _combat_batch_correction,
+    deconvolve_cell_types,
+    perform_differential_expression,
+    perform_pathway_enrichment,
+)
+
+# Six grid neighbors' worth of distance at a 100 µm pitch
+DISTANCE_THRESHOLD = 150.0
+
+KNOWN_GENES = sorted(
+    {g for db in OVARIAN_CANCER_PATHWAYS.values() for p in db.values() for g in p["genes"]}
+    | {g for sig in OVARIAN_CANCER_CELL_SIGNATURES.values() for g in sig["markers"]}
+)
+
+
+def _coordinates(n_spots):
+    side = int(np.ceil(np.sqrt(n_spots)))
+    grid = np.stack(np.meshgrid(np.arange(side), np.arange(side)), axis=-1).reshape(-1, 2)
+    return grid[:n_spots] * 100.0
+
+
+def _genes(n_genes):
+    return (KNOWN_GENES + [f"GENE{i:05d}" for i in range(max(n_genes - len(KNOWN_GENES), 0))])[:n_genes]
+
+
+def _counts(n_genes, n_spots, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.lognormal(1.0, 1.0, n_genes)
+    return rng.negative_binomial(2, 2 / (2 + means[:, None]), size=(n_genes, n_spots)).astype(float)
+
+
+def _expression_file(tmp_path, n_genes, n_spots):
+    """Spots × genes CSV with coordinates and two regions (tumor_core, stroma)."""
+    coordinates = _coordinates(n_spots)
+    spots = [f"SPOT_{i:05d}" for i in range(n_spots)]
+    data = pd.DataFrame(_counts(n_genes, n_spots).T, index=spots, columns=_genes(n_genes))
+    data.insert(0, "x", coordinates[:, 0])
+    data.insert(1, "y", coordinates[:, 1])
+    data.insert(2, "region", np.where(np.arange(n_spots) % 2, "stroma", "tumor_core"))
+    path = tmp_path / f"expression_{n_genes}x{n_spots}.csv"
+    data.to_csv(path)
+    return str(path), spots
+
+
+class TestMoransI:
+    """Spatial autocorrelation (Moran's I)."""
+
+    @pytest.mark.parametrize("n_spots", [
+        pytest.param(500, id="small"),
+        pytest.param(4000, id="medium"),
+        pytest.param(20000, id="large"),
+    ])
+    def test_morans_i(self, hot_path, n_spots):
+        coordinates = _coordinates(n_spots)
+        values = _counts(1, n_spots)[0]
+
+        morans_i, _, p_value = hot_path(
+            lambda: _calculate_morans_i(values, coordinates, DISTANCE_THRESHOLD), rounds=5)
+
+        assert -1 <= morans_i <= 1 and 0 <= p_value <= 1
+
+    @pytest.mark.parametrize("n_genes,n_spots", [
+        pytest.param(500, 500, id="small"),
+        pytest.param(2000, 2000, id="medium"),
+        pytest.param(8000, 4000, id="large"),
+    ])
+    def test_morans_i_batch(self, hot_path, n_genes, n_spots):
+        coordinates = _coordinates(n_spots)
+        expression = _counts(n_genes, n_spots)
+
+        morans_i, _, _ = hot_path(
+            lambda: _calculate_morans_i_batch(expression, coordinates, DISTANCE_THRESHOLD))
+
+        assert morans_i.shape == (n_genes,)
+
+
+class TestDifferentialExpression:
+    """Per-gene differential expression between two spot groups."""
+
+    @pytest.mark.parametrize("n_genes,n_spots", [
+        pytest.param(200, 200, id="small"),
+        pytest.param(1000, 500, id="medium"),
+        pytest.param(3000, 1000, id="large"),
+    ])
+    def test_differential_expression(self, hot_path, tmp_path, n_genes, n_spots):
+        path, spots = _expression_file(tmp_path, n_genes, n_spots)
+
+        result = hot_path(lambda: asyncio.run(
+            perform_differential_expression(path, spots[::2], spots[1::2])))
+
+        assert result["status"] == "success"
+
+
+class TestBatchCorrection:
+    """ComBat batch correction."""
+
+    @pytest.mark.parametrize("n_genes,n_spots", [
+        pytest.param(500, 300, id="small"),
+        pytest.param(2000, 1200, id="medium"),
+        pytest.param(8000, 3000, id="large"),
+    ])
+    def test_combat(self, hot_path, n_genes, n_spots):
+        data = pd.DataFrame(np.log1p(_counts(n_genes, n_spots)) + 1.0)
+        batch = np.arange(n_spots) % 3
+
+        corrected = hot_path(lambda: _combat_batch_correction(data, batch))
+
+        assert corrected.shape == data.shape
+
+
+class TestPathwayEnrichment:
+    """Fisher's exact pathway enrichment."""
+
+    @pytest.mark.parametrize("n_genes,n_background", [
+        pytest.param(50, 1000, id="small"),
+        pytest.param(500, 20000, id="medium"),
+        pytest.param(5000, 100000, id="large"),
+    ])
+    def test_pathway_enrichment(self, hot_path, n_genes, n_background):
+        background = _genes(n_background)
+        rng = np.random.default_rng(4)
+        gene_list = [background[i] for i in rng.choice(n_background, n_genes, replace=False)]
+
+        async def enrich_all():
+            return [await perform_pathway_enrichment(gene_list, background, database=database)
+                    for database in OVARIAN_CANCER_PATHWAYS]
+
+        results = hot_path(lambda: asyncio.run(enrich_all()), rounds=5)
+
+        assert len(results) == len(OVARIAN_CANCER_PATHWAYS)
+
+
+class TestDeconvolution:
+    """Signature-based cell type deconvolution."""
+
+    @pytest.mark.parametrize("n_genes,n_spots", [
+        pytest.param(300, 500, id="small"),
+        pytest.param(1000, 3000, id="medium"),
+        pytest.param(2000, 10000, id="large"),
+    ])
+    def test_deconvolution(self, hot_path, tmp_path, n_genes, n_spots):
+        path, _ = _expression_file(tmp_path, n_genes, n_spots)
+
+        result = hot_path(lambda: asyncio.run(deconvolve_cell_types(path)))
+
+        assert result["status"] == "success"
+        assert result["spots_analyzed"] == n_spots
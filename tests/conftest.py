@@ -0,0 +1,35 @@
+"""Test-tree configuration shared by every test directory.
+
+Benchmarks (tests/benchmarks) are slow, machine-specific and switch the
+servers out of DRY_RUN, so a plain ``pytest tests`` does not collect them.
+They run when the benchmarks directory or one of its files is named on the
+command line, or with ``--perf``:
+
+    pytest tests/benchmarks
+    pytest tests --perf
+"""
+
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent / "benchmarks"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--perf", action="store_true",
+                     help="Also collect the benchmarks under tests/benchmarks")
+
+
+def _benchmarks_requested(config) -> bool:
+    if config.getoption("--perf"):
+        return True
+    for arg in config.args:
+        path = (config.invocation_params.dir / arg.split("::")[0]).resolve()
+        if path == BENCHMARKS_DIR or BENCHMARKS_DIR in path.parents:
+            return True
+    return False
+
+
+def pytest_ignore_collect(collection_path, config):
+    if collection_path.resolve() == BENCHMARKS_DIR and not _benchmarks_requested(config):
+        return True
+    return None
@@ -0,0 +1,101 @@
+"""Tests for the block-matrix correlation engine used by HAllA."""
+
+import pytest
+import numpy as np
+from scipy import stats
+
+from mcp_multiomics.tools.associations import association_block, prepare_association_features
+from mcp_multiomics.tools.correlation import (
+    correlation_block,
+    correlation_pvalues,
+    prepare_features,
+)
+
+
+@pytest.fixture
+def paired_data():
+    """Two modalities sharing 15 samples, modality 2 partly driven by modality 1."""
+    rng = np.random.default_rng(0)
+    data1 = rng.normal(size=(30, 15))
+    data2 = 0.7 * data1[:20] + rng.normal(size=(20, 15))
+    return data1, data2
+
+
+def _reference(method, x, y):
+    test = stats.spearmanr if method == "spearman" else stats.pearsonr
+    return test(x, y)
+
+
+class TestCorrelationBlock:
+    """Block results must match per-pair SciPy tests."""
+
+    @pytest.mark.parametrize("method", ["spearman", "pearson"])
+    def test_matches_scipy_complete_data(self, paired_data, method):
+        data1, data2 = paired_data
+        r, p, n = correlation_block(prepare_features(data1, method), prepare_features(data2, method))
+
+        assert r.shape == (30, 20)
+        assert (n == 15).all()
+        for i in range(0, 30, 7):
+            for j in range(0, 20, 3):
+                expected_r, expected_p = _reference(method, data1[i], data2[j])
+                assert r[i, j] == pytest.approx(expected_r, abs=1e-12)
+                assert p[i, j] == pytest.approx(expected_p, rel=1e-9, abs=1e-300)
+
+    def test_pairwise_complete_missing_values(self, paired_data):
+        data1, data2 = paired_data
+        rng = np.random.default_rng(1)
+        data1 = np.where(rng.random(data1.shape) < 0.2, np.nan, data1)
+
+        r, p, n = correlation_block(prepare_features(data1, "pearson"),
+                                    prepare_features(data2, "pearson"))
+
+        for i in range(0, 30, 5):
+            valid = ~np.isnan(data1[i])
+            for j in range(0, 20, 4):
+                expected_r, expected_p = stats.pearsonr(data1[i, valid], data2[j, valid])
+                assert n[i, j] == valid.sum()
+                assert r[i, j] == pytest.approx(expected_r, abs=1e-12)
+                assert p[i, j] == pytest.approx(expected_p, rel=1e-9)
+
+    def test_constant_and_sparse_features_are_undefined(self, paired_data):
+        data1, data2 = paired_data
+        data1 = data1.copy()
+        data1[0] = 3.0
+        data1[1, 2:] = np.nan  # Only 2 observed samples
+
+        r, p, _ = correlation_block(prepare_features(data1, "spearman"),
+                                    prepare_features(data2, "spearman"))
+
+        assert np.isnan(r[:2]).all() and np.isnan(p[:2]).all()
+        assert not np.isnan(r[2:]).any()
+
+    def test_row_blocks_equal_full_matrix(self, paired_data):
+        data1, data2 = paired_data
+        prepared1 = prepare_features(data1, "spearman")
+        prepared2 = prepare_features(data2, "spearman")
+
+        full, _, _ = correlation_block(prepared1, prepared2)
+        block, _, _ = correlation_block(prepared1.rows(10, 20), prepared2)
+        np.testing.assert_allclose(block, full[10:20])
+
+    def test_perfect_correlation_has_zero_p_value(self):
+        p = correlation_pvalues(np.array([1.0, -1.0, 0.0]), np.array([10, 10, 10]))
+        np.testing.assert_allclose(p, [0.0, 0.0, 1.0])
+
+
+def test_association_block_correlation_methods(paired_data):
+    """HAllA's dispatcher scores correlation methods with the block engine."""
+    data1, data2 = paired_data
+    data1 = data1[:3].copy()
+    data1[2] = 1.0
+
+    r, p, n = association_block(prepare_association_features(data1, "pearson"),
+                                prepare_association_features(data2[:2], "pearson"))
+
+    expected_r, expected_p = stats.pearsonr(data1[0], data2[1])
+    assert r[0, 1] == pytest.approx(expected_r)
+    assert p[0, 1] == pytest.approx(expected_p)
+    assert n[0, 1] == 15
+    assert np.isnan(r[2]).all()
+    assert not np.isnan(r[:2]).any()
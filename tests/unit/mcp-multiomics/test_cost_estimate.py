@@ -0,0 +1,43 @@
+"""Tests for runtime-model-based cost estimation."""
+
+import pytest
+
+from mcp_multiomics.config import config
+from mcp_multiomics.server import estimate_analysis_cost
+
+
+class TestEstimateAnalysisCost:
+    """Tests for the estimate_analysis_cost tool."""
+
+    @pytest.mark.asyncio
+    async def test_predicts_runtime_per_tool(self, monkeypatch):
+        monkeypatch.setattr(config, "max_features", 2000)
+
+        result = await estimate_analysis_cost(
+            num_samples=20, modalities=["rna", "protein", "phospho"],
+            include_halla=True, include_pca=True, num_features={"rna": 3000},
+        )
+
+        tools = [run["tool"] for run in result["runtime"]]
+        assert tools == ["integrate_omics_data"] + ["run_halla_analysis"] * 3 + ["run_multiomics_pca"]
+        # Prefiltered to max_features; unspecified modalities use typical counts
+        assert result["runtime"][1]["sizes"] == {"f1": 2000, "f2": 2000, "n": 20}
+        assert result["runtime"][0]["sizes"] == {"features": 3000 + 7000 + 5000, "n": 20}
+        assert result["estimated_wall_seconds"] == pytest.approx(
+            sum(run["wall_seconds"] for run in result["runtime"]))
+        assert result["scheduling"]["fits_instance"]
+
+    @pytest.mark.asyncio
+    async def test_flags_oversized_jobs(self, monkeypatch):
+        monkeypatch.setattr(config, "max_features", 10 ** 6)
+        monkeypatch.setattr(config, "timeout_seconds", 600)
+
+        result = await estimate_analysis_cost(
+            num_samples=500, modalities=["rna", "protein"], include_halla=True,
+            num_features={"rna": 200000, "protein": 100000}, instance_type="aws_batch_small",
+        )
+
+        assert result["scheduling"]["oversized_tools"] == ["run_halla_analysis"]
+        assert result["scheduling"]["background_job_recommended"] == ["run_halla_analysis"]
+        assert result["scheduling"]["extrapolated"]
+        assert "aws_batch_small" in result["recommendation"]
@@ -0,0 +1,200 @@
+"""Tests for the content-addressed integrated-dataset cache."""
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.dataset_cache import ACCESS_FILE, DatasetCache, dataset_key, dataset_lease
+from mcp_multiomics.tools.integration import (
+    integrate_omics_data_impl,
+    list_integrated_datasets_impl,
+)
+from mcp_multiomics.tools.pca import run_multiomics_pca_impl
+
+
+def _frames(seed, n_features=20):
+    rng = np.random.default_rng(seed)
+    return {"rna": pd.DataFrame(rng.normal(size=(n_features, 8)),
+                                index=[f"GENE_{i}" for i in range(n_features)],
+                                columns=[f"S{i}" for i in range(8)])}
+
+
+def _set_last_access(cache, key, timestamp):
+    os.utime(cache.path(key) / ACCESS_FILE, (timestamp, timestamp))
+
+
+class TestDatasetCache:
+    """Tests for keys, input hashing and LRU eviction."""
+
+    def test_key_depends_on_inputs_and_params(self):
+        key = dataset_key({"rna": "abc"}, {"normalize": True})
+
+        assert key == dataset_key({"rna": "abc"}, {"normalize": True})
+        assert key != dataset_key({"rna": "abd"}, {"normalize": True})
+        assert key != dataset_key({"rna": "abc"}, {"normalize": False})
+
+    def test_hash_inputs_tracks_file_changes(self, tmp_path):
+        cache = DatasetCache(tmp_path / "datasets")
+        data_file = tmp_path / "rna.csv"
+        data_file.write_text("gene_id,S1\nA,1\n")
+
+        first = cache.hash_inputs({"rna": str(data_file)})
+        assert cache.hash_inputs({"rna": str(data_file)}) == first
+
+        data_file.write_text("gene_id,S1\nA,2\n")
+        os.utime(data_file, ns=(0, 10**9))
+        assert cache.hash_inputs({"rna": str(data_file)}) != first
+        with pytest.raises(FileNotFoundError):
+            cache.hash_inputs({"rna": str(tmp_path / "missing.csv")})
+
+    def test_get_put_and_sessions(self, tmp_path):
+        cache = DatasetCache(tmp_path / "datasets")
+        assert cache.get("k1") is None
+
+        cache.put("k1", _frames(0), info={"params": {}}, session_id="patient_a")
+        store = cache.get("k1", session_id="patient_b")
+
+        assert store.modalities == ["rna"]
+        assert store.manifest["dataset_id"] == "k1"
+        assert [d["dataset_id"] for d in cache.list(session_id="patient_b")] == ["k1"]
+        assert cache.list(session_id="patient_c") == []
+        assert cache.list()[0]["sessions"] == ["patient_a", "patient_b"]
+
+    def test_lru_eviction(self, tmp_path):
+        unbounded = DatasetCache(tmp_path / "datasets")
+        unbounded.put("old", _frames(0))
+        unbounded.put("used", _frames(1))
+        size = unbounded.total_bytes() // 2
+        _set_last_access(unbounded, "old", 1_000)
+        _set_last_access(unbounded, "used", 3_000)
+
+        cache = DatasetCache(tmp_path / "datasets", max_bytes=int(2.5 * size))
+        cache.put("new", _frames(2))
+
+        assert sorted(d["dataset_id"] for d in cache.list()) == ["new", "used"]
+        assert not cache.path("old").exists()
+
+    def test_new_dataset_is_never_evicted(self, tmp_path):
+        cache = DatasetCache(tmp_path / "datasets", max_bytes=1)
+        cache.put("a", _frames(0))
+        cache.put("b", _frames(1))
+
+        assert [d["dataset_id"] for d in cache.list()] == ["b"]
+
+    def test_forgets_removed_datasets(self, tmp_path):
+        cache = DatasetCache(tmp_path / "datasets", max_bytes=10**9)
+        cache.put("a", _frames(0))
+        shutil.rmtree(cache.path("a"))
+        cache.put("b", _frames(1))
+
+        assert [d["dataset_id"] for d in cache.list()] == ["b"]
+        assert cache.total_bytes() > 0
+
+    def test_derived_results_count_and_go_with_their_dataset(self, tmp_path):
+        unbounded = DatasetCache(tmp_path / "datasets")
+        unbounded.put("old", _frames(0))
+        size = unbounded.total_bytes()
+        derived = tmp_path / "halla" / "old_run"
+        derived.mkdir(parents=True)
+        (derived / "associations.npy").write_bytes(b"x" * 4 * size)
+        unbounded.add_derived("old", derived)
+        assert unbounded.total_bytes() == 5 * size
+        _set_last_access(unbounded, "old", 1_000)
+
+        # Budget fits both datasets, but not the old one's derived results
+        cache = DatasetCache(tmp_path / "datasets", max_bytes=3 * size)
+        cache.put("new", _frames(1))
+
+        assert [d["dataset_id"] for d in cache.list()] == ["new"]
+        assert not derived.exists()
+
+    def test_leased_dataset_is_not_evicted(self, tmp_path):
+        cache = DatasetCache(tmp_path / "datasets", max_bytes=1)
+        cache.put("a", _frames(0))
+
+        with cache.lease("a"):
+            assert cache.leased("a")
+            cache.put("b", _frames(1))
+            assert sorted(d["dataset_id"] for d in cache.list()) == ["a", "b"]
+        assert not cache.leased("a")
+
+        cache.put("c", _frames(2))
+        assert [d["dataset_id"] for d in cache.list()] == ["c"]
+
+    def test_concurrent_writer_keeps_first_store(self, tmp_path, monkeypatch):
+        """A writer that missed the cache never replaces a store another writer returned."""
+        cache = DatasetCache(tmp_path / "datasets")
+        first = cache.put("k1", _frames(0))
+        values_inode = (first.path / "rna" / "values.npy").stat().st_ino
+
+        # Second writer checked before the first store was renamed into place
+        monkeypatch.setattr("mcp_multiomics.tools.dataset_cache.is_integrated_store", lambda path: False)
+        second = cache.put("k1", _frames(0))
+
+        assert second.path == first.path
+        assert (first.path / "rna" / "values.npy").stat().st_ino == values_inode
+        assert sorted(p.name for p in cache.root.iterdir() if p.is_dir()) == ["k1"]
+
+    def test_parallel_puts_of_one_key(self, tmp_path):
+        cache = DatasetCache(tmp_path / "datasets")
+        barrier = threading.Barrier(4)
+
+        def put():
+            barrier.wait()
+            return cache.put("k1", _frames(0)).load("rna")
+
+        with ThreadPoolExecutor(4) as pool:
+            loaded = list(pool.map(lambda _: put(), range(4)))
+
+        for frame in loaded:
+            pd.testing.assert_frame_equal(frame, _frames(0)["rna"])
+        assert sorted(p.name for p in cache.root.iterdir() if p.is_dir()) == ["k1"]
+
+
+class TestIntegrationCache:
+    """Tests for dataset reuse by integrate_omics_data."""
+
+    def test_same_inputs_reuse_dataset(self, rna_path, protein_path):
+        first = integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path,
+                                          session_id="patient_a")
+        second = integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path,
+                                           session_id="patient_b")
+
+        assert first["cache_hit"] is False and second["cache_hit"] is True
+        assert second["cache_path"] == first["cache_path"]
+        assert second["feature_counts"] == first["feature_counts"]
+        assert second["qc_metrics"] == first["qc_metrics"]
+
+        listing = list_integrated_datasets_impl()
+        assert len(listing["datasets"]) == 1
+        assert listing["datasets"][0]["sessions"] == ["patient_a", "patient_b"]
+
+    def test_different_parameters_get_separate_datasets(self, rna_path):
+        normalized = integrate_omics_data_impl(rna_path=rna_path, normalize=True)
+        raw = integrate_omics_data_impl(rna_path=rna_path, normalize=False)
+
+        assert raw["cache_hit"] is False
+        assert raw["dataset_id"] != normalized["dataset_id"]
+        assert raw["cache_path"].startswith(str(config.cache_dir / "datasets"))
+        assert len(list_integrated_datasets_impl()["datasets"]) == 2
+
+    def test_eviction_removes_derived_results_unless_leased(self, rna_path, protein_path, monkeypatch):
+        monkeypatch.setattr(config, "dry_run", False)
+        first = integrate_omics_data_impl(rna_path=rna_path)
+        pca = run_multiomics_pca_impl(first["cache_path"], n_components=2)
+        monkeypatch.setattr(config, "cache_max_gb", 1e-12)
+
+        with dataset_lease(first["cache_path"]):
+            integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path)
+        assert os.path.exists(pca["projection_path"])
+
+        integrate_omics_data_impl(rna_path=rna_path, normalize=False)
+        assert not os.path.exists(first["cache_path"])
+        assert not os.path.exists(pca["projection_path"])
+        assert not os.path.exists(pca["plot_path"])
@@ -0,0 +1,176 @@
+"""Tests for the feature-selection prefilter."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.feature_selection import (
+    feature_statistics,
+    rank_features,
+    select_features,
+    trend_residuals,
+)
+from mcp_multiomics.tools.halla import run_halla_analysis_impl
+from mcp_multiomics.tools.integrated_store import IntegratedDataStore
+from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.tools.pca import run_multiomics_pca_impl
+from mcp_multiomics.tools.utils import ModalitySource
+
+
+@pytest.fixture
+def blocks():
+    """RNA whose first 20 genes are highly variable, plus a small protein block."""
+    rng = np.random.default_rng(0)
+    samples = [f"S{i:02d}" for i in range(24)]
+    rna = pd.DataFrame(rng.normal(5, 1, size=(200, 24)), index=[f"G{i}" for i in range(200)],
+                       columns=samples)
+    rna.iloc[:20] *= 4
+    rna.iloc[20, :18] = np.nan  # Highly variable but mostly missing
+    rna.iloc[20, 18:] = [-50, 50, -50, 50, -50, 50]
+    protein = pd.DataFrame(rng.normal(size=(15, 24)), index=[f"P{i}" for i in range(15)],
+                           columns=samples)
+    return {"rna": rna, "protein": protein}
+
+
+@pytest.fixture
+def source(blocks, tmp_path):
+    path = tmp_path / "store"
+    IntegratedDataStore.write(path, blocks)
+    return ModalitySource(str(path))
+
+
+class TestStatistics:
+    """Tests for per-feature statistics and scores."""
+
+    def test_statistics_match_numpy(self, source, blocks):
+        stats = feature_statistics(source, "rna", include_mad=True)
+
+        values = blocks["rna"].to_numpy()
+        median = np.nanmedian(values, axis=1, keepdims=True)
+        assert list(stats.index) == list(blocks["rna"].index)
+        np.testing.assert_allclose(stats["mean"], np.nanmean(values, axis=1))
+        np.testing.assert_allclose(stats["variance"], np.nanvar(values, axis=1, ddof=1))
+        np.testing.assert_allclose(stats["mad"], np.nanmedian(np.abs(values - median), axis=1))
+        assert stats.loc["G20", "missing_fraction"] == pytest.approx(0.75)
+
+    def test_trend_residuals_flag_variance_above_trend(self):
+        rng = np.random.default_rng(1)
+        mean = rng.uniform(0, 10, 500)
+        variance = np.exp(0.5 * mean) * rng.lognormal(0, 0.1, 500)
+        variance[:5] *= 20
+
+        residuals = trend_residuals(mean, variance)
+
+        assert set(np.argsort(-residuals)[:5]) == set(range(5))
+        assert abs(np.median(residuals)) < 0.1
+
+
+class TestSelection:
+    """Tests for ranking, persistence and per-modality selection."""
+
+    def test_ranking_is_persisted_and_excludes_missing(self, source, monkeypatch):
+        ranking = rank_features(source, "rna", "variance")
+
+        assert set(ranking.index[:20]) == {f"G{i}" for i in range(20)}
+        assert "G20" not in ranking.index
+        assert len(list((config.cache_dir / "feature_selection").glob("*.npz"))) == 1
+
+        def fail(*args, **kwargs):
+            raise AssertionError("statistics recomputed")
+
+        monkeypatch.setattr("mcp_multiomics.tools.feature_selection.feature_statistics", fail)
+        pd.testing.assert_series_equal(rank_features(source, "rna", "variance"), ranking)
+
+    def test_concurrent_rankings_of_one_dataset(self, source, monkeypatch):
+        import mcp_multiomics.tools.feature_selection as feature_selection
+
+        barrier = threading.Barrier(4)
+        score = feature_selection.score_features
+
+        def score_together(stats, method):
+            barrier.wait()  # All writers publish the same ranking at once
+            return score(stats, method)
+
+        monkeypatch.setattr(feature_selection, "score_features", score_together)
+        ranking_dir = config.cache_dir / "feature_selection"
+        for _ in range(30):
+            with ThreadPoolExecutor(4) as pool:
+                rankings = list(pool.map(lambda _: rank_features(source, "rna", "mad"), range(4)))
+
+            for ranking in rankings[1:]:
+                pd.testing.assert_series_equal(ranking, rankings[0])
+            assert len(list(ranking_dir.iterdir())) == 1
+            for path in ranking_dir.iterdir():
+                path.unlink()
+
+    def test_only_large_modalities_are_reduced(self, source):
+        selection = select_features(source, ["rna", "protein"], max_features=20, method="mad")
+
+        assert list(selection) == ["rna"]
+        assert selection["rna"] == [f"G{i}" for i in range(20)]
+        with pytest.raises(ValueError, match="Unknown feature selection method"):
+            select_features(source, ["rna"], max_features=20, method="entropy")
+
+    def test_defaults_to_config_limit(self, source, monkeypatch):
+        monkeypatch.setattr(config, "max_features", 30)
+
+        selection = select_features(source, ["rna", "protein"])
+
+        assert len(selection["rna"]) == 30
+
+
+class TestNormalizedStores:
+    """Tests for rankings of datasets z-scored at integration."""
+
+    def test_rankings_use_statistics_before_zscoring(self, blocks, tmp_path):
+        rna = blocks["rna"].drop(index="G20")
+        rna_path = tmp_path / "rna.csv"
+        rna.rename_axis("gene_id").to_csv(rna_path)
+        integrated = integrate_omics_data_impl(rna_path=str(rna_path), normalize=True)
+        source = ModalitySource(integrated["cache_path"])
+
+        stored = source.load("rna")
+        assert np.allclose(stored.var(axis=1), 1.0)
+        stats = feature_statistics(source, "rna", include_mad=True)
+        pd.testing.assert_series_equal(stats["variance"], rna.var(axis=1), check_names=False)
+        assert set(rank_features(source, "rna", "variance").index[:20]) == set(rna.index[:20])
+        assert set(rank_features(source, "rna", "mad").index[:20]) == set(rna.index[:20])
+
+    def test_zscored_store_without_statistics(self, blocks, tmp_path):
+        zscored = {m: df.sub(df.mean(axis=1), axis=0).div(df.std(axis=1), axis=0)
+                   for m, df in blocks.items()}
+        path = tmp_path / "zscored"
+        IntegratedDataStore.write(path, zscored, info={"params": {"normalize": True}})
+        source = ModalitySource(str(path))
+
+        for method in ("variance", "cv", "trend"):
+            with pytest.raises(ValueError, match="normalize=True"):
+                rank_features(source, "protein", method)
+        assert len(rank_features(source, "protein", "mad")) == 15
+        assert len(rank_features(source, "protein", "missingness")) == 15
+
+
+class TestToolPrefilter:
+    """Tests for the prefilter inside the analysis tools."""
+
+    def test_halla_reports_prefilter(self, source, monkeypatch):
+        monkeypatch.setattr(config, "dry_run", False)
+        monkeypatch.setattr(config, "max_features", 40)
+
+        result = run_halla_analysis_impl(source.data_path, "rna", "protein", n_jobs=1)
+
+        assert result["feature_prefilter"]["features_before"] == {"rna": 200, "protein": 15}
+        assert result["feature_prefilter"]["features_after"] == {"rna": 40, "protein": 15}
+        assert result["statistics"]["total_associations_tested"] == 40 * 15
+
+    def test_pca_uses_selected_features(self, source, monkeypatch):
+        monkeypatch.setattr(config, "max_features", 40)
+
+        result = run_multiomics_pca_impl(source.data_path, n_components=2, feature_selection="mad")
+
+        assert result["statistics"]["n_features"] == 40 + 15
+        assert result["statistics"]["feature_selection"] == "mad"
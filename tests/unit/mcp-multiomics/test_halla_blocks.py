@@ -0,0 +1,176 @@
+"""Tests for HAllA hierarchical block discovery."""
+
+import pickle
+
+import pytest
+import numpy as np
+import pandas as pd
+from scipy import stats
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import pdist
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.associations import prepare_association_features
+from mcp_multiomics.tools.halla import run_halla_analysis_impl
+from mcp_multiomics.tools.halla_blocks import (
+    build_tree,
+    discover_blocks,
+    feature_distances,
+    find_blocks,
+)
+from mcp_multiomics.tools.halla_scheduler import TileScheduler
+from mcp_multiomics.tools.halla_store import AssociationStore, TopKAssociations
+
+
+@pytest.fixture
+def planted():
+    """Two latent factors, each driving a feature cluster in both modalities."""
+    rng = np.random.default_rng(0)
+    factors = rng.normal(size=(2, 30))
+    data1 = rng.normal(size=(40, 30))
+    data2 = rng.normal(size=(25, 30))
+    data1[:8] += 2 * factors[0]
+    data2[:5] += 2 * factors[0]
+    data1[20:26] += 2 * factors[1]
+    data2[10:16] -= 2 * factors[1]
+    return data1, data2
+
+
+def _run_blocks(tmp_path, data1, data2, **kwargs):
+    prepared1 = prepare_association_features(data1, "spearman")
+    prepared2 = prepare_association_features(data2, "spearman")
+    store = AssociationStore.create(tmp_path / "store", range(len(data1)), range(len(data2)))
+    TileScheduler(prepared1, prepared2, 16, 16, n_jobs=1).run(
+        store, TopKAssociations(10), fingerprint="run", resume=False,
+    )
+    return discover_blocks(
+        prepared1, prepared2, store,
+        [f"GENE_{i}" for i in range(len(data1))], [f"PROT_{i}" for i in range(len(data2))],
+        **kwargs,
+    )
+
+
+def _jaccard(expected, found):
+    found = set(found)
+    return len(expected & found) / len(expected | found)
+
+
+class TestFeatureTree:
+    """Tests for condensed distances and leaf-ordered trees."""
+
+    def test_distances_match_pdist(self, planted):
+        data1, _ = planted
+        prepared = prepare_association_features(data1, "spearman")
+
+        condensed = feature_distances(prepared, block_rows=7)
+
+        ranks = stats.rankdata(data1, axis=1)
+        expected = 1 - np.abs(1 - pdist(ranks, metric="correlation"))
+        assert condensed.dtype == np.float32
+        np.testing.assert_allclose(condensed, expected, atol=1e-6)
+
+    def test_nodes_are_contiguous_leaf_ranges(self, planted):
+        data1, _ = planted
+        tree = build_tree(prepare_association_features(data1, "spearman"))
+
+        assert sorted(tree.order) == list(range(40))
+        assert tree.size[tree.root] == 40
+        _, nodes = hierarchy.to_tree(
+            hierarchy.linkage(feature_distances(prepare_association_features(data1, "spearman")),
+                              method="average"),
+            rd=True,
+        )
+        for node in nodes[40::5]:
+            assert set(tree.features(node.id)) == set(node.pre_order())
+
+    def test_single_feature(self):
+        tree = build_tree(prepare_association_features(np.arange(10.0)[None, :], "pearson"))
+        assert tree.root == 0 and tree.is_leaf(0)
+
+
+class TestFindBlocks:
+    """Tests for the top-down block search."""
+
+    def test_all_significant_is_one_block(self, planted):
+        data1, data2 = planted
+        tree1 = build_tree(prepare_association_features(data1[:6], "spearman"))
+        tree2 = build_tree(prepare_association_features(data2[:4], "spearman"))
+
+        blocks = find_blocks(tree1, tree2, np.full((6, 4), 0.001, dtype=np.float32))
+        assert len(blocks) == 1
+        assert blocks[0]["n_pairs"] == blocks[0]["n_significant"] == 24
+
+    def test_nothing_significant(self, planted):
+        data1, data2 = planted
+        tree1 = build_tree(prepare_association_features(data1[:6], "spearman"))
+        tree2 = build_tree(prepare_association_features(data2[:4], "spearman"))
+
+        assert find_blocks(tree1, tree2, np.full((6, 4), 0.5, dtype=np.float32)) == []
+
+    def test_fnr_threshold(self, planted):
+        """One non-significant pair in 24 stays within a 20% FNR, not within 0%."""
+        data1, data2 = planted
+        tree1 = build_tree(prepare_association_features(data1[:6], "spearman"))
+        tree2 = build_tree(prepare_association_features(data2[:4], "spearman"))
+        q_values = np.full((6, 4), 0.001, dtype=np.float32)
+        q_values[2, 1] = 0.9
+
+        assert len(find_blocks(tree1, tree2, q_values, fnr_threshold=0.2)) == 1
+        strict = find_blocks(tree1, tree2, q_values, fnr_threshold=0.0)
+        assert len(strict) > 1
+        assert sum(block["n_pairs"] for block in strict) == 23
+
+
+class TestDiscoverBlocks:
+    """End-to-end block discovery on planted associations."""
+
+    def test_recovers_planted_blocks(self, tmp_path, planted):
+        result = _run_blocks(tmp_path, *planted)
+
+        assert result["blocks_found"] >= 2
+        top = result["blocks"][:2]
+        planted_blocks = [
+            ({f"GENE_{i}" for i in range(8)}, {f"PROT_{i}" for i in range(5)}),
+            ({f"GENE_{i}" for i in range(20, 26)}, {f"PROT_{i}" for i in range(10, 16)}),
+        ]
+        for genes, proteins in planted_blocks:
+            # FNR tolerance lets a block gain or lose a feature at the margin
+            assert any(
+                _jaccard(genes, b["features1"]) >= 0.7 and _jaccard(proteins, b["features2"]) >= 0.7
+                for b in top
+            )
+        signs = sorted(np.sign(b["mean_association"]) for b in top)
+        assert signs == [-1, 1]
+        for block in result["blocks"]:
+            assert block["fraction_significant"] >= 0.8
+            assert block["best_q_value"] <= 0.05
+        assert [b["block_id"] for b in result["blocks"]] == list(range(1, len(result["blocks"]) + 1))
+
+    def test_noise_has_no_blocks(self, tmp_path):
+        rng = np.random.default_rng(3)
+        result = _run_blocks(tmp_path, rng.normal(size=(30, 20)), rng.normal(size=(20, 20)))
+
+        assert result["blocks"] == []
+        assert result["significant_pairs"] == 0
+
+    def test_max_blocks(self, tmp_path, planted):
+        result = _run_blocks(tmp_path, *planted, max_blocks=1)
+        assert len(result["blocks"]) == 1
+        assert result["blocks_found"] >= 2
+
+
+def test_halla_returns_blocks(tmp_path, monkeypatch, planted):
+    monkeypatch.setattr(config, "dry_run", False)
+    data1, data2 = planted
+    data_path = tmp_path / "integrated.pkl"
+    with open(data_path, "wb") as f:
+        pickle.dump({
+            "rna": pd.DataFrame(data1, index=[f"GENE_{i}" for i in range(40)]),
+            "protein": pd.DataFrame(data2, index=[f"PROT_{i}" for i in range(25)]),
+        }, f)
+
+    result = run_halla_analysis_impl(str(data_path), "rna", "protein", chunk_size=16, n_jobs=1)
+
+    assert result["blocks"]
+    assert result["statistics"]["blocks_found"] == result["clusters"]["blocks_found"]
+    assert set(result["blocks"][0]["features1"]) <= {f"GENE_{i}" for i in range(40)}
@@ -0,0 +1,157 @@
+"""Tests for the 2-D HAllA tile scheduler."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+
+from mcp_multiomics.tools.correlation import correlation_block, prepare_features
+from mcp_multiomics.tools.halla_scheduler import (
+    CHECKPOINT_FILE,
+    TileScheduler,
+    _mp_context,
+    data_fingerprint,
+    plan_tiles,
+    resolve_n_jobs,
+)
+from mcp_multiomics.tools.halla_store import AssociationStore, TopKAssociations
+
+
+@pytest.fixture
+def prepared():
+    """Prepared modalities of 23 and 17 features; modality 1 has missing values."""
+    rng = np.random.default_rng(0)
+    data1 = rng.normal(size=(23, 10))
+    data1[rng.random(data1.shape) < 0.1] = np.nan
+    data2 = rng.normal(size=(17, 10))
+    return prepare_features(data1, "pearson"), prepare_features(data2, "pearson")
+
+
+def _new_store(tmp_path, prepared1, prepared2):
+    return AssociationStore.create(
+        tmp_path / "store", range(prepared1.n_features), range(prepared2.n_features),
+    )
+
+
+def _sorted_pairs(records):
+    records = np.asarray(records)
+    order = np.lexsort((records["feature2"], records["feature1"]))
+    return records[order]
+
+
+class TestPlanning:
+    """Tests for tile planning helpers."""
+
+    def test_tiles_cover_matrix_once(self):
+        tiles = plan_tiles(23, 17, 10, 8)
+
+        assert len(tiles) == 3 * 3
+        covered = np.zeros((23, 17), dtype=int)
+        for tile in tiles:
+            covered[tile.row_start:tile.row_stop, tile.col_start:tile.col_stop] += 1
+        assert (covered == 1).all()
+        assert sum(tile.n_tests for tile in tiles) == 23 * 17
+        assert [tile.tile_id for tile in tiles] == list(range(9))
+
+    def test_invalid_tile_size(self):
+        with pytest.raises(ValueError):
+            plan_tiles(10, 10, 0, 5)
+
+    def test_resolve_n_jobs(self):
+        assert resolve_n_jobs(1) == 1
+        assert resolve_n_jobs(0) == 1
+        assert resolve_n_jobs(-1) >= 1
+
+    def test_fingerprint_tracks_data_and_parameters(self, prepared):
+        prepared1, _ = prepared
+        base = data_fingerprint(prepared1.values, prepared1.mask, chunk_size=10)
+
+        assert base == data_fingerprint(prepared1.values, prepared1.mask, chunk_size=10)
+        assert base != data_fingerprint(prepared1.values, prepared1.mask, chunk_size=5)
+        assert base != data_fingerprint(prepared1.values * 2, prepared1.mask, chunk_size=10)
+
+
+class TestTileScheduler:
+    """Tests for tile execution, checkpoints and progress."""
+
+    @pytest.mark.parametrize("n_jobs", [1, 2])
+    def test_matches_single_block(self, tmp_path, prepared, n_jobs):
+        """Serial and pooled (shared-memory) runs store every defined pair once."""
+        prepared1, prepared2 = prepared
+        store = _new_store(tmp_path, prepared1, prepared2)
+        top = TopKAssociations(20)
+
+        summary = TileScheduler(prepared1, prepared2, 10, 8, n_jobs=n_jobs).run(
+            store, top, fingerprint="run", resume=False,
+        )
+
+        corr, p_values, _ = correlation_block(prepared1, prepared2)
+        stored = _sorted_pairs(store.records())
+        assert summary["n_records"] == len(stored) == np.count_nonzero(~np.isnan(corr))
+        np.testing.assert_allclose(stored["p_value"],
+                                   p_values[stored["feature1"], stored["feature2"]])
+        np.testing.assert_array_equal(top.result()["p_value"], np.sort(stored["p_value"])[:20])
+        assert summary["n_tiles"] == 9 and summary["tiles_resumed"] == 0
+
+    def test_pool_from_a_job_thread_does_not_fork(self, tmp_path, prepared):
+        prepared1, prepared2 = prepared
+        store = _new_store(tmp_path, prepared1, prepared2)
+
+        with ThreadPoolExecutor(1) as jobs:
+            summary = jobs.submit(TileScheduler(prepared1, prepared2, 10, 8, n_jobs=2).run,
+                                  store, TopKAssociations(5), fingerprint="run").result(60)
+
+        assert _mp_context().get_start_method() in ("forkserver", "spawn")
+        assert summary["n_records"] == len(store.records())
+
+    def test_resumes_from_completed_tiles(self, tmp_path, prepared):
+        """An interrupted run restarts where its checkpoint left off."""
+        prepared1, prepared2 = prepared
+        fingerprint = data_fingerprint(prepared1.values, prepared1.mask, prepared2.values)
+
+        def interrupt(state):
+            if state["tiles_completed"] == 4:
+                raise KeyboardInterrupt
+
+        store = _new_store(tmp_path, prepared1, prepared2)
+        with pytest.raises(KeyboardInterrupt):
+            TileScheduler(prepared1, prepared2, 10, 8, n_jobs=1,
+                          progress_callback=interrupt).run(store, TopKAssociations(20), fingerprint)
+
+        checkpoint = TileScheduler.load_checkpoint(store, fingerprint)
+        assert checkpoint["completed_tiles"] == [0, 1, 2, 3]
+        # Simulate a partial write after the last checkpoint
+        store.append(np.asarray(store.records()[:5]))
+
+        top = TopKAssociations(20)
+        summary = TileScheduler(prepared1, prepared2, 10, 8, n_jobs=1).run(store, top, fingerprint)
+
+        assert summary["tiles_resumed"] == 4
+        assert len(summary["tile_details"]) == 5
+        corr, _, _ = correlation_block(prepared1, prepared2)
+        stored = _sorted_pairs(store.records())
+        assert len(stored) == np.count_nonzero(~np.isnan(corr))
+        assert len(np.unique(stored[["feature1", "feature2"]])) == len(stored)
+        np.testing.assert_array_equal(top.result()["p_value"], np.sort(stored["p_value"])[:20])
+
+    def test_checkpoint_ignored_for_other_data(self, tmp_path, prepared):
+        prepared1, prepared2 = prepared
+        store = _new_store(tmp_path, prepared1, prepared2)
+        TileScheduler(prepared1, prepared2, 10, 8, n_jobs=1).run(store, TopKAssociations(5), "old")
+
+        with open(store.path / CHECKPOINT_FILE) as f:
+            assert len(json.load(f)["completed_tiles"]) == 9
+        assert TileScheduler.load_checkpoint(store, "new") is None
+
+    def test_progress_reports_eta(self, tmp_path, prepared):
+        prepared1, prepared2 = prepared
+        states = []
+        TileScheduler(prepared1, prepared2, 10, 8, n_jobs=1, progress_callback=states.append).run(
+            _new_store(tmp_path, prepared1, prepared2), TopKAssociations(5), "run",
+        )
+
+        assert [s["tiles_completed"] for s in states] == list(range(1, 10))
+        assert states[-1]["fraction_complete"] == pytest.approx(1.0)
+        assert all(s["total_tiles"] == 9 for s in states)
+        assert all(s["eta_seconds"] is None or s["eta_seconds"] >= 0 for s in states)
@@ -0,0 +1,176 @@
+"""Tests for the out-of-core HAllA result store."""
+
+import pickle
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.halla import query_halla_associations_impl, run_halla_analysis_impl
+from mcp_multiomics.tools.halla_store import (
+    ASSOCIATION_DTYPE,
+    AssociationStore,
+    TopKAssociations,
+    make_records,
+)
+
+
+def _random_records(n, chunk_id=0, seed=0):
+    rng = np.random.default_rng(seed)
+    return make_records(
+        feature1=rng.integers(0, 10, n),
+        feature2=rng.integers(0, 5, n),
+        correlation=rng.uniform(-1, 1, n),
+        p_value=rng.random(n),
+        n_samples=np.full(n, 15),
+        chunk_id=chunk_id,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Store with 3 chunks of random records over 10 × 5 features."""
+    store = AssociationStore.create(
+        tmp_path / "store",
+        [f"GENE_{i}" for i in range(10)],
+        [f"PROT_{i}" for i in range(5)],
+        metadata={"modality1": "rna", "modality2": "protein"},
+    )
+    for chunk_id in range(3):
+        store.append(_random_records(400, chunk_id=chunk_id, seed=chunk_id))
+    store.finalize(total_associations_tested=1200)
+    return store
+
+
+class TestTopKAssociations:
+    """Tests for the bounded top-K selection."""
+
+    def test_matches_full_sort(self):
+        """Pushing batches keeps exactly the k smallest p-values."""
+        records = np.concatenate([_random_records(500, seed=s) for s in range(4)])
+        top = TopKAssociations(50)
+        for start in range(0, len(records), 300):
+            top.push(records[start:start + 300])
+
+        result = top.result()
+        assert len(result) == 50
+        np.testing.assert_array_equal(result["p_value"], np.sort(records["p_value"])[:50])
+
+    def test_fewer_records_than_k(self):
+        top = TopKAssociations(100)
+        top.push(_random_records(10))
+        assert len(top) == 10
+        assert (np.diff(top.result()["p_value"]) >= 0).all()
+
+    def test_zero_k_keeps_nothing(self):
+        top = TopKAssociations(0)
+        top.push(_random_records(10))
+        assert len(top.result()) == 0
+
+
+class TestAssociationStore:
+    """Tests for writing, memory-mapping and querying the store."""
+
+    def test_round_trip(self, store, tmp_path):
+        reopened = AssociationStore(tmp_path / "store")
+
+        assert len(reopened) == 1200
+        assert reopened.metadata["complete"] is True
+        assert reopened.metadata["total_associations_tested"] == 1200
+        records = reopened.records()
+        assert isinstance(records, np.memmap)
+        np.testing.assert_array_equal(records[400:800], _random_records(400, chunk_id=1, seed=1))
+
+    def test_rejects_wrong_dtype(self, store):
+        with pytest.raises(ValueError, match="ASSOCIATION_DTYPE"):
+            store.append(np.zeros(3))
+
+    def test_missing_store(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            AssociationStore(tmp_path / "nowhere").metadata
+
+    def test_query_filters(self, store):
+        records = np.asarray(store.records())
+        result = store.query(max_p_value=0.1, min_abs_correlation=0.5, feature="GENE_3", limit=1000)
+
+        expected = ((records["p_value"] <= 0.1) & (np.abs(records["correlation"]) >= 0.5)
+                    & (records["feature1"] == 3))
+        assert result["total_matching"] == expected.sum()
+        assert len(result["associations"]) == expected.sum()
+        for association in result["associations"]:
+            assert association["feature1"] == "GENE_3"
+            assert association["p_value_nominal"] <= 0.1
+            assert abs(association["correlation"]) >= 0.5
+            assert association["feature1_modality"] == "rna"
+
+    def test_query_feature_of_second_modality(self, store):
+        result = store.query(feature="PROT_2", limit=5000)
+        assert result["total_matching"] == (np.asarray(store.records())["feature2"] == 2).sum()
+        assert all(a["feature2"] == "PROT_2" for a in result["associations"])
+
+    def test_query_pages_sorted_by_p_value(self, store):
+        all_p = np.sort(np.asarray(store.records())["p_value"])
+        page = store.query(offset=20, limit=10)
+
+        assert page["total_matching"] == 1200
+        np.testing.assert_array_equal([a["p_value_nominal"] for a in page["associations"]],
+                                      all_p[20:30])
+
+    def test_query_pages_in_stored_order(self, store):
+        records = np.asarray(store.records())
+        # Page spans two appended chunks
+        page = store.query(offset=395, limit=10, sort_by_p_value=False)
+
+        np.testing.assert_array_equal([a["p_value_nominal"] for a in page["associations"]],
+                                      records["p_value"][395:405])
+        assert store.query(offset=5000, sort_by_p_value=False)["associations"] == []
+
+
+def test_halla_streams_all_pairs_to_store(tmp_path, monkeypatch):
+    """A real run keeps top_k associations in memory and every pair on disk."""
+    monkeypatch.setattr(config, "dry_run", False)
+    rng = np.random.default_rng(0)
+    rna = pd.DataFrame(rng.normal(size=(60, 12)), index=[f"GENE_{i}" for i in range(60)])
+    protein = pd.DataFrame(rng.normal(size=(25, 12)), index=[f"PROT_{i}" for i in range(25)])
+    data_path = tmp_path / "integrated.pkl"
+    with open(data_path, "wb") as f:
+        pickle.dump({"rna": rna, "protein": protein}, f)
+
+    result = run_halla_analysis_impl(
+        str(data_path), "rna", "protein", chunk_size=16, top_k=100,
+    )
+
+    stats = result["statistics"]
+    assert stats["total_associations_tested"] == 60 * 25
+    assert stats["associations_returned"] == len(result["associations"]) == 100
+
+    stored = AssociationStore(result["result_store"])
+    assert len(stored) == stats["total_associations_found"]
+    assert stored.records().dtype == ASSOCIATION_DTYPE
+    best = query_halla_associations_impl(result["result_store"], limit=100)
+    assert [a["p_value_nominal"] for a in best["associations"]] == [
+        a["p_value_nominal"] for a in result["associations"]
+    ]
+
+
+def test_halla_result_stores_are_per_dataset(tmp_path, monkeypatch):
+    """A run on a second dataset leaves the first run's result store intact."""
+    monkeypatch.setattr(config, "dry_run", False)
+    results = []
+    for seed in (0, 1):
+        rng = np.random.default_rng(seed)
+        data_path = tmp_path / f"patient_{seed}.pkl"
+        with open(data_path, "wb") as f:
+            pickle.dump({
+                "rna": pd.DataFrame(rng.normal(size=(20, 12)), index=[f"GENE_{i}" for i in range(20)]),
+                "protein": pd.DataFrame(rng.normal(size=(10, 12)), index=[f"PROT_{i}" for i in range(10)]),
+            }, f)
+        results.append(run_halla_analysis_impl(str(data_path), "rna", "protein", top_k=10, n_jobs=1))
+
+    first, second = results
+    assert first["result_store"] != second["result_store"]
+    best = query_halla_associations_impl(first["result_store"], limit=10)
+    assert [a["p_value_nominal"] for a in best["associations"]] == [
+        a["p_value_nominal"] for a in first["associations"]
+    ]
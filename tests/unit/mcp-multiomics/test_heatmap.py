@@ -0,0 +1,137 @@
+"""Tests for clustered multi-omics heatmaps."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import numpy as np
+import pandas as pd
+from scipy.cluster import hierarchy
+from scipy.spatial.distance import pdist
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.heatmap import (
+    _cached_linkage,
+    cluster,
+    condensed_distances,
+    create_multiomics_heatmap_impl,
+    select_top_features,
+)
+from mcp_multiomics.tools.integrated_store import IntegratedDataStore
+from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.tools.utils import ModalitySource
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    """Two sample groups separated by 30 RNA genes and 10 proteins."""
+    rng = np.random.default_rng(0)
+    samples = [f"S{i:02d}" for i in range(20)]
+    signal = np.repeat([-1.0, 1.0], 10)
+    rna = pd.DataFrame(rng.normal(size=(300, 20)), index=[f"G{i}" for i in range(300)], columns=samples)
+    rna.iloc[:30] += 3 * signal
+    protein = pd.DataFrame(rng.normal(size=(40, 20)), index=[f"P{i}" for i in range(40)], columns=samples)
+    protein.iloc[:10] += 3 * signal
+    metadata = pd.DataFrame({"Response": np.where(signal > 0, "Sensitive", "Resistant")}, index=samples)
+    path = tmp_path / "store"
+    IntegratedDataStore.write(path, {"rna": rna, "protein": protein}, metadata)
+    return str(path)
+
+
+class TestClustering:
+    """Tests for distances, linkage and feature selection."""
+
+    @pytest.mark.parametrize("metric", ["correlation", "euclidean"])
+    def test_condensed_distances_match_pdist(self, metric, monkeypatch):
+        monkeypatch.setattr("mcp_multiomics.tools.heatmap.DISTANCE_BLOCK_ROWS", 7)
+        values = np.random.default_rng(1).normal(size=(50, 12))
+
+        distances = condensed_distances(values, metric)
+
+        assert distances.dtype == np.float32
+        np.testing.assert_allclose(distances, pdist(values, metric), atol=1e-5)
+
+    def test_average_linkage_matches_scipy(self):
+        values = np.random.default_rng(2).normal(size=(40, 8))
+
+        linkage = cluster(values, "euclidean", optimal_ordering=True)
+
+        reference = hierarchy.optimal_leaf_ordering(
+            hierarchy.linkage(pdist(values), "average"), pdist(values))
+        np.testing.assert_allclose(linkage[:, 2], reference[:, 2], rtol=1e-5)
+        np.testing.assert_array_equal(hierarchy.leaves_list(linkage), hierarchy.leaves_list(reference))
+
+    def test_top_variance_split_across_modalities(self, store_path):
+        source = ModalitySource(store_path)
+
+        selection = select_top_features(source, ["rna", "protein"], 50)
+
+        assert len(selection["rna"]) == len(selection["protein"]) == 25
+        assert set(selection["protein"][:10]) == {f"P{i}" for i in range(10)}
+        assert set(selection["rna"]) <= {f"G{i}" for i in range(30)}
+        # A small modality passes its unused share on
+        assert len(select_top_features(source, ["rna", "protein"], 100)["rna"]) == 60
+
+
+class TestHeatmapImpl:
+    """Tests for the heatmap tool implementation."""
+
+    def test_clusters_samples_and_caches_linkage(self, store_path, tmp_path):
+        result = create_multiomics_heatmap_impl(store_path, top_features=60,
+                                                output_path=str(tmp_path / "heatmap.png"))
+        again = create_multiomics_heatmap_impl(store_path, top_features=60,
+                                               output_path=str(tmp_path / "heatmap.pdf"))
+
+        clusters = result["cluster_info"]["sample_clusters"]
+        assert len({clusters[f"S{i:02d}"] for i in range(10)}) == 1
+        assert clusters["S00"] != clusters["S10"]
+        assert result["cluster_info"]["linkage_cache_hit"] == {"rows": False, "cols": False}
+        assert again["cluster_info"]["linkage_cache_hit"] == {"rows": True, "cols": True}
+        assert again["figure_data"]["col_order"] == result["figure_data"]["col_order"]
+        assert (tmp_path / "heatmap.png").stat().st_size > 0
+        assert again["figure_data"]["format"] == "pdf"
+
+    def test_concurrent_linkage_cache_writers(self, monkeypatch):
+        import mcp_multiomics.tools.heatmap as heatmap
+
+        barrier = threading.Barrier(4)
+        values = np.random.default_rng(1).normal(size=(2000, 3))
+        expected = cluster(values, "euclidean", False)
+
+        def cluster_together(*args):
+            barrier.wait()  # All writers publish the same linkage at once
+            return expected
+
+        monkeypatch.setattr(heatmap, "cluster", cluster_together)
+        for i in range(30):
+            with ThreadPoolExecutor(4) as pool:
+                results = list(pool.map(
+                    lambda _: _cached_linkage({"run": i}, values, "euclidean", False), range(4)))
+
+            for linkage, _ in results:
+                np.testing.assert_array_equal(linkage, expected)
+        assert len(list((config.cache_dir / "heatmap").iterdir())) == 30
+
+    def test_requested_features_without_clustering(self, store_path):
+        result = create_multiomics_heatmap_impl(
+            store_path, features=["G3", "protein:P1", "MISSING"], cluster_rows=False, cluster_cols=False,
+        )
+
+        assert result["figure_data"]["row_order"] == ["rna:G3", "protein:P1"]
+        assert result["cluster_info"]["row_linkage"] is None
+        with pytest.raises(ValueError, match="None of the requested features"):
+            create_multiomics_heatmap_impl(store_path, features=["MISSING"])
+        with pytest.raises(ValueError, match="Unknown metric"):
+            create_multiomics_heatmap_impl(store_path, metric="cosine")
+
+
+def test_heatmap_from_integrated_fixtures(rna_path, protein_path, metadata_path, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+    integrated = integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path,
+                                           metadata_path=metadata_path)
+
+    result = create_multiomics_heatmap_impl(integrated["cache_path"], top_features=40)
+
+    assert result["figure_data"]["rows"] == 40
+    assert result["plot_path"].endswith(".png")
+    assert sum(result["cluster_info"]["row_cluster_sizes"].values()) == 40
@@ -0,0 +1,159 @@
+"""Tests for the scalable imputation backends."""
+
+import tracemalloc
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.imputation import (
+    IMPUTERS,
+    impute,
+    impute_modalities,
+    register_imputer,
+)
+from mcp_multiomics.tools.preprocessing import preprocess_multiomics_data_impl
+
+
+@pytest.fixture
+def low_rank():
+    """Features × samples table driven by 3 latent factors, 10% missing at random."""
+    rng = np.random.default_rng(0)
+    loadings = rng.normal(size=(400, 3))
+    factors = rng.normal(size=(3, 30))
+    truth = loadings @ factors + 0.3 * rng.normal(size=(400, 30)) + rng.normal(5, 2, size=(400, 1))
+    mask = rng.random(truth.shape) < 0.1
+    observed = pd.DataFrame(np.where(mask, np.nan, truth),
+                            index=[f"PROT_{i}" for i in range(400)],
+                            columns=[f"Sample_{j:02d}" for j in range(30)])
+    return observed, truth, mask
+
+
+def _rmse(imputed, truth, mask):
+    return np.sqrt(np.mean((np.asarray(imputed)[mask] - truth[mask]) ** 2))
+
+
+class TestBackends:
+    """Accuracy and edge cases of each backend."""
+
+    @pytest.mark.parametrize("method", ["knn", "svd"])
+    def test_recovers_low_rank_structure(self, low_rank, method):
+        observed, truth, mask = low_rank
+
+        imputed = impute(observed, method, chunk_rows=64)
+
+        assert isinstance(imputed, pd.DataFrame)
+        assert not imputed.isna().any().any()
+        # Far better than feature medians on correlated features
+        assert _rmse(imputed, truth, mask) < 0.5 * _rmse(impute(observed, "median"), truth, mask)
+        # Observed values are untouched
+        np.testing.assert_array_equal(imputed.to_numpy()[~mask], truth[~mask])
+
+    def test_chunking_does_not_change_result(self, low_rank):
+        observed, _, _ = low_rank
+
+        for method in ("knn", "svd", "median"):
+            np.testing.assert_allclose(impute(observed, method, chunk_rows=7),
+                                       impute(observed, method), rtol=1e-6, atol=1e-8)
+
+    def test_minprob_is_left_censored_and_seeded(self, low_rank):
+        observed, _, mask = low_rank
+
+        imputed = impute(observed, "minprob", q=0.01, random_state=1)
+
+        # Centred on each sample's 1% quantile, well below its median
+        column_q = observed.quantile(0.01).to_numpy()
+        drawn = imputed.to_numpy()[mask] - column_q[np.nonzero(mask)[1]]
+        assert abs(drawn.mean()) < 0.3
+        assert (imputed.to_numpy()[mask] < observed.median().to_numpy()[np.nonzero(mask)[1]]).mean() > 0.9
+        pd.testing.assert_frame_equal(imputed, impute(observed, "minprob", q=0.01, random_state=1))
+
+    @pytest.mark.parametrize("method", ["knn", "svd", "minprob", "median", "minimum"])
+    def test_all_missing_features(self, low_rank, method):
+        observed, _, _ = low_rank
+        observed = observed.copy()
+        observed.iloc[5] = np.nan
+
+        imputed = impute(observed, method)
+
+        if method in ("minprob", "minimum"):
+            # Left-censored: an unobserved feature is below detection everywhere
+            assert not imputed.isna().any().any()
+        else:
+            assert imputed.iloc[5].isna().all()
+            assert imputed.drop(index="PROT_5").notna().all().all()
+
+    def test_float32_and_in_place(self, low_rank):
+        observed, _, _ = low_rank
+        values = observed.to_numpy(dtype=np.float32)
+
+        imputed = impute(values, "knn", copy=False)
+
+        assert imputed is values
+        assert imputed.dtype == np.float32 and not np.isnan(imputed).any()
+
+    def test_unknown_method(self, low_rank):
+        with pytest.raises(ValueError, match="Unknown imputation method 'mice'"):
+            impute(low_rank[0], "mice")
+
+    def test_register_backend(self, low_rank, monkeypatch):
+        monkeypatch.setattr("mcp_multiomics.tools.imputation.IMPUTERS", dict(IMPUTERS))
+
+        @register_imputer("zero")
+        def zero_impute(values):
+            values[np.isnan(values)] = 0
+            return values
+
+        from mcp_multiomics.tools import imputation
+        assert "zero" in imputation.IMPUTERS
+        assert (impute(low_rank[0], "zero").to_numpy()[low_rank[2]] == 0).all()
+
+
+class TestImputeModalities:
+    """Tests for parallel multi-modality imputation and its report."""
+
+    def test_reports_counts_time_and_memory(self, low_rank):
+        observed, _, mask = low_rank
+        dataframes = {"protein": observed, "phospho": observed.iloc[:100]}
+
+        imputed, report = impute_modalities(dataframes, "svd", n_jobs=2)
+
+        assert set(imputed) == {"protein", "phospho"}
+        assert report["method"] == "svd"
+        assert report["n_workers"] == 2
+        assert report["modalities"]["protein"]["values_imputed"] == int(mask.sum())
+        assert report["modalities"]["protein"]["missing_after"] == 0
+        assert report["modalities"]["phospho"]["time_seconds"] >= 0
+        assert report["modalities"]["protein"]["working_memory_mb"] == round(observed.to_numpy().nbytes / 2**20, 2)
+        assert report["working_memory_mb"] == pytest.approx(
+            sum(m["working_memory_mb"] for m in report["modalities"].values()))
+        assert report["process_peak_rss_mb"] > 0
+        # Process-global tracing is left alone (other jobs may be running)
+        assert not tracemalloc.is_tracing()
+        pd.testing.assert_frame_equal(imputed["phospho"], impute(observed.iloc[:100], "svd"))
+
+
+@pytest.mark.parametrize("method", ["knn", "minprob", "svd"])
+def test_preprocessing_imputation_methods(method, rna_path, protein_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+
+    result = preprocess_multiomics_data_impl(
+        rna_path=rna_path,
+        protein_path=protein_path,
+        batch_correction=False,
+        imputation_method=method,
+        output_dir=str(tmp_path / "out"),
+    )
+
+    qc = result["qc_metrics"]
+    assert qc["imputation"]["protein"]["missing_after"] == 0
+    assert qc["imputation_performance"]["method"] == method
+    assert "working_memory_mb" in qc["imputation_performance"]
+
+
+def test_preprocessing_rejects_unknown_imputation(rna_path, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+
+    with pytest.raises(ValueError, match="Unknown imputation_method"):
+        preprocess_multiomics_data_impl(rna_path=rna_path, imputation_method="mice")
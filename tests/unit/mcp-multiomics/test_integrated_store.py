@@ -0,0 +1,140 @@
+"""Tests for the memory-mapped integrated-data store."""
+
+import pickle
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.halla import run_halla_analysis_impl
+from mcp_multiomics.tools.integrated_store import IntegratedDataStore, is_integrated_store
+from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.tools.utils import (
+    load_integrated_data,
+    load_modalities,
+    save_integrated_data,
+)
+
+
+@pytest.fixture
+def omics():
+    rng = np.random.default_rng(0)
+    samples = [f"Sample_{i:02d}" for i in range(12)]
+    rna = pd.DataFrame(rng.normal(size=(30, 12)), index=[f"GENE_{i}" for i in range(30)],
+                       columns=samples)
+    rna.iloc[3, 4] = np.nan
+    protein = pd.DataFrame(rng.normal(size=(10, 12)).astype(np.float32),
+                           index=[f"PROT_{i}" for i in range(10)], columns=samples)
+    metadata = pd.DataFrame(
+        {"Batch": [1, 2] * 6, "Response": ["Resistant", "Sensitive"] * 6},
+        index=pd.Index(samples, name="Sample"),
+    )
+    return {"rna": rna, "protein": protein}, metadata
+
+
+class TestIntegratedDataStore:
+    """Tests for writing and lazily reading stores."""
+
+    def test_round_trip(self, tmp_path, omics):
+        dataframes, metadata = omics
+        store = IntegratedDataStore.write(tmp_path / "store", dataframes, metadata)
+
+        assert is_integrated_store(tmp_path / "store")
+        assert store.modalities == ["rna", "protein"]
+        assert store.shape("rna") == (30, 12)
+        for modality, df in dataframes.items():
+            loaded = store.load(modality)
+            pd.testing.assert_frame_equal(loaded, df, check_names=False)
+        assert store.load("protein").dtypes.iloc[0] == np.float32
+        pd.testing.assert_frame_equal(store.sample_metadata(), metadata)
+
+    def test_values_are_memory_mapped(self, tmp_path, omics):
+        store = IntegratedDataStore.write(tmp_path / "store", omics[0])
+
+        values = store.values("rna")
+        assert isinstance(values, np.memmap)
+        assert not values.flags.writeable
+        assert store.sample_metadata() is None
+
+    def test_partial_loads(self, tmp_path, omics):
+        dataframes, _ = omics
+        store = IntegratedDataStore.write(tmp_path / "store", dataframes)
+
+        subset = store.load("rna", features=["GENE_7", "GENE_2"], samples=["Sample_05", "Sample_01"])
+        pd.testing.assert_frame_equal(
+            subset, dataframes["rna"].loc[["GENE_7", "GENE_2"], ["Sample_05", "Sample_01"]],
+            check_names=False,
+        )
+        chunks = list(store.iter_chunks("rna", chunk_rows=8))
+        assert [len(chunk) for chunk in chunks] == [8, 8, 8, 6]
+        pd.testing.assert_frame_equal(pd.concat(chunks), dataframes["rna"], check_names=False)
+
+    def test_unknown_names(self, tmp_path, omics):
+        store = IntegratedDataStore.write(tmp_path / "store", omics[0])
+
+        with pytest.raises(ValueError, match="Modality phospho not found"):
+            store.load("phospho")
+        with pytest.raises(ValueError, match="Unknown features"):
+            store.load("rna", features=["GENE_0", "NOT_A_GENE"])
+
+    def test_rewrite_replaces_store(self, tmp_path, omics):
+        dataframes, _ = omics
+        IntegratedDataStore.write(tmp_path / "store", dataframes)
+        store = IntegratedDataStore.write(tmp_path / "store", {"rna": dataframes["rna"].iloc[:5]})
+
+        assert store.modalities == ["rna"]
+        assert not (tmp_path / "store" / "protein").exists()
+        assert not list(tmp_path.glob(".store.tmp-*"))
+
+    def test_misaligned_samples(self, tmp_path, omics):
+        dataframes, _ = omics
+        dataframes["protein"] = dataframes["protein"].iloc[:, ::-1]
+
+        with pytest.raises(ValueError, match="not aligned"):
+            IntegratedDataStore.write(tmp_path / "store", dataframes)
+
+
+class TestLoaders:
+    """Tests for the utils loaders used by downstream tools."""
+
+    def test_load_modalities_from_store(self, tmp_path, omics):
+        dataframes, metadata = omics
+        save_integrated_data(dataframes, metadata, str(tmp_path / "store"))
+
+        loaded = load_modalities(str(tmp_path / "store"), ["protein"],
+                                 features={"protein": ["PROT_3"]})
+        assert list(loaded) == ["protein"]
+        assert list(loaded["protein"].index) == ["PROT_3"]
+
+        omics_data, loaded_metadata = load_integrated_data(str(tmp_path / "store"))
+        assert set(omics_data) == {"rna", "protein"}
+        pd.testing.assert_frame_equal(loaded_metadata, metadata)
+
+    @pytest.mark.parametrize("wrapped", [True, False])
+    def test_legacy_pickles(self, tmp_path, omics, wrapped):
+        dataframes, metadata = omics
+        package = {"omics_data": dataframes, "metadata": metadata} if wrapped else dataframes
+        with open(tmp_path / "integrated.pkl", "wb") as f:
+            pickle.dump(package, f)
+
+        loaded = load_modalities(str(tmp_path / "integrated.pkl"), ["rna"])
+        pd.testing.assert_frame_equal(loaded["rna"], dataframes["rna"])
+        with pytest.raises(ValueError, match="Modalities phospho not found"):
+            load_modalities(str(tmp_path / "integrated.pkl"), ["rna", "phospho"])
+
+    def test_missing_dataset(self, tmp_path):
+        with pytest.raises(FileNotFoundError, match="Run integrate_omics_data first"):
+            load_modalities(str(tmp_path / "nothing"), ["rna"])
+
+
+def test_halla_reads_integrated_store(monkeypatch, rna_path, protein_path):
+    monkeypatch.setattr(config, "dry_run", False)
+    integrated = integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path)
+
+    result = run_halla_analysis_impl(integrated["cache_path"], "rna", "protein",
+                                     chunk_size=500, top_k=10, n_jobs=1)
+
+    assert result["statistics"]["total_associations_tested"] == (
+        integrated["feature_counts"]["rna"] * integrated["feature_counts"]["protein"]
+    )
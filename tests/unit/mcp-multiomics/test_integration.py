@@ -6,8 +6,10 @@ import numpy as np
 from pathlib import Path
 
 from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.validation import validate_multiomics_file
 from mcp_multiomics.tools.utils import (
     load_omics_data,
+    to_feature_matrix,
     align_samples,
     filter_missing_features,
     normalize_zscore,
@@ -39,6 +41,40 @@ class TestDataLoading:
             load_omics_data("/nonexistent/file.csv")
 
 
+class TestSinglePassValidation:
+    """Tests for validation returning the parsed file."""
+
+    def test_validation_returns_full_table(self, rna_path, tmp_path):
+        """The validated table matches load_omics_data, for CSV and TSV."""
+        expected = load_omics_data(rna_path)
+        tsv_path = tmp_path / "rna.csv"  # tab-separated despite the extension
+        expected.to_csv(tsv_path, sep="\t")
+
+        for path in (rna_path, str(tsv_path)):
+            is_valid, _, table = validate_multiomics_file(path, ["gene_id"], "RNA", True)
+
+            assert is_valid
+            pd.testing.assert_frame_equal(to_feature_matrix(table), expected)
+
+    def test_integration_parses_each_file_once(self, rna_path, protein_path, metadata_path,
+                                               monkeypatch):
+        """Integration reuses the validated tables instead of reading files again."""
+        reads = []
+        read_csv = pd.read_csv
+
+        def counting_read_csv(path, *args, **kwargs):
+            reads.append(Path(path).name)
+            return read_csv(path, *args, **kwargs)
+
+        monkeypatch.setattr(pd, "read_csv", counting_read_csv)
+
+        result = integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path,
+                                           metadata_path=metadata_path)
+
+        assert sorted(reads) == sorted(Path(p).name for p in (rna_path, protein_path, metadata_path))
+        assert result["metadata"]["samples"] == 15
+
+
 class TestSampleAlignment:
     """Tests for sample alignment across modalities."""
 
@@ -200,5 +236,6 @@ class TestIntegration:
         )
 
         cache_path = Path(result["cache_path"])
-        assert cache_path.exists()
-        assert cache_path.suffix == ".pkl"
+        assert cache_path.is_dir()
+        assert (cache_path / "manifest.json").exists()
+        assert (cache_path / "rna" / "values.npy").exists()
@@ -0,0 +1,140 @@
+"""Tests for the tool worker pool and background jobs."""
+
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from mcp_multiomics.jobs import JobCancelled, JobManager, JobNotFound
+from mcp_multiomics.tools.integration import dataset_cache, integrate_omics_data_impl
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=4, tool_concurrency={"slow": 1})
+    yield manager
+    manager.shutdown()
+
+
+def _blocking(release: threading.Event, value=None):
+    release.wait(5)
+    return value
+
+
+def _tiles(n_tiles: int, release: threading.Event, progress_callback=None):
+    """Stand-in for HAllA: reports progress after every tile."""
+    for tile in range(n_tiles):
+        release.wait(5)
+        progress_callback({"tiles_completed": tile + 1, "total_tiles": n_tiles})
+    return n_tiles
+
+
+class TestJobManager:
+    """Tests for scheduling, limits and cancellation."""
+
+    def test_per_tool_limit_queues_without_blocking_other_tools(self, manager):
+        release = threading.Event()
+        first = manager.submit("slow", _blocking, release=release, value=1)
+        second = manager.submit("slow", _blocking, release=release, value=2)
+        other = manager.submit("fast", lambda: "done")
+
+        assert other.done.result(5) == "done"
+        assert manager.status(second.job_id)["status"] == "queued"
+        assert manager.status(second.job_id)["queue_position"] == 1
+
+        release.set()
+        assert second.done.result(5) == 2
+        assert manager.result(first.job_id) == 1
+        assert manager.status(second.job_id)["status"] == "completed"
+
+    def test_status_while_queue_drains(self, manager):
+        release = threading.Event()
+        jobs = [manager.submit("slow", _blocking, release=release, value=i) for i in range(20)]
+        errors = []
+
+        def poll():
+            while not jobs[-1].finished:
+                for job in jobs:
+                    try:
+                        status = manager.status(job.job_id)
+                    except Exception as exc:
+                        errors.append(exc)
+                        return
+                    if ("queue_position" in status) != (status["status"] == "queued"):
+                        errors.append(status)
+
+        poller = threading.Thread(target=poll)
+        poller.start()
+        release.set()
+        poller.join(10)
+
+        assert errors == []
+        assert [job.done.result(5) for job in jobs] == list(range(20))
+
+    def test_running_job_leases_its_dataset(self, manager, rna_path):
+        data_path = integrate_omics_data_impl(rna_path=rna_path)["cache_path"]
+        cache, key = dataset_cache(), Path(data_path).name
+
+        job = manager.submit("slow", lambda data_path: cache.leased(key), data_path=data_path)
+
+        assert job.done.result(5) is True
+        assert not cache.leased(key)
+
+    def test_progress_and_cooperative_cancel(self, manager):
+        release = threading.Event()
+        job = manager.submit("slow", _tiles, n_tiles=50, release=release)
+        queued = manager.submit("slow", _tiles, n_tiles=1, release=release)
+
+        assert manager.cancel(queued.job_id)["status"] == "cancelled"
+        assert manager.cancel(job.job_id)["status"] == "cancelling"
+        release.set()
+        with pytest.raises(JobCancelled):
+            job.done.result(5)
+
+        status = manager.status(job.job_id)
+        assert status["status"] == "cancelled"
+        assert status["progress"] == {"tiles_completed": 1, "total_tiles": 50}
+        with pytest.raises(JobCancelled):
+            manager.result(queued.job_id)
+
+    def test_failures_and_unknown_jobs(self, manager):
+        def fail():
+            raise ValueError("bad modality")
+
+        job = manager.submit("fast", fail)
+
+        with pytest.raises(ValueError, match="bad modality"):
+            job.done.result(5)
+        assert manager.status(job.job_id)["error"] == "bad modality"
+        with pytest.raises(ValueError, match="bad modality"):
+            manager.result(job.job_id)
+        with pytest.raises(JobNotFound):
+            manager.status("missing")
+
+
+class TestAsyncRun:
+    """Tests for awaiting jobs from the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self, manager):
+        release = threading.Event()
+        call = asyncio.ensure_future(manager.run("slow", _blocking, release=release, value=7))
+
+        # The loop keeps serving other work while the job blocks its worker thread
+        await asyncio.sleep(0.05)
+        assert not call.done()
+        release.set()
+        assert await call == 7
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_job_handle(self, manager):
+        release = threading.Event()
+
+        handle = await manager.run("slow", _tiles, timeout=0.05, n_tiles=2, release=release)
+
+        assert handle["status"] == "running"
+        assert "get_job_status" in handle["message"]
+        release.set()
+        assert await asyncio.wrap_future(manager.get(handle["job_id"]).done) == 2
+        assert manager.status(handle["job_id"])["progress"]["tiles_completed"] == 2
@@ -0,0 +1,155 @@
+"""Tests for normalized mutual information used by HAllA (method="mi")."""
+
+import pytest
+import numpy as np
+from sklearn.metrics import normalized_mutual_info_score
+
+from mcp_multiomics.tools.associations import association_block, prepare_association_features
+from mcp_multiomics.tools.halla_scheduler import TileScheduler
+from mcp_multiomics.tools.halla_store import AssociationStore, TopKAssociations
+from mcp_multiomics.tools.mutual_information import (
+    BinnedFeatures,
+    default_n_bins,
+    mi_block,
+    mutual_information_from_counts,
+    null_distribution,
+    prepare_bins,
+)
+
+
+@pytest.fixture
+def paired_data():
+    """Modality 2 depends non-monotonically on the first 10 features of modality 1."""
+    rng = np.random.default_rng(0)
+    data1 = rng.normal(size=(20, 25))
+    data2 = np.vstack([data1[:10] ** 2 + 0.1 * rng.normal(size=(10, 25)),
+                       rng.normal(size=(8, 25))])
+    return data1, data2
+
+
+class TestBinning:
+    """Tests for quantile binning."""
+
+    def test_equal_frequency_bins(self, paired_data):
+        data1, _ = paired_data
+        binned = prepare_bins(data1)
+
+        assert binned.n_bins == default_n_bins(25) == 5
+        for codes in binned.codes:
+            assert (np.bincount(codes, minlength=5) == 5).all()
+        np.testing.assert_array_equal(binned.onehot.argmax(axis=1), binned.codes)
+
+    def test_ties_share_a_bin_and_missing_is_coded(self):
+        values = np.array([[1.0, 1.0, 1.0, 2.0, 3.0, np.nan]])
+        binned = prepare_bins(values, n_bins=2)
+
+        assert binned.has_missing
+        assert len(set(binned.codes[0, :3])) == 1
+        assert binned.codes[0, 5] == -1
+        assert binned.onehot[0, :, 5].sum() == 0
+
+
+class TestMutualInformation:
+    """Tests for block NMI and permutation p-values."""
+
+    @pytest.mark.parametrize("missing_rate", [0.0, 0.15])
+    def test_matches_sklearn(self, paired_data, missing_rate):
+        data1, data2 = paired_data
+        rng = np.random.default_rng(1)
+        data1 = np.where(rng.random(data1.shape) < missing_rate, np.nan, data1)
+        binned1, binned2 = prepare_bins(data1), prepare_bins(data2)
+
+        nmi, _, n = mi_block(binned1, binned2, n_permutations=0)
+
+        for i in range(0, 20, 3):
+            complete = binned1.codes[i] >= 0
+            for j in range(0, 18, 4):
+                expected = normalized_mutual_info_score(binned1.codes[i, complete],
+                                                        binned2.codes[j, complete])
+                assert nmi[i, j] == pytest.approx(expected, abs=1e-12)
+                assert n[i, j] == complete.sum()
+
+    def test_dependent_pairs_have_small_p_values(self, paired_data):
+        data1, data2 = paired_data
+        nmi, p, _ = mi_block(prepare_bins(data1), prepare_bins(data2), n_permutations=200)
+
+        dependent = np.diag(p[:10, :10])
+        assert (dependent < 0.05).all()
+        assert p.min() >= 1 / 201
+        # Independent pairs: p-values spread over (0, 1]
+        assert np.median(p[10:, 10:]) > 0.2
+
+    def test_p_values_follow_signature_null(self, paired_data):
+        """Each p-value is the tail fraction of its margins' permutation null."""
+        data1, data2 = paired_data
+        binned1, binned2 = prepare_bins(data1[:3]), prepare_bins(data2[:3])
+        _, p, _ = mi_block(binned1, binned2, n_permutations=300)
+
+        joint = np.zeros((5, 5))
+        np.add.at(joint, (binned1.codes[0], binned2.codes[1]), 1)
+        observed = mutual_information_from_counts(joint)[0]
+        null = null_distribution(joint.sum(axis=1), joint.sum(axis=0), 300)
+        expected = (1 + np.sum(null >= observed - 1e-10)) / 301
+        assert p[0, 1] == pytest.approx(expected)
+
+    def test_null_matches_direct_shuffles(self):
+        rng = np.random.default_rng(2)
+        x = np.repeat(np.arange(4), [5, 5, 4, 6])
+        y = np.repeat(np.arange(4), [6, 4, 5, 5])
+        null = null_distribution(np.bincount(x), np.bincount(y), 2000)
+
+        direct = []
+        for _ in range(2000):
+            joint = np.zeros((4, 4))
+            np.add.at(joint, (x, rng.permutation(y)), 1)
+            direct.append(mutual_information_from_counts(joint)[0])
+        assert (np.diff(null) >= 0).all()
+        assert np.mean(null) == pytest.approx(np.mean(direct), rel=0.05)
+        assert np.quantile(null, 0.95) == pytest.approx(np.quantile(direct, 0.95), rel=0.1)
+        # Same margins in another bin order share the same null
+        np.testing.assert_array_equal(
+            null_distribution(np.bincount(x)[::-1], np.bincount(y), 2000), null,
+        )
+
+    def test_constant_feature_is_undefined(self, paired_data):
+        data1, data2 = paired_data
+        data1 = data1.copy()
+        data1[0] = 1.0
+        nmi, p, _ = mi_block(prepare_bins(data1), prepare_bins(data2), n_permutations=50)
+
+        assert np.isnan(nmi[0]).all() and np.isnan(p[0]).all()
+        assert not np.isnan(nmi[1:]).any()
+
+
+class TestAssociationDispatch:
+    """Tests for method dispatch shared by HAllA and the tile scheduler."""
+
+    def test_mi_dispatch(self, paired_data):
+        data1, data2 = paired_data
+        prepared1 = prepare_association_features(data1, "mi")
+
+        assert isinstance(prepared1, BinnedFeatures)
+        nmi, p, n = association_block(prepared1, prepare_association_features(data2, "mi"))
+        assert nmi.shape == p.shape == n.shape == (20, 18)
+
+    def test_unknown_method(self, paired_data):
+        with pytest.raises(ValueError, match="Unknown method"):
+            prepare_association_features(paired_data[0], "kendall")
+
+    def test_pooled_tiles_share_binned_features(self, tmp_path, paired_data):
+        """The shared-memory pool reproduces the single-block MI results."""
+        data1, data2 = paired_data
+        prepared1 = prepare_association_features(data1, "mi")
+        prepared2 = prepare_association_features(data2, "mi")
+        store = AssociationStore.create(tmp_path / "store", range(20), range(18))
+
+        TileScheduler(prepared1, prepared2, 7, 6, n_jobs=2).run(
+            store, TopKAssociations(10), fingerprint="mi", resume=False,
+        )
+
+        nmi, p, _ = association_block(prepared1, prepared2)
+        records = np.asarray(store.records())
+        assert len(records) == nmi.size
+        np.testing.assert_allclose(records["correlation"],
+                                   nmi[records["feature1"], records["feature2"]], rtol=1e-6)
+        np.testing.assert_array_equal(records["p_value"], p[records["feature1"], records["feature2"]])
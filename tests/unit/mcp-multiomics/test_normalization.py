@@ -0,0 +1,206 @@
+"""Tests for vectorized multi-omics normalization."""
+
+import pytest
+import pandas as pd
+import numpy as np
+
+from mcp_multiomics.tools.normalization import (
+    batch_correct,
+    median_scale,
+    missing_fraction,
+    normalize,
+    quantile,
+    tmm,
+    tmm_factors,
+    zscore,
+)
+
+
+@pytest.fixture
+def expression():
+    """Features × samples table with a constant, a partly missing and an all-missing row."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        rng.normal(5, 2, size=(200, 12)),
+        index=[f"GENE_{i}" for i in range(200)],
+        columns=[f"Sample_{j:02d}" for j in range(12)],
+    )
+    df.iloc[0] = 5.0
+    df.iloc[1, :4] = np.nan
+    df.iloc[2] = np.nan
+    return df
+
+
+class TestZScore:
+    """Tests for feature-wise z-scores."""
+
+    def test_matches_row_wise_reference(self, expression):
+        """Vectorized z-scores equal the per-row pandas computation."""
+        normalized = zscore(expression)
+
+        for gene in expression.index[1:]:
+            row = expression.loc[gene]
+            if row.std() > 0:
+                expected = (row - row.mean()) / row.std(ddof=1)
+                np.testing.assert_allclose(normalized.loc[gene], expected)
+
+        assert (normalized.iloc[0] == 5.0).all()  # Constant feature unchanged
+        assert normalized.iloc[2].isna().all()  # All-missing feature stays missing
+        assert normalized.iloc[1, :4].isna().all()
+
+    def test_float32_in_place(self, expression):
+        """copy=False with a float32 array normalizes the caller's buffer."""
+        values = expression.iloc[3:].to_numpy(dtype=np.float32)
+        result = zscore(values, copy=False)
+
+        assert result is values
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result.mean(axis=1), 0, atol=1e-5)
+        np.testing.assert_allclose(result.std(axis=1, ddof=1), 1, atol=1e-5)
+
+    def test_eps_zeroes_constant_features(self, expression):
+        """With eps > 0 constant features become 0 instead of being kept."""
+        assert (zscore(expression, eps=1e-8).iloc[0] == 0).all()
+
+
+class TestSampleNormalization:
+    """Tests for quantile, median and TMM normalization."""
+
+    def test_quantile_gives_identical_distributions(self, expression):
+        """Every sample ends up with the same sorted values."""
+        complete = expression.iloc[3:]
+        normalized = quantile(complete)
+
+        sorted_values = np.sort(normalized.to_numpy(), axis=0)
+        np.testing.assert_allclose(sorted_values, sorted_values[:, [0]].repeat(12, axis=1))
+        # Ranks within each sample are preserved
+        pd.testing.assert_frame_equal(normalized.rank(), complete.rank())
+
+    def test_quantile_keeps_missing_values(self, expression):
+        """Missing values stay missing and observed ranks are preserved."""
+        normalized = quantile(expression.iloc[1:])
+
+        assert normalized.iloc[0, :4].isna().all()
+        assert normalized.iloc[1].isna().all()
+        pd.testing.assert_frame_equal(normalized.rank(), expression.iloc[1:].rank())
+
+    def test_quantile_missing_matches_per_sample_interpolation(self, expression):
+        """The vectorized missing-value path equals per-sample np.interp."""
+        values = expression.iloc[1:].to_numpy()
+        n = values.shape[0]
+        grid = np.linspace(0, 1, n)
+        resampled = []
+        for column in values.T:
+            observed = np.sort(column[~np.isnan(column)])
+            resampled.append(np.interp(grid, np.linspace(0, 1, len(observed)), observed)
+                             if len(observed) else np.full(n, np.nan))
+        reference = np.nanmean(np.array(resampled).T, axis=1)
+
+        normalized = quantile(values, ties=False)
+
+        for j, column in enumerate(values.T):
+            observed = np.flatnonzero(~np.isnan(column))
+            order = observed[np.argsort(column[observed], kind="stable")]
+            expected = np.interp(np.linspace(0, 1, len(order)), grid, reference)
+            np.testing.assert_allclose(normalized[order, j], expected)
+
+    def test_quantile_ties_share_the_mean_reference(self):
+        """Tied values get the mean reference value over their ranks."""
+        values = np.array([[1.0, 4.0], [2.0, 4.0], [2.0, 1.0], [3.0, 2.0]])
+        reference = np.sort(values, axis=0).mean(axis=1)  # [1.0, 2.0, 3.0, 3.5]
+
+        normalized = quantile(values)
+
+        np.testing.assert_allclose(normalized[:, 0], [1.0, 2.5, 2.5, 3.5])
+        np.testing.assert_allclose(normalized[:, 1], [3.25, 3.25, 1.0, 2.0])
+        np.testing.assert_allclose(quantile(values, ties=False)[:, 0], reference)
+
+    def test_quantile_ties_with_missing_values(self, expression):
+        """Tie averaging also applies to interpolated targets."""
+        rounded = expression.iloc[3:].round(0)
+        rounded.iloc[:20, 0] = np.nan
+        normalized = quantile(rounded)
+
+        for j in range(rounded.shape[1]):
+            groups = normalized.iloc[:, j].groupby(rounded.iloc[:, j]).nunique()
+            assert (groups == 1).all()
+        assert normalized.iloc[:20, 0].isna().all()
+        pd.testing.assert_frame_equal(normalized.rank(), rounded.rank())
+
+    def test_median_scale_equalizes_medians(self, expression):
+        """All samples share the median of sample medians afterwards."""
+        normalized = median_scale(expression)
+        medians = normalized.median(axis=0)
+        np.testing.assert_allclose(medians, expression.median(axis=0).median())
+
+    def test_tmm_ignores_library_size_and_corrects_composition(self):
+        """TMM factors absorb composition bias, not sequencing depth."""
+        rng = np.random.default_rng(1)
+        counts = rng.poisson(50, size=(4000, 4)).astype(float)
+        counts[:, 1] *= 3  # Deeper sequencing only
+        counts[:400, 2] *= 10  # 10% of genes strongly up-regulated
+
+        factors = tmm_factors(counts)
+        assert factors[1] == pytest.approx(factors[0], rel=0.02)
+        assert factors[2] < 0.7 * factors[0]
+        assert np.exp(np.mean(np.log(factors))) == pytest.approx(1.0)
+
+        # Unchanged genes end up on a common scale
+        normalized = tmm(counts)
+        medians = np.median(normalized[400:], axis=0)
+        np.testing.assert_allclose(medians, medians[0], rtol=0.05)
+
+    def test_unknown_method(self, expression):
+        """Unknown methods are rejected."""
+        with pytest.raises(ValueError, match="Unknown normalization method"):
+            normalize(expression, "vsn")
+
+
+class TestBatchCorrection:
+    """Tests for grouped per-batch standardization."""
+
+    @staticmethod
+    def _reference(df, batches):
+        """Per-batch pandas loop (the original preprocessing implementation)."""
+        corrected = df.copy()
+        global_mean, global_std = df.mean(axis=1), df.std(axis=1)
+        for batch in pd.unique(batches):
+            samples = df.columns[batches == batch]
+            if len(samples) > 1:
+                batch_data = df[samples]
+                standardized = (batch_data.T - batch_data.mean(axis=1)) / (batch_data.std(axis=1) + 1e-8)
+                corrected[samples] = (standardized * global_std + global_mean).T
+        return corrected
+
+    def test_matches_per_batch_loop(self, expression):
+        data = expression.iloc[3:].copy()
+        data.iloc[5:10, 7] = np.nan
+        batches = np.array(["A"] * 5 + ["B"] * 4 + ["C"] * 3)
+        data.iloc[:, 5:9] += 3.0  # Batch B shifted
+
+        corrected = batch_correct(data, batches)
+
+        pd.testing.assert_frame_equal(corrected, self._reference(data, batches))
+        batch_means = corrected.T.groupby(batches).mean().T
+        np.testing.assert_allclose(batch_means["A"], batch_means["B"], atol=1e-6)
+
+    def test_singletons_and_unlabelled_samples_unchanged(self, expression):
+        data = expression.iloc[3:]
+        batches = np.array(["A"] * 6 + ["B"] * 4 + ["C"] + [None])
+
+        corrected = batch_correct(data, batches)
+
+        pd.testing.assert_frame_equal(corrected.iloc[:, 10:], data.iloc[:, 10:])
+        assert not np.allclose(corrected.iloc[:, :10], data.iloc[:, :10])
+
+    def test_label_count_must_match(self, expression):
+        with pytest.raises(ValueError, match="batch labels"):
+            batch_correct(expression, ["A", "B"])
+
+
+def test_missing_fraction(expression):
+    """Per-feature missing fraction."""
+    fractions = missing_fraction(expression)
+    assert fractions[0] == 0.0
+    assert fractions[1] == pytest.approx(4 / 12)
+    assert fractions[2] == 1.0
@@ -0,0 +1,118 @@
+"""Tests for block-scaled multi-omics PCA."""
+
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import PCA
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.integrated_store import IntegratedDataStore
+from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.tools.pca import PCAProjection, fit_pca, run_multiomics_pca_impl
+
+
+@pytest.fixture
+def blocks():
+    """A large RNA block and a small protein block sharing one sample-level signal."""
+    rng = np.random.default_rng(0)
+    samples = [f"S{i:02d}" for i in range(30)]
+    signal = np.repeat([-1.0, 1.0], 15)
+    rna = pd.DataFrame(rng.normal(size=(400, 30)), index=[f"G{i}" for i in range(400)], columns=samples)
+    rna.iloc[:40] += 1.5 * signal
+    protein = pd.DataFrame(rng.normal(size=(25, 30)) * 4, index=[f"P{i}" for i in range(25)],
+                           columns=samples)
+    protein.iloc[:5] += 6 * signal
+    rna.iloc[3, 7] = np.nan
+    return {"rna": rna, "protein": protein}
+
+
+@pytest.fixture
+def store_path(blocks, tmp_path):
+    path = tmp_path / "store"
+    IntegratedDataStore.write(path, blocks)
+    return str(path)
+
+
+def _block_scaled(df):
+    values = df.to_numpy()
+    mean = np.nanmean(values, axis=1, keepdims=True)
+    z = np.nan_to_num((values - mean) / np.nanstd(values, axis=1, ddof=1, keepdims=True))
+    return z / np.sqrt((z ** 2).sum())
+
+
+class TestFitPCA:
+    """Tests for the PCA solvers."""
+
+    def test_gram_matches_sklearn(self, blocks, store_path):
+        projection = fit_pca(store_path, n_components=3, method="gram", chunk_rows=37)
+
+        X = np.vstack([_block_scaled(blocks["rna"]), _block_scaled(blocks["protein"])]).T
+        reference = PCA(3).fit(X)
+        np.testing.assert_allclose(projection.explained_variance_ratio,
+                                   reference.explained_variance_ratio_, rtol=1e-8)
+        np.testing.assert_allclose(np.abs(projection.scores), np.abs(reference.transform(X)),
+                                   atol=1e-8)
+
+    def test_randomized_agrees_with_gram(self, store_path):
+        gram = fit_pca(store_path, n_components=2, method="gram")
+        randomized = fit_pca(store_path, n_components=2, method="randomized")
+
+        np.testing.assert_allclose(randomized.explained_variance_ratio[0],
+                                   gram.explained_variance_ratio[0], rtol=1e-4)
+        # Deterministic signs make the leading component directly comparable
+        np.testing.assert_allclose(randomized.scores[:, 0], gram.scores[:, 0], atol=1e-3)
+
+    def test_block_scaling_balances_modalities(self, store_path):
+        projection = fit_pca(store_path, n_components=1, method="gram")
+
+        contribution = {modality: float((projection.loadings[start:stop, 0] ** 2).sum())
+                        for modality, (start, stop) in projection.blocks.items()}
+        # The 25-feature protein block is not swamped by 400 RNA features
+        assert 0.3 < contribution["protein"] < 0.7
+
+    def test_transform_reproduces_scores(self, blocks, store_path, tmp_path):
+        projection = fit_pca(store_path, n_components=3)
+        projection.save(tmp_path / "projection.npz")
+
+        reloaded = PCAProjection.load(tmp_path / "projection.npz")
+
+        np.testing.assert_allclose(reloaded.transform(blocks).to_numpy(), projection.scores, atol=1e-5)
+        assert reloaded.features[0] == "rna:G0"
+        assert reloaded.method == "gram"
+
+    def test_transform_matches_samples_by_name(self, blocks, store_path):
+        projection = fit_pca(store_path, n_components=2)
+        shuffled = {"rna": blocks["rna"], "protein": blocks["protein"].iloc[:, ::-1]}
+
+        scores = projection.transform(shuffled)
+
+        assert list(scores.index) == list(blocks["rna"].columns)
+        np.testing.assert_allclose(scores.to_numpy(), projection.scores, atol=1e-5)
+
+    def test_selected_modalities_and_errors(self, store_path):
+        projection = fit_pca(store_path, modalities=["protein"], n_components=2)
+
+        assert list(projection.blocks) == ["protein"]
+        assert len(projection.features) == 25
+        with pytest.raises(ValueError, match="not found"):
+            fit_pca(store_path, modalities=["metabolite"])
+        with pytest.raises(ValueError, match="Unknown PCA method"):
+            fit_pca(store_path, method="nipals")
+
+
+def test_run_multiomics_pca_impl(rna_path, protein_path, metadata_path, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+    integrated = integrate_omics_data_impl(rna_path=rna_path, protein_path=protein_path,
+                                           metadata_path=metadata_path)
+
+    result = run_multiomics_pca_impl(integrated["cache_path"], n_components=3)
+    again = run_multiomics_pca_impl(integrated["cache_path"], n_components=3)
+
+    assert result["cache_hit"] is False and again["cache_hit"] is True
+    assert result["statistics"]["method"] == again["statistics"]["method"] == "gram"
+    assert again["variance_explained"] == result["variance_explained"]
+    assert sorted(result["statistics"]["modalities_used"]) == ["protein", "rna"]
+    assert len(result["loadings"]["PC1"]["top_features"]) == 10
+    assert len(next(iter(result["sample_coordinates"].values()))) == 3
+    assert result["plot_path"].endswith(".png")
+    assert PCAProjection.load(result["projection_path"]).scores.shape[1] == 3
@@ -0,0 +1,147 @@
+"""Tests for sample-wise regulator activity inference."""
+
+import pytest
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.integration import integrate_omics_data_impl
+from mcp_multiomics.tools.regulator_activity import (
+    BATCH_BYTES,
+    _batch_size,
+    infer_activities,
+    infer_regulator_activity_impl,
+    ulm,
+    wmean,
+)
+from mcp_multiomics.tools.regulator_network import RegulatorNetwork
+
+
+@pytest.fixture
+def cohort():
+    """Random expression and 20 signed regulons; TF0 is active in the first six samples."""
+    rng = np.random.default_rng(0)
+    genes = [f"G{i}" for i in range(400)]
+    sources, targets, weights = [], [], []
+    for r in range(20):
+        members = rng.choice(400, 15, replace=False)
+        sources += [f"TF{r}"] * 15
+        targets += [genes[i] for i in members]
+        weights += list(rng.choice([-1.0, 1.0], 15))
+    network = RegulatorNetwork.from_edges(sources, targets, weights)
+
+    expression = pd.DataFrame(rng.normal(size=(400, 12)), index=genes,
+                              columns=[f"Sample_{j:02d}" for j in range(12)])
+    # TF0 active in the first 6 samples: its targets move along their edge signs
+    tf0 = network.to_frame().query("source == 'TF0'")
+    expression.loc[tf0["target"], expression.columns[:6]] += 2.0 * tf0["weight"].to_numpy()[:, None]
+    return network, expression
+
+
+class TestActivityMethods:
+    """Tests for ULM and weighted-mean activities."""
+
+    def test_ulm_matches_linregress(self, cohort):
+        network, expression = cohort
+        aligned = network.align(expression.index)
+
+        t, p = ulm(aligned, expression)
+
+        weights = aligned.matrix.toarray()
+        for regulator, sample in [(0, 0), (3, 7), (19, 11)]:
+            fit = stats.linregress(weights[regulator], expression.iloc[:, sample])
+            assert t.iloc[regulator, sample] == pytest.approx(fit.slope / fit.stderr, rel=1e-8)
+            assert p.iloc[regulator, sample] == pytest.approx(fit.pvalue, rel=1e-6)
+
+    def test_recovers_active_regulator(self, cohort):
+        network, expression = cohort
+
+        for method in ("ulm", "wmean"):
+            activities, p_values = infer_activities(network, expression, method,
+                                                    n_permutations=200)
+            assert (activities.loc["TF0"].iloc[:6] > 3).all()
+            assert (p_values.loc["TF0"].iloc[:6] < 0.01).all()
+            assert activities.loc["TF0"].iloc[6:].abs().mean() < 2
+
+    def test_permutation_p_values_track_parametric(self, cohort):
+        network, expression = cohort
+        aligned = network.align(expression.index)
+
+        _, parametric = ulm(aligned, expression)
+        _, empirical = ulm(aligned, expression, n_permutations=300, random_state=1)
+
+        assert np.corrcoef(parametric.to_numpy().ravel(), empirical.to_numpy().ravel())[0, 1] > 0.95
+        assert empirical.to_numpy().min() >= 1 / 301
+
+    def test_batched_permutations_are_seeded(self, cohort, monkeypatch):
+        network, expression = cohort
+        aligned = network.align(expression.index)
+        activities, p_values = wmean(aligned, expression, n_permutations=50, random_state=3)
+
+        # Smaller batches draw the same permutations in the same order
+        monkeypatch.setattr("mcp_multiomics.tools.regulator_activity.BATCH_BYTES", 1)
+        small_batches = wmean(aligned, expression, n_permutations=50, random_state=3)
+
+        pd.testing.assert_frame_equal(activities, small_batches[0])
+        pd.testing.assert_frame_equal(p_values, small_batches[1])
+
+    def test_batch_size_counts_features_and_network(self):
+        # 60k features and a 2M-edge network: the permutation buffers dominate
+        batch = _batch_size(n_regulators=1000, n_samples=10, n_features=60_000, nnz=2_000_000)
+        per_permutation = 2 * 60_000 * 4 + 2_000_000 * 8 + 1001 * 8 + 1000 * 10 * 12
+
+        assert batch * per_permutation <= BATCH_BYTES
+        assert batch < _batch_size(n_regulators=1000, n_samples=10, n_features=100, nnz=100)
+        assert _batch_size(1, 1, 10 ** 9, 10 ** 9) == 1
+
+    def test_min_targets_and_unknown_method(self, cohort):
+        network, expression = cohort
+
+        activities, _ = infer_activities(network, expression.iloc[:100], "ulm", min_targets=5)
+
+        target_counts = network.align(expression.index[:100]).matrix.getnnz(axis=1)
+        assert len(activities) == (target_counts >= 5).sum() < len(network)
+        with pytest.raises(ValueError, match="Unknown activity method"):
+            infer_activities(network, expression, "viper")
+
+
+def test_infer_regulator_activity_impl(cohort, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+    network, expression = cohort
+    rna_path = tmp_path / "rna.csv"
+    expression.to_csv(rna_path)
+    network_path = tmp_path / "regulons.csv"
+    network.to_frame().to_csv(network_path, index=False)
+    integrated = integrate_omics_data_impl(rna_path=str(rna_path), normalize=False)
+
+    result = infer_regulator_activity_impl(
+        integrated["cache_path"], network_file=str(network_path), method="ulm",
+        top_k=3, output_dir=str(tmp_path / "out"),
+    )
+
+    assert result["regulators"][0]["name"] == "TF0"
+    assert result["regulators"][0]["samples_active"] >= 5
+    assert result["statistics"]["p_value_type"].startswith("parametric")
+    activities = pd.read_csv(result["output_files"]["activities"], index_col=0)
+    assert activities.shape == (result["statistics"]["regulators_scored"], 12)
+
+
+def test_default_output_dir_is_per_dataset(cohort, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+    network, expression = cohort
+    network_path = tmp_path / "regulons.csv"
+    network.to_frame().to_csv(network_path, index=False)
+    results = []
+    for name, frame in [("a", expression), ("b", expression.iloc[:, ::-1] * 2)]:
+        rna_path = tmp_path / f"rna_{name}.csv"
+        frame.to_csv(rna_path)
+        integrated = integrate_omics_data_impl(rna_path=str(rna_path), normalize=False)
+        results.append(infer_regulator_activity_impl(
+            integrated["cache_path"], network_file=str(network_path), method="ulm", top_k=3,
+        ))
+
+    first, second = (result["output_files"]["activities"] for result in results)
+    assert first != second
+    assert first.startswith(str(config.cache_dir / "regulator_activity"))
+    assert list(pd.read_csv(first, index_col=0).columns) == list(expression.columns)
@@ -0,0 +1,156 @@
+"""Tests for sparse regulator networks and vectorized enrichment scoring."""
+
+import pytest
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.regulator_network import (
+    RegulatorNetwork,
+    hypergeom_upper_tail,
+    read_network,
+    score_enrichment,
+)
+from mcp_multiomics.tools.upstream_regulators import predict_upstream_regulators_impl
+
+
+@pytest.fixture
+def regulon_file(tmp_path):
+    path = tmp_path / "collectri.tsv"
+    pd.DataFrame({
+        "source": ["TF_A"] * 4 + ["TF_B"] * 3 + ["TF_C"],
+        "target": ["G1", "G2", "G3", "G4", "G1", "G5", "G6", "G7"],
+        "weight": [1, 1, -1, -1, 1, 1, 1, 1],
+        "confidence": ["A", "A", "B", "B", "A", "C", "E", "A"],
+    }).to_csv(path, sep="\t", index=False)
+    return path
+
+
+class TestRegulatorNetwork:
+    """Tests for building and ingesting networks."""
+
+    def test_from_edges_averages_duplicates(self):
+        network = RegulatorNetwork.from_edges(["K1", "K1", "K1", "K2"], ["S1", "S1", "S2", "S2"],
+                                              [1.0, 0.0, -1.0, 1.0])
+
+        assert list(network.regulators) == ["K1", "K2"]
+        assert network.n_edges == 3
+        edges = network.to_frame().set_index(["source", "target"])["weight"]
+        assert edges[("K1", "S1")] == 0.5
+        assert edges[("K1", "S2")] == -1.0
+
+    def test_align_to_features(self):
+        network = RegulatorNetwork.from_dict({"TF_A": ["G1", "G2", "G3"], "TF_B": ["G9"]})
+
+        aligned = network.align(["G3", "G1", "G7"])
+
+        assert list(aligned.targets) == ["G3", "G1", "G7"]
+        assert list(aligned.regulators) == ["TF_A"]
+        np.testing.assert_array_equal(aligned.matrix.toarray(), [[1, 1, 0]])
+
+    def test_read_regulons_with_confidence(self, regulon_file):
+        network = read_network(str(regulon_file), min_confidence="B")
+
+        assert network.n_edges == 6
+        assert read_network(str(regulon_file), min_confidence="B") is network
+        edges = network.to_frame()
+        assert list(edges.loc[edges["source"] == "TF_A", "weight"]) == [1, 1, -1, -1]
+
+    def test_read_phosphositeplus(self, tmp_path):
+        path = tmp_path / "Kinase_Substrate_Dataset.txt"
+        pd.DataFrame({
+            "GENE": ["AKT1", "AKT1", "MAPK1"],
+            "KINASE": ["Akt1", "Akt1", "ERK2"],
+            "KIN_ORGANISM": ["human", "human", "mouse"],
+            "SUB_GENE": ["GSK3B", "FOXO1", "ELK1"],
+            "SUB_MOD_RSD": ["S9", "T24", "S383"],
+            "SUB_ORGANISM": ["human", "human", "mouse"],
+        }).to_csv(path, sep="\t", index=False)
+
+        genes = read_network(str(path))
+        sites = read_network(str(path), site_level=True, organism=None)
+
+        assert list(genes.regulators) == ["AKT1"]
+        assert list(genes.targets) == ["GSK3B", "FOXO1"]
+        assert list(sites.targets) == ["GSK3B_S9", "FOXO1_T24", "ELK1_S383"]
+
+    def test_read_dgidb_signs_inhibitors(self, tmp_path):
+        path = tmp_path / "interactions.tsv"
+        pd.DataFrame({
+            "gene_name": ["PIK3CA", "MTOR", "ESR1"],
+            "drug_name": ["ALPELISIB", "EVEROLIMUS", "ESTRADIOL"],
+            "interaction_types": ["inhibitor", "allosteric inhibitor,inhibitor", "agonist"],
+        }).to_csv(path, sep="\t", index=False)
+
+        edges = read_network(str(path)).to_frame().set_index("source")["weight"]
+        assert edges.to_dict() == {"ALPELISIB": -1.0, "EVEROLIMUS": -1.0, "ESTRADIOL": 1.0}
+
+    def test_unrecognized_layout(self, tmp_path):
+        path = tmp_path / "other.csv"
+        pd.DataFrame({"a": [1], "b": [2]}).to_csv(path, index=False)
+
+        with pytest.raises(ValueError, match="Unrecognized regulator network layout"):
+            read_network(str(path))
+
+
+class TestScoreEnrichment:
+    """Tests for vectorized enrichment and activation scores."""
+
+    def test_hypergeometric_tail_matches_scipy(self):
+        rng = np.random.default_rng(0)
+        successes = rng.integers(1, 300, 500)
+        k = np.minimum(rng.integers(0, 30, 500), successes + 1)
+
+        np.testing.assert_allclose(hypergeom_upper_tail(k, 20000, successes, 1500),
+                                   stats.hypergeom.sf(k - 1, 20000, successes, 1500), rtol=1e-8)
+
+    def test_matches_per_regulator_fisher(self):
+        rng = np.random.default_rng(1)
+        genes = [f"G{i}" for i in range(300)]
+        regulons = {f"TF{r}": list(rng.choice(genes, rng.integers(3, 40), replace=False)) for r in range(50)}
+        log2fc = {gene: float(rng.normal()) for gene in rng.choice(genes, 80, replace=False)}
+
+        scores = score_enrichment(RegulatorNetwork.from_dict(regulons), log2fc)
+
+        for regulator, row in scores.iterrows():
+            targets = set(regulons[regulator])
+            overlap = targets & set(log2fc)
+            a, b, c = len(overlap), len(targets) - len(overlap), len(log2fc) - len(overlap)
+            _, p_value = stats.fisher_exact([[a, b], [c, 20000 - a - b - c]], alternative="greater")
+            fc = np.array([log2fc[g] for g in overlap])
+            assert row["p_value"] == pytest.approx(p_value, rel=1e-8)
+            assert row["z_score"] == pytest.approx(fc.mean() / (fc.std() + 1e-10) * np.sqrt(len(fc)))
+        assert (scores["targets_in_dataset"] >= 2).all()
+        assert scores["p_value"].is_monotonic_increasing
+
+    def test_repressed_targets_going_down_mean_activation(self):
+        network = RegulatorNetwork.from_edges(["TF"] * 4, ["G1", "G2", "G3", "G4"], [1, 1, -1, -1])
+
+        scores = score_enrichment(network, {"G1": 2.0, "G2": 1.5, "G3": -1.8, "G4": -2.2})
+
+        assert scores.loc["TF", "z_score"] > 2
+        assert scores.loc["TF", "targets_consistent"] == 4
+
+
+def test_predict_with_network_files(regulon_file, monkeypatch):
+    monkeypatch.setattr(config, "dry_run", False)
+    differential_genes = {g: {"log2fc": fc, "p_value": 0.001}
+                          for g, fc in {"G1": 2.0, "G2": 1.8, "G3": -2.1, "G4": -1.7}.items()}
+
+    result = predict_upstream_regulators_impl(
+        differential_genes,
+        regulator_types=["transcription_factor"],
+        fdr_threshold=1.0,
+        activation_zscore_threshold=1.0,
+        network_files={"transcription_factor": str(regulon_file)},
+        universe_size=100,
+    )
+
+    assert [tf["name"] for tf in result["transcription_factors"]] == ["TF_A"]
+    assert result["transcription_factors"][0]["activation_state"] == "Activated"
+    assert result["statistics"]["tfs_tested"] == 3
+    assert result["statistics"]["kinases_tested"] == 0
+
+    with pytest.raises(ValueError, match="Unknown regulator types"):
+        predict_upstream_regulators_impl(differential_genes, network_files={"mirna": str(regulon_file)})
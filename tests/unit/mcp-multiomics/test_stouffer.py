@@ -3,12 +3,36 @@
 import pytest
 import numpy as np
 
+from scipy import stats
+
+from mcp_multiomics.tools.halla_store import AssociationStore, make_records
 from mcp_multiomics.tools.stouffer import (
     StoufferMetaAnalysis,
+    calculate_stouffer_meta_from_stores_impl,
     calculate_stouffer_meta_impl,
 )
 
 
+def _reference_meta(p_values, effect_sizes, weights):
+    """Per-feature Stouffer combination in float64 (observed modalities only)."""
+    z_meta = []
+    for p, e in zip(p_values.T, effect_sizes.T):
+        observed = ~np.isnan(p)
+        z = stats.norm.isf(p[observed] / 2) * np.sign(e[observed])
+        w = weights[observed]
+        z_meta.append(np.sum(w * z) / np.sqrt(np.sum(w ** 2)))
+    return np.array(z_meta)
+
+
+def _write_store(path, features1, features2, p_values, correlations):
+    """Store of all feature1 × feature2 pairs from dense matrices."""
+    store = AssociationStore.create(path, features1, features2)
+    f1, f2 = np.indices(p_values.shape).reshape(2, -1)
+    store.append(make_records(f1, f2, correlations.ravel(), p_values.ravel(), 30, 0))
+    store.finalize()
+    return store
+
+
 class TestStoufferMetaAnalysis:
     """Tests for StoufferMetaAnalysis class."""
 
@@ -139,6 +163,125 @@ class TestStoufferMetaAnalysis:
             analyzer.meta_analyze(p_values_dict)
 
 
+class TestVectorizedStouffer:
+    """Tests for matrix-wide combination, missing values and streaming."""
+
+    @pytest.fixture
+    def matrices(self):
+        rng = np.random.default_rng(0)
+        p_values = rng.random((3, 500)) ** 3
+        effect_sizes = rng.normal(size=(3, 500))
+        p_values[0, ::5] = np.nan
+        p_values[1, ::7] = np.nan
+        return p_values, effect_sizes
+
+    def test_combine_matches_per_feature(self, matrices):
+        p_values, effect_sizes = matrices
+        weights = np.array([2.0, 1.0, 0.5])
+
+        z_meta, p_meta, n_observed = StoufferMetaAnalysis().combine(p_values, effect_sizes, weights)
+
+        np.testing.assert_allclose(z_meta, _reference_meta(p_values, effect_sizes, weights), rtol=1e-10)
+        np.testing.assert_allclose(p_meta, 2 * stats.norm.sf(np.abs(z_meta)), rtol=1e-10)
+        np.testing.assert_array_equal(n_observed, (~np.isnan(p_values)).sum(axis=0))
+
+    def test_float32(self, matrices):
+        p_values, effect_sizes = matrices
+        z64, _, _ = StoufferMetaAnalysis().combine(p_values, effect_sizes)
+        z32, p32, _ = StoufferMetaAnalysis().combine(p_values.astype(np.float32), effect_sizes)
+
+        assert z32.dtype == p32.dtype == np.float32
+        np.testing.assert_allclose(z32, z64, rtol=1e-4, atol=1e-5)
+
+    def test_missing_features(self):
+        analyzer = StoufferMetaAnalysis(use_directionality=False)
+        result = analyzer.meta_analyze({
+            "rna": [0.001, None, None, 0.5],
+            "protein": [0.002, 0.01, None, 0.6],
+        })
+
+        assert result["n_modalities"] == [2, 1, 0, 2]
+        # A single observed modality passes through unchanged
+        assert result["meta_p_values"][1] == pytest.approx(0.01)
+        assert result["meta_p_values"][2] is None and result["q_values"][2] is None
+        # Only the three observed features count as tests
+        assert result["q_values"][1] == pytest.approx(0.015)
+
+    def test_impl_reports_missing_contributions(self):
+        result = calculate_stouffer_meta_impl(
+            p_values_dict={"rna": [1e-6, 0.5, 0.4], "protein": [None, 0.6, 0.7]},
+            use_directionality=False,
+        )
+
+        feature = result["significant_features"][0]
+        assert feature["n_modalities"] == 1
+        assert feature["modality_contributions"] == {"rna": 1e-6, "protein": None}
+
+    def test_stores_match_list_input(self, tmp_path):
+        rng = np.random.default_rng(1)
+        p_a, p_b = rng.random((2, 6, 5)) ** 4
+        r_a, r_b = rng.uniform(-1, 1, size=(2, 6, 5))
+        genes = [f"GENE_{i}" for i in range(6)]
+        proteins = [f"PROT_{i}" for i in range(5)]
+        stores = {
+            "cohort_a": _write_store(tmp_path / "a", genes, proteins, p_a, r_a),
+            "cohort_b": _write_store(tmp_path / "b", genes, proteins, p_b, r_b),
+        }
+
+        streamed = StoufferMetaAnalysis().meta_analyze_stores(
+            stores, weights={"cohort_a": 2.0}, batch_size=7,
+        )
+        expected = StoufferMetaAnalysis().meta_analyze(
+            {"cohort_a": p_a.ravel().tolist(), "cohort_b": p_b.ravel().tolist()},
+            effect_sizes_dict={"cohort_a": r_a.ravel().tolist(), "cohort_b": r_b.ravel().tolist()},
+            weights={"cohort_a": 2.0},
+        )
+
+        assert streamed["n_tested"] == 30
+        np.testing.assert_allclose(streamed["meta_z_scores"].ravel(), expected["meta_z_scores"], rtol=1e-5)
+        np.testing.assert_allclose(streamed["q_values"].ravel(), expected["q_values"], rtol=1e-4)
+
+    def test_stores_align_by_feature_name(self, tmp_path):
+        p_values = np.array([[1e-4, 0.5], [0.3, 0.02]])
+        correlations = np.array([[0.8, 0.1], [-0.2, -0.6]])
+        stores = {
+            "a": _write_store(tmp_path / "a", ["G1", "G2"], ["P1", "P2"], p_values, correlations),
+            # Same pairs, rows listed in the other order, plus one extra gene
+            "b": _write_store(tmp_path / "b", ["G2", "G1", "G3"], ["P1", "P2"],
+                              np.vstack([p_values[::-1], [[0.9, 0.9]]]),
+                              np.vstack([correlations[::-1], [[0.1, 0.1]]])),
+        }
+
+        result = StoufferMetaAnalysis().meta_analyze_stores(stores)
+
+        assert result["features1"] == ["G1", "G2", "G3"]
+        np.testing.assert_array_equal(result["n_modalities"], [[2, 2], [2, 2], [1, 1]])
+        # Identical evidence twice: Z_meta = sqrt(2) × Z
+        z = stats.norm.isf(1e-4 / 2)
+        assert result["meta_z_scores"][0, 0] == pytest.approx(np.sqrt(2) * z, rel=1e-5)
+        assert result["meta_z_scores"][1, 1] < 0
+
+    def test_stores_impl_top_k(self, tmp_path):
+        rng = np.random.default_rng(2)
+        p_values = rng.random((10, 8)) * 1e-3
+        correlations = rng.uniform(0.5, 1, size=(10, 8))
+        genes = [f"GENE_{i}" for i in range(10)]
+        proteins = [f"PROT_{i}" for i in range(8)]
+        _write_store(tmp_path / "a", genes, proteins, p_values, correlations)
+        _write_store(tmp_path / "b", genes, proteins, p_values, correlations)
+
+        result = calculate_stouffer_meta_from_stores_impl(
+            {"a": str(tmp_path / "a"), "b": str(tmp_path / "b")}, top_k=5,
+        )
+
+        pairs = result["significant_pairs"]
+        assert result["statistics"]["significant_pairs"] == 80
+        assert len(pairs) == 5
+        assert [pair["meta_p"] for pair in pairs] == sorted(pair["meta_p"] for pair in pairs)
+        i, j = np.unravel_index(np.argmin(p_values), p_values.shape)
+        assert (pairs[0]["feature1"], pairs[0]["feature2"]) == (genes[i], proteins[j])
+
+
 class TestStoufferImplementation:
     """Tests for calculate_stouffer_meta_impl function."""
 
@@ -0,0 +1,148 @@
+"""Tests for the synthetic multi-omics cohort generator."""
+
+import json
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from mcp_multiomics.config import config
+from mcp_multiomics.tools.halla import run_halla_analysis_impl
+from mcp_multiomics.tools.integrated_store import IntegratedDataStore
+from mcp_multiomics.tools.synthetic import (
+    RESPONSE_BLOCK,
+    SyntheticCohort,
+    SyntheticCohortConfig,
+    main,
+    score_associations,
+)
+
+
+@pytest.fixture
+def cohort():
+    return SyntheticCohort(n_samples=120, n_genes=1500, n_proteins=800, n_phospho=600, seed=7)
+
+
+def _matrix(cohort, modality):
+    return pd.concat(cohort.iter_chunks(modality))
+
+
+class TestGeneration:
+    """Tests for the generated matrices."""
+
+    def test_same_seed_same_data(self, cohort):
+        again = SyntheticCohort(cohort.config)
+        other = SyntheticCohort(n_samples=120, n_genes=1500, n_proteins=800, n_phospho=600, seed=8)
+
+        pd.testing.assert_frame_equal(_matrix(cohort, "phospho"), _matrix(again, "phospho"))
+        assert not _matrix(cohort, "rna").equals(_matrix(other, "rna"))
+
+    def test_shapes_and_names(self, cohort):
+        protein = _matrix(cohort, "protein")
+        phospho = _matrix(cohort, "phospho")
+
+        assert _matrix(cohort, "rna").shape == (1500, 120)
+        assert protein.shape == (800, 120)
+        assert phospho.index.is_unique
+        # Every site belongs to a measured protein
+        assert {site.split("_")[0] for site in phospho.index} <= set(protein.index)
+        assert list(cohort.metadata().columns) == ["Sample", "Response", "Batch"]
+        assert (cohort.metadata()["Response"] == "Resistant").sum() == 60
+
+    def test_missingness_rates_and_censoring(self, cohort):
+        rna, protein, phospho = (_matrix(cohort, m) for m in ("rna", "protein", "phospho"))
+
+        assert not rna.isna().any().any()
+        assert protein.isna().mean().mean() == pytest.approx(0.1, abs=0.03)
+        assert phospho.isna().mean().mean() == pytest.approx(0.25, abs=0.05)
+        # Low-abundance proteins are missing more often
+        missing = protein.isna().mean(axis=1)
+        abundance = protein.mean(axis=1)
+        assert missing[abundance < abundance.median()].mean() > 2 * missing[abundance > abundance.median()].mean()
+
+    def test_cross_modal_correlation_matches_ground_truth(self, cohort):
+        rna, protein = _matrix(cohort, "rna"), _matrix(cohort, "protein")
+        truth = cohort.true_associations("rna", "protein").sample(400, random_state=0)
+
+        observed = np.array([rna.loc[a].corr(protein.loc[b])
+                             for a, b in zip(truth["feature1"], truth["feature2"])])
+
+        assert np.corrcoef(observed, truth["expected_correlation"])[0, 1] > 0.9
+        assert np.abs(observed - truth["expected_correlation"]).mean() < 0.1
+
+    def test_invalid_config(self):
+        with pytest.raises(ValueError, match="n_proteins"):
+            SyntheticCohortConfig(n_genes=10, n_proteins=20)
+        with pytest.raises(ValueError, match="Phosphosites"):
+            SyntheticCohortConfig(n_proteins=0, n_phospho=5)
+
+
+class TestGroundTruth:
+    """Tests for the ground truth and association scoring."""
+
+    def test_true_associations_blocks(self, cohort):
+        truth = cohort.true_associations("rna", "rna")
+        gt = cohort.ground_truth()
+
+        module_size = cohort.config.module_size
+        n_modules = len(gt["modules"])
+        n_differential = len(gt["differential"]["genes"])
+        assert len(truth) == n_modules * module_size * (module_size - 1) // 2 \
+            + n_differential * (n_differential - 1) // 2
+        assert (truth["feature1"] != truth["feature2"]).all()
+        assert set(truth["block"]) == set(range(n_modules)) | {RESPONSE_BLOCK}
+
+    def test_score_associations(self):
+        truth = pd.DataFrame({"feature1": ["A", "B", "C"], "feature2": ["X", "Y", "Z"]})
+        found = pd.DataFrame({"feature1": ["A", "B", "D", "E"], "feature2": ["X", "Q", "Z", "Z"]})
+
+        score = score_associations(found, truth)
+
+        assert score["true_positives"] == 1
+        assert score["precision"] == 0.25
+        assert score["recall"] == pytest.approx(1 / 3)
+
+    def test_halla_recovers_true_pairs(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(config, "dry_run", False)
+        cohort = SyntheticCohort(n_samples=60, n_genes=400, n_proteins=200, n_phospho=0,
+                                 module_fraction=0.25, seed=3)
+        paths = cohort.write(tmp_path / "cohort")
+
+        result = run_halla_analysis_impl(str(paths["store"]), "rna", "protein",
+                                         top_k=200, n_jobs=1)
+
+        score = score_associations(pd.DataFrame(result["associations"]),
+                                   cohort.true_associations("rna", "protein"))
+        assert score["precision"] > 0.9
+
+
+class TestWriting:
+    """Tests for streaming the cohort to disk."""
+
+    def test_store_matches_generated_data(self, cohort, tmp_path):
+        paths = cohort.write(tmp_path / "cohort")
+
+        store = IntegratedDataStore(paths["store"])
+        pd.testing.assert_frame_equal(store.load("phospho"), _matrix(cohort, "phospho"),
+                                      check_names=False)
+        assert store.sample_metadata()["Response"].tolist() == cohort.response.tolist()
+        with open(paths["ground_truth"]) as f:
+            assert json.load(f)["config"]["seed"] == 7
+
+    def test_tables_round_trip(self, tmp_path):
+        cohort = SyntheticCohort(n_samples=10, n_genes=2500, n_proteins=300, n_phospho=0)
+
+        paths = cohort.write(tmp_path / "cohort", fmt="tsv")
+
+        rna = pd.read_csv(paths["rna"], sep="\t", index_col=0)
+        assert set(paths) == {"rna", "protein", "metadata", "ground_truth"}
+        assert rna.shape == (2500, 10)
+        np.testing.assert_allclose(rna.values, _matrix(cohort, "rna").values, atol=1e-4)
+
+    def test_cli_writes_float32_store(self, tmp_path, capsys):
+        main(["--output", str(tmp_path / "cli"), "--samples", "12", "--genes", "300",
+              "--proteins", "100", "--phospho", "50", "--float32"])
+
+        store = IntegratedDataStore(tmp_path / "cli" / "integrated")
+        assert store.values("rna").dtype == np.float32
+        assert "ground_truth" in capsys.readouterr().out
@@ -0,0 +1,139 @@
+"""
+Unit tests for shared multiple-testing utilities.
+
+Tests cover:
+- Benjamini-Hochberg / Benjamini-Yekutieli / Holm agreement with reference values
+- Storey q-values and pi0 estimation
+- NaN handling, float32 output and in-place adjustment
+
+Run tests:
+    pytest tests/unit/test_multiple_testing.py -v
+"""
+
+import pytest
+import numpy as np
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from shared.utils.multiple_testing import (
+    adjust_pvalues,
+    benjamini_hochberg,
+    benjamini_yekutieli,
+    estimate_pi0,
+    holm,
+    multipletests,
+    storey_qvalues,
+)
+
+
+# ============================================================================
+# TEST DATA FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def p_values():
+    """Mixture of null (uniform) and signal (near-zero) p-values."""
+    rng = np.random.default_rng(42)
+    return np.concatenate([rng.random(900), rng.random(100) * 1e-4])
+
+
+def _reference_bh(p):
+    """Textbook BH with an explicit loop, used as an oracle."""
+    n = len(p)
+    order = np.argsort(p)
+    q = np.empty(n)
+    running = 1.0
+    for i in range(n - 1, -1, -1):
+        running = min(running, p[order[i]] * n / (i + 1))
+        q[order[i]] = running
+    return q
+
+
+# ============================================================================
+# CORRECTION METHODS
+# ============================================================================
+
+class TestCorrections:
+    """Test each correction against known values."""
+
+    def test_bh_known_values(self):
+        q = benjamini_hochberg(np.array([0.01, 0.04, 0.03, 0.5]))
+        np.testing.assert_allclose(q, [0.04, 0.04 * 4 / 3, 0.04 * 4 / 3, 0.5])
+
+    def test_bh_matches_reference(self, p_values):
+        np.testing.assert_allclose(benjamini_hochberg(p_values), _reference_bh(p_values))
+
+    def test_bh_is_monotone_in_p(self, p_values):
+        order = np.argsort(p_values)
+        q_sorted = benjamini_hochberg(p_values)[order]
+        assert np.all(np.diff(q_sorted) >= 0)
+        assert q_sorted.max() <= 1.0
+
+    def test_by_is_bh_times_harmonic_number(self, p_values):
+        n = len(p_values)
+        harmonic = np.sum(1.0 / np.arange(1, n + 1))
+        expected = np.minimum(_reference_bh(p_values) * harmonic, 1.0)
+        np.testing.assert_allclose(benjamini_yekutieli(p_values), expected)
+
+    def test_holm_known_values(self):
+        q = holm(np.array([0.01, 0.04, 0.03, 0.005]))
+        np.testing.assert_allclose(q, [0.03, 0.06, 0.06, 0.02])
+
+    def test_storey_qvalues_scale_bh_by_pi0(self, p_values):
+        pi0 = estimate_pi0(p_values, lambda_=0.5)
+        assert 0.8 < pi0 <= 1.0
+        np.testing.assert_allclose(
+            storey_qvalues(p_values), np.minimum(_reference_bh(p_values) * pi0, 1.0)
+        )
+
+    def test_unknown_method_raises(self, p_values):
+        with pytest.raises(ValueError, match="Unknown multiple-testing method"):
+            adjust_pvalues(p_values, method="bonferroni_typo")
+
+    def test_out_of_range_raises(self):
+        with pytest.raises(ValueError, match="must lie in"):
+            adjust_pvalues(np.array([0.1, 1.5]))
+
+
+# ============================================================================
+# MEMORY / DTYPE BEHAVIOUR
+# ============================================================================
+
+class TestArrayHandling:
+    """Test NaN handling, dtypes and in-place operation."""
+
+    def test_nan_values_are_ignored(self, p_values):
+        with_nan = p_values.copy()
+        with_nan[::10] = np.nan
+        q = adjust_pvalues(with_nan)
+
+        finite = ~np.isnan(with_nan)
+        assert np.isnan(q[~finite]).all()
+        np.testing.assert_allclose(q[finite], _reference_bh(with_nan[finite]))
+
+    def test_float32_in_place(self, p_values):
+        buffer = p_values.astype(np.float32)
+        result = adjust_pvalues(buffer, method="fdr_bh", out=buffer)
+
+        assert result is buffer
+        assert buffer.dtype == np.float32
+        np.testing.assert_allclose(buffer, _reference_bh(p_values), rtol=1e-5)
+
+    def test_preserves_shape(self, p_values):
+        matrix = p_values.reshape(10, 100)
+        q = adjust_pvalues(matrix)
+        assert q.shape == (10, 100)
+        np.testing.assert_allclose(q.ravel(), _reference_bh(p_values))
+
+    def test_multipletests_returns_reject_mask(self, p_values):
+        reject, q = multipletests(p_values, alpha=0.05)
+        assert reject.dtype == bool
+        np.testing.assert_array_equal(reject, q <= 0.05)
+        assert reject[900:].all()
+
+    def test_empty_input(self):
+        assert adjust_pvalues(np.array([])).size == 0
@@ -0,0 +1,317 @@
+"""
+Unit tests for the patient report stage pipeline and vectorized stats core.
+
+Tests cover:
+- Stage DAG ordering, cycle detection and result hand-off
+- Process-pool execution with per-stage timings
+- Resuming from completed stages
+- Content-addressed stage keys and cache round trips
+- Cohort manifest loading and data directory discovery
+- Range checks of --param overrides
+- Vectorized DE / Moran's I / signature scores vs per-gene reference results
+
+Run tests:
+    pytest tests/unit/test_report_pipeline.py -v
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import sys
+from pathlib import Path
+
+# Add report tools to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "tools" / "reports"))
+
+import report_stats
+from cohort_reports import discover_spatial_dirs, load_manifest
+from generate_patient_report import DEFAULT_PARAMETERS, parameter_error
+from report_pipeline import StagePipeline, format_timings
+from stage_cache import StageCache, hash_file, stage_keys
+from mcp_spatialtools.server import _calculate_morans_i
+
+
+# ============================================================================
+# PICKLABLE STAGE CALLABLES
+# ============================================================================
+
+def _make_numbers():
+    return {'numbers': list(range(5))}
+
+
+def _make_letters():
+    return {'letters': list('abc')}
+
+
+def _noop():
+    return None
+
+
+def _fail():
+    raise RuntimeError("stage should have been restored, not executed")
+
+
+# ============================================================================
+# TEST DATA FIXTURES
+# ============================================================================
+
+@pytest.fixture
+def spatial_dataset():
+    """Small grid of spots with a spatially clustered and a random gene."""
+    rng = np.random.default_rng(7)
+    rows, cols = np.meshgrid(np.arange(12), np.arange(12))
+    coordinates = np.column_stack([rows.ravel(), cols.ravel()]).astype(float)
+    n_spots = len(coordinates)
+
+    spots = [f"SPOT_{i:03d}" for i in range(n_spots)]
+    genes = ['CLUSTERED', 'RANDOM', 'CONSTANT', 'ZERO_IN_STROMA']
+    expression = pd.DataFrame(
+        rng.poisson(5, size=(len(genes), n_spots)).astype(float),
+        index=genes, columns=spots,
+    )
+    expression.loc['CLUSTERED'] += np.where(coordinates[:, 0] < 6, 20, 0)
+    expression.loc['CONSTANT'] = 3.0
+    expression.loc['ZERO_IN_STROMA', spots[72:]] = 0.0
+
+    return expression, coordinates, spots[:72], spots[72:]
+
+
+# ============================================================================
+# STAGE PIPELINE
+# ============================================================================
+
+class TestStagePipeline:
+    """Test DAG scheduling."""
+
+    def test_execution_order_respects_dependencies(self):
+        pipeline = StagePipeline(max_workers=1, log=lambda msg: None)
+        pipeline.add_stage('figure', _noop, depends_on=['analysis_a', 'analysis_b'])
+        pipeline.add_stage('analysis_a', _noop)
+        pipeline.add_stage('analysis_b', _noop)
+
+        order = pipeline.execution_order()
+        assert order.index('figure') > order.index('analysis_a')
+        assert order.index('figure') > order.index('analysis_b')
+
+    def test_cycle_detection(self):
+        pipeline = StagePipeline(max_workers=1, log=lambda msg: None)
+        pipeline.add_stage('a', _noop, depends_on=['b'])
+        pipeline.add_stage('b', _noop, depends_on=['a'])
+
+        with pytest.raises(ValueError, match="cycle"):
+            pipeline.execution_order()
+
+    def test_unknown_dependency(self):
+        pipeline = StagePipeline(max_workers=1, log=lambda msg: None)
+        pipeline.add_stage('a', _noop, depends_on=['missing'])
+
+        with pytest.raises(ValueError, match="unknown stage"):
+            pipeline.run()
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_results_handed_back_before_dependents(self, max_workers):
+        pipeline = StagePipeline(max_workers=max_workers, log=lambda msg: None)
+        pipeline.add_stage('numbers', _make_numbers)
+        pipeline.add_stage('letters', _make_letters)
+        pipeline.add_stage('report', _noop, depends_on=['numbers', 'letters'])
+
+        merged = {}
+        completed = []
+
+        def on_result(name, result):
+            completed.append(name)
+            if result:
+                merged.update(result)
+
+        timings = pipeline.run(on_result=on_result)
+
+        assert completed[-1] == 'report'
+        assert merged == {'numbers': [0, 1, 2, 3, 4], 'letters': ['a', 'b', 'c']}
+        assert set(timings) == {'numbers', 'letters', 'report'}
+        assert all(t.seconds >= 0 for t in timings.values())
+        assert len(format_timings(timings)) == 3
+
+    def test_completed_stages_are_restored_not_rerun(self):
+        pipeline = StagePipeline(max_workers=1, log=lambda msg: None)
+        pipeline.add_stage('numbers', _fail)
+        pipeline.add_stage('report', _make_letters, depends_on=['numbers'])
+
+        merged = {}
+        timings = pipeline.run(
+            on_result=lambda name, result: merged.update(result or {}),
+            completed={'numbers': {'numbers': [42]}},
+        )
+
+        assert merged == {'numbers': [42], 'letters': ['a', 'b', 'c']}
+        assert set(timings) == {'report'}
+
+
+# ============================================================================
+# STAGE CACHE
+# ============================================================================
+
+def _keyed_pipeline(threshold=0.05):
+    pipeline = StagePipeline(max_workers=1, log=lambda msg: None)
+    pipeline.add_stage('numbers', _make_numbers, params={'threshold': threshold})
+    pipeline.add_stage('letters', _make_letters)
+    pipeline.add_stage('numbers_plot', _noop, depends_on=['numbers'])
+    pipeline.add_stage('letters_plot', _noop, depends_on=['letters'])
+    return pipeline
+
+
+class TestStageCache:
+    """Test stage keys and the on-disk cache."""
+
+    def test_keys_are_deterministic(self):
+        inputs = {'expression': 'abc123'}
+        assert stage_keys(_keyed_pipeline(), inputs) == stage_keys(_keyed_pipeline(), inputs)
+
+    def test_parameter_change_invalidates_only_downstream(self):
+        inputs = {'expression': 'abc123'}
+        before = stage_keys(_keyed_pipeline(0.05), inputs)
+        after = stage_keys(_keyed_pipeline(0.01), inputs)
+
+        changed = {name for name in before if before[name] != after[name]}
+        assert changed == {'numbers', 'numbers_plot'}
+
+    def test_input_or_context_change_invalidates_everything(self):
+        before = stage_keys(_keyed_pipeline(), {'expression': 'abc123'})
+        new_data = stage_keys(_keyed_pipeline(), {'expression': 'def456'})
+        new_patient = stage_keys(_keyed_pipeline(), {'expression': 'abc123'},
+                                 context={'patient_id': 'PAT002'})
+
+        assert all(before[name] != new_data[name] for name in before)
+        assert all(before[name] != new_patient[name] for name in before)
+
+    def test_store_and_load_restores_artifacts(self, tmp_path):
+        work_dir = tmp_path / "run1"
+        work_dir.mkdir()
+        (work_dir / "table.csv").write_text("gene,p\nTP53,0.01\n")
+
+        cache = StageCache(tmp_path / "cache")
+        key = 'ab' * 32
+        assert not cache.contains(key)
+
+        cache.store(key, 'numbers', {'numbers': [1, 2]}, work_dir,
+                    artifacts=['table.csv', 'never_written.png'])
+        assert cache.contains(key)
+
+        restore_dir = tmp_path / "run2"
+        restore_dir.mkdir()
+        assert cache.load(key, restore_dir) == {'numbers': [1, 2]}
+        assert (restore_dir / "table.csv").read_text() == "gene,p\nTP53,0.01\n"
+        assert not (restore_dir / "never_written.png").exists()
+
+    def test_hash_file_tracks_content(self, tmp_path):
+        data_file = tmp_path / "data.csv"
+        data_file.write_text("a,b\n1,2\n")
+        first = hash_file(data_file)
+        data_file.write_text("a,b\n1,3\n")
+        assert hash_file(data_file) != first
+
+
+# ============================================================================
+# COHORT MODE
+# ============================================================================
+
+class TestCohortManifest:
+    """Test manifest parsing and one-time data discovery."""
+
+    def test_load_csv_manifest(self, tmp_path):
+        manifest_file = tmp_path / "cohort.csv"
+        manifest_file.write_text(
+            "patient_id,spatial_dir\n"
+            "PAT001,/data/PAT001/spatial\n"
+            "PAT002,\n"
+            "PAT001,/duplicate\n"
+        )
+
+        manifest = load_manifest(str(manifest_file))
+
+        assert [row['patient_id'] for row in manifest] == ['PAT001', 'PAT002']
+        assert manifest[0]['spatial_dir'] == '/data/PAT001/spatial'
+        assert 'spatial_dir' not in manifest[1]
+
+    def test_manifest_requires_patient_id(self, tmp_path):
+        manifest_file = tmp_path / "cohort.json"
+        manifest_file.write_text('[{"spatial_dir": "/data/x"}]')
+
+        with pytest.raises(ValueError, match="patient_id"):
+            load_manifest(str(manifest_file))
+
+    def test_discover_spatial_dirs(self, tmp_path):
+        spatial = tmp_path / "pat001-ovc" / "spatial"
+        spatial.mkdir(parents=True)
+        (spatial / "visium_gene_expression.csv").write_text("barcode\n")
+        (tmp_path / "no-data" / "spatial").mkdir(parents=True)
+
+        assert discover_spatial_dirs(tmp_path) == {'PAT001-OVC': spatial}
+
+
+# ============================================================================
+# VECTORIZED STATS CORE
+# ============================================================================
+
+class TestReportParameters:
+    """Tests for validating analysis parameter overrides."""
+
+    def test_defaults_are_valid(self):
+        for name, value in DEFAULT_PARAMETERS.items():
+            assert parameter_error(name, value) is None
+
+    @pytest.mark.parametrize("name,value", [
+        ("fdr_threshold", 5.0),
+        ("fdr_threshold", 0.0),
+        ("svg_p_threshold", float("nan")),
+        ("log2fc_threshold", -1.0),
+        ("morans_distance_threshold", 0.0),
+    ])
+    def test_out_of_range_values_are_rejected(self, name, value):
+        assert name in parameter_error(name, value)
+
+
+class TestReportStats:
+    """Vectorized results must match the per-gene reference implementations."""
+
+    def test_differential_expression_matches_per_gene(self, spatial_dataset):
+        expression, _, group1, group2 = spatial_dataset
+        deg_df = report_stats.differential_expression(expression, group1, group2)
+
+        for _, row in deg_df.iterrows():
+            gene1 = expression.loc[row['gene'], group1].values
+            gene2 = expression.loc[row['gene'], group2].values
+            _, p_value = stats.mannwhitneyu(gene1, gene2, alternative='two-sided')
+            assert row['p_value'] == pytest.approx(p_value if np.isfinite(p_value) else 1.0)
+
+        zero = deg_df.set_index('gene').loc['ZERO_IN_STROMA']
+        assert zero['log2_fold_change'] == 10
+        assert (deg_df['fdr'] >= deg_df['p_value']).all()
+
+    def test_spatial_autocorrelation_matches_per_gene(self, spatial_dataset):
+        expression, coordinates, _, _ = spatial_dataset
+        spatial_df = report_stats.spatial_autocorrelation(expression, coordinates, 1.5)
+
+        for _, row in spatial_df.iterrows():
+            expected = _calculate_morans_i(expression.loc[row['gene']].values, coordinates, 1.5)
+            assert (row['morans_i'], row['z_score'], row['p_value']) == pytest.approx(expected)
+
+        by_gene = spatial_df.set_index('gene')
+        assert by_gene.loc['CLUSTERED', 'morans_i'] > 0.5
+        assert by_gene.loc['CONSTANT', 'p_value'] == 1.0
+
+    def test_signature_scores(self, spatial_dataset):
+        expression, _, _, _ = spatial_dataset
+        scores = report_stats.signature_scores(expression, {
+            'pair': ['CLUSTERED', 'RANDOM'],
+            'partial': ['CONSTANT', 'NOT_MEASURED'],
+            'absent': ['NOT_MEASURED'],
+        })
+
+        assert list(scores.columns) == ['pair', 'partial']
+        pd.testing.assert_series_equal(
+            scores['pair'], expression.loc[['CLUSTERED', 'RANDOM']].mean(axis=0),
+            check_names=False,
+        )
+        assert (scores['partial'] == 3.0).all()
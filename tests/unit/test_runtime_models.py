@@ -0,0 +1,152 @@
+"""
+Unit tests for benchmark-calibrated runtime models.
+
+Tests cover:
+- Recovering known scaling coefficients from measurements
+- JSON round trips and extrapolation flags
+- The bundled calibration covering the multi-omics and spatial tools
+- Runtime-based cost estimates and instance memory checks
+
+Run tests:
+    pytest tests/unit/test_runtime_models.py -v
+"""
+
+import pytest
+import numpy as np
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from shared.utils.cost_tracking import CostEstimator
+from shared.utils.runtime_models import (
+    RuntimeModels,
+    evaluate_terms,
+    fit_curve,
+    load_runtime_models,
+    measure,
+)
+
+
+def _halla_points():
+    """Exact measurements of seconds = 0.5 + 2e-6·f1·f2 + 1e-8·f1·f2·n."""
+    points = []
+    for f1, f2 in ((100, 50), (400, 400), (1600, 200)):
+        for n in (10, 100):
+            points.append({
+                "f1": f1, "f2": f2, "n": n,
+                "seconds": 0.5 + 2e-6 * f1 * f2 + 1e-8 * f1 * f2 * n,
+                "peak_mb": 10 + 1e-4 * (f1 + f2) * n,
+            })
+    return points
+
+
+@pytest.fixture
+def curve():
+    return fit_curve("run_halla_analysis", _halla_points(), ["f1", "f2", "n"],
+                     time_terms=[["f1", "f2"], ["f1", "f2", "n"]],
+                     memory_terms=[["f1", "n"], ["f2", "n"]])
+
+
+class TestFitting:
+    """Tests for fitting scaling curves."""
+
+    def test_recovers_coefficients(self, curve):
+        assert curve.overhead_seconds == pytest.approx(0.5, rel=1e-6)
+        np.testing.assert_allclose(curve.time_coefficients, [2e-6, 1e-8], rtol=1e-6)
+        assert curve.baseline_mb == pytest.approx(10, rel=1e-6)
+        np.testing.assert_allclose(curve.memory_coefficients, [1e-4, 1e-4], rtol=1e-6)
+        assert curve.max_relative_error < 1e-6
+
+    def test_predictions_and_extrapolation(self, curve):
+        inside = curve.predict(f1=800, f2=400, n=50)
+        outside = curve.predict(f1=20000, f2=7000, n=15)
+
+        assert inside.wall_seconds == pytest.approx(0.5 + 2e-6 * 320000 + 1e-8 * 320000 * 50)
+        assert not inside.extrapolated
+        assert outside.extrapolated
+        assert outside.peak_memory_mb == pytest.approx(10 + 1e-4 * 27000 * 15)
+
+    def test_missing_sizes_and_too_few_points(self, curve):
+        with pytest.raises(ValueError, match="Missing size parameter"):
+            curve.predict(f1=10, n=5)
+        with pytest.raises(ValueError, match="cannot fit"):
+            fit_curve("x", _halla_points()[:2], ["f1", "f2", "n"],
+                      [["f1"], ["f2"]], [["n"]])
+        assert evaluate_terms([["f1", "n"], ["f2"]], {"f1": 3, "f2": 4, "n": 2}).tolist() == [6, 4]
+        assert evaluate_terms([["min(f1,5)", "n"]], {"f1": 8, "n": 2}).tolist() == [10]
+        with pytest.raises(ValueError, match="f2"):
+            evaluate_terms([["min(f2,5)"]], {"f1": 8})
+
+    def test_json_round_trip(self, curve, tmp_path):
+        path = RuntimeModels({"run_halla_analysis": curve}, {"machine": "test"}).save(tmp_path / "models.json")
+
+        models = RuntimeModels.load(path)
+
+        assert models.metadata == {"machine": "test"}
+        assert models.curves["run_halla_analysis"] == curve
+        with pytest.raises(KeyError, match="No runtime model"):
+            models.predict("run_pca", features=10, n=10)
+
+    def test_inaccurate_curves_are_not_saved(self, tmp_path):
+        points = _halla_points()
+        points[0]["peak_mb"] *= 3
+        bad = fit_curve("run_halla_analysis", points, ["f1", "f2", "n"],
+                        time_terms=[["f1", "f2"], ["f1", "f2", "n"]],
+                        memory_terms=[["f1", "n"], ["f2", "n"]])
+
+        assert bad.max_relative_error < 1e-6
+        assert not bad.within()
+        with pytest.raises(ValueError, match="run_halla_analysis"):
+            RuntimeModels({"run_halla_analysis": bad}).save(tmp_path / "models.json")
+        assert not (tmp_path / "models.json").exists()
+
+    def test_measure_reports_time_and_peak_memory(self):
+        seconds, peak_mb = measure(lambda: np.ones(2 ** 21), repeat=2)
+
+        assert seconds > 0
+        assert peak_mb >= 15  # 16 MB buffer
+
+
+class TestBundledModels:
+    """Tests for the calibration shipped with the repository."""
+
+    @pytest.mark.parametrize("tool,small,large", [
+        ("run_halla_analysis", {"f1": 500, "f2": 500, "n": 20}, {"f1": 2000, "f2": 2000, "n": 20}),
+        ("run_multiomics_pca", {"features": 2000, "n": 50}, {"features": 32000, "n": 400}),
+        ("create_multiomics_heatmap", {"rows": 250, "n": 40}, {"rows": 2000, "n": 160}),
+        ("integrate_omics_data", {"features": 1000, "n": 10}, {"features": 32000, "n": 160}),
+        ("calculate_spatial_autocorrelation", {"genes": 500, "spots": 500},
+         {"genes": 8000, "spots": 2000}),
+        ("perform_batch_correction", {"genes": 500, "spots": 300}, {"genes": 8000, "spots": 1200}),
+    ])
+    def test_larger_inputs_cost_more(self, tool, small, large):
+        models = load_runtime_models()
+
+        assert models.predict(tool, **large).wall_seconds > models.predict(tool, **small).wall_seconds
+        assert models.predict(tool, **large).peak_memory_mb > models.predict(tool, **small).peak_memory_mb
+
+    def test_bundled_curves_fit_their_calibration(self):
+        models = load_runtime_models()
+
+        assert all(curve.within() for curve in models.curves.values())
+
+
+class TestCostEstimator:
+    """Tests for runtime-based cost estimates."""
+
+    def test_compute_cost_and_instance_fit(self, curve):
+        models = RuntimeModels({"run_halla_analysis": curve})
+
+        small = CostEstimator.tool_runtime_cost("run_halla_analysis", models=models,
+                                                f1=1000, f2=500, n=10)
+        huge = CostEstimator.tool_runtime_cost("run_halla_analysis", "aws_batch_small", models=models,
+                                               f1=10 ** 6, f2=10 ** 6, n=100)
+
+        assert small["compute_usd"] == pytest.approx(
+            CostEstimator.compute_cost("aws_batch_medium", small["wall_seconds"] / 3600))
+        assert small["fits_instance"]
+        assert not huge["fits_instance"]
+        assert huge["extrapolated"]
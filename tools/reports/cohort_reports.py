@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Batch cohort mode for the patient report generator.
+
+Generates reports for every patient in a manifest using a pool of worker
+processes. Each worker runs one patient at a time (its stages sequentially) so
+the pool size bounds both CPU and memory use.
+
+Features:
+    - Data directories are discovered once for the whole cohort (or taken from
+      the manifest's ``spatial_dir`` column); patients without one fail fast
+    - Reference artifacts (cell signatures) are loaded once and installed in
+      each worker at start-up; spatial weights matrices are cached per worker
+      and reused by every patient with the same spot layout
+    - Optional per-worker memory cap (address-space limit, Linux/macOS)
+    - Resume: completed patients are skipped; partially finished patients
+      reuse their stages from the shared content-addressed stage cache
+    - Cohort summary table (CSV + JSON) with throughput in patients/hour
+
+Manifest format (CSV or JSON list of objects):
+    patient_id,spatial_dir
+    PAT001-OVC-2025,/data/patient-data/PAT001-OVC-2025/spatial
+    PAT002-OVC-2025,
+
+Usage:
+    python generate_patient_report.py --manifest cohort.csv --output-dir ./results \\
+        --workers 8 --max-memory-mb 4096 --resume
+"""
+
+import contextlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from generate_patient_report import CELL_SIGNATURES, PatientReportGenerator, init_plot_style
+
+COMPLETE_MARKER = "report_complete.json"
+SUMMARY_COLUMNS = [
+    'patient_id', 'status', 'elapsed_seconds', 'num_genes', 'num_spots', 'num_degs',
+    'num_svgs', 'stages_restored', 'worker_pid', 'output_dir', 'error',
+]
+
+# Reference artifacts installed once per worker process by _init_worker
+_WORKER_SIGNATURES: Optional[Dict[str, List[str]]] = None
+
+
+@dataclass
+class CohortTask:
+    """One patient's report job."""
+    patient_id: str
+    output_dir: str
+    spatial_dir: Optional[str] = None
+    data_dir: Optional[str] = None
+    generate_draft: bool = False
+    parameters: Optional[Dict[str, float]] = None
+    use_cache: bool = True
+    cache_dir: Optional[str] = None
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Load a cohort manifest (CSV or JSON).
+
+    Args:
+        manifest_path: Path to a CSV with a ``patient_id`` column, or a JSON
+            list of objects with a ``patient_id`` key
+
+    Returns:
+        List of manifest rows (dicts), duplicates removed in order
+    """
+    path = Path(manifest_path)
+    if path.suffix.lower() == '.json':
+        with open(path) as f:
+            rows = json.load(f)
+    else:
+        rows = pd.read_csv(path, dtype=str).fillna('').to_dict(orient='records')
+
+    seen = set()
+    manifest = []
+    for row in rows:
+        patient_id = str(row.get('patient_id', '')).strip()
+        if not patient_id:
+            raise ValueError(f"Manifest row without patient_id: {row}")
+        if patient_id in seen:
+            continue
+        seen.add(patient_id)
+        manifest.append({k: v for k, v in row.items() if v not in ('', None)})
+    return manifest
+
+
+def discover_spatial_dirs(data_dir: Path) -> Dict[str, Path]:
+    """Scan the patient data root once: patient directory name (upper-case) -> spatial dir."""
+    found = {}
+    if not data_dir.exists():
+        return found
+    for expr_file in data_dir.glob("*/spatial/visium_gene_expression.csv"):
+        found[expr_file.parent.parent.name.upper()] = expr_file.parent
+    return found
+
+
+def _init_worker(memory_limit_mb: Optional[int], signatures: Dict[str, List[str]]) -> None:
+    """Worker initializer: apply the memory cap and install shared references."""
+    global _WORKER_SIGNATURES
+    _WORKER_SIGNATURES = signatures
+
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"⚠️  Could not apply worker memory cap: {e}")
+
+    init_plot_style()
+
+
+def _run_patient(task: CohortTask) -> Dict[str, Any]:
+    """Generate one patient's report (runs in a worker). Never raises."""
+    start = time.perf_counter()
+    patient_output_dir = Path(task.output_dir) / task.patient_id
+    patient_output_dir.mkdir(parents=True, exist_ok=True)
+
+    row = {
+        'patient_id': task.patient_id,
+        'worker_pid': os.getpid(),
+        'output_dir': str(patient_output_dir),
+    }
+
+    try:
+        # Per-patient log file keeps worker output readable
+        with open(patient_output_dir / "report.log", 'a') as log_file, \
+                contextlib.redirect_stdout(log_file):
+            generator = PatientReportGenerator(
+                task.patient_id,
+                task.output_dir,
+                generate_draft=task.generate_draft,
+                max_workers=1,  # Patient-level parallelism; stages run sequentially
+                data_dir=task.data_dir,
+                spatial_dir=task.spatial_dir,
+                signatures=_WORKER_SIGNATURES,
+                parameters=task.parameters,
+                use_cache=task.use_cache,
+                cache_dir=task.cache_dir,
+            )
+            generator.generate_report()
+
+        row.update({
+            'status': 'success',
+            'num_genes': int(generator.spatial_data['expression'].shape[0]),
+            'num_spots': int(generator.spatial_data['expression'].shape[1]),
+            'num_degs': len(generator.analysis_results.get('significant_degs', [])),
+            'num_svgs': len(generator.analysis_results.get('spatially_variable_genes', [])),
+            'stages_restored': len(generator.restored_stages),
+        })
+    except MemoryError:
+        row.update({'status': 'failed', 'error': 'MemoryError: worker memory cap exceeded'})
+    except Exception as e:
+        row.update({'status': 'failed', 'error': f"{type(e).__name__}: {e}"})
+        with open(patient_output_dir / "report.log", 'a') as log_file:
+            log_file.write(traceback.format_exc())
+
+    row['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+
+    if row['status'] == 'success':
+        with open(patient_output_dir / COMPLETE_MARKER, 'w') as f:
+            json.dump({**row, 'completed_at': datetime.now().isoformat()}, f, indent=2)
+
+    return row
+
+
+class CohortReportRunner:
+    """Schedule patient reports across a worker pool and summarize the cohort."""
+
+    def __init__(
+        self,
+        manifest: List[Dict[str, Any]],
+        output_dir: str,
+        data_dir: Optional[str] = None,
+        workers: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        generate_draft: bool = False,
+        resume: bool = False,
+        signatures: Optional[Dict[str, List[str]]] = None,
+        parameters: Optional[Dict[str, float]] = None,
+        use_cache: bool = True,
+        cache_dir: Optional[str] = None,
+        log: Callable[[str], None] = print,
+    ):
+        self.manifest = manifest
+        self.output_dir = Path(output_dir)
+        self.data_dir = Path(data_dir) if data_dir else None
+        self.workers = workers or os.cpu_count()
+        self.memory_limit_mb = memory_limit_mb
+        self.generate_draft = generate_draft
+        self.resume = resume
+        self.signatures = signatures or CELL_SIGNATURES
+        self.parameters = parameters
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.log = log
+
+    def build_tasks(self) -> List[CohortTask]:
+        """Resolve each patient's data directory once, up front."""
+        discovered = discover_spatial_dirs(self.data_dir) if self.data_dir else {}
+
+        tasks = []
+        for row in self.manifest:
+            patient_id = row['patient_id']
+            spatial_dir = row.get('spatial_dir') or discovered.get(patient_id.upper())
+            tasks.append(CohortTask(
+                patient_id=patient_id,
+                output_dir=str(self.output_dir),
+                spatial_dir=str(spatial_dir) if spatial_dir else None,
+                data_dir=str(self.data_dir) if self.data_dir else None,
+                generate_draft=self.generate_draft,
+                parameters=self.parameters,
+                use_cache=self.use_cache,
+                cache_dir=self.cache_dir,
+            ))
+        return tasks
+
+    def _already_complete(self, task: CohortTask) -> Optional[Dict[str, Any]]:
+        """Return the stored summary row if this patient finished in an earlier run."""
+        marker = Path(task.output_dir) / task.patient_id / COMPLETE_MARKER
+        if not (self.resume and marker.exists()):
+            return None
+        with open(marker) as f:
+            row = json.load(f)
+        row['status'] = 'skipped (complete)'
+        row['elapsed_seconds'] = 0.0
+        return row
+
+    def run(self) -> pd.DataFrame:
+        """Generate all reports and write the cohort summary.
+
+        Returns:
+            Cohort summary DataFrame (one row per patient)
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tasks = self.build_tasks()
+
+        rows = []
+        pending = []
+        for task in tasks:
+            done = self._already_complete(task)
+            if done is not None:
+                rows.append(done)
+            elif task.spatial_dir is None:
+                # Never let a patient fall back to another patient's data directory
+                rows.append({
+                    'patient_id': task.patient_id,
+                    'status': 'failed',
+                    'elapsed_seconds': 0.0,
+                    'error': 'No spatial data directory found (set spatial_dir in manifest)',
+                })
+            else:
+                pending.append(task)
+
+        self.log(f"Cohort: {len(tasks)} patient(s), {len(pending)} to run, "
+                 f"{sum(r['status'] != 'failed' for r in rows)} already complete, "
+                 f"{sum(r['status'] == 'failed' for r in rows)} without data")
+        self.log(f"Workers: {self.workers}"
+                 + (f", memory cap {self.memory_limit_mb} MB/worker" if self.memory_limit_mb else ""))
+
+        start = time.perf_counter()
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending)),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb, self.signatures),
+            ) as pool:
+                futures = {pool.submit(_run_patient, task): task for task in pending}
+                for future in as_completed(futures):
+                    row = future.result()
+                    rows.append(row)
+                    icon = "✅" if row['status'] == 'success' else "❌"
+                    self.log(f"{icon} {row['patient_id']}: {row['status']} "
+                             f"({row['elapsed_seconds']:.1f}s) [{len(rows)}/{len(tasks)}]"
+                             + (f" - {row['error']}" if row.get('error') else ""))
+        wall_seconds = time.perf_counter() - start
+
+        summary = pd.DataFrame(rows).reindex(columns=SUMMARY_COLUMNS)
+        count_columns = ['num_genes', 'num_spots', 'num_degs', 'num_svgs',
+                         'stages_restored', 'worker_pid']
+        summary[count_columns] = summary[count_columns].astype('Int64')
+        order = {task.patient_id: idx for idx, task in enumerate(tasks)}
+        summary = summary.sort_values('patient_id', key=lambda ids: ids.map(order))
+        self.write_summary(summary, wall_seconds)
+        return summary
+
+    def write_summary(self, summary: pd.DataFrame, wall_seconds: float) -> Dict[str, Any]:
+        """Write cohort_summary.csv / cohort_summary.json and log throughput."""
+        succeeded = int((summary['status'] == 'success').sum())
+        failed = int((summary['status'] == 'failed').sum())
+        throughput = succeeded / (wall_seconds / 3600) if wall_seconds > 0 else 0.0
+
+        stats = {
+            'generated_at': datetime.now().isoformat(),
+            'patients_total': int(len(summary)),
+            'patients_succeeded': succeeded,
+            'patients_failed': failed,
+            'patients_skipped': int(len(summary) - succeeded - failed),
+            'wall_time_seconds': round(wall_seconds, 2),
+            'throughput_patients_per_hour': round(throughput, 1),
+            'workers': self.workers,
+            'memory_limit_mb': self.memory_limit_mb,
+            'failed_patients': summary.loc[summary['status'] == 'failed', 'patient_id'].tolist(),
+        }
+
+        summary.to_csv(self.output_dir / "cohort_summary.csv", index=False)
+        with open(self.output_dir / "cohort_summary.json", 'w') as f:
+            json.dump(stats, f, indent=2)
+
+        self.log("=" * 80)
+        self.log(f"COHORT COMPLETE: {succeeded} succeeded, {failed} failed, "
+                 f"{stats['patients_skipped']} skipped")
+        self.log(f"   Wall time: {wall_seconds:.1f}s | Throughput: {throughput:.1f} patients/hour")
+        self.log(f"   Summary: {self.output_dir / 'cohort_summary.csv'}")
+        self.log("=" * 80)
+        return stats
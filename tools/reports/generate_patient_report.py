@@ -8,19 +8,33 @@ Integrates FHIR clinical data with spatial molecular analysis.
 Usage:
     python generate_patient_report.py --patient-id patient-001 --output-dir ./results
 
+Analyses and figures run as a dependency graph of stages (see report_pipeline.py);
+independent stages execute concurrently in a process pool (--workers) and
+per-stage timings are logged and saved to metadata.json.
+
+Stage outputs are kept in a content-addressed cache (see stage_cache.py) keyed
+by the input data hashes, stage parameters and code. Re-running a report (e.g.
+after CitL review, or with one --param changed) re-executes only the stages
+whose inputs changed; an interrupted run simply continues where it stopped.
+
+For many patients at once, pass a manifest instead of --patient-id
+(see cohort_reports.py):
+    python generate_patient_report.py --manifest cohort.csv --output-dir ./results --workers 8
+
 Author: Claude Code
 Date: December 29, 2025
 """
 
 import argparse
+import inspect
 import os
+import pickle
 import sys
 from pathlib import Path
 from datetime import datetime
 import json
 import pandas as pd
 import numpy as np
-from scipy import stats
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
@@ -30,27 +44,103 @@ import seaborn as sns
 sys.path.insert(0, str(Path(__file__).parent / "servers" / "mcp-spatialtools" / "src"))
 sys.path.insert(0, str(Path(__file__).parent / "servers" / "mcp-epic" / "src"))
 
-from mcp_spatialtools.server import _calculate_morans_i
+import report_stats
+from report_pipeline import StagePipeline, format_timings
+from stage_cache import StageCache, hash_file, stage_keys
+
+DEFAULT_DATA_DIR = Path("/Users/lynnlangit/Documents/GitHub/spatial-mcp/data/patient-data")
+
+# Marker gene signatures used for cell type deconvolution
+CELL_SIGNATURES = {
+    'fibroblasts': ['COL1A1', 'COL3A1', 'ACTA2'],
+    'immune_cells': ['CD3D', 'CD8A', 'PTPRC'],
+    'hypoxic': ['HIF1A', 'CA9', 'VEGFA'],
+    'resistant': ['ABCB1', 'PIK3CA', 'AKT1']
+}
+
+# Analysis thresholds (override with --param NAME=VALUE)
+DEFAULT_PARAMETERS = {
+    'fdr_threshold': 0.05,
+    'log2fc_threshold': 1.0,
+    'morans_distance_threshold': 1.5,
+    'svg_p_threshold': 0.01,
+}
+
+# Allowed range of each parameter: (low, high, low is inclusive)
+PARAMETER_RANGES = {
+    'fdr_threshold': (0.0, 1.0, False),
+    'log2fc_threshold': (0.0, np.inf, True),
+    'morans_distance_threshold': (0.0, np.inf, False),
+    'svg_p_threshold': (0.0, 1.0, False),
+}
+
+
+def parameter_error(name: str, value: float):
+    """Why ``value`` is not a valid setting of parameter ``name``, or None if it is."""
+    low, high, low_inclusive = PARAMETER_RANGES[name]
+    above_low = value >= low if low_inclusive else value > low
+    if not (above_low and value <= high and np.isfinite(value)):
+        bracket = '[' if low_inclusive else '('
+        upper = f'{high:g}]' if np.isfinite(high) else 'inf)'
+        return f"{name} must be in {bracket}{low:g}, {upper}, got {value:g}"
+    return None
+
+# Modules whose source the analysis stage outputs depend on (part of the cache key)
+ANALYSIS_CODE = (
+    report_stats,
+    inspect.getmodule(report_stats.adjust_pvalues),
+    inspect.getmodule(report_stats._calculate_morans_i_batch),
+)
+
+# Files each spatial input is loaded from (hashed into the stage cache keys)
+SPATIAL_INPUT_FILES = {
+    'expression': "visium_gene_expression.csv",
+    'regions': "visium_region_annotations.csv",
+    'coordinates': "visium_spatial_coordinates.csv",
+}
+
+
+def init_plot_style():
+    """Apply the report figure style (also used as the worker initializer)."""
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.dpi'] = 300
+    plt.rcParams['savefig.dpi'] = 300
+    plt.rcParams['font.size'] = 10
 
 
 class PatientReportGenerator:
     """Generate comprehensive patient analysis reports."""
 
-    def __init__(self, patient_id: str, output_dir: str, generate_draft: bool = False):
+    def __init__(self, patient_id: str, output_dir: str, generate_draft: bool = False,
+                 max_workers: int = None, data_dir: str = None, spatial_dir: str = None,
+                 signatures: dict = None, parameters: dict = None,
+                 use_cache: bool = True, cache_dir: str = None):
         self.patient_id = patient_id
         self.output_dir = Path(output_dir)
         self.patient_output_dir = self.output_dir / patient_id
         self.patient_output_dir.mkdir(parents=True, exist_ok=True)
         self.generate_draft = generate_draft
+        self.max_workers = max_workers
+        self.signatures = signatures or CELL_SIGNATURES
+        self.parameters = {**DEFAULT_PARAMETERS, **(parameters or {})}
 
-        # Data paths
-        self.data_dir = Path("/Users/lynnlangit/Documents/GitHub/spatial-mcp/data/patient-data")
-        self.patient_data_dir = None
+        # Content-addressed stage cache, shared by all patients in an output directory
+        cache_root = Path(cache_dir) if cache_dir else self.output_dir / ".stage_cache"
+        self.stage_cache = StageCache(cache_root) if use_cache else None
+
+        # Data paths (spatial_dir skips directory discovery, e.g. from a cohort manifest)
+        self.data_dir = Path(data_dir) if data_dir else DEFAULT_DATA_DIR
+        self.patient_data_dir = Path(spatial_dir) if spatial_dir else None
 
         # Results storage
         self.fhir_data = {}
         self.spatial_data = {}
         self.analysis_results = {}
+        self.input_hashes = {}
+        self.stage_keys = {}
+        self.stage_artifacts = {}
+        self.stage_timings = {}
+        self.restored_stages = set()
 
     def log(self, message: str):
         """Print timestamped log message."""
@@ -157,30 +247,36 @@ class PatientReportGenerator:
             self.data_dir / f"PAT001-OVC-2025" / "spatial",  # Specific to our test patient
         ]
 
-        for data_dir in possible_dirs:
-            if data_dir.exists():
-                self.patient_data_dir = data_dir
-                break
+        if self.patient_data_dir is None:
+            for data_dir in possible_dirs:
+                if data_dir.exists():
+                    self.patient_data_dir = data_dir
+                    break
 
         if not self.patient_data_dir:
             raise FileNotFoundError(f"Could not find spatial data for {self.patient_id}")
 
         self.log(f"   Data directory: {self.patient_data_dir}")
 
+        self.input_hashes = {
+            name: hash_file(self.patient_data_dir / filename)
+            for name, filename in SPATIAL_INPUT_FILES.items()
+        }
+
         # Load expression data
-        expr_file = self.patient_data_dir / "visium_gene_expression.csv"
+        expr_file = self.patient_data_dir / SPATIAL_INPUT_FILES['expression']
         expr_data = pd.read_csv(expr_file, index_col=0).T  # Transpose to genes × spots
         self.spatial_data['expression'] = expr_data
         self.log(f"✅ Expression: {expr_data.shape[0]} genes × {expr_data.shape[1]} spots")
 
         # Load region annotations
-        region_file = self.patient_data_dir / "visium_region_annotations.csv"
+        region_file = self.patient_data_dir / SPATIAL_INPUT_FILES['regions']
         region_data = pd.read_csv(region_file).set_index('barcode')
         self.spatial_data['regions'] = region_data
         self.log(f"✅ Regions: {len(region_data['region'].unique())} tissue regions")
 
         # Load coordinates
-        coord_file = self.patient_data_dir / "visium_spatial_coordinates.csv"
+        coord_file = self.patient_data_dir / SPATIAL_INPUT_FILES['coordinates']
         coord_data = pd.read_csv(coord_file).set_index('barcode')
         self.spatial_data['coordinates'] = coord_data
         self.log(f"✅ Coordinates: {len(coord_data)} spots")
@@ -212,70 +308,33 @@ class PatientReportGenerator:
 
         if len(tumor_spots) == 0 or len(stroma_spots) == 0:
             self.log("⚠️  Insufficient samples for differential expression")
-            return
+            return {}
 
         self.log(f"   Comparing: {len(tumor_spots)} tumor_core vs {len(stroma_spots)} stroma spots")
 
-        # Extract expression data
-        group1_data = expr_data[tumor_spots].values
-        group2_data = expr_data[stroma_spots].values
-
-        # Perform Mann-Whitney U tests
-        results = []
-        genes = expr_data.index.tolist()
-
-        for gene_idx, gene in enumerate(genes):
-            gene1 = group1_data[gene_idx, :]
-            gene2 = group2_data[gene_idx, :]
-
-            try:
-                statistic, p_value = stats.mannwhitneyu(gene1, gene2, alternative='two-sided')
-
-                mean1 = np.mean(gene1)
-                mean2 = np.mean(gene2)
-
-                if mean2 > 0:
-                    fold_change = mean1 / mean2
-                    log2fc = np.log2(fold_change) if fold_change > 0 else -10
-                else:
-                    log2fc = 10 if mean1 > 0 else 0
-
-                results.append({
-                    'gene': gene,
-                    'mean_tumor': mean1,
-                    'mean_stroma': mean2,
-                    'log2_fold_change': log2fc,
-                    'p_value': p_value,
-                    'statistic': statistic
-                })
-            except:
-                results.append({
-                    'gene': gene,
-                    'mean_tumor': 0,
-                    'mean_stroma': 0,
-                    'log2_fold_change': 0,
-                    'p_value': 1.0,
-                    'statistic': 0
-                })
-
-        deg_df = pd.DataFrame(results)
-
-        # Calculate FDR
-        from scipy.stats import false_discovery_control
-        deg_df['fdr'] = false_discovery_control(deg_df['p_value'].values)
+        # Mann-Whitney U tests + BH FDR for all genes at once
+        deg_df = report_stats.differential_expression(expr_data, tumor_spots, stroma_spots)
 
         # Filter significant DEGs
-        sig_degs = deg_df[(deg_df['fdr'] < 0.05) & (np.abs(deg_df['log2_fold_change']) > 1.0)]
-
-        self.analysis_results['differential_expression'] = deg_df
-        self.analysis_results['significant_degs'] = sig_degs
+        fdr_threshold = self.parameters['fdr_threshold']
+        log2fc_threshold = self.parameters['log2fc_threshold']
+        sig_degs = deg_df[(deg_df['fdr'] < fdr_threshold) &
+                          (np.abs(deg_df['log2_fold_change']) > log2fc_threshold)]
+
+        results = {
+            'differential_expression': deg_df,
+            'significant_degs': sig_degs,
+        }
+        self.analysis_results.update(results)
 
         # Save results
         output_file = self.patient_output_dir / "differential_expression.csv"
         deg_df.to_csv(output_file, index=False)
 
-        self.log(f"✅ DEGs: {len(sig_degs)} significant (FDR < 0.05, |log2FC| > 1)")
+        self.log(f"✅ DEGs: {len(sig_degs)} significant "
+                 f"(FDR < {fdr_threshold}, |log2FC| > {log2fc_threshold})")
         self.log(f"   Saved to: {output_file}")
+        return results
 
     def calculate_spatial_autocorrelation(self):
         """Calculate spatial autocorrelation for all genes."""
@@ -285,49 +344,32 @@ class PatientReportGenerator:
         coord_data = self.spatial_data['coordinates']
 
         coordinates = coord_data[['array_row', 'array_col']].values
-        genes = expr_data.index.tolist()
-
-        results = []
-        for gene in genes:
-            expression_values = expr_data.loc[gene].values
-
-            try:
-                morans_i, z_score, p_value = _calculate_morans_i(
-                    expression_values,
-                    coordinates,
-                    distance_threshold=1.5
-                )
-
-                results.append({
-                    'gene': gene,
-                    'morans_i': morans_i,
-                    'z_score': z_score,
-                    'p_value': p_value
-                })
-            except:
-                results.append({
-                    'gene': gene,
-                    'morans_i': 0,
-                    'z_score': 0,
-                    'p_value': 1.0
-                })
 
-        spatial_df = pd.DataFrame(results)
+        # Moran's I for all genes with a single shared weights matrix
+        spatial_df = report_stats.spatial_autocorrelation(
+            expr_data, coordinates,
+            distance_threshold=self.parameters['morans_distance_threshold']
+        )
         spatial_df = spatial_df.sort_values('morans_i', ascending=False)
 
         # Identify significant SVGs
-        svgs = spatial_df[spatial_df['p_value'] < 0.01]
+        svg_p_threshold = self.parameters['svg_p_threshold']
+        svgs = spatial_df[spatial_df['p_value'] < svg_p_threshold]
 
-        self.analysis_results['spatial_autocorrelation'] = spatial_df
-        self.analysis_results['spatially_variable_genes'] = svgs
+        results = {
+            'spatial_autocorrelation': spatial_df,
+            'spatially_variable_genes': svgs,
+        }
+        self.analysis_results.update(results)
 
         # Save results
         output_file = self.patient_output_dir / "spatial_autocorrelation.csv"
         spatial_df.to_csv(output_file, index=False)
 
-        self.log(f"✅ SVGs: {len(svgs)} spatially variable genes (p < 0.01)")
+        self.log(f"✅ SVGs: {len(svgs)} spatially variable genes (p < {svg_p_threshold})")
         self.log(f"   Top gene: {svgs.iloc[0]['gene']} (Moran's I = {svgs.iloc[0]['morans_i']:.4f})")
         self.log(f"   Saved to: {output_file}")
+        return results
 
     def perform_cell_deconvolution(self):
         """Perform cell type deconvolution."""
@@ -336,49 +378,33 @@ class PatientReportGenerator:
         expr_data = self.spatial_data['expression']
         region_data = self.spatial_data['regions']
 
-        # Define signatures
-        signatures = {
-            'fibroblasts': ['COL1A1', 'COL3A1', 'ACTA2'],
-            'immune_cells': ['CD3D', 'CD8A', 'PTPRC'],
-            'hypoxic': ['HIF1A', 'CA9', 'VEGFA'],
-            'resistant': ['ABCB1', 'PIK3CA', 'AKT1']
-        }
-
-        # Calculate signature scores
-        signature_scores = {}
-        for cell_type, sig_genes in signatures.items():
-            available_genes = [g for g in sig_genes if g in expr_data.index]
-
-            if len(available_genes) > 0:
-                sig_expr = expr_data.loc[available_genes]
-                scores = sig_expr.mean(axis=0)
-                signature_scores[cell_type] = scores
-
-        score_df = pd.DataFrame(signature_scores)
+        # Calculate signature scores (spots × signatures)
+        score_df = report_stats.signature_scores(expr_data, self.signatures)
         score_df['region'] = region_data['region'].values
 
         # Calculate mean scores by region
         region_means = score_df.groupby('region').mean()
 
-        self.analysis_results['cell_deconvolution'] = score_df
-        self.analysis_results['region_cell_scores'] = region_means
+        results = {
+            'cell_deconvolution': score_df,
+            'region_cell_scores': region_means,
+        }
+        self.analysis_results.update(results)
 
         # Save results
         output_file = self.patient_output_dir / "cell_deconvolution.csv"
         region_means.to_csv(output_file)
 
-        self.log(f"✅ Cell types: {len(signature_scores)} signatures analyzed")
+        self.log(f"✅ Cell types: {score_df.shape[1] - 1} signatures analyzed")
         self.log(f"   Saved to: {output_file}")
+        return results
 
     def create_visualizations(self):
         """Generate all visualizations for the report."""
         self.log("Creating visualizations...")
 
         # Set style
-        sns.set_style("whitegrid")
-        plt.rcParams['figure.dpi'] = 300
-        plt.rcParams['savefig.dpi'] = 300
-        plt.rcParams['font.size'] = 10
+        init_plot_style()
 
         # Create individual plots
         self.plot_volcano()
@@ -389,6 +415,114 @@ class PatientReportGenerator:
 
         self.log(f"✅ Visualizations saved to: {self.patient_output_dir}")
 
+    def build_stage_pipeline(self):
+        """Build the analysis/figure stage graph.
+
+        DE, spatial autocorrelation and deconvolution are independent; each
+        figure depends only on the analyses whose results it draws. Each stage
+        declares the parameters, code and output files its cache key covers.
+        """
+        pipeline = StagePipeline(max_workers=self.max_workers, log=self.log,
+                                 initializer=init_plot_style)
+        params = self.parameters
+
+        pipeline.add_stage(
+            'differential_expression', self.perform_differential_expression,
+            params={k: params[k] for k in ('fdr_threshold', 'log2fc_threshold')},
+            code=(self.perform_differential_expression, *ANALYSIS_CODE),
+            artifacts=['differential_expression.csv'])
+        pipeline.add_stage(
+            'spatial_autocorrelation', self.calculate_spatial_autocorrelation,
+            params={k: params[k] for k in ('morans_distance_threshold', 'svg_p_threshold')},
+            code=(self.calculate_spatial_autocorrelation, *ANALYSIS_CODE),
+            artifacts=['spatial_autocorrelation.csv'])
+        pipeline.add_stage(
+            'cell_deconvolution', self.perform_cell_deconvolution,
+            params={'signatures': self.signatures},
+            code=(self.perform_cell_deconvolution, *ANALYSIS_CODE),
+            artifacts=['cell_deconvolution.csv'])
+
+        pipeline.add_stage(
+            'volcano_plot', self.plot_volcano,
+            depends_on=['differential_expression'],
+            params={k: params[k] for k in ('fdr_threshold', 'log2fc_threshold')},
+            code=(self.plot_volcano, init_plot_style),
+            artifacts=['volcano_plot.png'])
+        pipeline.add_stage(
+            'spatial_heatmap', self.plot_spatial_heatmap,
+            depends_on=['spatial_autocorrelation'],
+            code=(self.plot_spatial_heatmap, init_plot_style),
+            artifacts=['spatial_heatmap.png'])
+        pipeline.add_stage(
+            'cell_composition', self.plot_cell_composition,
+            depends_on=['cell_deconvolution'],
+            code=(self.plot_cell_composition, init_plot_style),
+            artifacts=['cell_composition_heatmap.png'])
+        pipeline.add_stage(
+            'spatial_autocorrelation_plot', self.plot_spatial_autocorrelation,
+            depends_on=['spatial_autocorrelation'],
+            code=(self.plot_spatial_autocorrelation, init_plot_style),
+            artifacts=['spatial_autocorrelation_plot.png'])
+        pipeline.add_stage(
+            'summary_figure', self.plot_summary_figure,
+            depends_on=['differential_expression', 'spatial_autocorrelation',
+                        'cell_deconvolution'],
+            params={'svg_p_threshold': params['svg_p_threshold']},
+            code=(self.plot_summary_figure, init_plot_style),
+            artifacts=['summary_figure.png'])
+        return pipeline
+
+    def merge_stage_result(self, stage_name, result):
+        """Merge a finished stage's results (computed in a worker) into this process."""
+        if isinstance(result, dict):
+            self.analysis_results.update(result)
+
+    def cache_stage(self, stage_name, result):
+        """Merge a stage result and store it (with its output files) in the stage cache."""
+        self.merge_stage_result(stage_name, result)
+        if self.stage_cache is None or stage_name in self.restored_stages:
+            return
+
+        self.stage_cache.store(self.stage_keys[stage_name], stage_name, result,
+                               self.patient_output_dir, self.stage_artifacts[stage_name])
+
+    def load_cached_stages(self):
+        """Restore stages whose key (inputs, parameters, code) is already cached."""
+        completed = {}
+        for stage_name, key in self.stage_keys.items():
+            if not self.stage_cache.contains(key):
+                continue
+            try:
+                completed[stage_name] = self.stage_cache.load(key, self.patient_output_dir)
+            except (OSError, EOFError, KeyError, ValueError, pickle.UnpicklingError) as e:
+                self.log(f"⚠️  Ignoring unreadable cache entry for {stage_name}: {e}")
+        return completed
+
+    def run_analysis_stages(self):
+        """Run analyses and figures concurrently according to the stage graph."""
+        workers = self.max_workers or os.cpu_count()
+        self.log(f"Running analysis stages ({workers} worker(s))...")
+
+        pipeline = self.build_stage_pipeline()
+        self.stage_keys = stage_keys(pipeline, self.input_hashes,
+                                     context={'patient_id': self.patient_id})
+        self.stage_artifacts = {name: stage.artifacts for name, stage in pipeline.stages.items()}
+
+        completed = {}
+        if self.stage_cache is not None:
+            completed = self.load_cached_stages()
+            if completed:
+                self.log(f"   Stage cache: {len(completed)}/{len(pipeline.stages)} stage(s) "
+                         f"unchanged")
+        self.restored_stages = set(completed)
+
+        self.stage_timings = pipeline.run(on_result=self.cache_stage, completed=completed)
+
+        self.log("Stage timings:")
+        for line in format_timings(self.stage_timings):
+            self.log(f"   {line}")
+        self.log(f"✅ Visualizations saved to: {self.patient_output_dir}")
+
     def plot_volcano(self):
         """Create volcano plot for differential expression."""
         if 'differential_expression' not in self.analysis_results:
@@ -400,7 +534,10 @@ class PatientReportGenerator:
 
         # Prepare data
         deg_df['neg_log10_fdr'] = -np.log10(deg_df['fdr'] + 1e-300)
-        deg_df['significant'] = (deg_df['fdr'] < 0.05) & (np.abs(deg_df['log2_fold_change']) > 1.0)
+        fdr_threshold = self.parameters['fdr_threshold']
+        log2fc_threshold = self.parameters['log2fc_threshold']
+        deg_df['significant'] = ((deg_df['fdr'] < fdr_threshold) &
+                                 (np.abs(deg_df['log2_fold_change']) > log2fc_threshold))
 
         # Color scheme
         colors = ['lightgray' if not sig else 'red' if log2fc > 0 else 'blue'
@@ -411,9 +548,9 @@ class PatientReportGenerator:
                   c=colors, alpha=0.6, s=50, edgecolors='none')
 
         # Threshold lines
-        ax.axhline(-np.log10(0.05), color='gray', linestyle='--', linewidth=1, alpha=0.5)
-        ax.axvline(-1, color='gray', linestyle='--', linewidth=1, alpha=0.5)
-        ax.axvline(1, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+        ax.axhline(-np.log10(fdr_threshold), color='gray', linestyle='--', linewidth=1, alpha=0.5)
+        ax.axvline(-log2fc_threshold, color='gray', linestyle='--', linewidth=1, alpha=0.5)
+        ax.axvline(log2fc_threshold, color='gray', linestyle='--', linewidth=1, alpha=0.5)
 
         # Label top genes
         sig_degs = deg_df[deg_df['significant']].sort_values('neg_log10_fdr', ascending=False).head(10)
@@ -636,7 +773,8 @@ Key Findings:
 
         if 'spatially_variable_genes' in self.analysis_results:
             svgs = self.analysis_results['spatially_variable_genes']
-            summary_text += f"  • {len(svgs)} spatially variable genes (p < 0.01)\n"
+            summary_text += (f"  • {len(svgs)} spatially variable genes "
+                             f"(p < {self.parameters['svg_p_threshold']})\n")
 
         # Check for resistance markers
         if 'significant_degs' in self.analysis_results:
@@ -821,6 +959,15 @@ Key Findings:
             'analysis_results': {
                 'num_degs': len(self.analysis_results.get('significant_degs', [])),
                 'num_svgs': len(self.analysis_results.get('spatially_variable_genes', []))
+            },
+            'parameters': self.parameters,
+            'input_hashes': self.input_hashes,
+            'stage_timings_seconds': {
+                name: round(timing.seconds, 3) for name, timing in self.stage_timings.items()
+            },
+            'stage_cache': {
+                'keys': self.stage_keys,
+                'reused': sorted(self.restored_stages),
             }
         }
 
@@ -1287,18 +1434,8 @@ Key Findings:
         self.load_spatial_data()
         self.log("")
 
-        # Step 3: Run analyses
-        self.perform_differential_expression()
-        self.log("")
-
-        self.calculate_spatial_autocorrelation()
-        self.log("")
-
-        self.perform_cell_deconvolution()
-        self.log("")
-
-        # Step 4: Create visualizations
-        self.create_visualizations()
+        # Steps 3-4: Run analyses and create visualizations (parallel stage graph)
+        self.run_analysis_stages()
         self.log("")
 
         # Step 5: Generate summary
@@ -1345,14 +1482,29 @@ Examples:
 
   # Specify custom output directory
   python generate_patient_report.py --patient-id PAT002-OVC-2025 --output-dir /path/to/results
+
+  # Cohort mode: all patients in a manifest, 8 workers, 4 GB cap per worker
+  python generate_patient_report.py --manifest cohort.csv --data-dir /data/patient-data \\
+      --output-dir ./results --workers 8 --max-memory-mb 4096
+
+  # Re-run after changing one threshold: only the affected stages re-execute
+  python generate_patient_report.py --patient-id PAT001-OVC-2025 --output-dir ./results \\
+      --param fdr_threshold=0.01
+
+  # Continue an interrupted cohort run, skipping completed patients
+  python generate_patient_report.py --manifest cohort.csv --output-dir ./results --resume
         """
     )
 
-    parser.add_argument(
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
         '--patient-id',
-        required=True,
         help='Patient ID (e.g., patient-001)'
     )
+    target.add_argument(
+        '--manifest',
+        help='Cohort manifest (CSV or JSON with a patient_id column) for batch mode'
+    )
 
     parser.add_argument(
         '--output-dir',
@@ -1366,10 +1518,104 @@ Examples:
         help='Generate draft report with quality checks for CitL review workflow (default: False)'
     )
 
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Worker processes: analysis/figure stages for one patient, or patients '
+             'in cohort mode (default: all CPUs; 1 = sequential)'
+    )
+
+    parser.add_argument(
+        '--data-dir',
+        default=None,
+        help=f'Root directory of patient data (default: {DEFAULT_DATA_DIR})'
+    )
+
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Cohort mode: skip patients whose report already completed'
+    )
+
+    parser.add_argument(
+        '--param',
+        action='append',
+        default=[],
+        metavar='NAME=VALUE',
+        help=f'Override an analysis parameter (repeatable). '
+             f'Defaults: {", ".join(f"{k}={v}" for k, v in DEFAULT_PARAMETERS.items())}'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help='Stage cache directory (default: <output-dir>/.stage_cache)'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Recompute every stage instead of reusing cached stage outputs'
+    )
+
+    parser.add_argument(
+        '--max-memory-mb',
+        type=int,
+        default=None,
+        help='Cohort mode: address-space cap per worker process in MB'
+    )
+
+    parser.add_argument(
+        '--signatures',
+        default=None,
+        help='JSON file of cell type signatures (default: built-in ovarian cancer panel)'
+    )
+
     args = parser.parse_args()
 
+    signatures = None
+    if args.signatures:
+        with open(args.signatures) as f:
+            signatures = json.load(f)
+
+    parameters = {}
+    for override in args.param:
+        name, sep, value = override.partition('=')
+        if not sep or name not in DEFAULT_PARAMETERS:
+            parser.error(f"--param expects NAME=VALUE with NAME in {list(DEFAULT_PARAMETERS)}")
+        try:
+            parameters[name] = float(value)
+        except ValueError:
+            parser.error(f"--param {name} expects a number, got {value!r}")
+        error = parameter_error(name, parameters[name])
+        if error:
+            parser.error(f"--param {error}")
+
+    if args.manifest:
+        from cohort_reports import CohortReportRunner, load_manifest
+
+        runner = CohortReportRunner(
+            load_manifest(args.manifest),
+            args.output_dir,
+            data_dir=args.data_dir or DEFAULT_DATA_DIR,
+            workers=args.workers,
+            memory_limit_mb=args.max_memory_mb,
+            generate_draft=args.generate_draft,
+            resume=args.resume,
+            signatures=signatures,
+            parameters=parameters,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+        )
+        summary = runner.run()
+        sys.exit(0 if (summary['status'] != 'failed').all() else 1)
+
     # Generate report
-    generator = PatientReportGenerator(args.patient_id, args.output_dir, args.generate_draft)
+    generator = PatientReportGenerator(args.patient_id, args.output_dir, args.generate_draft,
+                                       max_workers=args.workers, data_dir=args.data_dir,
+                                       signatures=signatures, parameters=parameters,
+                                       use_cache=not args.no_cache, cache_dir=args.cache_dir)
     generator.generate_report()
 
 
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Stage scheduler for patient report generation.
+
+Runs report stages (analyses and figures) as a dependency DAG. Independent
+stages execute concurrently in a process pool; a stage is submitted only after
+every stage it depends on has finished and its result has been handed back to
+the caller, so dependents always see up-to-date inputs.
+
+Usage:
+    pipeline = StagePipeline(max_workers=4, log=print)
+    pipeline.add_stage("differential_expression", generator.perform_differential_expression)
+    pipeline.add_stage("volcano_plot", generator.plot_volcano,
+                       depends_on=["differential_expression"])
+    timings = pipeline.run(on_result=generator.merge_stage_result)
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class Stage:
+    """A single unit of report work.
+
+    ``params``, ``code`` and ``artifacts`` describe the stage for caching (see
+    stage_cache.py): the parameters and source code its output depends on, and
+    the files it writes.
+    """
+    name: str
+    func: Callable[[], Any]
+    depends_on: Tuple[str, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    code: Tuple[Any, ...] = ()
+    artifacts: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageTiming:
+    """Execution timing for one stage."""
+    name: str
+    seconds: float
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    worker_pid: Optional[int] = None
+
+
+def _run_timed(func: Callable[[], Any]) -> Tuple[Any, float, float, int]:
+    """Execute a stage callable and measure its wall time (runs in the worker)."""
+    start = time.time()
+    tick = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - tick, start, os.getpid()
+
+
+@dataclass
+class StagePipeline:
+    """Dependency-ordered, process-parallel stage executor.
+
+    Stage callables must be picklable (module-level functions, bound methods of
+    picklable objects or functools.partial objects). With ``max_workers=1``
+    stages run inline in dependency order, which is useful for debugging.
+    """
+    max_workers: Optional[int] = None
+    log: Callable[[str], None] = print
+    initializer: Optional[Callable[[], None]] = None
+    stages: Dict[str, Stage] = field(default_factory=dict)
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        depends_on: Sequence[str] = (),
+        params: Optional[Dict[str, Any]] = None,
+        code: Sequence[Any] = (),
+        artifacts: Sequence[str] = (),
+    ) -> None:
+        """Register a stage.
+
+        Args:
+            name: Unique stage name
+            func: Zero-argument callable performing the stage
+            depends_on: Names of stages that must complete first
+            params: Parameters the stage output depends on
+            code: Functions/modules whose source the stage output depends on
+                (defaults to ``func`` itself)
+            artifacts: File names the stage writes to the output directory
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage name: {name}")
+        self.stages[name] = Stage(name, func, tuple(depends_on), dict(params or {}),
+                                  tuple(code) or (func,), tuple(artifacts))
+
+    def execution_order(self) -> List[str]:
+        """Return a topological order of the stages (raises on cycles)."""
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.depends_on if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {missing}")
+
+        order: List[str] = []
+        remaining = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"Dependency cycle among stages: {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def run(
+        self,
+        on_result: Optional[Callable[[str, Any], None]] = None,
+        completed: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, StageTiming]:
+        """Execute all stages.
+
+        Args:
+            on_result: Called in the parent process as ``on_result(name, result)``
+                when a stage finishes, before any dependent stage is submitted
+            completed: Results of stages finished in an earlier run (e.g. loaded
+                from the stage cache). These stages are not re-executed; their
+                results are handed to ``on_result`` before anything else runs.
+
+        Returns:
+            Mapping of stage name -> StageTiming (executed stages only)
+        """
+        order = self.execution_order()
+        timings: Dict[str, StageTiming] = {}
+
+        completed = {name: result for name, result in (completed or {}).items()
+                     if name in self.stages}
+        for name in order:
+            if name in completed:
+                self.log(f"   ↻  {name}: inputs unchanged, restored from cache")
+                if on_result is not None:
+                    on_result(name, completed[name])
+        order = [name for name in order if name not in completed]
+
+        def record(name: str, payload: Tuple[Any, float, float, int]) -> None:
+            result, seconds, started, pid = payload
+            timings[name] = StageTiming(name, seconds, started, started + seconds, pid)
+            self.log(f"   ⏱  {name}: {seconds:.2f}s")
+            if on_result is not None:
+                on_result(name, result)
+
+        if self.max_workers == 1 or len(order) <= 1:
+            if self.initializer is not None:
+                self.initializer()
+            for name in order:
+                record(name, _run_timed(self.stages[name].func))
+            return timings
+
+        pending = {name: set(self.stages[name].depends_on) - set(completed) for name in order}
+        running: Dict[Future, str] = {}
+
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 initializer=self.initializer) as pool:
+            while pending or running:
+                for name in [n for n in order if n in pending and not pending[n]]:
+                    del pending[name]
+                    running[pool.submit(_run_timed, self.stages[name].func)] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    record(name, future.result())
+                    for deps in pending.values():
+                        deps.discard(name)
+
+        return timings
+
+
+def format_timings(timings: Dict[str, StageTiming]) -> List[str]:
+    """Format stage timings as aligned report lines, slowest first."""
+    if not timings:
+        return []
+    width = max(len(name) for name in timings)
+    lines = []
+    for timing in sorted(timings.values(), key=lambda t: t.seconds, reverse=True):
+        lines.append(f"{timing.name.ljust(width)}  {timing.seconds:8.2f}s")
+    return lines
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Vectorized statistics core for patient report generation.
+
+Every function here scores all genes (or all signatures) in one call using
+whole-matrix NumPy/SciPy operations instead of per-gene Python loops, so the
+report stages stay fast on full transcriptome panels.
+
+Functions:
+    differential_expression: Mann-Whitney U + log2 fold change for all genes
+    spatial_autocorrelation: Moran's I for all genes with one (cached) weights matrix
+    signature_scores: Mean-expression signature scores for all spots
+"""
+
+import hashlib
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "servers" / "mcp-spatialtools" / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "shared" / "utils"))
+
+from mcp_spatialtools.server import _calculate_morans_i_batch, _spatial_weights
+from multiple_testing import adjust_pvalues
+
+# Spatial weights keyed by (coordinate hash, threshold). Visium slides share one
+# spot layout, so in cohort runs each worker builds the matrix once.
+_WEIGHTS_CACHE: "OrderedDict[tuple, object]" = OrderedDict()
+_WEIGHTS_CACHE_SIZE = 8
+
+
+def cached_spatial_weights(coordinates: np.ndarray, distance_threshold: float):
+    """Return row-standardized spatial weights, reusing a cached matrix if possible."""
+    coordinates = np.ascontiguousarray(coordinates, dtype=float)
+    key = (hashlib.sha1(coordinates.tobytes()).hexdigest(), coordinates.shape, distance_threshold)
+
+    if key in _WEIGHTS_CACHE:
+        _WEIGHTS_CACHE.move_to_end(key)
+        return _WEIGHTS_CACHE[key]
+
+    weights = _spatial_weights(coordinates, distance_threshold)
+    _WEIGHTS_CACHE[key] = weights
+    if len(_WEIGHTS_CACHE) > _WEIGHTS_CACHE_SIZE:
+        _WEIGHTS_CACHE.popitem(last=False)
+    return weights
+
+
+def differential_expression(
+    expression: pd.DataFrame,
+    group1: List[str],
+    group2: List[str],
+) -> pd.DataFrame:
+    """Two-sided Mann-Whitney U test and log2 fold change for every gene.
+
+    Args:
+        expression: Expression matrix (genes × spots)
+        group1: Spot barcodes for the first group (e.g. tumor_core)
+        group2: Spot barcodes for the second group (e.g. stroma)
+
+    Returns:
+        DataFrame with one row per gene: gene, mean_tumor, mean_stroma,
+        log2_fold_change, p_value, statistic, fdr
+    """
+    group1_data = expression[group1].to_numpy(dtype=float)
+    group2_data = expression[group2].to_numpy(dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        statistic, p_value = stats.mannwhitneyu(
+            group1_data, group2_data, alternative='two-sided', axis=1
+        )
+
+    mean1 = group1_data.mean(axis=1)
+    mean2 = group2_data.mean(axis=1)
+
+    # Same capping rules as the per-gene implementation:
+    # mean2 == 0 -> +10 (or 0 if both zero); mean1 == 0 -> -10
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log2fc = np.log2(mean1 / mean2)
+    log2fc = np.where(mean2 > 0, np.where(mean1 > 0, log2fc, -10.0),
+                      np.where(mean1 > 0, 10.0, 0.0))
+
+    # Genes where the test is undefined are reported as not significant
+    failed = ~np.isfinite(p_value)
+    p_value = np.where(failed, 1.0, p_value)
+    statistic = np.where(failed, 0.0, statistic)
+
+    deg_df = pd.DataFrame({
+        'gene': expression.index,
+        'mean_tumor': mean1,
+        'mean_stroma': mean2,
+        'log2_fold_change': log2fc,
+        'p_value': p_value,
+        'statistic': statistic,
+    })
+    deg_df['fdr'] = adjust_pvalues(deg_df['p_value'].values, method="fdr_bh")
+
+    return deg_df
+
+
+def spatial_autocorrelation(
+    expression: pd.DataFrame,
+    coordinates: np.ndarray,
+    distance_threshold: float = 1.5,
+) -> pd.DataFrame:
+    """Moran's I for every gene using a single shared spatial weights matrix.
+
+    Args:
+        expression: Expression matrix (genes × spots)
+        coordinates: Spot coordinates aligned with the expression columns
+        distance_threshold: Maximum distance for neighbors
+
+    Returns:
+        DataFrame with gene, morans_i, z_score, p_value (unsorted)
+    """
+    morans_i, z_score, p_value = _calculate_morans_i_batch(
+        expression.to_numpy(dtype=float),
+        coordinates,
+        distance_threshold=distance_threshold,
+        weights=cached_spatial_weights(coordinates, distance_threshold)
+    )
+
+    return pd.DataFrame({
+        'gene': expression.index,
+        'morans_i': morans_i,
+        'z_score': z_score,
+        'p_value': p_value,
+    })
+
+
+def signature_scores(
+    expression: pd.DataFrame,
+    signatures: Dict[str, List[str]],
+) -> pd.DataFrame:
+    """Mean expression of each signature's available genes, per spot.
+
+    Computed as one product of a normalized gene-membership matrix with the
+    expression matrix. Signatures with no genes present are omitted.
+
+    Args:
+        expression: Expression matrix (genes × spots)
+        signatures: Mapping of signature name -> marker genes
+
+    Returns:
+        DataFrame of scores (spots × signatures)
+    """
+    gene_index = {gene: idx for idx, gene in enumerate(expression.index)}
+
+    names = []
+    membership = []
+    for name, genes in signatures.items():
+        idx = sorted({gene_index[g] for g in genes if g in gene_index})
+        if not idx:
+            continue
+        column = np.zeros(len(gene_index))
+        column[idx] = 1.0 / len(idx)
+        names.append(name)
+        membership.append(column)
+
+    if not names:
+        return pd.DataFrame(index=expression.columns)
+
+    scores = expression.to_numpy(dtype=float).T @ np.column_stack(membership)
+    return pd.DataFrame(scores, index=expression.columns, columns=names)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for patient report stages.
+
+Every stage is identified by a key: the SHA-256 of everything that determines
+its output -- the stage name, the patient, the input data file hashes, the
+stage's parameters, a fingerprint of the code that computes it, and the keys
+of the stages it depends on. Because upstream keys are part of the key, a
+change anywhere propagates to exactly the stages downstream of it.
+
+Stage outputs (the pickled return value plus any files the stage writes) are
+stored under ``<cache>/objects/<key[:2]>/<key>/``. Re-running a report after
+a CitL review, or after editing one parameter, re-executes only the stages
+whose key changed; everything else is restored from the cache.
+
+Usage:
+    cache = StageCache(output_dir / ".stage_cache")
+    keys = stage_keys(pipeline, inputs={"expression": hash_file(expr_file)},
+                      context={"patient_id": patient_id})
+    if cache.contains(keys["volcano_plot"]):
+        result = cache.load(keys["volcano_plot"], patient_output_dir)
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from report_pipeline import StagePipeline
+
+# Bump to invalidate every cached entry (e.g. when the entry layout changes)
+CACHE_FORMAT_VERSION = 1
+
+RESULT_FILE = "result.pkl"
+MANIFEST_FILE = "manifest.json"
+ARTIFACTS_DIR = "artifacts"
+
+
+def _digest(payload: Any) -> str:
+    """SHA-256 of a JSON-serializable payload (stable key order)."""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_fingerprint(objects: Iterable[Any]) -> str:
+    """Fingerprint the source code of functions, methods or whole modules.
+
+    Modules are hashed by file contents; functions and methods by their own
+    source, so editing one figure function only invalidates that figure.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        obj = getattr(obj, '__func__', obj)  # Bound method -> function
+        if inspect.ismodule(obj):
+            digest.update(Path(inspect.getsourcefile(obj)).read_bytes())
+        else:
+            digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+def stage_keys(
+    pipeline: StagePipeline,
+    inputs: Dict[str, str],
+    context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
+    """Compute the content key of every stage in dependency order.
+
+    Args:
+        pipeline: Stage graph (stage ``params`` and ``code`` are part of the key)
+        inputs: Input name -> content hash (e.g. data file hashes)
+        context: Extra values shared by all stages (e.g. patient ID)
+
+    Returns:
+        Mapping of stage name -> hex key
+    """
+    keys: Dict[str, str] = {}
+    for name in pipeline.execution_order():
+        stage = pipeline.stages[name]
+        keys[name] = _digest({
+            'format': CACHE_FORMAT_VERSION,
+            'stage': name,
+            'context': context or {},
+            'inputs': inputs,
+            'params': stage.params,
+            'code': code_fingerprint(stage.code),
+            'upstream': {dep: keys[dep] for dep in stage.depends_on},
+        })
+    return keys
+
+
+class StageCache:
+    """On-disk store of stage results and artifacts, addressed by stage key."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def entry_dir(self, key: str) -> Path:
+        """Directory holding one cache entry."""
+        return self.root / "objects" / key[:2] / key
+
+    def contains(self, key: str) -> bool:
+        """True if a complete entry exists for this key."""
+        return (self.entry_dir(key) / MANIFEST_FILE).exists()
+
+    def load(self, key: str, artifact_dir: Path) -> Any:
+        """Return a cached stage result and restore its artifacts into ``artifact_dir``."""
+        entry = self.entry_dir(key)
+        with open(entry / MANIFEST_FILE) as f:
+            manifest = json.load(f)
+        for name in manifest['artifacts']:
+            shutil.copy2(entry / ARTIFACTS_DIR / name, Path(artifact_dir) / name)
+        with open(entry / RESULT_FILE, 'rb') as f:
+            return pickle.load(f)
+
+    def store(
+        self,
+        key: str,
+        stage_name: str,
+        result: Any,
+        artifact_dir: Path,
+        artifacts: Iterable[str] = (),
+    ) -> None:
+        """Store a stage result and the files it wrote.
+
+        The entry is assembled in a temporary directory and renamed into place,
+        so concurrent writers (e.g. cohort workers) never expose partial entries.
+        Artifacts the stage did not produce (it may skip figures on missing
+        inputs) are simply not recorded.
+        """
+        entry = self.entry_dir(key)
+        if self.contains(key):
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_entry = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=entry.parent))
+        try:
+            (tmp_entry / ARTIFACTS_DIR).mkdir()
+            stored = []
+            for name in artifacts:
+                source = Path(artifact_dir) / name
+                if source.exists():
+                    shutil.copy2(source, tmp_entry / ARTIFACTS_DIR / name)
+                    stored.append(name)
+
+            with open(tmp_entry / RESULT_FILE, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(tmp_entry / MANIFEST_FILE, 'w') as f:
+                json.dump({
+                    'key': key,
+                    'stage': stage_name,
+                    'artifacts': stored,
+                    'created_at': datetime.now().isoformat(),
+                }, f, indent=2)
+
+            try:
+                os.rename(tmp_entry, entry)
+            except OSError:
+                # Another process stored the same key first; its entry is identical
+                if not self.contains(key):
+                    raise
+        finally:
+            if tmp_entry.exists():
+                shutil.rmtree(tmp_entry, ignore_errors=True)